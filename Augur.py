@@ -11,6 +11,7 @@ import reeds
 import ReEDS_Augur.prep_data as prep_data
 import ReEDS_Augur.capacity_credit as capacity_credit
 import ReEDS_Augur.stress_periods as stress_periods
+import ReEDS_Augur.pras_worker as pras_worker
 
 
 #%% Functions
@@ -35,6 +36,11 @@ def run_pras(
     Only keys in the switches dictionary are allowed, but we do not check types or
     self-consistency for the provided values, so review the allowed choices in cases.csv
     and use these additional arguments at your own risk.
+
+    If the pras_worker switch is on, the job is sent to a persistent Julia process
+    (started on the first call for the case) to avoid loading packages and compiling
+    on every call. If the worker can't be started, fails, or returns a nonzero exit code,
+    it is stopped and run_pras.jl is run in a new Julia process instead.
     """
     ### Get the PRAS settings for this solve year
     print('Running ReEDS2PRAS and PRAS')
@@ -49,7 +55,7 @@ def run_pras(
     start_year = min(sw['resource_adequacy_years_list'])
     ## ReEDS2PRAS runs at hourly resolution
     timesteps = sw['num_resource_adequacy_years'] * 8760
-    command = ' '.join([
+    julia = [
         "julia",
         f"--project={sw['reeds_path']}",
         ### As of 20231113 there seems to be a problem with multithreading in julia on
@@ -59,7 +65,8 @@ def run_pras(
             '--threads=1' if (sys.platform == 'darwin')
             else f"--threads={sw['threads'] if sw['threads'] > 0 else 'auto'}"
         ),
-        f"{os.path.join(scriptpath, 'ReEDS_Augur','run_pras.jl')}",
+    ]
+    args = [
         f"--reeds_path={sw['reeds_path']}",
         f"--reedscase={casedir}",
         f"--solve_year={t}",
@@ -79,13 +86,38 @@ def run_pras(
         f"--pras_existing_unit_size={int(sw['pras_existing_unit_size'])}",
         f"--pras_max_unitsize_prm={int(sw.get('pras_max_unitsize_prm',1))}",
         f"--pras_seed={int(sw['pras_seed'])}",
-    ])
+    ]
+    command = ' '.join(
+        julia + [f"{os.path.join(scriptpath, 'ReEDS_Augur','run_pras.jl')}"] + args)
     print(command)
     print(f'vvvvvvvvvvvvvvv run_pras.jl {t}i{iteration} vvvvvvvvvvvvvvv')
-    log = open(os.path.join(casedir, 'gamslog.txt'), 'a')
-    result = subprocess.run(command, stdout=log, stderr=log, text=True, shell=True)
-    log.close()
+    result = None
+    try:
+        if int(sw.get('pras_worker', 0)):
+            try:
+                returncode = pras_worker.run(casedir, args, julia, scriptpath)
+                if returncode:
+                    ## The worker may be left in a bad state, so retry in a new process
+                    print(
+                        f'PRAS worker returned {returncode} so running run_pras.jl directly')
+                    pras_worker.stop(casedir)
+                else:
+                    result = subprocess.CompletedProcess(args=command, returncode=returncode)
+            except Exception as err:
+                print(f'PRAS worker failed so running run_pras.jl directly: {err}')
+                pras_worker.stop(casedir)
+        if result is None:
+            log = open(os.path.join(casedir, 'gamslog.txt'), 'a')
+            result = subprocess.run(command, stdout=log, stderr=log, text=True, shell=True)
+            log.close()
+    except BaseException:
+        ## Don't leave a worker running if the run is about to stop
+        pras_worker.stop(casedir)
+        raise
     print(f'^^^^^^^^^^^^^^^ run_pras.jl {t}i{iteration} ^^^^^^^^^^^^^^^')
+    ## The caller raises an exception for failed jobs, so stop the worker too
+    if result.returncode:
+        pras_worker.stop(casedir)
 
     if recordtime:
         try:
@@ -159,6 +191,10 @@ def main(t, tnext, casedir, iteration=0):
             write_flow=(True if t == max(solveyears) else False),
             write_energy=True,
         )
+        ## Don't leave the PRAS worker running after the last solve year
+        ## (d_solve_iterate.py stops it after the last stress period iteration)
+        if (t == max(solveyears)) and int(sw.GSw_PRM_CapCredit):
+            pras_worker.stop(casedir)
         if result.returncode:
             raise Exception(
                 f"run_pras.jl returned code {result.returncode}. Check gamslog.txt for error trace."
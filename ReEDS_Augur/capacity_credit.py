@@ -1,5 +1,7 @@
 #%% IMPORTS
 import os
+import datetime
+import concurrent.futures
 import numpy as np
 import pandas as pd
 import gdxpds
@@ -98,7 +100,22 @@ def load_evmc_data(csv_path,inputs_case,h_dt_szn,
     df = pd.read_csv(os.path.join(inputs_case,csv_path))
     df = pd.merge(df,h_dt_szn[set_h_szn_cols],on='hour',how='left')
     return df.set_index(set_idx_cols)
-     
+
+
+def get_cc_workers(sw, tasks_n):
+    '''
+    Get the number of worker threads to use for the (ccreg, ccseason) capacity
+    credit calculations. Parallel execution is opt-in (cc_parallel = 1) and
+    uses up to the number of threads in the solver options file
+    (or all available cores if threads <= 0).
+    '''
+    if not int(sw.get('cc_parallel', 0)):
+        return 1
+    threads = int(sw.get('threads', 1))
+    if threads <= 0:
+        threads = os.cpu_count() or 1
+    return max(1, min(threads, tasks_n))
+
 
 #%% Main function
 def reeds_cc(t, tnext, casedir):
@@ -171,7 +188,8 @@ def reeds_cc(t, tnext, casedir):
     ## vre_gen needs to have tech_class_r columns
     ## last version has (ccseason,year,h,hour) index
     vre_gen = pd.read_hdf(os.path.join(augur_data,f'vre_gen_exist_{t}.h5'))
-    ## vre_cf_marg has same columns and index as vre_gen
+    ## vre_cf_marg has same columns and index as vre_gen; it is scaled by
+    ## marg_vre_mw_cc within cc_vg to avoid storing a copy of the marginal power
     vre_cf_marg = pd.read_hdf(os.path.join(augur_data,f'vre_cf_marg_{t}.h5'))
 
     if int(sw['GSw_PRM_CapCreditMulti']) == 0:
@@ -184,10 +202,10 @@ def reeds_cc(t, tnext, casedir):
     for ccseason in ccseasons:
         if ccseason == 'year':
             vregen_ccseason[ccseason] = vre_gen
-            vregen_marginal_ccseason[ccseason] = vre_cf_marg * marg_vre_mw_cc
+            vregen_marginal_ccseason[ccseason] = vre_cf_marg
         else:
             vregen_ccseason[ccseason] = vre_gen.loc[ccseason]
-            vregen_marginal_ccseason[ccseason] = (vre_cf_marg * marg_vre_mw_cc).loc[ccseason]
+            vregen_marginal_ccseason[ccseason] = vre_cf_marg.loc[ccseason]
 
     load_profiles = (
         # HOURLY_PROFILES['load'].profiles
@@ -214,6 +232,7 @@ def reeds_cc(t, tnext, casedir):
     dict_cc_evmc = {}
     dict_net_load = {}
     dict_net_load_2012 = {}
+    ccreg_inputs = {}
 
     #%% Loop over CCREGs
     for ccreg in hierarchy['ccreg'].drop_duplicates():
@@ -222,8 +241,6 @@ def reeds_cc(t, tnext, casedir):
         # ------- Get load profile, RECF profiles, VG capacity, storage
         # capacity, and storage RTE for this CCREG -------
 
-        log.info('Calculating capacity credit for {}'.format(ccreg))
-
         # Resources to be used
         resources_ccreg = resource_profiles[resource_profiles['ccreg'] == ccreg]
         resourcelist = (
@@ -242,6 +259,9 @@ def reeds_cc(t, tnext, casedir):
             evmc_shape_reg = [r for r in resources_ccreg.r.drop_duplicates()
                       if r in evmccf_shape_decrease.columns]
             evmccf_shape_decrease_ccreg = evmccf_shape_decrease[['i'] + evmc_shape_reg]
+        else:
+            evmccf_shape_increase_ccreg = None
+            evmccf_shape_decrease_ccreg = None
 
         # Storage information
         # Note that we only calculate storage capacity credit for storage in the same ccreg
@@ -271,144 +291,182 @@ def reeds_cc(t, tnext, casedir):
         # log.debug(f'reductions_considered = {reductions_considered}')
         # log.debug(f'peak_reductions diff = {peak_reductions[1] - peak_reductions[0]}')
 
-        # ---------------------------- CALL FUNCTIONS -------------------------
-        #%%  Loop over ccseasons
-        for ccseason in ccseasons:
-            #%%
-            # ccseason = 'winter'  # Uncomment for debugging
-            # Get the load and CF profiles for this ccseason
-            if ccseason == 'year':
-                load_profile_ccseason = load_profile_ccreg.copy()
-                hours_considered = int(sw['cc_ann_hours'])
-                if int(sw['GSw_EVMC']):
-                    evmc_shape_load_ccseason = evmccf_shape_increase_ccreg.copy()
-                    evmc_shape_gen_ccseason = evmccf_shape_decrease_ccreg.copy()
+        ccreg_inputs[ccreg] = {
+            'resourcelist': resourcelist,
+            'load_profile': load_profile_ccreg,
+            'evmc_increase': evmccf_shape_increase_ccreg,
+            'evmc_decrease': evmccf_shape_decrease_ccreg,
+            'eff_charge': eff_charge,
+            'peak_reductions': peak_reductions,
+        }
+
+    def pivot_melt_data(df):
+        return pd.pivot_table(
+            pd.melt(df,
+                id_vars=['h','year','hour','i'],
+                var_name='r'),
+        index=['year','hour','h'],
+        columns=['i','r'], values='value')
+
+    # ---------------------------- CALL FUNCTIONS -------------------------
+    def calc_cc_ccreg_ccseason(ccreg, ccseason):
+        """
+        Calculate the capacity credit for one (ccreg, ccseason) pair.
+        Each pair is independent, so this function only reads the shared inputs
+        and returns its results, allowing the pairs to be run in parallel.
+        """
+        tic = datetime.datetime.now()
+        inputs = ccreg_inputs[ccreg]
+        resourcelist = inputs['resourcelist']
+        results = {}
+        # Get the load and CF profiles for this ccseason
+        if ccseason == 'year':
+            load_profile_ccseason = inputs['load_profile'].copy()
+            hours_considered = int(sw['cc_ann_hours'])
+            if int(sw['GSw_EVMC']):
+                evmc_shape_load_ccseason = inputs['evmc_increase'].copy()
+                evmc_shape_gen_ccseason = inputs['evmc_decrease'].copy()
+
+        else:
+            load_profile_ccseason = inputs['load_profile'].xs(
+                ccseason, axis=0, level='ccseason').reset_index()
+            hours_considered = int(sw['GSw_PRM_CapCreditHours'])
 
-            else:
-                load_profile_ccseason = load_profile_ccreg.xs(
+            if int(sw['GSw_EVMC']):
+                evmc_shape_load_ccseason = inputs['evmc_increase'].xs(
+                    ccseason, axis=0, level='ccseason').reset_index()
+                evmc_shape_gen_ccseason = inputs['evmc_decrease'].xs(
                     ccseason, axis=0, level='ccseason').reset_index()
-                hours_considered = int(sw['GSw_PRM_CapCreditHours'])
-
-                if int(sw['GSw_EVMC']):
-                    evmc_shape_load_ccseason = evmccf_shape_increase_ccreg.xs(
-                        ccseason, axis=0, level='ccseason').reset_index()
-                    evmc_shape_gen_ccseason = evmccf_shape_decrease_ccreg.xs(
-                        ccseason, axis=0, level='ccseason').reset_index()
-
-            # log.debug(ccseason, int(len(load_profile_ccseason) / 7))
-            ###### Calculate the capacity credit for each resource
-            cc_vg_results = cc_vg(
-                vg_power=vregen_ccseason[ccseason][resourcelist].values,
-                load=load_profile_ccseason[ccreg].values,
-                vg_marg_power=vregen_marginal_ccseason[ccseason][resourcelist].values,
-                top_hours_n=hours_considered, cap_marg=marg_vre_mw_cc)
-
-            ###### Store the existing and marginal capacity credit results
-            dict_cc_old[ccreg, ccseason] = pd.DataFrame({
-                'resource': resource_profiles.set_index('resource').loc[resourcelist].index,
-                'MW': cc_vg_results['cap_useful_MW'][:,0],
-            })
-
-            dict_cc_mar[ccreg, ccseason] = (
-                resource_profiles.loc[resource_profiles.resource.isin(resourcelist)]
-                .drop('ccreg', axis=1)
-                .assign(CC=cc_vg_results['cc_marg'])
-            )
 
-            net_load_ccreg_ccseason = (
-                load_profile_ccseason.drop(columns=ccreg)
-                .assign(MW=cc_vg_results['load_net'])
-                .sort_values(['MW'], ascending=False)
-            )
-            #Save top n hrs of net load for ccreg and ccseason across all years, and for 2012 alone
-            net_load_out_numhrs = 500
-            dict_net_load[ccreg, ccseason] = net_load_ccreg_ccseason.head(net_load_out_numhrs)
-            dict_net_load_2012[ccreg, ccseason] = (
-                net_load_ccreg_ccseason[net_load_ccreg_ccseason['year']==2012].head(net_load_out_numhrs)
-            )
+        # log.debug(ccseason, int(len(load_profile_ccseason) / 7))
+        ###### Calculate the capacity credit for each resource
+        cc_vg_results = cc_vg(
+            vg_power=vregen_ccseason[ccseason][resourcelist].values,
+            load=load_profile_ccseason[ccreg].values,
+            vg_marg_power=vregen_marginal_ccseason[ccseason][resourcelist].values,
+            top_hours_n=hours_considered, cap_marg=marg_vre_mw_cc,
+            marg_scale=marg_vre_mw_cc, chunk_mb=float(sw['cc_chunk_mb']))
+        results['peak_bytes'] = cc_vg_results['peak_bytes']
+
+        ###### Store the existing and marginal capacity credit results
+        results['cc_old'] = pd.DataFrame({
+            'resource': resource_profiles.set_index('resource').loc[resourcelist].index,
+            'MW': cc_vg_results['cap_useful_MW'][:,0],
+        })
+
+        results['cc_mar'] = (
+            resource_profiles.loc[resource_profiles.resource.isin(resourcelist)]
+            .drop('ccreg', axis=1)
+            .assign(CC=cc_vg_results['cc_marg'])
+        )
 
-            ###### Calculate the storage capacity credit
-            # The call to this function gives the MWh required for each
-            # peak reduction capacity. For each data year, loop through
-            # and get get the MWh needed for each peak reduction capacity.
-            # Get a "ccseason_required_MWhs" for each year.
-            # Get the maximum value for each position in the array.
-            # Make a new "ccseason_required_MWhs" array to send to the
-            # cc_storage function.
-            # Call storage cc functions for existing and marginal
-            # conventional storage.
-            net_load_profile_timestamp = pd.DataFrame(
-                cc_vg_results['load_net'], load_profile_ccseason.year)
-            years = list(net_load_profile_timestamp.index.unique())
-
-            for y in years:
-                net_load_profile_temp = net_load_profile_timestamp.iloc[
-                    :, 0][net_load_profile_timestamp.index == y].to_numpy()
-                required_MWhs_temp, batt_powers = calc_required_mwh(
-                    load_profile=net_load_profile_temp.copy(),
-                    peak_reductions=peak_reductions.copy(),
-                    eff_charge=eff_charge, stor_buffer_minutes=float(sw['cc_stor_buffer']))
-
-                if years.index(y) == 0:
-                    required_MWhs = required_MWhs_temp.copy()
-                else:
-                    required_MWhs = np.maximum(required_MWhs, required_MWhs_temp)
-
-            # Get the peaking storage potential by duration
-            peaking_stor = cc_storage(
-                pr=peak_reductions.copy(),
-                re=required_MWhs.copy(), 
-                sdb=sdb.copy(), log=log)
-            
-            # Store the storage capacity credit along with the energy capacity.
-            # For the safety bin, compute MWh as safety_bin * cc_safety_bin_size.
-            dict_sdbin_size[ccreg, ccseason] = pd.concat([
-                peaking_stor[['duration', 'MW']],
-                pd.DataFrame({
-                    'duration': [safety_bin],
-                    'MW': float(sw['cc_safety_bin_size'])
-                }),
-            ], ignore_index=True)
-            
-            def pivot_melt_data(df):
-                return pd.pivot_table(
-                    pd.melt(df,
-                        id_vars=['h','year','hour','i'],
-                        var_name='r'),
-                index=['year','hour','h'],
-                columns=['i','r'], values='value')
+        net_load_ccreg_ccseason = (
+            load_profile_ccseason.drop(columns=ccreg)
+            .assign(MW=cc_vg_results['load_net'])
+            .sort_values(['MW'], ascending=False)
+        )
+        #Save top n hrs of net load for ccreg and ccseason across all years, and for 2012 alone
+        net_load_out_numhrs = 500
+        results['net_load'] = net_load_ccreg_ccseason.head(net_load_out_numhrs)
+        results['net_load_2012'] = (
+            net_load_ccreg_ccseason[net_load_ccreg_ccseason['year']==2012].head(net_load_out_numhrs)
+        )
 
-            if int(sw['GSw_EVMC']):
-                evmc_shape_inc_timestamp = pivot_melt_data(evmc_shape_load_ccseason)
-                evmc_shape_dec_timestamp = pivot_melt_data(evmc_shape_gen_ccseason)
-                evmc_years = evmc_shape_dec_timestamp.index.get_level_values('year').unique()
-                #do as evmc cap credit instead?
-                if len(evmc_years)==1:
-                    gen_array = evmc_shape_dec_timestamp.values - evmc_shape_inc_timestamp.values 
-                    evmc_shape_marg_power = np.tile(gen_array,(7,1))
-                elif len(evmc_years)==7:
-                    evmc_shape_marg_power = evmc_shape_dec_timestamp.values - evmc_shape_inc_timestamp.values 
-                else:
-                    log.info("no weather year data on EVMC for any relevant regions; skipping")
-                    continue
-                
+        ###### Calculate the storage capacity credit
+        # The call to calc_required_mwh_batch gives the MWh required for each
+        # peak reduction capacity for each data year (all handled in a single
+        # vectorized call). Take the maximum value for each position across
+        # years and send it to the cc_storage function.
+        net_load_years = load_profile_ccseason.year.values
+        required_MWhs = np.max(
+            calc_required_mwh_batch(
+                load_profiles=[
+                    cc_vg_results['load_net'][net_load_years == y]
+                    for y in pd.unique(net_load_years)
+                ],
+                peak_reductions=inputs['peak_reductions'],
+                eff_charge=inputs['eff_charge'],
+                stor_buffer_minutes=float(sw['cc_stor_buffer'])),
+            axis=0,
+        )
+
+        # Get the peaking storage potential by duration
+        peaking_stor = cc_storage(
+            pr=inputs['peak_reductions'].copy(),
+            re=required_MWhs.copy(),
+            sdb=sdb.copy(), log=log)
+
+        # Store the storage capacity credit along with the energy capacity.
+        # For the safety bin, compute MWh as safety_bin * cc_safety_bin_size.
+        results['sdbin_size'] = pd.concat([
+            peaking_stor[['duration', 'MW']],
+            pd.DataFrame({
+                'duration': [safety_bin],
+                'MW': float(sw['cc_safety_bin_size'])
+            }),
+        ], ignore_index=True)
+
+        if int(sw['GSw_EVMC']):
+            evmc_shape_inc_timestamp = pivot_melt_data(evmc_shape_load_ccseason)
+            evmc_shape_dec_timestamp = pivot_melt_data(evmc_shape_gen_ccseason)
+            evmc_years = evmc_shape_dec_timestamp.index.get_level_values('year').unique()
+            #do as evmc cap credit instead?
+            if len(evmc_years)==1:
+                gen_array = evmc_shape_dec_timestamp.values - evmc_shape_inc_timestamp.values 
+                evmc_shape_marg_power = np.tile(gen_array,(7,1))
+            elif len(evmc_years)==7:
+                evmc_shape_marg_power = evmc_shape_dec_timestamp.values - evmc_shape_inc_timestamp.values 
+            else:
+                log.info("no weather year data on EVMC for any relevant regions; skipping")
+                evmc_shape_marg_power = None
+
+            if evmc_shape_marg_power is not None:
                 ###### Calculate the capacity credit for each evmc_shape resource
                 results_evmc_shape = cc_evmc_shape(load=cc_vg_results['load'],
                     load_net=cc_vg_results['load_net'],
                     top_hours_net=cc_vg_results['top_hours_net'],
                     top_hours_n=hours_considered,
-                    evmc_shape_marg_power=evmc_shape_marg_power*float(sw['marg_evmc_mw']),
-                    cap_marg=float(sw['marg_evmc_mw']))
+                    evmc_shape_marg_power=evmc_shape_marg_power,
+                    cap_marg=float(sw['marg_evmc_mw']),
+                    marg_scale=float(sw['marg_evmc_mw']),
+                    chunk_mb=float(sw['cc_chunk_mb']))
 
                 evmc_cc_i = pd.melt(pd.DataFrame(data=[np.round(results_evmc_shape, decimals=5), ],
                                         columns=evmc_shape_dec_timestamp.columns))
 
-                if (ccreg, ccseason) in dict_cc_evmc.keys():
-                    dict_cc_evmc[ccreg, ccseason] = pd.concat(
-                    [dict_cc_evmc[ccreg, ccseason],
-                    evmc_cc_i[['r', 'i', 'value']]])
-                else:
-                    dict_cc_evmc[ccreg, ccseason] = evmc_cc_i[['r', 'i', 'value']]
+                results['cc_evmc'] = evmc_cc_i[['r', 'i', 'value']]
+
+        results['seconds'] = (datetime.datetime.now() - tic).total_seconds()
+        return results
+
+    #%% Loop over (ccreg, ccseason) pairs, in parallel if cc_parallel is turned on
+    tasks = [(ccreg, ccseason) for ccreg in ccreg_inputs for ccseason in ccseasons]
+    workers = get_cc_workers(sw, len(tasks))
+    log.info(f'Calculating capacity credit for {len(tasks)} (ccreg, ccseason) pairs '
+             f'using {workers} worker thread{"s" if workers > 1 else ""}')
+    if workers > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            task_results = list(executor.map(lambda task: calc_cc_ccreg_ccseason(*task), tasks))
+    else:
+        task_results = [calc_cc_ccreg_ccseason(*task) for task in tasks]
+
+    ### Merge the results in (ccreg, ccseason) order so outputs don't depend on workers
+    peak_bytes = 0
+    for (ccreg, ccseason), results in zip(tasks, task_results):
+        log.info('Calculated capacity credit for {} {} in {:.2f} s'.format(
+            ccreg, ccseason, results['seconds']))
+        dict_cc_old[ccreg, ccseason] = results['cc_old']
+        dict_cc_mar[ccreg, ccseason] = results['cc_mar']
+        dict_net_load[ccreg, ccseason] = results['net_load']
+        dict_net_load_2012[ccreg, ccseason] = results['net_load_2012']
+        dict_sdbin_size[ccreg, ccseason] = results['sdbin_size']
+        if 'cc_evmc' in results:
+            dict_cc_evmc[ccreg, ccseason] = results['cc_evmc']
+        peak_bytes = max(peak_bytes, results['peak_bytes'])
+
+    log.info(
+        'Peak marginal net load working memory: {:.0f} MB (cc_chunk_mb = {})'.format(
+            peak_bytes / 1e6, sw['cc_chunk_mb']))
 
     # ------ AGGREGATE OUTPUTS ------
     cc_old = (
@@ -490,9 +548,67 @@ def reeds_cc(t, tnext, casedir):
     return cc_results
 
 #%% Additional functions
+# ------------------ TOP HOURS OF MARGINAL NET LOAD ---------------------------
+def calc_peak_marg_net_load(load_net, marg_power, top_hours_n, marg_scale=1., chunk_mb=None):
+    '''
+    Get the top_hours_n highest hours of marginal net load (load_net minus the
+    marginal power profile) for each resource, sorted from highest to lowest.
+    Only the hours that could be among the top hours for some resource are kept,
+    and resources are processed in blocks, so the full [hours x resources]
+    marginal net load matrix is never stored.
+    Args:
+        load_net: numpy array containing the net load profile. Units: MW
+        marg_power: numpy matrix [hours x resources] containing the marginal power
+            profiles (or capacity factor profiles if marg_scale is provided)
+        top_hours_n: number of top hours to keep
+        marg_scale: factor applied to marg_power (e.g. the marginal capacity in MW
+            when marg_power contains capacity factors)
+        chunk_mb: maximum size (in MB) of the working block; if None, all resources
+            are processed at once
+    Returns:
+        peak_net_load: numpy matrix [top_hours_n x resources]
+        peak_bytes: size (in bytes) of the largest working block
+    '''
+    hours_n, resources_n = marg_power.shape
+    peak_net_load = np.empty((top_hours_n, resources_n))
+    if not resources_n:
+        return peak_net_load, 0
+
+    ### The top_hours_n-th highest marginal net load for any resource is at least the
+    ### top_hours_n-th highest net load minus the largest marginal power, so hours with
+    ### net load below that (plus the range of marginal power) can be skipped.
+    marg_min, marg_max = sorted([np.min(marg_power) * marg_scale, np.max(marg_power) * marg_scale])
+    marg_range = (marg_max - marg_min) * (1 + 1e-9) + 1e-6
+    threshold = np.partition(load_net, hours_n - top_hours_n)[hours_n - top_hours_n] - marg_range
+    hours = np.flatnonzero(load_net >= threshold)
+    load_net_hours = load_net[hours]
+
+    if chunk_mb is None:
+        chunk = resources_n
+    else:
+        chunk = max(1, int(float(chunk_mb) * 1e6 // (len(hours) * 8)))
+    peak_bytes = 0
+    for start in range(0, resources_n, chunk):
+        cols = slice(start, min(start + chunk, resources_n))
+        ## Store the block as [resources x hours] so each resource is contiguous
+        ## (scaling is applied before casting to match the precision of marg_power * marg_scale)
+        block = marg_power[hours, cols].T
+        if marg_scale != 1:
+            block = block * marg_scale
+        block = np.ascontiguousarray(block, dtype=float)
+        ## Marginal net load for this block of resources
+        np.subtract(load_net_hours, block, out=block)
+        ### np.partition returns the max top_hours_n values, unsorted; then np.sort sorts.
+        ### So we only sort top_hours_n values instead of the whole array, saving time.
+        block.partition(len(hours) - top_hours_n, axis=1)
+        peak_net_load[:, cols] = np.sort(block[:, -top_hours_n:], axis=1)[:, ::-1].T
+        peak_bytes = max(peak_bytes, block.nbytes)
+
+    return peak_net_load, peak_bytes
+
+
 # ------------------ CALC CC OF EXISTING VG RESOURCES -------------------------
-# @numba.jit(cache=True)
-def cc_vg(vg_power, load, vg_marg_power, top_hours_n, cap_marg):
+def cc_vg(vg_power, load, vg_marg_power, top_hours_n, cap_marg, marg_scale=1., chunk_mb=None):
     '''
     Calculate the capacity credit of existing and marginal variable generation
     capacity using a top hour approximation. More details on the methodology
@@ -503,10 +619,14 @@ def cc_vg(vg_power, load, vg_marg_power, top_hours_n, cap_marg):
             hours_n for each variable generating resource
         load: numpy array containing time-synchronous load profile for all
             hours_n. Units: MW
-        cf_marg: numpy array containing capacity factor profiles for marginal
-            builds of each variable generating resource
+        vg_marg_power: numpy matrix containing power output profiles for marginal
+            builds of each variable generating resource (or capacity factor
+            profiles if marg_scale is provided)
         top_hours_n: number of top hours to consider for the calculation
         cap_marg: marginal capacity used to calculate marginal capacity credit
+        marg_scale: factor applied to vg_marg_power
+        chunk_mb: maximum size (in MB) of the working block used to find the
+            top hours of marginal net load
     Returns:
         cc_marg: marginal capacity credit for each variable generating resource
         load_net: net load profile. Units: MW
@@ -514,6 +634,7 @@ def cc_vg(vg_power, load, vg_marg_power, top_hours_n, cap_marg):
             length top_hours_n
         top_hours: argumnets for the highest load hours in load, length
             top_hours_n
+        peak_bytes: size (in bytes) of the largest marginal net load working block
     Notes:
         Currently only built for hourly profiles. Generalize to any duration
             timestep.
@@ -539,14 +660,11 @@ def cc_vg(vg_power, load, vg_marg_power, top_hours_n, cap_marg):
     # VG Capacity credit allocation documentation.pptx" for additional details
     load_dif = load[top_hours] - load_net[top_hours]
     load_reduct = load[top_hours] - load_net[top_hours_net]
-    load_ratio = np.tile(
-        np.divide(
-            load_reduct, load_dif,
-            out=np.zeros_like(load_reduct),
-            where=load_dif != 0,
-        ).reshape(top_hours_n, 1),
-        (1, vg_power.shape[1])
-    )
+    load_ratio = np.divide(
+        load_reduct, load_dif,
+        out=np.zeros_like(load_reduct),
+        where=load_dif != 0,
+    ).reshape(top_hours_n, 1)
     # get the existing cc for each resource
     gen_tech = (
         vg_power[top_hours_net, :]
@@ -555,42 +673,25 @@ def cc_vg(vg_power, load, vg_marg_power, top_hours_n, cap_marg):
             vg_power[top_hours, :]*load_ratio,
             vg_power[top_hours, :]))
 
-    gen_sum = np.tile(
-        np.sum(gen_tech, axis=1).reshape(top_hours_n, 1),
-        (1, vg_power.shape[1]))
+    gen_sum = np.broadcast_to(
+        np.sum(gen_tech, axis=1).reshape(top_hours_n, 1), gen_tech.shape)
 
     gen_frac = np.divide(
         gen_tech, gen_sum,
         out=np.zeros_like(gen_tech), where=gen_sum != 0)
 
     cap_useful_MW = (
-        np.sum(
-            gen_frac
-            * np.tile(load_reduct.reshape(top_hours_n, 1), (1, vg_power.shape[1])),
-            axis=0)
+        np.sum(gen_frac * load_reduct.reshape(top_hours_n, 1), axis=0)
         / top_hours_n
     ).reshape(vg_power.shape[1], 1)
 
-    # get the marg net load for each VG resource [hours x resources]
-    load_marg = (
-        np.tile(load_net.reshape(hours_n, 1), (1, vg_marg_power.shape[1]))
-        - vg_marg_power)
-
-    ### Get the peak net load hours [top_hours_n x resources]
-    peak_net_load = np.transpose(np.array(
-        ### np.partition returns the max top_hours_n values, unsorted; then np.sort sorts.
-        ### So we only sort top_hours_n values instead of the whole array, saving time.
-        [np.sort(
-            np.partition(load_marg[:,n], -top_hours_n)[-top_hours_n:]
-         )[::-1]
-         for n in range(load_marg.shape[1])]
-    ))
+    ### Get the peak net load hours for each VG resource [top_hours_n x resources]
+    peak_net_load, peak_bytes = calc_peak_marg_net_load(
+        load_net=load_net, marg_power=vg_marg_power, top_hours_n=top_hours_n,
+        marg_scale=marg_scale, chunk_mb=chunk_mb)
 
     # get the reductions in load for each resource
-    load_reduct_marg = np.tile(
-        load_net[top_hours_net].reshape(top_hours_n, 1),
-        (1, vg_marg_power.shape[1])
-    ) - peak_net_load
+    load_reduct_marg = load_net[top_hours_net].reshape(top_hours_n, 1) - peak_net_load
 
     # get the marginal CCs for each resource
     cc_marg = np.sum(load_reduct_marg, axis=0) / top_hours_n / cap_marg
@@ -609,12 +710,16 @@ def cc_vg(vg_power, load, vg_marg_power, top_hours_n, cap_marg):
         'cc_marg': cc_marg,
         'cap_useful_MW': cap_useful_MW,
         'top_hours_net': top_hours_net,
-        'peak_net_load': peak_net_load
+        'peak_net_load': peak_net_load,
+        'peak_bytes': peak_bytes,
     }
 
     return results
 
-def cc_evmc_shape(load,load_net,top_hours_net,top_hours_n,evmc_shape_marg_power,cap_marg):
+def cc_evmc_shape(
+        load, load_net, top_hours_net, top_hours_n, evmc_shape_marg_power, cap_marg,
+        marg_scale=1., chunk_mb=None,
+    ):
     '''
     Calculate the capacity credit of marginal evmc_shape resources
     using a top hour approximation.
@@ -628,33 +733,21 @@ def cc_evmc_shape(load,load_net,top_hours_net,top_hours_n,evmc_shape_marg_power,
         evmc_shape_marg: numpy array containing capacity factor profiles for marginal
             builds of each evmc_shape resource bin
         cap_marg: marginal capacity used to calculate marginal capacity credit
+        marg_scale: factor applied to evmc_shape_marg_power
+        chunk_mb: maximum size (in MB) of the working block used to find the
+            top hours of marginal net load
     Returns:
         cc_marg: marginal capacity credit for each evmc_shape resource
     Notes:
         Currently only built for hourly profiles. Generalize to any duration
             timestep.
     '''
-    hours_n = len(load)
-
-    # get the marg net load for each evmc_shape resource [hours x resources]
-    load_marg = (
-        np.tile(load_net.reshape(hours_n, 1), (1, evmc_shape_marg_power.shape[1]))
-        - evmc_shape_marg_power)
-
     ### Get the peak net load hours [top_hours_n x evmc_shape resources]
-    peak_net_load = np.transpose(np.array(
-        ### np.partition returns the max top_hours_n values, unsorted; then np.sort sorts.
-        ### So we only sort top_hours_n values instead of the whole array, saving time.
-        [np.sort(
-            np.partition(load_marg[:,n], -top_hours_n)[-top_hours_n:]
-         )[::-1]
-         for n in range(load_marg.shape[1])]
-    ))
-
-    load_reduct_marg = np.tile(
-        load_net[top_hours_net].reshape(top_hours_n, 1),
-        (1, evmc_shape_marg_power.shape[1])
-    ) - peak_net_load
+    peak_net_load, _ = calc_peak_marg_net_load(
+        load_net=load_net, marg_power=evmc_shape_marg_power, top_hours_n=top_hours_n,
+        marg_scale=marg_scale, chunk_mb=chunk_mb)
+
+    load_reduct_marg = load_net[top_hours_net].reshape(top_hours_n, 1) - peak_net_load
     # get the marginal CCs for each resource
     cc_marg = np.sum(load_reduct_marg, axis=0) / top_hours_n / cap_marg
 
@@ -663,7 +756,84 @@ def cc_evmc_shape(load,load_net,top_hours_net,top_hours_n,evmc_shape_marg_power,
     return cc_marg
 
 # -------------------------CALC REQUIRED MWHS----------------------------------
-# @numba.jit(nopython=True, cache=True)
+def _required_mwh(load_profile, peak_reductions, eff_charge):
+    '''
+    Storage energy kernel shared by calc_required_mwh and calc_required_mwh_batch.
+    The battery energy level follows e[n] = min(e[n-1] + c[n], 0), which is
+    equivalent to e[n] = S[n] - max(0, max(S[:n+1])) where S is the cumulative
+    sum of the possible battery changes c. So the hourly loop is replaced by a
+    cumsum and a running maximum over [peak_reductions x hours] arrays.
+    Args:
+        load_profile: time-synchronous load profile
+        peak_reductions: set of peak reductions (in MW) to be tested
+        eff_charge: RTE of charging
+    Returns:
+        required_MWhs: energy storage capacity required for each peak reduction
+    '''
+    inc = len(peak_reductions)
+    hours_n = len(load_profile)
+    ## Leave a leading column of zeros so the running maximum is floored at 0
+    levels = np.zeros((inc, hours_n + 1))
+    changes = levels[:, 1:]
+    ## necessary_discharges
+    np.subtract(
+        (np.max(load_profile) - peak_reductions).reshape(inc, 1), load_profile,
+        out=changes)
+    ## Charge when there is headroom (limited by the battery power), otherwise discharge
+    np.minimum(changes, peak_reductions.reshape(inc, 1), out=changes)
+    np.multiply(changes, eff_charge, out=changes, where=(changes > 0))
+    ## Cumulative battery changes and their running maximum
+    np.cumsum(levels, axis=1, out=levels)
+    running_max = np.maximum.accumulate(levels, axis=1)
+    ## The deepest battery energy level is the required energy capacity
+    running_max -= levels
+    return np.max(running_max, axis=1)
+
+
+def calc_required_mwh_batch(
+        load_profiles, peak_reductions, eff_charge, stor_buffer_minutes,
+        max_elements=int(1e6),
+    ):
+    '''
+    Vectorized version of calc_required_mwh for many load profiles at once
+    (e.g. every weather year of every ccreg and ccseason).
+    Args:
+        load_profiles: list of time-synchronous load profiles (can differ in length)
+        peak_reductions: set of peak reductions (in MW) to be tested; either a single
+            array used for all profiles or a list with one array per profile
+        eff_charge: RTE of charging; either a scalar or one value per profile
+        stor_buffer_minutes: additional duration required of storage
+        max_elements: maximum number of (peak reduction x hour) elements to process
+            at once, used to bound memory use
+    Returns:
+        required_MWhs: list of arrays, one per profile, of energy storage capacities
+            required for each peak reduction size
+    '''
+    nprofiles = len(load_profiles)
+    if isinstance(peak_reductions, np.ndarray) and (peak_reductions.ndim == 1):
+        peak_reductions = [peak_reductions] * nprofiles
+    eff_charges = np.broadcast_to(np.asarray(eff_charge, dtype=float), (nprofiles,))
+
+    # This buffer is applied on all storage duration requirements, i.e. if the
+    # stor_buffer_minutes is set to 60 minutes then a 2-hour peak would be served
+    # by a 3-hour device, a 3-hour peak by a 4-hour device, etc.
+    stor_buffer_hrs = stor_buffer_minutes / 60
+
+    required_MWhs = []
+    for load_profile, pr, eff in zip(load_profiles, peak_reductions, eff_charges):
+        load_profile = np.asarray(load_profile, dtype=float)
+        pr = np.asarray(pr, dtype=float)
+        ### Process the peak reductions in chunks to limit memory use
+        chunk = max(1, int(max_elements // len(load_profile)))
+        required = np.concatenate([
+            _required_mwh(load_profile, pr[start:start+chunk], eff)
+            for start in range(0, len(pr), chunk)
+        ]) if len(pr) else np.zeros(0)
+        required_MWhs.append(required + pr * stor_buffer_hrs)
+
+    return required_MWhs
+
+
 def calc_required_mwh(load_profile, peak_reductions, eff_charge, stor_buffer_minutes):
     '''
     Determine the energy storage capacity required to acheive a certain peak
@@ -677,41 +847,74 @@ def calc_required_mwh(load_profile, peak_reductions, eff_charge, stor_buffer_min
             reduction size
         batt_powers: corresponding peak reduction sizes for required_MWhs
     '''
-
-    hours_n = len(load_profile)
-
-    inc = len(peak_reductions)
-    max_demands = np.tile(
-        (np.max(load_profile) - peak_reductions).reshape(inc, 1), (1, hours_n))
-    batt_powers = np.tile(peak_reductions.reshape(inc, 1), (1, hours_n))
-
-    poss_charges = np.minimum(batt_powers * eff_charge,
-                              (max_demands - load_profile) * eff_charge)
-    necessary_discharges = (max_demands - load_profile)
-
-    poss_batt_changes = np.where(necessary_discharges <= 0,
-                                 necessary_discharges, poss_charges)
-
-    batt_e_level = np.zeros([inc, hours_n])
-    batt_e_level[:, 0] = np.minimum(poss_batt_changes[:, 0], 0)
-    for n in np.arange(1, hours_n):
-        batt_e_level[:, n] = batt_e_level[:, n-1] + poss_batt_changes[:, n]
-        batt_e_level[:, n] = np.clip(batt_e_level[:, n], a_min=None,
-                                     a_max=0.0, out=batt_e_level[:, n])
-
-    required_MWhs = -np.min(batt_e_level, axis=1)
-
-    # This line of code will implement a buffer on all storage duration
-    # requirements, i.e. if the stor_buffer_minutes is set to 60 minutes
-    # then a 2-hour peak would be served by a 3-hour device, a 3-hour peak
-    # by a 4-hour device, etc.
-    stor_buffer_hrs = stor_buffer_minutes / 60
-    required_MWhs = required_MWhs + (batt_powers[:, 0] * stor_buffer_hrs)
+    required_MWhs = calc_required_mwh_batch(
+        load_profiles=[np.asarray(load_profile, dtype=float)],
+        peak_reductions=np.asarray(peak_reductions, dtype=float),
+        eff_charge=eff_charge,
+        stor_buffer_minutes=stor_buffer_minutes,
+    )[0]
+    batt_powers = np.broadcast_to(
+        np.asarray(peak_reductions).reshape(-1, 1), (len(peak_reductions), len(load_profile)))
 
     return required_MWhs, batt_powers
 
 
 # --------------------- CALC CC OF MARGINAL STORAGE ---------------------------
+def find_crossover(pr, re, p_base, e_base, d, p_step_small, max_iter=int(1e7)):
+    """
+    Find the largest storage power p (on a grid of p_step_small starting at p_base)
+    before the MW–MWh curve (pr, re) crosses the energy line of a d-hour device
+    added on top of the existing bins, i.e. the first p_test = p_base + k * p_step_small
+    (k >= 1) where np.interp(p_test, pr, re) >= e_base + (p_test - p_base) * d.
+
+    The curve is piecewise linear, so the crossover test changes sign at most once
+    within each segment of pr. The segment endpoints are checked all at once and the
+    first grid point within the crossing segment is found by bisection.
+
+    Returns:
+        p: peaking power at the crossover point (p_test - p_step_small)
+        iterations: number of curve evaluations used
+        converged: False if there is no crossover within max_iter steps
+    """
+    def crossed(k):
+        p_test = p_base + k * p_step_small
+        return np.interp(p_test, pr, re) >= e_base + ((p_test - p_base) * d)
+
+    ### Grid indices at the lower and upper end of each segment of pr (plus the
+    ### first grid point past the end of pr, beyond which re is constant)
+    k_lower = np.maximum(1, np.ceil((pr[:-1] - p_base) / p_step_small))
+    k_upper = np.floor((pr[1:] - p_base) / p_step_small)
+    keep = k_upper >= k_lower
+    k_lower = np.append(k_lower[keep], max(1, np.floor((pr[-1] - p_base) / p_step_small) + 1))
+    k_upper = np.append(k_upper[keep], k_lower[-1])
+    crossed_lower = crossed(k_lower)
+    crossed_upper = crossed(k_upper)
+    iterations = len(k_lower) + len(k_upper)
+
+    segments = np.flatnonzero(crossed_lower | crossed_upper)
+    if not len(segments):
+        k = None
+    else:
+        segment = segments[0]
+        if crossed_lower[segment]:
+            k = int(k_lower[segment])
+        else:
+            ## The test is False at lo and True at hi
+            lo, hi = int(k_lower[segment]), int(k_upper[segment])
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                iterations += 1
+                if crossed(mid):
+                    hi = mid
+                else:
+                    lo = mid
+            k = hi
+
+    if (k is None) or (k > max_iter + 1):
+        return p_base + (max_iter + 1) * p_step_small, iterations, False
+    return p_base + (k - 1) * p_step_small, iterations, True
+
+
 def cc_storage(pr, re, sdb, log=None):
     """
     Determine the theoretical peaking capacity (MW) for incrementally increasing 
@@ -727,13 +930,20 @@ def cc_storage(pr, re, sdb, log=None):
 
     Returns:
         pd.DataFrame with columns:
+            - duration: The storage duration bin.
             - MW: The theoretical peaking potential for each bin.
+            - iterations: Number of MW–MWh curve evaluations used to find the
+              crossover point for each bin (0 if no search was needed).
     """
     # Initializing terms
-    ds = sdb.copy()
+    pr = np.asarray(pr, dtype=float)
+    re = np.asarray(re, dtype=float)
+    ds = list(sdb)
     min_bin = min(ds)
     ds.remove(min_bin)
-    peak_stor = pd.DataFrame(columns=['peaking potential', 'existing power'])
+    durations = [min_bin]
+    peaking_potential = []
+    iterations = [0]
 
     # Get the step size and make a smaller step size for interpolation
     p_step = (pr[1] - pr[0])
@@ -745,8 +955,7 @@ def cc_storage(pr, re, sdb, log=None):
     dur[1:] = re[1:] / pr[1:]
     dur = dur.round(3)
     dur_marg = np.zeros(len(pr))
-    for i in range(1, len(pr)):
-        dur_marg[i] = ((re[i] - re[i-1]) / (pr[i] - pr[i-1]))
+    dur_marg[1:] = np.diff(re) / np.diff(pr)
     dur_marg = dur_marg.round(3)
 
     # ----------------------------------------------------------------
@@ -754,44 +963,42 @@ def cc_storage(pr, re, sdb, log=None):
     # ----------------------------------------------------------------
 
     # Find the limit of 2-hour storage capacity
-    dur_temp = dur[dur <= min_bin].copy()
-    dur_marg_temp = dur_marg[dur_marg < float(min(ds))].copy()
-
+    len_dur_temp = np.count_nonzero(dur <= min_bin)
+    len_dur_marg_temp = np.count_nonzero(dur_marg < float(min(ds)))
 
     # Case 1: Storage potential bleeds into the next bin's marginal addition
-    if len(dur_marg_temp) < len(dur_temp):
-        peak_stor.loc[min_bin, 'peaking potential'] = pr[len(dur_marg_temp)-1]
+    if len_dur_marg_temp < len_dur_temp:
+        peaking_potential.append(pr[len_dur_marg_temp-1])
 
     # Case 2: There's storage potential for the smallest bin
-    elif len(dur_temp) > 1:
+    elif len_dur_temp > 1:
         # If the marginal duration is acceptable at the crossover point, find
         # the crossover point.
-        lower_bound_p = pr[len(dur_temp) - 1]
-        upper_bound_p = pr[len(dur_temp)]
-        lower_bound_e = re[len(dur_temp) - 1]
-        upper_bound_e = re[len(dur_temp)]
+        lower_bound_p = pr[len_dur_temp - 1]
+        upper_bound_p = pr[len_dur_temp]
+        lower_bound_e = re[len_dur_temp - 1]
+        upper_bound_e = re[len_dur_temp]
         min_p = np.linspace(lower_bound_p, upper_bound_p, (rel_step**2) + 1)
         min_e = np.linspace(lower_bound_e, upper_bound_e, (rel_step**2) + 1)
         min_dur = min_e / min_p
-        min_dur_temp = min_dur[min_dur <= min_bin].copy()
+        len_min_dur_temp = np.count_nonzero(min_dur <= min_bin)
         # If the duration is already the min duration, don't interpolate
-        if len(min_dur_temp) == 0:
-            peak_stor.loc[min_bin,'peaking potential'] = lower_bound_p
+        if len_min_dur_temp == 0:
+            peaking_potential.append(lower_bound_p)
         else:
             # Find the max addition that could be made without exceeding the
             # marginal duration limit.
-            dur_marg_test = min(min(ds), dur_marg[len(dur_temp)])
+            dur_marg_test = min(min(ds), dur_marg[len_dur_temp])
             max_interp = ((p_step * (min(ds) - dur_marg_test))
                           / (min(ds) - min_bin)) + lower_bound_p
             # Set the peaking potential for the lowest bin to be the minimum
             # between the crossover point and the maximum allowed interpolated
             # value (limited by the marg duration and p_step size).
-            peak_stor.loc[min_bin, 'peaking potential'] = min(
-                max_interp, min_p[len(min_dur_temp) - 1])
+            peaking_potential.append(min(max_interp, min_p[len_min_dur_temp - 1]))
 
     # Case 3: No storage potential for the smallest bin
-    elif len(dur_temp) == 1:
-        peak_stor.loc[min_bin, 'peaking potential'] = 0
+    else:
+        peaking_potential.append(0)
 
     # ----------------------------------------------------------------
     # 2) Determine peaking potential for the remaining duration bins
@@ -804,59 +1011,48 @@ def cc_storage(pr, re, sdb, log=None):
             d1 = ds[i+1]
         except Exception:
             d1 = d * 2
-        e_base = 0
-        p_base = 0
-        for key in peak_stor.index:
-            e_base += peak_stor.loc[key, 'peaking potential'] * key
-            p_base += peak_stor.loc[key, 'peaking potential']
+        e_base = sum(p * key for (p, key) in zip(peaking_potential, durations))
+        p_base = sum(peaking_potential)
+        durations.append(d)
         # First check to see if this bin size will be limited by marginal
         # duration.
-        dur_marg_temp = dur_marg[dur_marg < float(d1)].copy()
-        p_temp = pr[len(dur_marg_temp) - 1] - p_base
+        len_dur_marg_temp = np.count_nonzero(dur_marg < float(d1))
+        p_temp = pr[len_dur_marg_temp - 1] - p_base
         e_temp = e_base + (p_temp * d)
-        e_test = re[len(dur_marg_temp) - 1]
+        e_test = re[len_dur_marg_temp - 1]
         if e_test <= e_temp:
-            peak_stor.loc[d, 'peaking potential'] = p_temp
+            peaking_potential.append(p_temp)
+            iterations.append(0)
         else:
-            # Now add small incremental capacity until we reach the crossover
-            # point
-            error = 0
-            p = p_base
-            condition = True
-            while condition:
-                p_test = p + p_step_small
-                e_test = e_base + ((p_test - p_base) * d)
-                if np.interp(p_test, pr, re) >= e_test:
-                    condition = False
-                else:
-                    p += p_step_small
-                error += 1
-                if error > 1e7:
+            # Find the crossover point of the MW–MWh curve and the energy
+            # line for this bin
+            p, iters, converged = find_crossover(
+                pr=pr, re=re, p_base=p_base, e_base=e_base, d=d,
+                p_step_small=p_step_small)
+            iterations.append(iters)
+            if log is not None:
+                if not converged:
                     log.info(d)
-                    condition = False
-                    log.info('**** Runaway while loop in capacity_credit.py')
+                    log.info('**** No storage crossover point found in capacity_credit.py')
+                log.debug(f'{d}-hour bin crossover found in {iters} iterations')
             # Find the max addition that could be made without exceeding the
             # marginal duration limit
-            pr_temp = pr[pr <= p]
-            dur_marg_test = dur_marg[len(pr_temp) - 1]
+            len_pr_temp = np.searchsorted(pr, p, side='right')
+            dur_marg_test = dur_marg[len_pr_temp - 1]
             max_interp = ((p_step * (d1 - dur_marg_test))
-                          / (d1 - d)) + pr_temp[-1]
+                          / (d1 - d)) + pr[len_pr_temp - 1]
             # Set the peaking potential to be the minimum of the crossover
             # point and  maximum interpolation value (limited by the marg
             # duration and p_step size).
-            peak_stor.loc[d, 'peaking potential'] = min(max_interp, p) - p_base
-
-    peak_stor['existing power'] = 0
+            peaking_potential.append(min(max_interp, p) - p_base)
 
     # ----------------------------------------------------------------
-    # 3) Prepare final output: duration and MW
+    # 3) Prepare final output: duration, MW, and search iterations
     # ----------------------------------------------------------------
-    peak_stor['peaking potential'] = pd.to_numeric(peak_stor['peaking potential'])
-    result = (
-        peak_stor[['peaking potential']]
-        .round(decimals=2)
-        .reset_index()
-        .rename(columns={'index': 'duration', 'peaking potential': 'MW'})
-    )
+    result = pd.DataFrame({
+        'duration': durations,
+        'MW': np.around(np.array(peaking_potential, dtype=float), decimals=2),
+        'iterations': iterations,
+    })
 
     return result
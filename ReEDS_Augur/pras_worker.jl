@@ -0,0 +1,110 @@
+#%% Imports
+import ArgParse
+import JSON
+import Logging
+import Sockets
+
+## Functions for a single ReEDS2PRAS/PRAS run (its procedure only runs when called directly)
+include(joinpath(@__DIR__, "run_pras.jl"))
+
+#%% Functions
+"""
+    Parse command line arguments for the persistent PRAS worker
+"""
+function parse_worker_commandline()
+    s = ArgParse.ArgParseSettings()
+
+    @ArgParse.add_arg_table s begin
+        "--reedscase"
+            help = "Path to ReEDS run (usually .../ReEDS-2.0/runs/{casename})"
+            arg_type = String
+            required = true
+        "--portfile"
+            help = "File to write the port number to once the worker is ready"
+            arg_type = String
+            required = true
+        "--idle_timeout"
+            help = "Shut down after this many seconds without a job"
+            arg_type = Int
+            default = 3600
+            required = false
+    end
+    return ArgParse.parse_args(s)
+end
+
+"""
+    Serve ReEDS2PRAS/PRAS jobs from Augur over a local socket.
+
+    Each connection sends one line of JSON, either {"args": [...]} with the same
+    command line arguments as run_pras.jl or {"command": "stop"}, and receives one line
+    of JSON with the return code. Jobs run one at a time.
+"""
+function serve(worker_args::Dict)
+    server = Sockets.listen(Sockets.localhost, 0)
+    _, port = Sockets.getsockname(server)
+    ## Write the port atomically so Augur never reads a partial file
+    tmpfile = worker_args["portfile"] * ".tmp"
+    write(tmpfile, string(port))
+    mv(tmpfile, worker_args["portfile"], force=true)
+    @info "PRAS worker listening on port $(port)"
+
+    base_logger = Logging.global_logger()
+    last_activity = Ref(time())
+    busy = Ref(false)
+    @async while isopen(server)
+        sleep(60)
+        if !busy[] && (time() - last_activity[] > worker_args["idle_timeout"])
+            @info "PRAS worker idle for $(worker_args["idle_timeout"]) s so shutting down"
+            close(server)
+        end
+    end
+
+    while isopen(server)
+        sock = try
+            Sockets.accept(server)
+        catch
+            break
+        end
+        line = readline(sock)
+        if isempty(line)
+            close(sock)
+            continue
+        end
+        busy[] = true
+        request = JSON.parse(line)
+        if get(request, "command", "run") == "stop"
+            println(sock, JSON.json(Dict("returncode" => 0)))
+            close(sock)
+            close(server)
+            break
+        end
+
+        returncode = 0
+        try
+            main(parse_commandline(Vector{String}(request["args"])))
+        catch err
+            @error "PRAS worker job failed" exception=(err, catch_backtrace())
+            returncode = 1
+        end
+        ## main() adds a file logger for each job, so reset it before the next one
+        Logging.global_logger(base_logger)
+
+        println(sock, JSON.json(Dict("returncode" => returncode)))
+        close(sock)
+        last_activity[] = time()
+        busy[] = false
+    end
+    rm(worker_args["portfile"], force=true)
+end
+
+
+#%% Procedure
+if abspath(PROGRAM_FILE) == @__FILE__
+    worker_args = parse_worker_commandline()
+
+    #%% Include ReEDS2PRAS once for all jobs
+    include(joinpath(worker_args["reedscase"], "reeds2pras", "src", "ReEDS2PRAS.jl"))
+
+    #%% Serve jobs until stopped or idle
+    serve(worker_args)
+end
@@ -0,0 +1,112 @@
+#%% Imports
+import os
+import json
+import time
+import socket
+import subprocess
+
+
+#%% Functions
+def get_portfile(casedir):
+    return os.path.join(casedir, 'ReEDS_Augur', 'PRAS', 'pras_worker.port')
+
+
+def connect(casedir, timeout=10):
+    """
+    Connect to the PRAS worker for casedir.
+    Raises OSError if there is no worker or it is not responding.
+    """
+    with open(get_portfile(casedir), 'r') as f:
+        port = int(f.read().strip())
+    return socket.create_connection(('127.0.0.1', port), timeout=timeout)
+
+
+def start(casedir, julia, scriptpath, startup_timeout=3600, idle_timeout=3600):
+    """
+    Start a PRAS worker for casedir in the background and wait until it is ready.
+    The worker loads Julia packages and ReEDS2PRAS once and keeps running after this
+    process exits, so later solve years and iterations skip package loading and
+    compilation. It shuts itself down after idle_timeout seconds without a job
+    (so a run that stops without calling stop() doesn't leave it holding memory for
+    long); if it has shut down, the next call to run() starts a new worker.
+
+    Args:
+        casedir (str): Path to the ReEDS run.
+        julia (list): julia executable and options (project, threads) as for run_pras.jl
+        scriptpath (str): Folder containing ReEDS_Augur/pras_worker.jl
+        startup_timeout (int): Seconds to wait for the worker to report that it's ready
+
+    Raises:
+        RuntimeError: if the worker exits or isn't ready within startup_timeout
+    """
+    portfile = get_portfile(casedir)
+    if os.path.isfile(portfile):
+        os.remove(portfile)
+    command = ' '.join(julia + [
+        os.path.join(scriptpath, 'ReEDS_Augur', 'pras_worker.jl'),
+        f"--reedscase={casedir}",
+        f"--portfile={portfile}",
+        f"--idle_timeout={idle_timeout}",
+    ])
+    print(command)
+    log = open(os.path.join(casedir, 'gamslog.txt'), 'a')
+    proc = subprocess.Popen(
+        command, stdout=log, stderr=log, text=True, shell=True,
+        start_new_session=True,
+    )
+    log.close()
+    tic = time.time()
+    while not os.path.isfile(portfile):
+        if proc.poll() is not None:
+            raise RuntimeError(f'PRAS worker exited with code {proc.returncode}')
+        if time.time() - tic > startup_timeout:
+            proc.kill()
+            raise RuntimeError(f'PRAS worker was not ready after {startup_timeout} s')
+        time.sleep(1)
+    print(f'Started PRAS worker in {time.time() - tic:.1f} s')
+
+
+def send(casedir, request, sock=None):
+    """Send a request to the PRAS worker and wait for its response"""
+    if sock is None:
+        sock = connect(casedir)
+    ## Jobs can take hours so don't time out while waiting for the response
+    sock.settimeout(None)
+    with sock, sock.makefile('rw') as f:
+        f.write(json.dumps(request) + '\n')
+        f.flush()
+        response = f.readline()
+    if not response:
+        raise ConnectionError('PRAS worker closed the connection without a response')
+    return json.loads(response)
+
+
+def run(casedir, args, julia, scriptpath):
+    """
+    Run ReEDS2PRAS and PRAS with the run_pras.jl command line arguments in args,
+    starting a PRAS worker if one isn't already running for casedir.
+
+    Returns:
+        int: Return code of the job (0 if successful)
+
+    Raises:
+        OSError or RuntimeError: if the worker can't be started or stops responding,
+            in which case the caller should fall back to running run_pras.jl directly
+    """
+    try:
+        sock = connect(casedir)
+    except (OSError, ValueError):
+        start(casedir, julia, scriptpath)
+        sock = connect(casedir)
+    return send(casedir, {'args': args}, sock=sock)['returncode']
+
+
+def stop(casedir):
+    """Stop the PRAS worker for casedir if there is one"""
+    try:
+        send(casedir, {'command': 'stop'})
+    except (OSError, ValueError):
+        pass
+    portfile = get_portfile(casedir)
+    if os.path.isfile(portfile):
+        os.remove(portfile)
@@ -13,7 +13,7 @@ const DF = DataFrames
 """
     Parse command line arguments for use with ReEDS2PRAS and PRAS
 """
-function parse_commandline()
+function parse_commandline(args=ARGS)
     s = ArgParse.ArgParseSettings()
 
     @ArgParse.add_arg_table s begin
@@ -115,7 +115,18 @@ function parse_commandline()
             default = 0
             required = false
     end
-    return ArgParse.parse_args(s)
+    return ArgParse.parse_args(args, s)
+end
+
+"""
+    Cumulative time spent compiling in this Julia session in ns (0 if not available)
+"""
+function compile_time_ns()
+    if isdefined(Base, :cumulative_compile_timing)
+        Base.cumulative_compile_timing(true)
+        return Int(Base.cumulative_compile_time_ns()[1])
+    end
+    return 0
 end
 
 """
@@ -388,6 +399,7 @@ function main(args::Dict)
     )
 
     #%% Set up the logger
+    compile_start = compile_time_ns()
     setup_logger(pras_system_path, args)
     @info "Julia version: $(VERSION)"
     @info "Julia executable: $(joinpath(Sys.BINDIR, "julia"))"
@@ -419,13 +431,17 @@ function main(args::Dict)
     end
 
     #%% Run PRAS
+    dfout = nothing
     if args["samples"] > 0
         @info "Running PRAS"
         dfout = run_pras(pras_system_path, args)
         @info "Finished PRAS"
-        #%%
-        return dfout
     end
+    ## Time spent compiling rather than running (mostly on the first call in a session)
+    @info "Julia compilation time: $(round((compile_time_ns() - compile_start) / 1e9, digits=1)) s"
+
+    #%%
+    return dfout
 end
 
 
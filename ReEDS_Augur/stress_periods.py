@@ -1,9 +1,11 @@
 #%%### General imports
 import os
 import site
+import functools
 import traceback
 import pandas as pd
 import numpy as np
+import scipy.sparse
 from glob import glob
 import re
 import matplotlib.pyplot as plt
@@ -55,20 +57,66 @@ def get_and_write_neue(sw, write=True):
     return neue
 
 
+@functools.lru_cache(maxsize=None)
+def _get_hierarchy(casedir):
+    return reeds.io.get_hierarchy(casedir)
+
+
 def get_rmap(sw, hierarchy_level='country'):
     """
     """
     ### Make the region aggregator
-    hierarchy = reeds.io.get_hierarchy(sw.casedir)
+    hierarchy = _get_hierarchy(sw.casedir)
 
     if hierarchy_level == 'r':
         rmap = pd.Series(hierarchy.index, index=hierarchy.index)
     else:
-        rmap = hierarchy[hierarchy_level]
+        rmap = hierarchy[hierarchy_level].copy()
 
     return rmap
 
 
+@functools.lru_cache(maxsize=None)
+def _get_region_aggregator(casedir, regions, hierarchy_level):
+    hierarchy = _get_hierarchy(casedir)
+    if hierarchy_level == 'r':
+        rmap = dict(zip(hierarchy.index, hierarchy.index))
+    else:
+        rmap = hierarchy[hierarchy_level].to_dict()
+    ## Regions missing from the hierarchy keep their own name, as with .rename(columns=rmap)
+    labels = [rmap.get(r, r) for r in regions]
+    level_regions, col = np.unique(labels, return_inverse=True)
+    matrix = scipy.sparse.csr_matrix(
+        (np.ones(len(regions)), (np.arange(len(regions)), col)),
+        shape=(len(regions), len(level_regions)),
+    )
+    return matrix, pd.Index(level_regions)
+
+
+def get_region_aggregator(sw, regions, hierarchy_level='country'):
+    """
+    Get a sparse (regions x hierarchy_level regions) matrix of ones that sums
+    region columns to hierarchy_level when right-multiplied, along with the
+    sorted hierarchy_level region names for the output columns.
+    Matrices are cached so they are built once per run for each level.
+    """
+    return _get_region_aggregator(sw.casedir, tuple(regions), hierarchy_level)
+
+
+def aggregate_regions(df, aggregator):
+    """
+    Sum the region columns of df using a matrix from get_region_aggregator().
+    Equivalent to df.rename(columns=rmap).groupby(axis=1, level=0).sum().
+    """
+    matrix, level_regions = aggregator
+    values = df.fillna(0).values
+    return pd.DataFrame(
+        values @ matrix.astype(values.dtype),
+        index=df.index,
+        columns=level_regions,
+    )
+
+
 def get_pras_eue(sw, t, iteration=0):
     """
     """
@@ -116,17 +164,13 @@ def get_stress_periods(
     Returns:
         pd.DataFrame: Table of periods sorted in descending order by stress metric.
     """
-    ### Get the region aggregator
-    rmap = get_rmap(sw=sw, hierarchy_level=hierarchy_level)
-
     ### Get EUE from PRAS
     dfeue = get_pras_eue(sw=sw, t=t, iteration=iteration)
     ## Aggregate to hierarchy_level
-    dfeue = (
-        dfeue
-        .rename_axis('r', axis=1).rename_axis('h', axis=0)
-        .rename(columns=rmap).groupby(axis=1, level=0).sum()
-    )
+    dfeue = aggregate_regions(
+        dfeue.rename_axis('h', axis=0),
+        get_region_aggregator(sw, dfeue.columns, hierarchy_level),
+    ).rename_axis('r', axis=1)
 
     ###### Calculate the stress metric by period
     if stress_metric.upper() == 'EUE':
@@ -142,7 +186,9 @@ def get_stress_periods(
         dfload = reeds.io.read_h5py_file(
             os.path.join(
                 sw['casedir'],'ReEDS_Augur','augur_data',f'pras_load_{t}.h5')
-        ).rename(columns=rmap).groupby(level=0, axis=1).sum()
+        )
+        dfload = aggregate_regions(
+            dfload, get_region_aggregator(sw, dfload.columns, hierarchy_level))
         dfload.index = dfeue.index
 
         ### Recalculate NEUE [ppm] and aggregate appropriately
@@ -198,20 +244,28 @@ def get_annual_neue(sw, t, iteration=0):
     dfload.index = dfeue.index
 
     levels = ['country','interconnect','nercr','transreg','transgrp','st','r']
+    ### Stack the region aggregators for all levels so every level is summed
+    ### with a single matrix multiply
+    def aggregate_levels(df):
+        aggregators = [get_region_aggregator(sw, df.columns, l) for l in levels]
+        columns = pd.MultiIndex.from_tuples(
+            [(l, r) for l, (_, regions) in zip(levels, aggregators) for r in regions],
+            names=['level','region'],
+        )
+        matrix = scipy.sparse.hstack([a[0] for a in aggregators], format='csr')
+        return aggregate_regions(df, (matrix, columns))
+
+    eue_levels = aggregate_levels(dfeue)
+    load_levels = aggregate_levels(dfload)
+    ### Get NEUE summed over year
+    neue_sum = eue_levels.sum() / load_levels.sum() * 1e6
+    ### Get max NEUE hour
+    neue_max = (eue_levels / load_levels).max() * 1e6
+
     _neue = {}
     for hierarchy_level in levels:
-        ### Get the region aggregator
-        rmap = get_rmap(sw=sw, hierarchy_level=hierarchy_level)
-        ### Get NEUE summed over year
-        _neue[hierarchy_level,'sum'] = (
-            dfeue.rename(columns=rmap).groupby(axis=1, level=0).sum().sum()
-            / dfload.rename(columns=rmap).groupby(axis=1, level=0).sum().sum()
-        ) * 1e6
-        ### Get max NEUE hour
-        _neue[hierarchy_level,'max'] = (
-            dfeue.rename(columns=rmap).groupby(axis=1, level=0).sum()
-            / dfload.rename(columns=rmap).groupby(axis=1, level=0).sum()
-        ).max() * 1e6
+        _neue[hierarchy_level,'sum'] = neue_sum[hierarchy_level]
+        _neue[hierarchy_level,'max'] = neue_max[hierarchy_level]
 
     ### Combine it
     neue = pd.concat(_neue, names=['level','metric','region']).rename('NEUE_ppm')
@@ -433,6 +487,10 @@ def main(sw, t, iteration=0):
             inputs_case=os.path.join(sw['casedir'], 'inputs_case'),
             periodtype=newstresspath,
             make_plots=0,
+            previous_periodtype=(
+                f'stress{t}i{iteration}'
+                if int(sw.get('GSw_PRM_StressIncremental', 0)) else None
+            ),
         )
         ### Write a few tables for debugging
         eue_sorted_periods.round(2).rename(columns={'EUE':'EUE_MWh','NEUE':'NEUE_ppm'}).to_csv(
@@ -0,0 +1,292 @@
+"""
+Benchmark the vectorized capacity credit functions in ReEDS_Augur/capacity_credit.py
+against the original loop-based implementations on 7-year (61,320-hour) profiles.
+
+Usage:
+    python benchmarks/capacity_credit.py [--number 3]
+"""
+
+#%% Imports
+import argparse
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+reeds_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if reeds_path not in sys.path:
+    sys.path.append(reeds_path)
+from ReEDS_Augur import capacity_credit
+
+
+#%% Reference implementations
+def calc_required_mwh_loop(load_profile, peak_reductions, eff_charge, stor_buffer_minutes):
+    """Original hourly-loop version of capacity_credit.calc_required_mwh"""
+    hours_n = len(load_profile)
+    inc = len(peak_reductions)
+    max_demands = np.tile(
+        (np.max(load_profile) - peak_reductions).reshape(inc, 1), (1, hours_n))
+    batt_powers = np.tile(peak_reductions.reshape(inc, 1), (1, hours_n))
+    poss_charges = np.minimum(batt_powers * eff_charge,
+                              (max_demands - load_profile) * eff_charge)
+    necessary_discharges = (max_demands - load_profile)
+    poss_batt_changes = np.where(necessary_discharges <= 0,
+                                 necessary_discharges, poss_charges)
+    batt_e_level = np.zeros([inc, hours_n])
+    batt_e_level[:, 0] = np.minimum(poss_batt_changes[:, 0], 0)
+    for n in np.arange(1, hours_n):
+        batt_e_level[:, n] = batt_e_level[:, n-1] + poss_batt_changes[:, n]
+        batt_e_level[:, n] = np.clip(batt_e_level[:, n], a_min=None,
+                                     a_max=0.0, out=batt_e_level[:, n])
+    required_MWhs = -np.min(batt_e_level, axis=1)
+    required_MWhs = required_MWhs + (batt_powers[:, 0] * stor_buffer_minutes / 60)
+    return required_MWhs
+
+
+def cc_storage_loop(pr, re, sdb, log=None):
+    """
+    Original incremental while-loop version of capacity_credit.cc_storage
+    """
+    # Initializing terms
+    ds = sdb.copy()
+    min_bin = min(ds)
+    ds.remove(min_bin)
+    peak_stor = pd.DataFrame(columns=['peaking potential', 'existing power'])
+
+    # Get the step size and make a smaller step size for interpolation
+    p_step = (pr[1] - pr[0])
+    rel_step = 100
+    p_step_small = p_step / rel_step
+
+    # Get duration and marginal duration as a function of storage penetration
+    dur = np.zeros(len(pr))
+    dur[1:] = re[1:] / pr[1:]
+    dur = dur.round(3)
+    dur_marg = np.zeros(len(pr))
+    for i in range(1, len(pr)):
+        dur_marg[i] = ((re[i] - re[i-1]) / (pr[i] - pr[i-1]))
+    dur_marg = dur_marg.round(3)
+
+    # ----------------------------------------------------------------
+    # 1) Determine peaking potential for the smallest duration bin
+    # ----------------------------------------------------------------
+
+    # Find the limit of 2-hour storage capacity
+    dur_temp = dur[dur <= min_bin].copy()
+    dur_marg_temp = dur_marg[dur_marg < float(min(ds))].copy()
+
+
+    # Case 1: Storage potential bleeds into the next bin's marginal addition
+    if len(dur_marg_temp) < len(dur_temp):
+        peak_stor.loc[min_bin, 'peaking potential'] = pr[len(dur_marg_temp)-1]
+
+    # Case 2: There's storage potential for the smallest bin
+    elif len(dur_temp) > 1:
+        # If the marginal duration is acceptable at the crossover point, find
+        # the crossover point.
+        lower_bound_p = pr[len(dur_temp) - 1]
+        upper_bound_p = pr[len(dur_temp)]
+        lower_bound_e = re[len(dur_temp) - 1]
+        upper_bound_e = re[len(dur_temp)]
+        min_p = np.linspace(lower_bound_p, upper_bound_p, (rel_step**2) + 1)
+        min_e = np.linspace(lower_bound_e, upper_bound_e, (rel_step**2) + 1)
+        min_dur = min_e / min_p
+        min_dur_temp = min_dur[min_dur <= min_bin].copy()
+        # If the duration is already the min duration, don't interpolate
+        if len(min_dur_temp) == 0:
+            peak_stor.loc[min_bin,'peaking potential'] = lower_bound_p
+        else:
+            # Find the max addition that could be made without exceeding the
+            # marginal duration limit.
+            dur_marg_test = min(min(ds), dur_marg[len(dur_temp)])
+            max_interp = ((p_step * (min(ds) - dur_marg_test))
+                          / (min(ds) - min_bin)) + lower_bound_p
+            # Set the peaking potential for the lowest bin to be the minimum
+            # between the crossover point and the maximum allowed interpolated
+            # value (limited by the marg duration and p_step size).
+            peak_stor.loc[min_bin, 'peaking potential'] = min(
+                max_interp, min_p[len(min_dur_temp) - 1])
+
+    # Case 3: No storage potential for the smallest bin
+    elif len(dur_temp) == 1:
+        peak_stor.loc[min_bin, 'peaking potential'] = 0
+
+    # ----------------------------------------------------------------
+    # 2) Determine peaking potential for the remaining duration bins
+    # ----------------------------------------------------------------
+    # Iterate through the rest of the storage duration bins to find the
+    # peaking potential.
+    for i in range(0, len(ds)):
+        d = ds[i]
+        try:
+            d1 = ds[i+1]
+        except Exception:
+            d1 = d * 2
+        e_base = 0
+        p_base = 0
+        for key in peak_stor.index:
+            e_base += peak_stor.loc[key, 'peaking potential'] * key
+            p_base += peak_stor.loc[key, 'peaking potential']
+        # First check to see if this bin size will be limited by marginal
+        # duration.
+        dur_marg_temp = dur_marg[dur_marg < float(d1)].copy()
+        p_temp = pr[len(dur_marg_temp) - 1] - p_base
+        e_temp = e_base + (p_temp * d)
+        e_test = re[len(dur_marg_temp) - 1]
+        if e_test <= e_temp:
+            peak_stor.loc[d, 'peaking potential'] = p_temp
+        else:
+            # Now add small incremental capacity until we reach the crossover
+            # point
+            error = 0
+            p = p_base
+            condition = True
+            while condition:
+                p_test = p + p_step_small
+                e_test = e_base + ((p_test - p_base) * d)
+                if np.interp(p_test, pr, re) >= e_test:
+                    condition = False
+                else:
+                    p += p_step_small
+                error += 1
+                if error > 1e7:
+                    log.info(d)
+                    condition = False
+                    log.info('**** Runaway while loop in capacity_credit.py')
+            # Find the max addition that could be made without exceeding the
+            # marginal duration limit
+            pr_temp = pr[pr <= p]
+            dur_marg_test = dur_marg[len(pr_temp) - 1]
+            max_interp = ((p_step * (d1 - dur_marg_test))
+                          / (d1 - d)) + pr_temp[-1]
+            # Set the peaking potential to be the minimum of the crossover
+            # point and  maximum interpolation value (limited by the marg
+            # duration and p_step size).
+            peak_stor.loc[d, 'peaking potential'] = min(max_interp, p) - p_base
+
+    peak_stor['existing power'] = 0
+
+    # ----------------------------------------------------------------
+    # 3) Prepare final output: duration and MW
+    # ----------------------------------------------------------------
+    peak_stor['peaking potential'] = pd.to_numeric(peak_stor['peaking potential'])
+    result = (
+        peak_stor[['peaking potential']]
+        .round(decimals=2)
+        .reset_index()
+        .rename(columns={'index': 'duration', 'peaking potential': 'MW'})
+    )
+
+    return result
+
+
+def peak_marg_net_load_loop(load_net, marg_power, top_hours_n):
+    """Original tiled version of the marginal net load top hours in cc_vg"""
+    hours_n = len(load_net)
+    load_marg = (
+        np.tile(load_net.reshape(hours_n, 1), (1, marg_power.shape[1]))
+        - marg_power)
+    return np.transpose(np.array(
+        [np.sort(np.partition(load_marg[:,n], -top_hours_n)[-top_hours_n:])[::-1]
+         for n in range(load_marg.shape[1])]
+    ))
+
+
+#%% Helper functions
+def make_load_profile(hours_n, seed=0, peak=10000):
+    """Synthetic load profile with daily and seasonal shape plus noise"""
+    rng = np.random.default_rng(seed)
+    hours = np.arange(hours_n)
+    load = (
+        0.6
+        + 0.15 * np.sin(2 * np.pi * hours / 24)
+        + 0.15 * np.sin(2 * np.pi * hours / 8760)
+        + 0.05 * rng.standard_normal(hours_n)
+    )
+    return np.around(load / load.max() * peak, 3)
+
+
+def make_peak_reductions(load_profile, stepsize=100, max_stor_pen=0.9):
+    """Peak reductions as defined in capacity_credit.reeds_cc"""
+    max_demand = load_profile.max() * max_stor_pen
+    return np.linspace(0, max_demand, int(max_demand // stepsize))
+
+
+def compare(name, funcs, number=3, units='s'):
+    """Time each function in funcs and print the speedup of the last over the first"""
+    times = {}
+    for label, func in funcs.items():
+        times[label] = timeit.timeit(func, number=number) / number
+        scale = 1000 if units == 'ms' else 1
+        print(f'{name} ({label}): {times[label] * scale:.3f} {units}')
+    labels = list(funcs)
+    print(f'speedup: {times[labels[0]] / times[labels[-1]]:.1f}x')
+
+
+#%% Benchmarks
+def benchmark_required_mwh(load_profile, peak_reductions, number=3):
+    expected = calc_required_mwh_loop(load_profile, peak_reductions, 0.85, 60)
+    result = capacity_credit.calc_required_mwh(load_profile, peak_reductions, 0.85, 60)[0]
+    print(f'max difference: {np.abs(result - expected).max():.2e} MWh')
+    compare(
+        'calc_required_mwh',
+        {
+            'loop': lambda: calc_required_mwh_loop(load_profile, peak_reductions, 0.85, 60),
+            'vectorized': lambda: capacity_credit.calc_required_mwh(
+                load_profile, peak_reductions, 0.85, 60),
+        },
+        number=number,
+    )
+
+
+def benchmark_cc_storage(load_profile, peak_reductions, number=3):
+    sdb = [2, 4, 6, 8, 10, 12, 24, 48, 72, 100]
+    re = capacity_credit.calc_required_mwh(load_profile, peak_reductions, 0.85, 60)[0]
+    expected = cc_storage_loop(peak_reductions, re, sdb.copy())
+    result = capacity_credit.cc_storage(peak_reductions, re, sdb.copy())
+    print(f'max difference: {np.abs(result.MW.values - expected.MW.values).max():.2f} MW')
+    compare(
+        'cc_storage',
+        {
+            'loop': lambda: cc_storage_loop(peak_reductions, re, sdb.copy()),
+            'bisection': lambda: capacity_credit.cc_storage(peak_reductions, re, sdb.copy()),
+        },
+        number=number,
+        units='ms',
+    )
+
+
+def benchmark_peak_marg_net_load(load_profile, resources_n=500, number=3):
+    marg_cf = np.random.default_rng(0).random((len(load_profile), resources_n))
+    expected = peak_marg_net_load_loop(load_profile, marg_cf * 1000, 20)
+    result = capacity_credit.calc_peak_marg_net_load(
+        load_profile, marg_cf, 20, marg_scale=1000, chunk_mb=100)[0]
+    print(f'max difference: {np.abs(result - expected).max():.2e} MW')
+    compare(
+        'peak marginal net load',
+        {
+            'loop': lambda: peak_marg_net_load_loop(load_profile, marg_cf * 1000, 20),
+            'chunked': lambda: capacity_credit.calc_peak_marg_net_load(
+                load_profile, marg_cf, 20, marg_scale=1000, chunk_mb=100),
+        },
+        number=number,
+    )
+
+
+#%% Procedure
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark capacity credit functions')
+    parser.add_argument('--hours', type=int, default=61320, help='Hours in the load profile')
+    parser.add_argument('--peak', type=float, default=40000, help='Peak load [MW]')
+    parser.add_argument(
+        '--resources', type=int, default=500, help='Resources in the marginal profiles')
+    parser.add_argument('--number', '-n', type=int, default=3, help='Repetitions to average')
+    args = parser.parse_args()
+
+    load_profile = make_load_profile(args.hours, peak=args.peak)
+    peak_reductions = make_peak_reductions(load_profile)
+    print(f'{args.hours} hours, {len(peak_reductions)} peak reductions')
+    benchmark_required_mwh(load_profile, peak_reductions, number=args.number)
+    benchmark_cc_storage(load_profile, peak_reductions, number=args.number)
+    benchmark_peak_marg_net_load(load_profile, args.resources, number=args.number)
@@ -0,0 +1,170 @@
+"""
+Benchmark the vectorized county disaggregation helpers in input_processing/aggregate_regions.py
+against the original loop-based implementations on a synthetic full-US county case.
+
+Usage:
+    python benchmarks/county_disaggregation.py [--number 1]
+"""
+
+#%% Imports
+import argparse
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+reeds_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if reeds_path not in sys.path:
+    sys.path.append(reeds_path)
+sys.path.append(os.path.join(reeds_path, 'input_processing'))
+import aggregate_regions
+
+
+#%% Reference implementations
+def filter_county_transmission_loop(dfin, region_col, agglevel_variables):
+    """Original row-loop version of aggregate_regions.filter_county_transmission"""
+    df_disagg_list = []
+    for idx, tx_row in dfin.iterrows():
+        cond1 = ((tx_row[region_col[0]] in agglevel_variables['ba_regions']+agglevel_variables['ba_transgrp'])
+                    and (tx_row[region_col[1]] in agglevel_variables['county_regions']+agglevel_variables['county_transgrp']))
+        cond2 = ((tx_row[region_col[1]] in agglevel_variables['ba_regions']+ agglevel_variables['ba_transgrp'])
+                    and (tx_row[region_col[0]] in agglevel_variables['county_regions']+agglevel_variables['county_transgrp']))
+        cond3 = ((tx_row[region_col[0]] in agglevel_variables['county_regions']+agglevel_variables['county_transgrp'])
+                    and (tx_row[region_col[1]] in agglevel_variables['county_regions']+agglevel_variables['county_transgrp']))
+
+        if cond1 or cond2 or cond3:
+            df_disagg_list.append(tx_row)
+
+    return pd.DataFrame(df_disagg_list).drop_duplicates()
+
+
+def get_present_regions_loop(dfin, regions):
+    """Original list-comprehension version of aggregate_regions.get_present_regions"""
+    regions_list = []
+    for ba in regions:
+        if ba not in dfin.columns:
+            regions_list.append(ba)
+    return [x for x in regions if x not in regions_list]
+
+
+def disaggregate_load_hourly_loop(df1, fracdata):
+    """Original column-loop disaggregation of load_hourly.h5 in aggregate_regions.aggreg_methods"""
+    return pd.concat(
+        {fips: row.fracdata * df1[row.PCA_REG]
+            for fips, row in fracdata.iterrows()},
+        axis=1
+    ).astype(np.float32)
+
+
+#%% Synthetic inputs
+def get_county_case(num_ba=134, counties_per_ba=23, county_fraction=0.5, seed=0):
+    """
+    Make a mixed-resolution case with about as many counties as the contiguous US,
+    with county_fraction of the BAs solved at county resolution
+    """
+    rng = np.random.default_rng(seed)
+    bas = [f'p{i}' for i in range(1, num_ba + 1)]
+    ba2county = {
+        ba: [f'p{i:02}{j:03}' for j in range(counties_per_ba)]
+        for i, ba in enumerate(bas)
+    }
+    county_bas = bas[:int(num_ba * county_fraction)]
+    transgrp = {ba: f'transgrp{i // 10}' for i, ba in enumerate(bas)}
+    agglevel_variables = {
+        'lvl': 'mult',
+        'ba_regions': [ba for ba in bas if ba not in county_bas],
+        'county_regions': [c for ba in county_bas for c in ba2county[ba]],
+        'county_regions2ba': county_bas,
+        ## Transmission groups can include both BA- and county-resolution regions
+        'ba_transgrp': sorted(set(transgrp[ba] for ba in bas if ba not in county_bas)),
+        'county_transgrp': sorted(set(transgrp[ba] for ba in county_bas)),
+    }
+
+    ### Transmission interfaces between all regions and groups, plus some duplicates
+    regions = (
+        agglevel_variables['ba_regions'] + agglevel_variables['county_regions']
+        + agglevel_variables['ba_transgrp'] + agglevel_variables['county_transgrp']
+        + ['missing']
+    )
+    num_rows = 20000
+    dftrans = pd.DataFrame({
+        'r': rng.choice(regions, num_rows),
+        'rr': rng.choice(regions, num_rows),
+        'trtype': rng.choice(['AC', 'B2B', 'LCC'], num_rows),
+        'MW': rng.random(num_rows).round(3) * 1000,
+    })
+    dftrans = pd.concat([dftrans, dftrans.iloc[:100]], ignore_index=True)
+
+    ### Hourly load by BA and population fractions by county
+    hours = 8760
+    load = pd.DataFrame(
+        rng.random((hours, num_ba)).astype(np.float32) * 1000,
+        columns=bas,
+        index=pd.MultiIndex.from_product(
+            [[2030], pd.RangeIndex(hours)], names=['year', 'datetime']),
+    )
+    fracdata = pd.DataFrame(
+        [(c, ba) for ba in county_bas for c in ba2county[ba]],
+        columns=['FIPS', 'PCA_REG'],
+    )
+    fracdata['fracdata'] = rng.random(len(fracdata)).astype(np.float32)
+    fracdata = fracdata.set_index('FIPS')
+
+    return agglevel_variables, dftrans, load, fracdata
+
+
+#%% Benchmark
+def benchmark(number=1):
+    agglevel_variables, dftrans, load, fracdata = get_county_case()
+    region_membership = aggregate_regions.get_region_membership(agglevel_variables)
+    regions = agglevel_variables['county_regions'] + agglevel_variables['ba_regions']
+    print(
+        f"{len(agglevel_variables['county_regions'])} counties, "
+        f"{len(agglevel_variables['ba_regions'])} BAs, {len(dftrans)} transmission rows"
+    )
+    ## Check that the vectorized versions match before timing them
+    pd.testing.assert_frame_equal(
+        aggregate_regions.filter_county_transmission(dftrans, ['r', 'rr'], region_membership),
+        filter_county_transmission_loop(
+            dftrans, ['r', 'rr'], agglevel_variables).astype(dftrans.dtypes),
+    )
+    assert (
+        aggregate_regions.get_present_regions(fracdata.T, regions)
+        == get_present_regions_loop(fracdata.T, regions)
+    )
+    pd.testing.assert_frame_equal(
+        aggregate_regions.disaggregate_load_hourly(load, fracdata),
+        disaggregate_load_hourly_loop(load, fracdata),
+    )
+    cases = {
+        'transmission filter': (
+            lambda: filter_county_transmission_loop(dftrans, ['r', 'rr'], agglevel_variables),
+            lambda: aggregate_regions.filter_county_transmission(
+                dftrans, ['r', 'rr'], region_membership),
+        ),
+        'present regions': (
+            lambda: get_present_regions_loop(fracdata.T, regions),
+            lambda: aggregate_regions.get_present_regions(fracdata.T, regions),
+        ),
+        'load_hourly disaggregation': (
+            lambda: disaggregate_load_hourly_loop(load, fracdata),
+            lambda: aggregate_regions.disaggregate_load_hourly(load, fracdata),
+        ),
+    }
+    for label, (before, after) in cases.items():
+        t_before = timeit.timeit(before, number=number) / number
+        t_after = timeit.timeit(after, number=number) / number
+        print(
+            f'{label:<28}: {t_before:8.3f} s -> {t_after:8.3f} s '
+            f'({t_before / t_after:.0f}x)'
+        )
+
+
+#%% Procedure
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark county disaggregation helpers')
+    parser.add_argument('--number', '-n', type=int, default=1, help='Repetitions to average')
+    args = parser.parse_args()
+
+    benchmark(number=args.number)
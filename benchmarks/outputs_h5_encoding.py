@@ -0,0 +1,100 @@
+"""
+Compare the size and write/read times of outputs.h5 files written with fixed-width
+and dictionary-encoded string columns (see the outputs_string_encoding switch).
+
+Usage:
+    python benchmarks/outputs_h5_encoding.py [--case path/to/run]
+
+Without --case, a synthetic national-scale dump of e_report outputs is used.
+"""
+
+#%% Imports
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+import h5py
+import numpy as np
+import pandas as pd
+
+reeds_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if reeds_path not in sys.path:
+    sys.path.append(reeds_path)
+import reeds
+
+
+#%% Functions
+def make_outputs(rows_n=int(5e6)):
+    """Make a national-scale dictionary of e_report outputs"""
+    rng = np.random.default_rng(0)
+    techs = [f'{tech}_{i}' for tech in ['upv', 'wind-ons', 'battery', 'gas-cc'] for i in range(1, 11)]
+    regions = [f'p{i}' for i in range(1, 135)]
+    hours = [f'y2012d{d:03}h{h:02}' for d in range(1, 366) for h in range(1, 25, 4)]
+    years = np.arange(2025, 2051, 5)
+    return {
+        'gen_h': pd.DataFrame({
+            'i': rng.choice(techs, rows_n), 'r': rng.choice(regions, rows_n),
+            'allh': rng.choice(hours, rows_n), 't': rng.choice(years, rows_n),
+            'Value': rng.random(rows_n),
+        }),
+        'tran_flow_all': pd.DataFrame({
+            'r': rng.choice(regions, rows_n // 5), 'rr': rng.choice(regions, rows_n // 5),
+            'trtype': rng.choice(['AC', 'B2B', 'LCC'], rows_n // 5),
+            't': rng.choice(years, rows_n // 5), 'Value': rng.random(rows_n // 5),
+        }),
+        'cap': pd.DataFrame({
+            'i': rng.choice(techs, rows_n // 50), 'v': rng.choice(['init-1', 'new1'], rows_n // 50),
+            'r': rng.choice(regions, rows_n // 50), 't': rng.choice(years, rows_n // 50),
+            'Value': rng.random(rows_n // 50),
+        }),
+    }
+
+
+def benchmark(case=None, number=1):
+    """
+    Compare file size and write/read times of fixed-width and dictionary-encoded strings.
+    If case is provided, its outputs/outputs.h5 file is used as the e_report dump.
+    """
+    if case is None:
+        dfdict = make_outputs()
+    else:
+        h5path = os.path.join(case, 'outputs', 'outputs.h5')
+        with h5py.File(h5path, 'r') as f:
+            keys = list(f)
+        dfdict = {key: reeds.io.read_output(h5path, key) for key in keys}
+        dfdict = {
+            key: df.rename(columns={v: k for k, v in reeds.io.OUTPUT_COLUMN_RENAMES.items()})
+            for key, df in dfdict.items()
+        }
+    print(f"{len(dfdict)} outputs, {sum(len(df) for df in dfdict.values()):,} rows")
+    with tempfile.TemporaryDirectory() as tempdir:
+        for string_encoding in ['fixed', 'dictionary']:
+            h5path = os.path.join(tempdir, f'{string_encoding}.h5')
+
+            def write():
+                if os.path.exists(h5path):
+                    os.remove(h5path)
+                for key, df in dfdict.items():
+                    reeds.io.write_output_to_h5(
+                        df, key, h5path, string_encoding=string_encoding)
+
+            def read():
+                for key in dfdict:
+                    reeds.io.read_output(h5path, key)
+
+            write_time = timeit.timeit(write, number=number) / number
+            read_time = timeit.timeit(read, number=number) / number
+            print(
+                f"{string_encoding}: {os.path.getsize(h5path) / 1e6:.1f} MB, "
+                f"write {write_time:.2f} s, read {read_time:.2f} s"
+            )
+
+
+#%% Procedure
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark outputs.h5 string encodings')
+    parser.add_argument('--case', '-c', type=str, default=None,
+                        help='Path to a ReEDS case with an outputs/outputs.h5 file')
+    args = parser.parse_args()
+    benchmark(args.case)
@@ -0,0 +1,144 @@
+"""
+Benchmark the sparse-matrix representative period models in
+input_processing/hourly_repperiods.py against the original pulp models
+built term by term, and compare the HiGHS and CBC solvers.
+
+Usage:
+    python benchmarks/repperiod_solvers.py [--days 365] [--clusters 33]
+"""
+
+#%% Imports
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import pulp
+
+reeds_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(reeds_path, 'input_processing'))
+import hourly_repperiods
+
+
+#%% Reference implementations (pulp models built term by term)
+def optimize_period_weights_pulp(profiles_day):
+    days = profiles_day.index.values
+    profiles_mean = profiles_day.mean()
+    m = pulp.LpProblem('LinearDaySelection', pulp.LpMinimize)
+    WEIGHT = pulp.LpVariable.dicts('WEIGHT', (d for d in days), lowBound=0, cat='Continuous')
+    ERROR_POS = pulp.LpVariable.dicts(
+        'ERROR_POS', (c for c in profiles_day.columns), lowBound=0, cat='Continuous')
+    ERROR_NEG = pulp.LpVariable.dicts(
+        'ERROR_NEG', (c for c in profiles_day.columns), lowBound=0, cat='Continuous')
+    m += pulp.lpSum([WEIGHT[d] for d in days]) == 1
+    for c in profiles_day.columns:
+        m += (
+            ERROR_POS[c] - ERROR_NEG[c]
+            + pulp.lpSum([WEIGHT[d] * profiles_day[c][d] for d in days])
+            == profiles_mean[c])
+    m += pulp.lpSum([ERROR_POS[c] + ERROR_NEG[c] for c in profiles_day.columns])
+    m.solve(solver=pulp.PULP_CBC_CMD(msg=False))
+    return pulp.value(m.objective)
+
+
+def assign_representative_days_pulp(profiles_day, rweights):
+    actualdays = profiles_day.index.values
+    repdays = list(rweights.index)
+    m = pulp.LpProblem('RepDayAssignment', pulp.LpMinimize)
+    WEIGHT = pulp.LpVariable.dicts(
+        'WEIGHT', ((a,r) for a in actualdays for r in repdays),
+        lowBound=0, upBound=1, cat=pulp.LpInteger)
+    ERROR_POS = pulp.LpVariable.dicts(
+        'ERROR_POS', ((a,c) for a in actualdays for c in profiles_day.columns),
+        lowBound=0, cat='Continuous')
+    ERROR_NEG = pulp.LpVariable.dicts(
+        'ERROR_NEG', ((a,c) for a in actualdays for c in profiles_day.columns),
+        lowBound=0, cat='Continuous')
+    for a in actualdays:
+        m += pulp.lpSum([WEIGHT[a,r] for r in repdays]) == 1
+    for r in repdays:
+        m += pulp.lpSum([WEIGHT[a,r] for a in actualdays]) == rweights[r]
+    for a in actualdays:
+        for c in profiles_day.columns:
+            m += (
+                ERROR_POS[a,c] - ERROR_NEG[a,c]
+                + pulp.lpSum([WEIGHT[a,r] * profiles_day[c][r] for r in repdays])
+                == profiles_day[c][a])
+    m += pulp.lpSum([
+        ERROR_POS[a,c] + ERROR_NEG[a,c]
+        for a in actualdays for c in profiles_day.columns
+    ])
+    m.solve(solver=pulp.PULP_CBC_CMD(msg=False))
+    return pulp.value(m.objective)
+
+
+#%% Helper functions
+def make_profiles(numdays=365, numregions=5, hours=4, seed=0):
+    """Random hourly profiles with one row per day and (property, region, hour) columns"""
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_tuples(
+        [(2012, d) for d in range(1, numdays + 1)], names=['year', 'yperiod'])
+    columns = pd.MultiIndex.from_product(
+        [['load', 'upv'], [f'p{i}' for i in range(numregions)], range(1, hours + 1)],
+        names=['property', 'region', 'h_of_period'])
+    return pd.DataFrame(rng.random((numdays, len(columns))), index=index, columns=columns)
+
+
+def weighting_error(profiles_day, weights):
+    return (
+        profiles_day.mean() - (profiles_day.multiply(weights / len(profiles_day), axis=0)).sum()
+    ).abs().sum()
+
+
+def assignment_error(profiles_day, a2r):
+    return np.abs(profiles_day.values - profiles_day.loc[a2r.values].values).sum()
+
+
+def timed(func):
+    tic = time.perf_counter()
+    out = func()
+    return out, time.perf_counter() - tic
+
+
+#%% Benchmarks
+def benchmark_optimize_period_weights(profiles, numclusters):
+    profiles_day = None
+    for solver in ['highs', 'cbc']:
+        (profiles_day, _, weights), seconds = timed(
+            lambda: hourly_repperiods.optimize_period_weights(
+                profiles, numclusters=numclusters, solver=solver))
+        print(
+            f'optimize_period_weights ({solver}): {seconds:.2f} s, '
+            f'objective {weighting_error(profiles_day, weights):.6f}')
+    objective, seconds = timed(lambda: optimize_period_weights_pulp(profiles_day))
+    print(f'optimize_period_weights (pulp): {seconds:.2f} s, objective {objective:.6f}')
+
+
+def benchmark_assign_representative_days(profiles, numclusters):
+    profiles_day, iweights, _ = hourly_repperiods.optimize_period_weights(
+        profiles, numclusters=numclusters)
+    profiles_day = profiles_day.round(4)
+    for solver in ['highs', 'cbc']:
+        a2r, seconds = timed(
+            lambda: hourly_repperiods.assign_representative_days(
+                profiles_day, iweights, solver=solver))
+        print(
+            f'assign_representative_days ({solver}): {seconds:.2f} s, '
+            f'objective {assignment_error(profiles_day, a2r):.4f}')
+    objective, seconds = timed(lambda: assign_representative_days_pulp(profiles_day, iweights))
+    print(f'assign_representative_days (pulp): {seconds:.2f} s, objective {objective:.4f}')
+
+
+#%% Procedure
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark representative period models')
+    parser.add_argument('--days', type=int, default=365, help='Days to cluster')
+    parser.add_argument('--clusters', type=int, default=33, help='Representative days')
+    parser.add_argument('--regions', type=int, default=5, help='Regions in the profiles')
+    args = parser.parse_args()
+
+    profiles = make_profiles(numdays=args.days, numregions=args.regions)
+    print(f'{args.days} days, {profiles.shape[1]} columns, {args.clusters} clusters')
+    benchmark_optimize_period_weights(profiles, args.clusters)
+    benchmark_assign_representative_days(profiles, args.clusters)
@@ -136,6 +136,10 @@ def main(casepath, t, overwrite=False):
     ).columns.astype(int).values
     tprev = {**{years[0]:years[0]}, **dict(zip(years[1:], years))}
 
+    ### Don't leave the PRAS worker running after the last solve year
+    if t == max(years):
+        Augur.pras_worker.stop(casepath)
+
     if ((not int(sw['keep_g00_files'])) and (not int(sw['debug']))) and (min(years) < t):
         g00files = glob(os.path.join(casepath, 'g00files', f'*{tprev[t]}i*.g00'))
         for i in g00files:
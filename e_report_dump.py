@@ -3,12 +3,16 @@
 # %% Imports
 # System packages
 import argparse
+import collections
+import concurrent.futures
 import datetime
+import functools
 import os
 import traceback
 import sys
 
 # Third-party packages
+import h5py
 import pandas as pd
 import gdxpds
 
@@ -55,6 +59,13 @@ def dfdict_to_csv(dfdict, filepath, symbol_list=None, rename=dict(), decimals=6)
         df_out.round(decimals).to_csv(os.path.join(filepath, f"{file_out}.csv"), index=False)
 
 
+def get_workers(workers=None):
+    """Number of worker threads to use; workers <= 0 uses all available cores"""
+    if workers is None:
+        return 1
+    return int(workers) if int(workers) > 0 else (os.cpu_count() or 1)
+
+
 def dfdict_to_h5(
     dfdict,
     filepath,
@@ -62,13 +73,21 @@ def dfdict_to_h5(
     symbol_list=None,
     rename=dict(),
     errors="warn",
+    string_encoding="fixed",
+    workers=None,
     **kwargs,
 ):
     """
-    Write dictionary of dataframes to one .h5 file
+    Write dictionary of dataframes to one .h5 file.
+    String columns are written as fixed-width byte strings by default; use
+    string_encoding="dictionary" to store them as integer codes plus a vocabulary
+    (see reeds.io.write_to_h5()).
+    Symbols are encoded by a pool of {workers} threads and streamed in order to a single
+    writer that holds the .h5 file open; at most 2*{workers} encoded symbols are
+    held in memory at once.
     """
     ### unless a subset is specified, iterate over all keys in dict
-    _symbol_list = dfdict.keys() if symbol_list is None else symbol_list
+    _symbol_list = list(dfdict.keys() if symbol_list is None else symbol_list)
 
     ### Check for existing file
     _filepath = filepath if filepath.endswith(".h5") else filepath + ".h5"
@@ -79,21 +98,49 @@ def dfdict_to_h5(
             raise NameError(
                 f"{_filepath} already exists; to overwrite set overwrite=True"
             )
-    ### iterate over symbols and add to .h5 file
-    for key in _symbol_list:
-        try:
-            reeds.io.write_output_to_h5(
-                df=dfdict[key],
-                key=rename.get(key, key),
-                filepath=_filepath,
-                overwrite=overwrite,
-                drop_ctypes=True,
-            )
-        except Exception as err:
-            print(key)
-            print(traceback.format_exc())
-            if errors == "raise":
-                raise Exception(err)
+
+    def encode(key):
+        return reeds.io.encode_output_for_h5(
+            dfdict[key], drop_ctypes=True, string_encoding=string_encoding,
+        )
+
+    def handle_error(key, err):
+        print(key)
+        print(traceback.format_exc())
+        if errors == "raise":
+            raise Exception(err)
+
+    ### Encode symbols in parallel and write them as they finish
+    _workers = get_workers(workers)
+    with (
+        concurrent.futures.ThreadPoolExecutor(max_workers=_workers) as executor,
+        h5py.File(_filepath, 'a') as f,
+    ):
+        futures = collections.deque()
+        symbols = iter(_symbol_list)
+        while True:
+            for key in symbols:
+                futures.append((key, executor.submit(encode, key)))
+                if len(futures) >= 2 * _workers:
+                    break
+            if not len(futures):
+                break
+            key, future = futures.popleft()
+            encoded = None
+            try:
+                encoded = future.result()
+                if encoded is not None:
+                    reeds.io.write_encoded_to_h5(
+                        encoded,
+                        key=rename.get(key, key),
+                        filepath=_filepath,
+                        overwrite=overwrite,
+                        h5file=f,
+                    )
+            except Exception as err:
+                handle_error(key, err)
+            ## Release the encoded arrays before encoding the next symbol
+            del future, encoded
 
 
 def dfdict_to_excel(
@@ -141,6 +188,7 @@ def write_dfdict(
     symbol_list=None,
     rename=dict(),
     errors="warn",
+    workers=None,
     **kwargs,
 ):
     """
@@ -148,27 +196,36 @@ def write_dfdict(
     Notes
     * If filepath ends with .h5 or .xlsx, filetype will be overwritten to match
     * To read single dataframes from the resulting .h5 file, use:
-      `pd.read_hdf('path/to/outputs.h5', 'cap')` (for example)
+      `reeds.io.read_output('path/to/case', 'cap')` (for example)
+    * If workers is provided, the .csv and .xlsx files are written at the same time as
+      the .h5 file (which is encoded using {workers} threads). Use workers=0 to use
+      all available cores.
     """
-    ## Always write the h5
-    dfdict_to_h5(
-        dfdict=dfdict,
-        filepath=os.path.join(outputs_path, 'outputs.h5'),
-        overwrite=overwrite,
-        symbol_list=symbol_list,
-        rename=rename,
-        errors=errors,
-        **kwargs,
-    )
+    writers = {
+        ## Always write the h5
+        'h5': functools.partial(
+            dfdict_to_h5,
+            dfdict=dfdict,
+            filepath=os.path.join(outputs_path, 'outputs.h5'),
+            overwrite=overwrite,
+            symbol_list=symbol_list,
+            rename=rename,
+            errors=errors,
+            workers=workers,
+            **kwargs,
+        ),
+    }
     if write_csv:
-        dfdict_to_csv(
+        writers['csv'] = functools.partial(
+            dfdict_to_csv,
             dfdict=dfdict,
             filepath=outputs_path,
             symbol_list=symbol_list,
             rename=rename,
         )
     if write_xlsx:
-        dfdict_to_excel(
+        writers['xlsx'] = functools.partial(
+            dfdict_to_excel,
             dfdict=dfdict,
             filepath=os.path.join(outputs_path, 'outputs.xlsx'),
             overwrite=overwrite,
@@ -177,6 +234,14 @@ def write_dfdict(
             errors=errors,
             **kwargs,
         )
+    if workers is None:
+        for writer in writers.values():
+            writer()
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(writers)) as executor:
+            futures = {filetype: executor.submit(writer) for filetype, writer in writers.items()}
+        for future in futures.values():
+            future.result()
 
 
 #%% Functions for extra postprocessing of particular outputs
@@ -234,11 +299,16 @@ if __name__ == '__main__' and not hasattr(sys, 'ps1'):
     parser.add_argument("case", help="ReEDS scenario name")
     parser.add_argument('--csv', '-c', action='store_true', help='write csv files')
     parser.add_argument('--xlsx', '-x', action='store_true', help='write xlsx file')
+    parser.add_argument(
+        '--workers', '-w', type=int, default=None,
+        help='number of threads to use for writing outputs (default: threads from cplex.opt)',
+    )
 
     args = parser.parse_args()
     case = args.case
     write_csv = args.csv
     write_xlsx = args.xlsx
+    workers = args.workers
 
     # #%% Inputs for debugging
     # case = os.path.join(reeds_path, 'runs', 'v20250312_scheduledM0_Pacific')
@@ -268,6 +338,9 @@ if __name__ == '__main__' and not hasattr(sys, 'ps1'):
     rename = {k.split("(")[0]: v for k, v in rename.items()}
     print(f"renamed parameters: {rename}")
 
+    if workers is None:
+        workers = int(sw['threads'])
+
     # %%### Write results for each gdx file
     ### outputs gdx
     print("Loading outputs gdx")
@@ -282,6 +355,8 @@ if __name__ == '__main__' and not hasattr(sys, 'ps1'):
         write_csv=write_csv,
         write_xlsx=write_xlsx,
         rename=rename,
+        workers=workers,
+        string_encoding=sw.get('outputs_string_encoding', 'fixed'),
     )
 
     ### powerfrac results
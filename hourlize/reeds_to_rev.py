@@ -2,6 +2,8 @@
 This file is for converting back from ReEDS capacity results to reV sites.
 """
 import argparse
+import concurrent.futures
+import datetime
 import os
 from pathlib import Path
 import sys
@@ -14,7 +16,7 @@ import h5py
 import numpy as np
 import pandas as pd
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import reeds
 
 pd.options.mode.chained_assignment = "raise"
@@ -24,6 +26,28 @@ TECH_ALIASES = {
     "egs": "egs_allkm",
     "geohydro": "geohydro_allkm",
 }
+# ReEDS outputs used by all techs: file path within the run folder and read_csv arguments
+REEDS_OUTPUT_FILES = {
+    "cap": {
+        "filepath": ("outputs", "cap.csv"),
+        "names": ["tech", "region", "year", "MW"],
+    },
+    "cap_new_bin_out": {
+        "filepath": ("outputs", "cap_new_bin_out.csv"),
+        "names": ["tech", "vintage", "region", "year", "bin", "MW"],
+        "usecols": ["tech", "region", "year", "bin", "MW"],
+    },
+    "cap_new_ivrt_refurb": {
+        "filepath": ("outputs", "cap_new_ivrt_refurb.csv"),
+        "names": ["tech", "vintage", "region", "year", "MW"],
+        "usecols": ["tech", "region", "year", "MW"],
+    },
+    "cap_exog": {
+        "filepath": ("outputs", "cap_exog.csv"),
+        "names": ["tech", "vintage", "region", "year", "MW"],
+        "usecols": ["tech", "region", "year", "MW"],
+    },
+}
 
 
 def get_reeds_years(run_folder, first_year=2009):
@@ -141,6 +165,62 @@ def get_reeds_tech_lifetimes(run_folder):
     return lifetimes_expanded_df
 
 
+def read_reeds_output(run_folder, key, reeds_outputs=None):
+    """
+    Reads one of the ReEDS outputs defined in REEDS_OUTPUT_FILES for all technologies.
+
+    Parameters
+    ----------
+    run_folder : str
+        Path to the folder containing the ReEDS run of interest.
+    key : str
+        Key of the output in REEDS_OUTPUT_FILES (e.g., "cap").
+    reeds_outputs : dict, optional
+        ReEDS outputs that have already been loaded with load_reeds_outputs(). If
+        provided, a copy of the preloaded output is returned instead of reading the
+        file again. By default None.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Contents of the ReEDS output file.
+    """
+    if reeds_outputs is not None:
+        return reeds_outputs[key].copy()
+
+    read_kwargs = REEDS_OUTPUT_FILES[key].copy()
+    filepath = os.path.join(run_folder, *read_kwargs.pop("filepath"))
+    return pd.read_csv(filepath, low_memory=False, header=0, **read_kwargs)
+
+
+def load_reeds_outputs(run_folder):
+    """
+    Loads the ReEDS outputs that are shared by all technologies so they can be passed
+    to prepare_data() and check_tech() for each technology instead of being read again.
+
+    Parameters
+    ----------
+    run_folder : str
+        Path to the folder containing the ReEDS run of interest. Must contain the
+        files in REEDS_OUTPUT_FILES plus outputs/systemcost.csv and
+        inputs_case/maxage.csv.
+
+    Returns
+    -------
+    dict
+        Dictionary with a pandas.DataFrame for each key of REEDS_OUTPUT_FILES, plus
+        "years" (from get_reeds_years()) and "lifetimes" (from
+        get_reeds_tech_lifetimes()).
+    """
+    reeds_outputs = {
+        key: read_reeds_output(run_folder, key) for key in REEDS_OUTPUT_FILES
+    }
+    reeds_outputs["years"] = get_reeds_years(run_folder)
+    reeds_outputs["lifetimes"] = get_reeds_tech_lifetimes(run_folder)
+
+    return reeds_outputs
+
+
 def get_reeds_formatted_rev_supply_curve(sc_file, tech, run_folder):
     """
     Helper function for prepare_data(). Get reV supply curve and return as a DataFrame.
@@ -377,7 +457,7 @@ def get_preexisting_capacity(df_sc_in, tech, first_model_year=2009):
     return df_bin_exist
 
 
-def get_capacity_check_data(run_folder, tech):
+def get_capacity_check_data(run_folder, tech, reeds_outputs=None):
     """
     Helper function for prepare_data(). Gets summary of capacity by year, region, and
     class that can be used to check capacity values at the end of disaggregation.
@@ -389,6 +469,9 @@ def get_capacity_check_data(run_folder, tech):
         following file: outputs/cap.csv.
     tech : str
         Technology. Expected values are defined in VALID_TECHS.
+    reeds_outputs : dict, optional
+        Preloaded ReEDS outputs from load_reeds_outputs(). If None (default), the
+        outputs are read from ``run_folder``.
 
     Returns
     -------
@@ -398,10 +481,7 @@ def get_capacity_check_data(run_folder, tech):
         "MW"].
     """
     # Get check for capacity
-    cap_chk = os.path.join(run_folder, "outputs", "cap.csv")
-    df_cap_chk = pd.read_csv(
-        cap_chk, low_memory=False, names=["tech", "region", "year", "MW"], header=0
-    )
+    df_cap_chk = read_reeds_output(run_folder, "cap", reeds_outputs)
     df_cap_chk[["tech_cat", "class"]] = df_cap_chk["tech"].str.rsplit(
         "_", n=1, expand=True
     )
@@ -412,7 +492,7 @@ def get_capacity_check_data(run_folder, tech):
     return df_cap_chk
 
 
-def get_new_investments(run_folder, tech):
+def get_new_investments(run_folder, tech, reeds_outputs=None):
     """
     Helper function for prepare_data(). Produces a DataFrame summarizing the new
     capacity deployed by year to each region, year, class, and bin.
@@ -424,6 +504,9 @@ def get_new_investments(run_folder, tech):
         following file: outputs/cap_new_bin_out.csv.
     tech : str
         Technology. Expected values are defined in VALID_TECHS.
+    reeds_outputs : dict, optional
+        Preloaded ReEDS outputs from load_reeds_outputs(). If None (default), the
+        outputs are read from ``run_folder``.
 
     Returns
     -------
@@ -433,14 +516,7 @@ def get_new_investments(run_folder, tech):
     """
     # Read in inv_rsc
     # source of New investments by reg/class/bin
-    inv_rsc = os.path.join(run_folder, "outputs", "cap_new_bin_out.csv")
-    df_inv_rsc = pd.read_csv(
-        inv_rsc,
-        low_memory=False,
-        names=["tech", "vintage", "region", "year", "bin", "MW"],
-        usecols=["tech", "region", "year", "bin", "MW"],
-        header=0,
-    )
+    df_inv_rsc = read_reeds_output(run_folder, "cap_new_bin_out", reeds_outputs)
     df_inv_rsc = df_inv_rsc[df_inv_rsc["tech"].str.startswith(tech)].copy()
 
     return df_inv_rsc
@@ -478,7 +554,7 @@ def combine_preexisting_and_new_investments(df_bin_exist, df_inv_rsc):
     return df_inv
 
 
-def get_input_refurbishments(run_folder, tech):
+def get_input_refurbishments(run_folder, tech, reeds_outputs=None):
     """
     Helper function for prepare_data(). Loads refurbishment capacities to DataFrame.
 
@@ -489,6 +565,9 @@ def get_input_refurbishments(run_folder, tech):
         following file: outputs/cap_new_ivrt_refurb.csv.
     tech : str
         Technology. Expected values are defined in VALID_TECHS.
+    reeds_outputs : dict, optional
+        Preloaded ReEDS outputs from load_reeds_outputs(). If None (default), the
+        outputs are read from ``run_folder``.
 
     Returns
     -------
@@ -498,13 +577,8 @@ def get_input_refurbishments(run_folder, tech):
     """
     # Refurbishments
     # source of Refurbishments by reg/class/bin
-    inv_refurb = os.path.join(run_folder, "outputs", "cap_new_ivrt_refurb.csv")
-    df_inv_refurb_in = pd.read_csv(
-        inv_refurb,
-        low_memory=False,
-        names=["tech", "vintage", "region", "year", "MW"],
-        header=0,
-        usecols=["tech", "region", "year", "MW"],
+    df_inv_refurb_in = read_reeds_output(
+        run_folder, "cap_new_ivrt_refurb", reeds_outputs
     )
     df_inv_refurb_in = df_inv_refurb_in[
         df_inv_refurb_in["tech"].str.startswith(tech)
@@ -636,7 +710,7 @@ def get_retirements_of_refurbishments(df_refurb_investments_in, lifetimes, years
     return df_ret_inv_refurb
 
 
-def get_exogenous_capacity(run_folder, tech):
+def get_exogenous_capacity(run_folder, tech, reeds_outputs=None):
     """
     Loads exogenous capacity by region, year, and class from ReEDS outputs.
 
@@ -647,6 +721,9 @@ def get_exogenous_capacity(run_folder, tech):
         following file: outputs/cap_exog.csv.
     tech : str
         Technology. Expected values are defined in VALID_TECHS.
+    reeds_outputs : dict, optional
+        Preloaded ReEDS outputs from load_reeds_outputs(). If None (default), the
+        outputs are read from ``run_folder``.
 
     Returns
     -------
@@ -656,14 +733,7 @@ def get_exogenous_capacity(run_folder, tech):
     """
 
     # Source of Existing capacity over time. Used for retirements of existing capacity.
-    cap_exog = os.path.join(run_folder, "outputs", "cap_exog.csv")
-    df_cap_exog = pd.read_csv(
-        cap_exog,
-        low_memory=False,
-        names=["tech", "vintage", "region", "year", "MW"],
-        header=0,
-        usecols=["tech", "region", "year", "MW"],
-    )
+    df_cap_exog = read_reeds_output(run_folder, "cap_exog", reeds_outputs)
     df_cap_exog = df_cap_exog[df_cap_exog["tech"].str.startswith(tech)].copy()
 
     return df_cap_exog
@@ -776,7 +846,9 @@ def combine_retirements(
     return df_ret
 
 
-def prepare_data(run_folder, sc_file, tech, priority_cols, check_results=True):
+def prepare_data(
+    run_folder, sc_file, tech, priority_cols, check_results=True, reeds_outputs=None
+):
     # pylint: disable=too-many-branches,too-many-statements
     """
     Prepares a number of DataFrames required to run disaggregate_reeds_to_rev().
@@ -810,6 +882,10 @@ def prepare_data(run_folder, sc_file, tech, priority_cols, check_results=True):
     check_results : bool, optional
         If True (default), derive and include the ``df_cap_chk`` DataFrame in the
         outputs. If False, the ``df_cap_chk`` output will be ``None``.
+    reeds_outputs : dict, optional
+        Preloaded ReEDS outputs from load_reeds_outputs(), which avoids reading the
+        same outputs again for each technology. If None (default), the outputs are read
+        from ``run_folder``.
 
     Returns
     -------
@@ -838,11 +914,15 @@ def prepare_data(run_folder, sc_file, tech, priority_cols, check_results=True):
     """
 
     # load required data
-    years = get_reeds_years(run_folder)
-    lifetimes = get_reeds_tech_lifetimes(run_folder)
-    df_cap_exog = get_exogenous_capacity(run_folder, tech)
+    if reeds_outputs is not None:
+        years = list(reeds_outputs["years"])
+        lifetimes = reeds_outputs["lifetimes"].copy()
+    else:
+        years = get_reeds_years(run_folder)
+        lifetimes = get_reeds_tech_lifetimes(run_folder)
+    df_cap_exog = get_exogenous_capacity(run_folder, tech, reeds_outputs)
     if check_results:
-        df_cap_chk = get_capacity_check_data(run_folder, tech)
+        df_cap_chk = get_capacity_check_data(run_folder, tech, reeds_outputs)
     else:
         df_cap_chk = None
 
@@ -856,12 +936,12 @@ def prepare_data(run_folder, sc_file, tech, priority_cols, check_results=True):
 
     # Prepare Capital Stock Data
     # new and existing investments
-    df_new_investments = get_new_investments(run_folder, tech)
+    df_new_investments = get_new_investments(run_folder, tech, reeds_outputs)
     df_new_and_preexisting_investments = combine_preexisting_and_new_investments(
         df_bin_exist, df_new_investments
     )
     # refurbishments
-    df_refurbishments_in = get_input_refurbishments(run_folder, tech)
+    df_refurbishments_in = get_input_refurbishments(run_folder, tech, reeds_outputs)
     df_refurbishments = amend_refurbishments(df_refurbishments_in)
     # retirements
     df_ret_preexist = get_retirements_of_preexisting(df_cap_exog, years)
@@ -964,6 +1044,77 @@ def sort_sites_by_priority(df_sc, priority):
     return sorted_df
 
 
+def get_priority_order(priority_values):
+    """
+    Helper function for disaggregate_reeds_to_rev(). Array equivalent of
+    sort_sites_by_priority() for sites within a single region/class: returns the
+    positions that sort the sites by the priority columns, keeping the input order
+    for ties.
+
+    Parameters
+    ----------
+    priority_values : dictionary
+        Dictionary of priority columns in order of precedence. Keys are column names,
+        values are tuples of (numpy.ndarray of column values, sort order), where the sort
+        order is either "ascending" or "descending".
+
+    Returns
+    -------
+    numpy.ndarray
+        Positions that sort the input values by priority.
+    """
+    keys = [
+        values if sort_order == "ascending" else -values
+        for values, sort_order in priority_values.values()
+    ]
+    # np.lexsort is stable and sorts by the last key first
+    return np.lexsort(keys[::-1])
+
+
+def get_year_site_array(df_sc_out, column, num_years):
+    """
+    Helper function for disaggregate_reeds_to_rev(). Returns a copy of a column of the
+    accounting dataframe, which contains all supply curve points replicated for each
+    model year, as a (year, site) array.
+
+    Parameters
+    ----------
+    df_sc_out : pandas.DataFrame
+        Accounting dataframe, sorted by year and then by site.
+    column : str
+        Column to extract.
+    num_years : int
+        Number of model years.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of the column values with shape (num_years, number of sites).
+    """
+    return df_sc_out[column].to_numpy(dtype=float, copy=True).reshape(num_years, -1)
+
+
+def set_accounting_column(df_sc_out, column, values):
+    """
+    Helper function for disaggregate_reeds_to_rev() and simultaneous_fill(). Writes
+    an array of accounting values (e.g. from get_year_site_array()) back to the
+    dataframe. Integer columns are kept as integers if the new values are all whole
+    numbers, as when adding to the column in place.
+
+    Parameters
+    ----------
+    df_sc_out : pandas.DataFrame
+        Accounting dataframe in the same order as ``values``. Modified in place.
+    column : str
+        Column to overwrite.
+    values : numpy.ndarray
+        Array of new values.
+    """
+    if pd.api.types.is_integer_dtype(df_sc_out[column]) and not (values % 1).any():
+        values = values.astype(df_sc_out[column].dtype)
+    df_sc_out[column] = values.ravel()
+
+
 def check_overbuilt(df_sc_out):
     """
     Check whether any sites in the input supply curve dataframe have been overbuilt
@@ -972,8 +1123,9 @@ def check_overbuilt(df_sc_out):
 
     Parameters
     ----------
-    df_sc_out : pandas.DataFrame
-        Supply curve dataframe. Must contain the following columns:
+    df_sc_out : pandas.DataFrame or dict
+        Supply curve dataframe (or dictionary of numpy arrays). Must contain the
+        following columns:
         - "cap" = Capacity in MW deployed to the site
         - "cap_sc" = Developable capacity in MW of the site
 
@@ -1150,6 +1302,81 @@ def disaggregate_reeds_to_rev(
     # make sure that no sites have been overbuilt relative to their developable capacity
     check_overbuilt(df_sc_out)
 
+    # --------------------------------------------------------------------------------
+    # The remaining accounting is done on (year, site) arrays, which are in the same
+    # order as df_sc_out (all sites for the first year, then all sites for the next...)
+    num_years = len(years)
+    year_index = {year: i for i, year in enumerate(years)}
+    years_arr = np.array(years)
+    cap_sc = get_year_site_array(df_sc_out, "cap_sc", num_years)
+    cap = get_year_site_array(df_sc_out, "cap", num_years)
+    inv_rsc = get_year_site_array(df_sc_out, "inv_rsc", num_years)
+    ret = get_year_site_array(df_sc_out, "ret", num_years)
+    refurb = get_year_site_array(df_sc_out, "refurb", num_years)
+    tech_lifetime = df_sc["tech_lifetime"].to_numpy(dtype=float)
+    priority_values = {
+        column: (df_sc[column].to_numpy(), sort_order)
+        for column, sort_order in priority.items()
+    }
+
+    def fill_sites(sites, year, window, investment):
+        """
+        Fill sites (already sorted by priority) in order up to the smallest capacity
+        left over each site's lifetime, record the capacity and retirements, and
+        return the investment in each site.
+        """
+        lifetime_cap_left = np.where(window, (cap_sc - cap)[:, sites], np.inf).min(
+            axis=0
+        )
+        # find the subset of sites to allocate capacity to. start at the first site
+        # and continue down the list until the total developable capacity of the
+        # rows is enough to make the required investment.
+        enough_capacity_left = np.cumsum(lifetime_cap_left) > investment
+        if enough_capacity_left.any():
+            stop_site = np.argmax(enough_capacity_left) + 1
+        else:
+            stop_site = len(enough_capacity_left)
+        # make the investments, filling up each site to its lifetime_cap_left.
+        # inv_left is the investment left before each site (subtracting in order, so
+        # the result is the same as filling one site at a time); after the site where
+        # it runs out, inv_left is negative and the investments are zero.
+        site_cap = np.maximum(lifetime_cap_left[:stop_site], 0)
+        inv_left = np.subtract.accumulate(np.append(investment, site_cap))[:-1]
+        site_inv = np.zeros(len(sites))
+        site_inv[:stop_site] = np.maximum(np.minimum(inv_left, site_cap), 0)
+        # Attribute this capacity to the future years for these sites (within the
+        # tech lifetime).
+        cap[:, sites] += np.where(window, site_inv, 0)
+        # Account for the corresponding retirements, filtering out any retirements
+        # past the modeled years
+        retire_year = year + tech_lifetime[sites]
+        retired = np.isin(retire_year, years_arr)
+        ret[
+            np.searchsorted(years_arr, retire_year[retired]), sites[retired]
+        ] += site_inv[retired]
+        # make sure that no sites have been overbuilt relative to their developable
+        # capacity
+        check_overbuilt({"cap": cap[:, sites], "cap_sc": cap_sc[:, sites]})
+
+        return site_inv
+
+    def get_candidate_sites(sites, year):
+        """
+        Filter sites to those that can be built in the given year and get the years
+        within each site's lifetime
+        """
+        if year not in year_index:
+            raise ValueError("No candidate sites found")
+        # include years starting at the year of the investment and ending before the
+        # retirement year
+        window = (years_arr[:, None] >= year) & (
+            years_arr[:, None] < year + tech_lifetime[sites]
+        )
+        keep = window[year_index[year]]
+        if not keep.any():
+            raise ValueError("No candidate sites found")
+        return sites[keep], window[:, keep]
+
     # --------------------------------------------------------------------------------
     # New Investments
     print("Disaggregating new investments")
@@ -1168,243 +1395,82 @@ def disaggregate_reeds_to_rev(
             by=["region", "class", "bin", "year"], inplace=True
         )
 
+        # sort the sites in each region x class x (bin) by the user-defined priorities
+        # once; the candidate sites for each investment are then a subset of the group
+        group_cols = (
+            ["region", "class", "bin"] if constrain_to_bins else ["region", "class"]
+        )
+        priority_order = get_priority_order(priority_values)
+        group_sites = {
+            key: priority_order[positions]
+            for key, positions in df_sc.iloc[priority_order]
+            .groupby(group_cols, sort=False)
+            .indices.items()
+        }
+
         # loop over the new investments for each region x class x (bin) x year
-        for i, new_inv in df_new_investments.iterrows():
-            # identify the candidate sc sites corresponding to this investment.
-            # include points in the correct region x class x (bin) for years
-            # starting at the year of the investment and ending before the retirement
-            # year
-            if constrain_to_bins:
-                candidate_sites = df_sc_out[
-                    (df_sc_out["bin"] == new_inv["bin"])
-                    & (df_sc_out["class"] == new_inv["class"])
-                    & (df_sc_out["region"] == new_inv["region"])
-                    & (df_sc_out["inv_year"] >= new_inv["year"])
-                    & (
-                        df_sc_out["inv_year"]
-                        < new_inv["year"] + df_sc_out["tech_lifetime"]
-                    )
-                ].copy()
-            else:
-                candidate_sites = df_sc_out[
-                    (df_sc_out["class"] == new_inv["class"])
-                    & (df_sc_out["region"] == new_inv["region"])
-                    & (df_sc_out["inv_year"] >= new_inv["year"])
-                    & (
-                        df_sc_out["inv_year"]
-                        < new_inv["year"] + df_sc_out["tech_lifetime"]
-                    )
-                ].copy()
-
-            # for each candidate site, determine the smallest amount of available
-            # developable capacity over all of the years during which the investment.
-            # This effectively determines the size of the investment that can be made
-            # since otherwise, you'd risk overbuilding a given site in a later year.
-            lifetime_cap_left = (
-                candidate_sites.sort_values(
-                    by=["sc_point_gid_", "inv_year"], ascending=[True, False]
-                )
-                .groupby(["sc_point_gid_"])["cap_left"]
-                .cummin()
+        for year, region, _class, _bin, investment in df_new_investments.itertuples(
+            index=False
+        ):
+            key = (region, _class, _bin) if constrain_to_bins else (region, _class)
+            sites, window = get_candidate_sites(
+                group_sites.get(key, np.array([], dtype=int)), year
             )
-            candidate_sites.loc[
-                lifetime_cap_left.index, "lifetime_cap_left"
-            ] = lifetime_cap_left
-
-            # filter to just the copy of each site for the current investment year
-            # and sort the sites by the user-defined priorities
-            candidate_sites_year = sort_sites_by_priority(
-                candidate_sites[candidate_sites["inv_year"] == new_inv["year"]],
-                priority=priority,
-            )
-            if candidate_sites_year.empty:
-                raise ValueError("No candidate sites found")
-
-            # find the subset of sites to allocate capacity to. start at the first site
-            # and continue down the list until the total developable capacity of the
-            # rows is enough to make the required investment.
-            cumulative_cap_left = np.cumsum(candidate_sites_year["lifetime_cap_left"])
-            enough_capacity_left = cumulative_cap_left > new_inv["MW"]
-            if enough_capacity_left.any():
-                stop_site = np.argmax(enough_capacity_left) + 1
-            else:
-                stop_site = len(enough_capacity_left)
-            # make the investments, looping over each of the sites and filling up
-            # capacity up to the lifetime_cap_left.
-            inv_left = new_inv["MW"]
-            candidate_sites_year["site_inv"] = 0
-            for i in range(0, stop_site):
-                site_inv = np.maximum(
-                    np.minimum(
-                        inv_left, candidate_sites_year["lifetime_cap_left"].iloc[i]
-                    ),
-                    0,
-                )
-                candidate_sites_year.iloc[
-                    i, candidate_sites_year.columns.get_loc("site_inv")
-                ] = site_inv
-                inv_left -= site_inv
+            site_inv = fill_sites(sites, year, window, investment)
+            inv_rsc[year_index[year], sites] += site_inv
 
             # check that the total investments made to sites is effectively equal to
             # the expected investment.
-            total_investments = candidate_sites_year["site_inv"].sum()
-            if not np.isclose(total_investments, new_inv["MW"], atol=1e-2):
-                rcy = (
-                    f"{new_inv['region']}{new_inv['class']}{new_inv['bin']}"
-                    f"{new_inv['year']}"
-                )
-                if total_investments > new_inv["MW"]:
-                    inv_extra = total_investments - new_inv["MW"]
+            total_investments = site_inv.sum()
+            if not np.isclose(total_investments, investment, atol=1e-2):
+                rcy = f"{region}{_class}{_bin}{year}"
+                if total_investments > investment:
+                    inv_extra = total_investments - investment
                     print(
                         f"WARNING at rcby={rcy}. Aggregate site investments exceed "
                         f" expected investments by {round(inv_extra, 2)} MW."
                     )
-                if total_investments < new_inv["MW"]:
-                    inv_left = new_inv["MW"] - total_investments
+                if total_investments < investment:
+                    inv_left = investment - total_investments
                     print(
                         f"WARNING at rcby={rcy}. Available capacity exhausted and we "
                         f"have {round(inv_left, 2)} MW remaining to invest."
                     )
 
-            # Attribute this capacity to the future years for these sites (within the
-            # tech lifetime).
-            add_cap_df = candidate_sites_year.reset_index()[
-                ["sc_point_gid", "site_inv"]
-            ]
-            add_cap_lkup = dict(
-                add_cap_df[["sc_point_gid", "site_inv"]].values.tolist()
-            )
-            candidate_sites["cap"] += (
-                candidate_sites["sc_point_gid_"].map(add_cap_lkup).fillna(0)
-            )
-
-            # apply the results back to the full accounting dataframe
-            df_sc_out.loc[candidate_sites.index, "cap"] = candidate_sites["cap"]
-            df_sc_out.loc[
-                candidate_sites_year.index, "inv_rsc"
-            ] += candidate_sites_year["site_inv"]
-            # update the capacity left
-            df_sc_out["cap_left"] = df_sc_out["cap_sc"] - df_sc_out["cap"]
-
-            # Account for the corresponding retirements of these investments
-            retirements = candidate_sites_year[
-                ["sc_point_gid_", "inv_year", "site_inv", "tech_lifetime"]
-            ].reset_index(drop=True)
-            retirements.rename(columns={"sc_point_gid_": "sc_point_gid"}, inplace=True)
-            retirements["year"] = retirements["inv_year"] + retirements["tech_lifetime"]
-            # filter out any retirements past the modeled years
-            retirements_modeled = retirements[retirements["year"].isin(years)]
-            retirements_modeled.set_index(["sc_point_gid", "year"], inplace=True)
-            df_sc_out.loc[retirements_modeled.index, "ret"] += retirements_modeled[
-                "site_inv"
-            ]
-            # make sure that no sites have been overbuilt relative to their developable
-            # capacity
-            check_overbuilt(df_sc_out)
-
     # --------------------------------------------------------------------------------
     # Refurbishments
     print("Disaggregating refurbishments")
     if not df_refurbishments.empty:
         df_refurbishments.sort_values(by=["region", "class", "year"], inplace=True)
+        region_class_sites = df_sc.groupby(["region", "class"], sort=False).indices
         # loop over the refurbishments for each region x class x year
         for i, refurb_inv in df_refurbishments.iterrows():
-            # identify the candidate sc sites corresponding to these refurbishments
-            # and extract rows corresponding to the years preceding the actual refurb.
-            # include points in the correct region x class for years. Previous years
-            # are extracted so that we can prioritize refurbishments to sites based on
-            # installed capacity that existed in earlier years.
-            candidate_sites_prior_years = df_sc_out[
-                (df_sc_out["class"] == refurb_inv["class"])
-                & (df_sc_out["region"] == refurb_inv["region"])
-                & (df_sc_out["inv_year"] <= refurb_inv["year"])
-            ].copy()
-            # determine previous max installed capacity for prior years of candidate
-            # sites and attribute this back to the main accounting data frame
-            max_prev_cap = (
-                candidate_sites_prior_years.sort_values(
-                    by=["sc_point_gid_", "inv_year"]
-                )
-                .groupby(["sc_point_gid_"])["cap"]
-                .cummax()
-            )
-            df_sc_out.loc[max_prev_cap.index, "max_prev_cap"] = max_prev_cap
-
-            # extract out the actual candidate sites for refurbishment. similar to
-            # how we did for new investments, include years from the time of investment
-            # retirement.
-            candidate_sites = df_sc_out[
-                (df_sc_out["class"] == refurb_inv["class"])
-                & (df_sc_out["region"] == refurb_inv["region"])
-                & (df_sc_out["inv_year"] >= refurb_inv["year"])
-                & (
-                    df_sc_out["inv_year"]
-                    < refurb_inv["year"] + df_sc_out["tech_lifetime"]
-                )
-            ].copy()
-
-            # same as for new investments, determine the minimum developable capacity
-            # left for each site across the years
-            lifetime_cap_left = (
-                candidate_sites.sort_values(
-                    by=["sc_point_gid_", "inv_year"], ascending=[True, False]
-                )
-                .groupby(["sc_point_gid_"])["cap_left"]
-                .cummin()
+            sites, window = get_candidate_sites(
+                region_class_sites.get(
+                    (refurb_inv["region"], refurb_inv["class"]), np.array([], dtype=int)
+                ),
+                refurb_inv["year"],
             )
-            candidate_sites.loc[
-                lifetime_cap_left.index, "lifetime_cap_left"
-            ] = lifetime_cap_left
-
-            # filter to the current year
             # prioritize sites that have previous had some amount of installed capacity
+            # (the max installed capacity over the years up to the refurbishment)
             # but don't limit to these sites because sometimes more capacity will be
             # needed than these sites can provide.
-            refurb_priority = OrderedDict({"max_prev_cap": "descending"})
-            refurb_priority.update(priority)
-            candidate_sites_year = sort_sites_by_priority(
-                candidate_sites[(candidate_sites["inv_year"] == refurb_inv["year"])],
-                priority=refurb_priority,
+            max_prev_cap = cap[: year_index[refurb_inv["year"]] + 1, sites].max(axis=0)
+            refurb_priority = {"max_prev_cap": (max_prev_cap, "descending")}
+            refurb_priority.update(
+                {
+                    column: (values[sites], sort_order)
+                    for column, (values, sort_order) in priority_values.items()
+                }
             )
+            order = get_priority_order(refurb_priority)
+            sites, window = sites[order], window[:, order]
 
-            if candidate_sites_year.empty:
-                raise ValueError("No candidate sites found")
-
-            # drop sites without capacity in the refurb year from candidate sites
-            drop_sites = candidate_sites.index[
-                ~candidate_sites["sc_point_gid_"].isin(
-                    candidate_sites_year["sc_point_gid_"]
-                )
-            ]
-            candidate_sites.drop(drop_sites, axis=0, inplace=True)
-
-            # find the subset of sites to allocate capacity to. logic is the same as
-            # used in new investments
-            cumulative_cap_left = np.cumsum(candidate_sites_year["lifetime_cap_left"])
-            enough_capacity_left = cumulative_cap_left > refurb_inv["MW"]
-            if enough_capacity_left.any():
-                stop_site = np.argmax(enough_capacity_left) + 1
-            else:
-                stop_site = len(enough_capacity_left)
-            # make the investments
-            inv_left = refurb_inv["MW"]
-            candidate_sites_year["site_inv"] = 0
-            for i in range(0, stop_site):
-                site_inv = np.maximum(
-                    np.minimum(
-                        inv_left, candidate_sites_year["lifetime_cap_left"].iloc[i]
-                    ),
-                    0,
-                )
-
-                candidate_sites_year.iloc[
-                    i, candidate_sites_year.columns.get_loc("site_inv")
-                ] = site_inv
-
-                inv_left -= site_inv
+            site_inv = fill_sites(sites, refurb_inv["year"], window, refurb_inv["MW"])
+            refurb[year_index[refurb_inv["year"]], sites] += site_inv
 
             # check total investments made to sites are equal to the total refurbishment
-            total_investments = candidate_sites_year["site_inv"].sum()
+            total_investments = site_inv.sum()
             if not np.isclose(total_investments, refurb_inv["MW"], atol=1e-2):
                 rcy = f"{refurb_inv['region']}{refurb_inv['class']}{refurb_inv['year']}"
                 if total_investments > refurb_inv["MW"]:
@@ -1420,39 +1486,15 @@ def disaggregate_reeds_to_rev(
                         f"have {round(inv_left, 2)} MW remaining to refurbish."
                     )
 
-            # apply invested capacity to future years
-            add_cap_df = candidate_sites_year.reset_index()[
-                ["sc_point_gid", "site_inv"]
-            ]
-            add_cap_lkup = dict(
-                add_cap_df[["sc_point_gid", "site_inv"]].values.tolist()
-            )
-            candidate_sites["cap"] += (
-                candidate_sites["sc_point_gid_"].map(add_cap_lkup).fillna(0)
-            )
-
-            df_sc_out.loc[candidate_sites.index, "cap"] = candidate_sites["cap"]
-            df_sc_out.loc[candidate_sites_year.index, "refurb"] += candidate_sites_year[
-                "site_inv"
-            ]
-            # update the capacity left
-            df_sc_out["cap_left"] = df_sc_out["cap_sc"] - df_sc_out["cap"]
-
-            # account for the corresponding retirements
-            retirements = candidate_sites_year[
-                ["sc_point_gid_", "inv_year", "site_inv", "tech_lifetime"]
-            ].reset_index(drop=True)
-            retirements.rename(columns={"sc_point_gid_": "sc_point_gid"}, inplace=True)
-            retirements["year"] = retirements["inv_year"] + retirements["tech_lifetime"]
-            # filter out any retirements past the modeled years
-            retirements_modeled = retirements[retirements["year"].isin(years)]
-            retirements_modeled.set_index(["sc_point_gid", "year"], inplace=True)
-            df_sc_out.loc[retirements_modeled.index, "ret"] += retirements_modeled[
-                "site_inv"
-            ]
-            # make sure that no sites have been overbuilt relative to their developable
-            # capacity
-            check_overbuilt(df_sc_out)
+    # apply the results back to the full accounting dataframe
+    for column, values in {
+        "cap": cap,
+        "cap_left": cap_sc - cap,
+        "inv_rsc": inv_rsc,
+        "ret": ret,
+        "refurb": refurb,
+    }.items():
+        set_accounting_column(df_sc_out, column, values)
 
     if df_cap_chk is not None:
         # run the overall aggregate capacity checks, showing how the total disaggregated
@@ -1488,6 +1530,65 @@ def disaggregate_reeds_to_rev(
     return df_sc_out
 
 
+def fill_simultaneously(amount, sites, available, added, label, name):
+    """
+    Helper function for simultaneous_fill(). Spreads ``amount`` evenly over ``sites``,
+    stepping through the sites in order: if the even share of the amount left is less
+    than the capacity available at the current site, the share is added to all
+    remaining sites and the fill is finished; otherwise the capacity available at the
+    current site is added to all remaining sites and the current site is dropped.
+
+    Parameters
+    ----------
+    amount : float
+        Capacity in MW to add (or retire).
+    sites : numpy.ndarray
+        Positions of the sites to fill, in fill order.
+    available : numpy.ndarray
+        Capacity available at all sites (e.g. "cap_left"). Modified in place.
+    added : numpy.ndarray
+        Capacity added to all sites (e.g. "inv_rsc"). Modified in place.
+    label : str
+        Label used in error messages, e.g. "rcby=p1_1_1_2030".
+    name : str
+        Name of the amount used in error messages, e.g. "inv_left".
+
+    Returns
+    -------
+    tuple
+        Amount that could not be added, and the position of the last site that
+        capacity was added to (None if there were no sites).
+    """
+    amount_left = amount
+    num_sites = len(sites)
+    site_idx = None
+    for i, site_idx in enumerate(sites):
+        num_left = num_sites - i
+        # if the amount divided by the number of remaining points is less then the
+        # amount available at the next point, then spread the remaining amount across
+        # the available points
+        if amount_left / num_left < available[site_idx]:
+            amount_add = amount_left / num_left
+        # otherwise add the available capacity from this site to all available points
+        else:
+            amount_add = available[site_idx]
+        added[sites[i:]] += amount_add
+        available[sites[i:]] -= amount_add
+
+        # compute remaining amount
+        amount_left = amount_left - amount_add * num_left
+
+        # if we're close to zero then finish looping
+        if round(amount_left, 2) == 0:
+            amount_left = 0
+            break
+        # check to make sure amount_left isn't negative
+        if amount_left < 0:
+            print(f"ERROR at {label}: {name} is negative: {amount_left:4f}")
+
+    return amount_left, site_idx
+
+
 def simultaneous_fill(
     df_sc_in,
     df_ret,
@@ -1555,7 +1656,12 @@ def simultaneous_fill(
     # for each rcyb, find the cap_avail at the smallest site:
     # if cap_avail x all sites > investment, add investment / all sites
     # if cap_avail x all sites < investment, add cap_avail to all sites and continue to next site
-    df_sc_out = pd.DataFrame()
+    # The sites in each region/class are contiguous after sorting, so the fills are done
+    # on numpy arrays of the sorted columns and then written back to df_sc_sorted.
+    df_sc_out = []
+    no_sites = np.array([], dtype=int)
+    # last site that capacity was added to or removed from
+    last_site = None
 
     for year in years:
         print(f"Starting {year}")
@@ -1566,48 +1672,23 @@ def simultaneous_fill(
         df_sc_sorted = sort_sites_by_priority(df_sc_sorted, {"cap": "ascending"})
         df_sc_sorted["ret"] = 0
         df_ret_yr = df_ret[df_ret["year"] == year].copy()
+        region_class_sites = df_sc_sorted.groupby(
+            ["region", "class"], sort=False
+        ).indices
+        cap = df_sc_sorted["cap"].to_numpy(dtype=float, copy=True)
+        ret = np.zeros(len(df_sc_sorted))
 
-        for _, r in df_ret_yr.iterrows():
+        for r in df_ret_yr.to_dict("records"):
             # This loops through all the retirements
-            df_sc_rc = df_sc_sorted[
-                (df_sc_sorted["region"] == r["region"])
-                & (df_sc_sorted["class"] == r["class"])
-                & (df_sc_sorted["cap"] > 0)
-            ].copy()
-            # get full list of points
-            df_sc_rc_list = df_sc_rc.index
-
+            sites = region_class_sites.get((r["region"], r["class"]), no_sites)
+            sites = sites[cap[sites] > 0]
             rcy = str(r["region"]) + "_" + str(r["class"]) + "_" + str(year)
-            ret_left = r["MW"]
-
-            for sc_i in df_sc_rc_list:
-                # get built capacity at this site
-                sc_r_cap = df_sc_sorted.loc[sc_i, "cap"]
-
-                # if the amount of retirements divided by the number of remaining points
-                # is less then the amount of capacity at the next point,
-                # then spread the remaining retirement across the available points
-                if ret_left / len(df_sc_rc) < sc_r_cap:
-                    ret_sub = ret_left / len(df_sc_rc)
-                # otherwise retire total installed capacity from this site from all available points
-                else:
-                    ret_sub = sc_r_cap
-                df_sc_sorted.loc[df_sc_rc.index, "ret"] += ret_sub
-                df_sc_sorted.loc[df_sc_rc.index, "cap"] -= ret_sub
-
-                # compute remaining retirement amount
-                ret_left = ret_left - ret_sub * len(df_sc_rc)
-
-                # remove the current gid from df_sc_rc_cap so no more capacity is retired
-                df_sc_rc = df_sc_rc.drop(sc_i, errors="ignore")
-
-                # if we're close to zero then finish looping
-                if round(ret_left, 2) == 0:
-                    ret_left = 0
-                    break
-                # check to make sure inv_left isn't negative
-                if ret_left < 0:
-                    print(f"ERROR at rcby={rcby}: ret_left is negative: {ret_left}")
+            ret_left, site_idx = fill_simultaneously(
+                r["MW"], sites, cap, ret, label=f"rcy={rcy}", name="ret_left"
+            )
+            last_site = (
+                df_sc_sorted.index[site_idx] if site_idx is not None else last_site
+            )
 
             if np.floor(ret_left * 100) / 100 != 0:
                 print(
@@ -1615,6 +1696,8 @@ def simultaneous_fill(
                     rcy,
                     str(ret_left),
                 )
+        set_accounting_column(df_sc_sorted, "cap", cap)
+        set_accounting_column(df_sc_sorted, "ret", ret)
         df_sc_sorted["cap_left"] = df_sc_sorted["cap_expand"] - df_sc_sorted["cap"]
 
         # Next refurbishments
@@ -1622,67 +1705,36 @@ def simultaneous_fill(
         df_sc_sorted = sort_sites_by_priority(df_sc_sorted, {"cap": "ascending"})
         df_sc_sorted["refurb"] = 0
         df_inv_refurb_yr = df_refurbishments[df_refurbishments["year"] == year].copy()
-
-        for _, r in df_inv_refurb_yr.iterrows():
+        region_class_sites = df_sc_sorted.groupby(
+            ["region", "class"], sort=False
+        ).indices
+        cap = df_sc_sorted["cap"].to_numpy(dtype=float, copy=True)
+        cap_left = df_sc_sorted["cap_left"].to_numpy(dtype=float, copy=True)
+        refurb = np.zeros(len(df_sc_sorted))
+
+        for r in df_inv_refurb_yr.to_dict("records"):
             # This loops through all the refurbishments
-            df_sc_rc = df_sc_sorted[
-                (df_sc_sorted["region"] == r["region"])
-                & (df_sc_sorted["class"] == r["class"])
-                & (df_sc_sorted["cap"] > 0)  # must have capacity to be refurbished
-            ].copy()
-
-            # if there isn't any available capacity to refurbish, add to any sites in same
-            # region/class without capacity (will spread capacity out more)
-            if df_sc_rc.empty:
-                df_sc_rc = df_sc_sorted[
-                    (df_sc_sorted["region"] == r["region"])
-                    & (df_sc_sorted["class"] == r["class"])
-                ].copy()
-
-            df_sc_rc_list = df_sc_rc.index
+            sites = region_class_sites.get((r["region"], r["class"]), no_sites)
+            # must have capacity to be refurbished; if there isn't any available
+            # capacity to refurbish, add to any sites in same region/class without
+            # capacity (will spread capacity out more)
+            if (cap[sites] > 0).any():
+                sites = sites[cap[sites] > 0]
             rcy = str(r["region"]) + "_" + str(r["class"]) + "_" + str(year)
-            refurb_left = r["MW"]
-
-            for sc_i in df_sc_rc_list:
-                # get available capacity at this site
-                sc_r_cap = df_sc_sorted.loc[sc_i, "cap_left"]
-
-                # if the amount of investment / number of remaining points
-                # is less then the amount available at the next point,
-                # then spread the remaining investment across the available points
-                if refurb_left / len(df_sc_rc) < sc_r_cap:
-                    refurb_add = refurb_left / len(df_sc_rc)
-                # otherwise add as new investment the available capacity from this site
-                else:
-                    refurb_add = sc_r_cap
-
-                df_sc_sorted.loc[df_sc_rc.index, "refurb"] += refurb_add
-                df_sc_sorted.loc[df_sc_rc.index, "cap_left"] -= refurb_add
-                # useful for looking at rows during debugging
-                # df_sc_sorted.loc[df_sc_rc.index,]
-
-                # compute remaining investment amount
-                refurb_left = refurb_left - refurb_add * len(df_sc_rc)
-
-                # remove the current gid from df_sc_rc so no more capacity is added
-                df_sc_rc = df_sc_rc.drop(sc_i, errors="ignore")
-
-                # if we're close to zero then finish looping
-                if round(refurb_left, 2) == 0:
-                    refurb_left = 0
-                    break
-                # check to make sure inv_left isn't negative
-                if refurb_left < 0:
-                    print(
-                        f"ERROR at rcby={rcby}: refurb_left is negative: {refurb_left}"
-                    )
+            refurb_left, site_idx = fill_simultaneously(
+                r["MW"], sites, cap_left, refurb, label=f"rcy={rcy}", name="refurb_left"
+            )
+            last_site = (
+                df_sc_sorted.index[site_idx] if site_idx is not None else last_site
+            )
 
             if round(refurb_left, 2) != 0:
                 print(
                     f"ERROR at rcy={rcy}: refurb_left should be 0 "
                     f"and it is {refurb_left}"
                 )
-
+        set_accounting_column(df_sc_sorted, "cap_left", cap_left)
+        set_accounting_column(df_sc_sorted, "refurb", refurb)
         df_sc_sorted["cap"] = df_sc_sorted["cap_expand"] - df_sc_sorted["cap_left"]
 
         # Finally, new site investments
@@ -1692,59 +1744,34 @@ def simultaneous_fill(
         df_inv_yr = df_new_and_preexisting_investments[
             df_new_and_preexisting_investments["year"] == year
         ].copy()
-
-        for _, r in df_inv_yr.iterrows():
+        region_class_sites = df_sc_sorted.groupby(
+            ["region", "class"], sort=False
+        ).indices
+        cap_left = df_sc_sorted["cap_left"].to_numpy(dtype=float, copy=True)
+        inv_rsc = np.zeros(len(df_sc_sorted))
+        if constrain_to_bins:
+            sc_bin = df_sc_sorted["bin"]
+            sc_bin_isnull = sc_bin.isnull().to_numpy()
+            sc_bin = sc_bin.to_numpy()
+
+        for r in df_inv_yr.to_dict("records"):
             # This loops through all the investments
             # old h5 files don't include bin, so only filter on bin if constrain_to_bins
             # is True and the bin col exists
-            df_sc_rc_filter = (df_sc_sorted["region"] == r["region"]) & (
-                df_sc_sorted["class"] == r["class"]
-            )
+            sites = region_class_sites.get((r["region"], r["class"]), no_sites)
             if constrain_to_bins:
-                df_sc_filter = df_sc_rc_filter & (
-                    (df_sc_sorted["bin"] == r["bin"]) | df_sc_sorted["bin"].isnull()
-                )
+                sites = sites[(sc_bin[sites] == r["bin"]) | sc_bin_isnull[sites]]
                 bin_label = f"{r['bin']}_"
             else:
-                df_sc_filter = df_sc_rc_filter
                 bin_label = ""
 
-            df_sc_rcb = df_sc_sorted[df_sc_filter].copy()
-            df_sc_rcb_list = df_sc_rcb.index
             rcby = f"{r['region']}_{r['class']}_{bin_label}{year}"
-            inv_left = r["MW"]
-
-            for sc_i in df_sc_rcb_list:
-                # get available capacity at this site
-                sc_r_cap = df_sc_sorted.loc[sc_i, "cap_left"]
-
-                # if the amount of investment divided by the number of remaining points
-                # is less then the amount available at the next point,
-                # then spread the remaining investment across the available points
-                if inv_left / len(df_sc_rcb) < sc_r_cap:
-                    inv_add = inv_left / len(df_sc_rcb)
-                # otherwise add as new investment the available capacity from this site
-                else:
-                    inv_add = sc_r_cap
-                df_sc_sorted.loc[df_sc_rcb.index, "inv_rsc"] += inv_add
-                df_sc_sorted.loc[df_sc_rcb.index, "cap_left"] -= inv_add
-                # useful for looking at rows during debugging
-                # df_sc_sorted.loc[df_sc_rcb.index,]
-
-                # compute remaining investment amount
-                inv_left -= inv_add * len(df_sc_rcb)
-
-                # remove the current gid from df_sc_rcb_avail so no more capacity is
-                # added at this point
-                df_sc_rcb = df_sc_rcb.drop(sc_i, errors="ignore")
-
-                # if we're close to zero then finish looping
-                if round(inv_left, 2) == 0:
-                    inv_left = 0
-                    break
-                # check to make sure inv_left isn't negative
-                if inv_left < 0:
-                    print(f"ERROR at rcby={rcby}: inv_left is negative: {inv_left:4f}")
+            inv_left, site_idx = fill_simultaneously(
+                r["MW"], sites, cap_left, inv_rsc, label=f"rcby={rcby}", name="inv_left"
+            )
+            last_site = (
+                df_sc_sorted.index[site_idx] if site_idx is not None else last_site
+            )
 
             # add any additional capacity to the last point
             if round(inv_left, 2) != 0:
@@ -1752,22 +1779,25 @@ def simultaneous_fill(
                     f"ERROR at rcby={rcby}: inv_left should be zero "
                     f"and it is: {inv_left:2f}. Adding to the last supply curve point"
                 )
-                df_sc_sorted.loc[sc_i, "inv_rsc"] += inv_left
-                df_sc_sorted.loc[sc_i, "cap_left"] -= inv_left
+                site_idx = df_sc_sorted.index.get_loc(last_site)
+                inv_rsc[site_idx] += inv_left
+                cap_left[site_idx] -= inv_left
                 inv_left = 0
 
             # checks on investment
-            check = df_sc_rcb_list.intersection(
-                df_sc_sorted[df_sc_sorted["cap_left"] < 0].index
-            )
-            if len(check):
+            overbuilt = sites[cap_left[sites] < 0]
+            if len(overbuilt):
                 print(
-                    f"ERROR at rcby={rcby}: capacity at {len(check)} supply curve "
+                    f"ERROR at rcby={rcby}: capacity at {len(overbuilt)} supply curve "
                     "points excceeds available capacity; "
-                    f"max excess is {min(df_sc_sorted.loc[check,'cap_left']):2f} MW"
+                    f"max excess is {min(cap_left[overbuilt]):2f} MW"
                 )
+        set_accounting_column(df_sc_sorted, "cap_left", cap_left)
+        set_accounting_column(df_sc_sorted, "inv_rsc", inv_rsc)
         df_sc_sorted["cap"] = df_sc_sorted["cap_expand"] - df_sc_sorted["cap_left"]
-        df_sc_out = pd.concat([df_sc_out, df_sc_sorted], sort=False)
+        df_sc_out.append(df_sc_sorted.copy())
+
+    df_sc_out = pd.concat(df_sc_out, sort=False)
 
     if df_cap_chk is not None:
         final_year = years[-1]
@@ -2064,7 +2094,7 @@ def get_supply_curve_info(
     return filtered_sc_info_df
 
 
-def check_tech(run_folder, tech):
+def check_tech(run_folder, tech, reeds_outputs=None):
     """
     Check that the selcted technology is present in the ReEDS outputs.
 
@@ -2075,21 +2105,158 @@ def check_tech(run_folder, tech):
         following file: outputs/cap.csv.
     tech : str
         Technology. Expected values are defined in VALID_TECHS.
+    reeds_outputs : dict, optional
+        Preloaded ReEDS outputs from load_reeds_outputs(). If None (default), the
+        outputs are read from ``run_folder``.
 
     Returns
     -------
     bool
         Returns True if the technology is present in the ReEDS outputs, False if not.
     """
-    cap_chk = os.path.join(run_folder, "outputs", "cap.csv")
-    df_cap = pd.read_csv(
-        cap_chk, low_memory=False, names=["tech", "region", "year", "MW"], header=0
-    )
+    df_cap = read_reeds_output(run_folder, "cap", reeds_outputs)
     tech_included = df_cap["tech"].str.startswith(tech).any()
 
     return tech_included
 
 
+def run_tech(
+    run_folder,
+    tech,
+    sc_file,
+    priority,
+    out_dir_path,
+    method="priority",
+    reduced_only=False,
+    constrain_to_bins=True,
+    reeds_outputs=None,
+):
+    """
+    Runs ReEDS to reV disaggregation for a single technology: prepares the data,
+    disaggregates the built capacity, and formats and saves the outputs.
+
+    Parameters
+    ----------
+    run_folder : str
+        Path to the folder containing the ReEDS run of interest. See run() for required
+        files.
+    tech : str
+        Technology. Expected values are defined in VALID_TECHS.
+    sc_file : str
+        Path to supply curve file used by this ReEDS model run.
+    priority : dictionary
+        Dictionary specifying which columns will be used to prioritize sites for
+        disaggregation, as in disaggregate_reeds_to_rev().
+    out_dir_path : pathlib.Path
+        Path to the output directory where the CSVs will be saved.
+    method : str, optional
+        "priority" (default) to fill each region/class/bin in priority order or
+        "simultaneous" to fill all sites in each region/class/bin simultaneously.
+    reduced_only : bool, optional
+        If True, save a simpler/reduced format of outputs. By default False.
+    constrain_to_bins : bool, optional
+        Passed to the disaggregation function. By default True.
+    reeds_outputs : dict, optional
+        Preloaded ReEDS outputs from load_reeds_outputs(). By default None.
+
+    Returns
+    -------
+    float
+        Elapsed time in seconds.
+    """
+    tic = datetime.datetime.now()
+    priority_cols = list(priority.keys())
+
+    print(f"Preparing required data to disaggregate built capacity for {tech}.")
+    reeds_to_rev_data = prepare_data(
+        run_folder,
+        sc_file,
+        tech,
+        priority_cols=priority_cols,
+        reeds_outputs=reeds_outputs,
+    )
+
+    # Save a copy of the input supply curve to the output directory
+    reeds_to_rev_data["df_sc_in"].to_csv(
+        out_dir_path.joinpath(f"df_sc_in_{tech}.csv"), index=False
+    )
+
+    print(f"Disaggregating built capacity to reV sites for {tech}")
+
+    if method == "simultaneous":
+        print(f"Filling each region/class/bin simultaneously for {tech}")
+        disagg_df = simultaneous_fill(
+            constrain_to_bins=constrain_to_bins, **reeds_to_rev_data
+        )
+    else:
+        print(f"Filling each region/class/bin in priority order for {tech} ")
+        disagg_df = disaggregate_reeds_to_rev(
+            priority=priority,
+            constrain_to_bins=constrain_to_bins,
+            tech=tech,
+            **reeds_to_rev_data,
+        )
+
+    print(f"Formatting and saving output data for {tech}")
+    df_sc_out = format_outputs(
+        disagg_df, priority_cols=priority_cols, reduced_only=reduced_only
+    )
+    save_outputs(df_sc_out, out_dir_path, tech, reduced_only)
+
+    return (datetime.datetime.now() - tic).total_seconds()
+
+
+def run_techs(tech_jobs, workers=1):
+    """
+    Runs run_tech() for each technology, either one after another or in a pool of
+    processes.
+
+    Parameters
+    ----------
+    tech_jobs : dict
+        Dictionary with technologies as keys and dictionaries of run_tech() keyword
+        arguments as values.
+    workers : int, optional
+        Maximum number of technologies to run at the same time. By default 1, which
+        runs the technologies one after another in the current process.
+
+    Yields
+    ------
+    tuple
+        (tech, elapsed time in seconds) for each technology as it finishes.
+
+    Raises
+    ------
+    Exception
+        Any exception raised for a technology is printed and raised again.
+    """
+    if (workers is None) or (workers <= 1) or (len(tech_jobs) <= 1):
+        for tech, kwargs in tech_jobs.items():
+            try:
+                yield tech, run_tech(**kwargs)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"***Error for {tech}...\n{traceback.format_exc()}")
+                raise e
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(workers, len(tech_jobs))
+    ) as executor:
+        futures = {
+            executor.submit(run_tech, **kwargs): tech
+            for tech, kwargs in tech_jobs.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            tech = futures[future]
+            try:
+                yield tech, future.result()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"***Error for {tech}...\n{traceback.format_exc()}")
+                for other_future in futures:
+                    other_future.cancel()
+                raise e
+
+
 def run(
     run_folder,
     method,
@@ -2099,13 +2266,14 @@ def run(
     bins=None,
     rev_case=None,
     sc_path=None,
+    workers=1,
     **kwargs,  # pylint: disable=unused-argument
 ):
     """
     Top-level function for running ReEDs to reV disaggregation. Includes the following
     functionalit steps:
-    1. Get information about the supply curves to be used.
-    2. Loop over each technology.
+    1. Get information about the supply curves to be used and load the ReEDS outputs.
+    2. Loop over each technology (in parallel if ``workers`` > 1).
     3. Format and prepare data from supply curve and reeds results for running
         disaggregation.
     4. Run the disaggregation.
@@ -2145,6 +2313,9 @@ def run(
         Optional path to supply curve files where the specified version resides. If not
         specified (i.e., None), the sc_path will in the supply curve metadata will
         be used. Will have no effect if specified but tech is None.
+    workers : int, optional
+        Number of technologies to disaggregate at the same time in separate processes.
+        By default 1, which runs the technologies one after another.
 
     Raises
     ------
@@ -2178,60 +2349,31 @@ def run(
     source_code_path = Path(__file__)
     shutil.copy(source_code_path, out_dir_path)
 
-    # iterate over technologies
-    for _, rev_row in sc_info_df.iterrows():
-        try:
-            sc_file = rev_row["sc_file"]
-            cost_col = rev_row["cost_col"]
-            tech = rev_row["tech"]
-
-            if not check_tech(run_folder, tech):
-                print(
-                    f"Technology {tech} is not present in ReEDS outputs. "
-                    "Skipping disaggregation."
-                )
-                continue
+    print("Loading ReEDS outputs")
+    reeds_outputs = load_reeds_outputs(run_folder)
 
+    tech_jobs = {}
+    for rev_row in sc_info_df.to_dict("records"):
+        if not check_tech(run_folder, rev_row["tech"], reeds_outputs):
             print(
-                "Preparing required data to disaggregate built capacity "
-                f"for {rev_row['tech']}."
-            )
-            reeds_to_rev_data = prepare_data(
-                run_folder, sc_file, tech, priority_cols=[cost_col]
-            )
-
-            # Save a copy of the input supply curve to the output directory
-            reeds_to_rev_data["df_sc_in"].to_csv(
-                out_dir_path.joinpath(f"df_sc_in_{tech}.csv"), index=False
+                f"Technology {rev_row['tech']} is not present in ReEDS outputs. "
+                "Skipping disaggregation."
             )
+            continue
+        tech_jobs[rev_row["tech"]] = {
+            "run_folder": run_folder,
+            "tech": rev_row["tech"],
+            "sc_file": rev_row["sc_file"],
+            "priority": {rev_row["cost_col"]: "ascending"},
+            "out_dir_path": out_dir_path,
+            "method": method,
+            "reduced_only": reduced_only,
+            "reeds_outputs": reeds_outputs,
+        }
 
-            print(f"Disaggregating built capacity to reV sites for {rev_row['tech']}")
-
-            if method == "simultaneous":
-                print(
-                    f"Filling each region/class/bin simultaneously for {rev_row['tech']}"
-                )
-                disagg_df = simultaneous_fill(**reeds_to_rev_data)
-            else:
-                print(
-                    "Filling each region/class/bin in priority order for "
-                    f"{rev_row['tech']} "
-                )
-                disagg_df = disaggregate_reeds_to_rev(
-                    priority={cost_col: "ascending"},
-                    tech=tech,
-                    **reeds_to_rev_data,
-                )
-
-            print(f"Formatting and saving output data for {tech}")
-            df_sc_out = format_outputs(
-                disagg_df, priority_cols=[cost_col], reduced_only=reduced_only
-            )
-            save_outputs(df_sc_out, out_dir_path, tech, reduced_only)
-
-        except Exception as e:  # pylint: disable=broad-exception-caught
-            print(f"***Error for {rev_row.tech}...\n{traceback.format_exc()}")
-            raise e
+    # iterate over technologies
+    for done_tech, elapsed in run_techs(tech_jobs, workers=workers):
+        print(f"Finished reeds_to_rev for {done_tech} in {elapsed:.1f} seconds")
 
     print("Completed reeds_to_rev!")
 
@@ -2317,6 +2459,13 @@ def build_parser():
         + " resides. Does not need to be specified if the path is the same"
         + " as the current default.",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of technologies to disaggregate in parallel (default 1)",
+    )
 
     return parser
 
@@ -2333,9 +2482,7 @@ def main():
     site.addsitedir(args.reeds_path)
     from reeds.log import makelog
 
-    makelog(
-        scriptname=__file__, logpath=os.path.join(args.run_folder, args.logname)
-    )
+    makelog(scriptname=__file__, logpath=os.path.join(args.run_folder, args.logname))
 
     run(**args.__dict__)
 
@@ -280,7 +280,15 @@ def main(ctx=None, verbose=False):
     required=True,
     type=click.Path(exists=False, file_okay=False, dir_okay=True, path_type=Path),
 )
-def from_config(json_path, out_path):
+@click.option(
+    "-w",
+    "--workers",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of technologies to disaggregate in parallel.",
+)
+def from_config(json_path, out_path, workers=1):
     """
     Disaggregates ReEDS capacity to reV sites using input parameters provided
     via a JSON configuration file. Provides a greater range of options for
@@ -295,6 +303,9 @@ def from_config(json_path, out_path):
         If this does exist and it contains outputs from previous execution of this
         command, the existing files will be overwritten.
 
+    Use --workers to disaggregate multiple technologies at the same time in separate
+    processes; the time taken for each technology is written to the log.
+
     \b
     Expected format of input JSON file from JSON_PATH looks like:
     ``
@@ -357,49 +368,37 @@ def from_config(json_path, out_path):
     for source_code_path in source_code_paths:
         shutil.copy(source_code_path, out_path)
 
+    logger.info("Loading ReEDS outputs")
+    reeds_outputs = reeds_to_rev.load_reeds_outputs(config["run_folder"])
+
+    tech_jobs = {}
     for tech, sc_file in config["tech_supply_curves"].items():
-        if not reeds_to_rev.check_tech(config["run_folder"], tech):
+        if not reeds_to_rev.check_tech(config["run_folder"], tech, reeds_outputs):
             logger.warning(
                 f"Warning: Technology {tech} is not present in ReEDS outputs. "
                 "Skipping disaggregation."
             )
             continue
 
-        logger.info(
-            f"Preparing required data to disaggregate built capacity for {tech}."
-        )
         if not Path(sc_file).exists():
             raise FileNotFoundError(
                 f"Could not find supply curve {sc_file} for {tech}."
             )
         cost_col = reeds_to_rev.get_cost_col(tech, sc_file)
-        priority = get_priority_from_config(config, cost_col)
-        priority_cols = list(priority.keys())
-
-        reeds_to_rev_data = reeds_to_rev.prepare_data(
-            config["run_folder"],
-            sc_file,
-            tech,
-            priority_cols=priority_cols,
-        )
-        # Save a copy of the input supply curve to the output directory
-        reeds_to_rev_data["df_sc_in"].to_csv(
-            out_path.joinpath(f"df_sc_in_{tech}.csv"), index=False
-        )
-
-        logger.info(f"Disaggregating built capacity to reV sites for {tech}")
-        disagg_df = reeds_to_rev.disaggregate_reeds_to_rev(
-            priority=priority,
-            constrain_to_bins=config["constrain_to_bins"],
-            tech=tech,
-            **reeds_to_rev_data,
-        )
+        tech_jobs[tech] = {
+            "run_folder": config["run_folder"],
+            "tech": tech,
+            "sc_file": sc_file,
+            "priority": get_priority_from_config(config, cost_col),
+            "out_dir_path": out_path,
+            "reduced_only": config["reduced_only"],
+            "constrain_to_bins": config["constrain_to_bins"],
+            "reeds_outputs": reeds_outputs,
+        }
 
-        logger.info(f"Formatting and saving output data for {tech}")
-        df_sc_out = reeds_to_rev.format_outputs(
-            disagg_df, priority_cols, reduced_only=config["reduced_only"]
-        )
-        reeds_to_rev.save_outputs(df_sc_out, out_path, tech, config["reduced_only"])
+    logger.info(f"Disaggregating built capacity to reV sites for {list(tech_jobs)}")
+    for tech, elapsed in reeds_to_rev.run_techs(tech_jobs, workers=workers):
+        logger.info(f"Finished {tech} in {elapsed:.1f} seconds")
 
     logger.info("Completed reeds_to_rev!")
 
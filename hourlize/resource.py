@@ -7,6 +7,7 @@ Typically called from "run_hourlize.py" -- see README for setup and details.
 ### --- IMPORTS ---
 ### ===========================================================================
 import argparse
+import concurrent.futures
 import datetime
 import h5py
 import json
@@ -15,6 +16,8 @@ import numpy as np
 import os
 import pandas as pd
 import pytz
+import scipy.sparse
+import scipy.spatial
 import shutil
 import site
 from collections import OrderedDict
@@ -308,6 +311,115 @@ def add_ilr(tech, df, reeds_path, casename):
     return df
 
 
+def assign_existing_sites(df_cp, df_exist, profile_id_col, k_start=16):
+    """Greedily assign existing plants to the nearest supply curve sites in the same state
+
+    Plants are processed in the order of df_exist (largest first) and fill the closest
+    available sites until their capacity is met; sites that receive existing capacity are
+    removed from consideration for subsequent plants. Candidate sites are found with a
+    KD-tree on the same scaled coordinates used for the distance (~69 miles per degree
+    latitude, ~53 miles per degree longitude), querying more neighbors as needed.
+
+    Parameters
+    ----------
+    df_cp
+        supply curve sites with columns [profile_id_col, 'STATE', 'latitude',
+        'longitude', 'capacity']
+    df_exist
+        existing plants with columns ['STATE', 'LAT', 'LONG', 'cap', 'UID',
+        'Commercial.Online.Year', 'RetireYear']
+    profile_id_col
+        column name of the supply curve site ID
+    k_start
+        number of neighbors to query first for each plant
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per site with existing capacity, with columns [profile_id_col,
+        'existing_capacity', 'existing_uid', 'online_year', 'retire_year', 'exist_mi_diff']
+    """
+    outcols = [
+        profile_id_col, 'existing_capacity', 'existing_uid', 'online_year', 'retire_year',
+        'exist_mi_diff',
+    ]
+    out = {col: [] for col in outcols}
+
+    #Restrict matching to within the same state
+    print("{:<18} {:>} MW".format("Total", round(df_exist.cap.sum())))
+    print("{:<18} {:>}".format("-------", "-------"))
+    for st in df_exist['STATE'].unique():
+        df_exist_st = df_exist[df_exist['STATE'] == st]
+        print("{:<18} {:>} MW".format(st, round(df_exist_st.cap.sum())))
+        df_cp_st = df_cp[df_cp['STATE'] == st]
+        site_ids = df_cp_st[profile_id_col].values
+        lat = df_cp_st['latitude'].values.astype(float)
+        lon = df_cp_st['longitude'].values.astype(float)
+        cap = df_cp_st['capacity'].values.astype(float)
+        available = np.ones(len(df_cp_st), dtype=bool)
+        #Assume each lat is ~69 miles and each long is ~53 miles
+        # TODO FIXME: If this calculation matters, use meters from equal-area projection
+        # (fixed lat/lon-to-miles is inaccurate over areas as large as the USA)
+        tree = scipy.spatial.cKDTree(np.column_stack([lat * 69, lon * 53])) if len(lat) else None
+
+        for plant_lat, plant_lon, plant_cap, uid, online_year, retire_year in zip(
+            df_exist_st['LAT'].values, df_exist_st['LONG'].values, df_exist_st['cap'].values,
+            df_exist_st['UID'].values, df_exist_st['Commercial.Online.Year'].values,
+            df_exist_st['RetireYear'].values,
+        ):
+            #Current way to deal with lats and longs that don't exist
+            if plant_lon == 0:
+                continue
+            k = k_start
+            while True:
+                ## Get the candidate sites, sorted by distance (ties broken by supply curve order)
+                if (k >= len(lat)) or (not np.isfinite(plant_lat * plant_lon)):
+                    candidates = np.flatnonzero(available)
+                    bound = np.inf
+                else:
+                    dist, idx = tree.query([plant_lat * 69, plant_lon * 53], k=k)
+                    candidates = idx[available[idx]]
+                    ## Unqueried sites are at least this far away (with some margin for roundoff)
+                    bound = dist[-1]**2 * (1 - 1e-9)
+                mi_sq = ((lat[candidates] - plant_lat)*69)**2 + ((lon[candidates] - plant_lon)*53)**2
+                order = np.lexsort((candidates, mi_sq))
+                candidates = candidates[order]
+                mi_sq = mi_sq[order]
+                #Step through the available sites and fill up the closest ones until we are
+                #done with this existing capacity
+                exist_cap_remain = plant_cap
+                fill = np.zeros(len(candidates))
+                done = False
+                for j, i_avail in enumerate(candidates):
+                    if exist_cap_remain <= cap[i_avail]:
+                        fill[j] = exist_cap_remain
+                        exist_cap_remain = 0
+                        done = True
+                        break
+                    else:
+                        fill[j] = cap[i_avail]
+                        exist_cap_remain = exist_cap_remain - cap[i_avail]
+                ## Stop if the filled sites are guaranteed to be the closest available ones
+                if np.isinf(bound) or (done and (mi_sq[j] < bound)):
+                    break
+                k *= 2
+            if exist_cap_remain > 0:
+                print('WARNING: Existing site shortfall: ' + str(exist_cap_remain))
+            #Build output and take the available sites with existing capacity out of
+            #consideration for the next exisiting site
+            filled = fill > 0
+            available[candidates[filled]] = False
+            out[profile_id_col].extend(site_ids[candidates[filled]])
+            out['existing_capacity'].extend(fill[filled])
+            out['existing_uid'].extend([uid] * filled.sum())
+            out['online_year'].extend([online_year] * filled.sum())
+            out['retire_year'].extend([retire_year] * filled.sum())
+            out['exist_mi_diff'].extend(mi_sq[filled]**0.5)
+
+    df_cp_out = pd.DataFrame(out, columns=outcols)
+    return df_cp_out
+
+
 def get_supply_curve_and_preprocess(tech, original_sc_file, reeds_path, hourlize_path, outpath,
                                     reg_out_col, reg_map_file, min_cap, capacity_col,
                                     existing_sites, state_abbrev, start_year, casename,
@@ -427,55 +539,7 @@ def get_supply_curve_and_preprocess(tech, original_sc_file, reeds_path, hourlize
         dict_st = dict(zip(df_st['ST'], df_st['State']))
         df_exist['STATE'] = df_exist['STATE'].map(dict_st)
         df_cp = df_cp[[profile_id_col, 'STATE','latitude','longitude','capacity']].copy()
-        df_cp['existing_capacity'] = 0.0
-        df_cp['existing_uid'] = 0
-        df_cp['online_year'] = 0
-        df_cp['retire_year'] = 0
-        df_cp_out = pd.DataFrame()
-
-        #Restrict matching to within the same state
-        print("{:<18} {:>} MW".format("Total", round(df_exist.cap.sum())))
-        print("{:<18} {:>}".format("-------", "-------"))
-        for st in df_exist['STATE'].unique():
-            df_exist_st = df_exist[df_exist['STATE'] == st].copy()
-            print("{:<18} {:>} MW".format(st, round(df_exist_st.cap.sum())))
-            df_cp_st = df_cp[df_cp['STATE'] == st].copy()
-            for i_exist, r_exist in df_exist_st.iterrows():
-                #Current way to deal with lats and longs that don't exist
-                if r_exist['LONG'] == 0:
-                    continue
-                #Assume each lat is ~69 miles and each long is ~53 miles
-                # TODO FIXME: If this calculation matters, use meters from equal-area projection
-                # (fixed lat/lon-to-miles is inaccurate over areas as large as the USA)
-                df_cp_st['mi_sq'] =  ((df_cp_st['latitude'] - r_exist['LAT'])*69)**2 + ((df_cp_st['longitude'] - r_exist['LONG'])*53)**2
-                #Sort by closest
-                df_cp_st.sort_values(['mi_sq'], inplace=True)
-                #Step through the available sites and fill up the closest ones until we are done with this existing capacity
-                exist_cap_remain = r_exist['cap']
-                for i_avail, r_avail in df_cp_st.iterrows():
-                    avail_cap = df_cp_st.at[i_avail, 'capacity']
-                    # TODO: handle missing UIDs
-                    try:
-                        df_cp_st.at[i_avail, 'existing_uid'] = r_exist['UID']
-                    except Exception:
-                        df_cp_st.at[i_avail, 'existing_uid'] = 0
-                    df_cp_st.at[i_avail, 'online_year'] = r_exist['Commercial.Online.Year']
-                    df_cp_st.at[i_avail, 'retire_year'] = r_exist['RetireYear']
-                    if exist_cap_remain <= avail_cap:
-                        df_cp_st.at[i_avail, 'existing_capacity'] = exist_cap_remain
-                        exist_cap_remain = 0
-                        break
-                    else:
-                        df_cp_st.at[i_avail, 'existing_capacity'] = avail_cap
-                        exist_cap_remain = exist_cap_remain - avail_cap
-                if exist_cap_remain > 0:
-                    print('WARNING: Existing site shortfall: ' + str(exist_cap_remain))
-                #Build output and take the available sites with existing capacity out of consideration for the next exisiting site
-                df_cp_out_add = df_cp_st[df_cp_st['existing_capacity'] > 0].copy()
-                df_cp_out = pd.concat([df_cp_out, df_cp_out_add], sort=False).reset_index(drop=True)
-                df_cp_st = df_cp_st[df_cp_st['existing_capacity'] == 0].copy()
-        df_cp_out['exist_mi_diff'] = df_cp_out['mi_sq']**0.5
-        df_cp_out = df_cp_out[[profile_id_col, 'existing_capacity', 'existing_uid', 'online_year', 'retire_year', 'exist_mi_diff']].copy()
+        df_cp_out = assign_existing_sites(df_cp, df_exist, profile_id_col)
         df = pd.merge(left=df, right=df_cp_out, how='left', on=profile_id_col, sort=False)
         df[['existing_capacity','existing_uid','online_year','retire_year','exist_mi_diff']] = df[['existing_capacity','existing_uid','online_year','retire_year','exist_mi_diff']].fillna(0)
         df[['existing_uid','online_year','retire_year']] = df[['existing_uid','online_year','retire_year']].astype(int)
@@ -588,12 +652,75 @@ def add_cost(df_sc, tech):
 ### --- PROFILES ---
 ### ===========================================================================
 
+def read_profiles_weighted(
+        h5path, profile_dset, time_dset, profile_id_col, site_ids, weights,
+        num_regionclass, scale_factor=False, chunk_mb=1000):
+    """
+    Read the weighted sum of site profiles for each (region, class) from one reV .h5 file.
+    Only the columns for sites in site_ids are read, in chunks of at most chunk_mb,
+    and each chunk is aggregated with a single sparse matmul.
+
+    Args:
+        site_ids: profile_id_col values of the sites to read (a site can appear more than once)
+        weights: scipy.sparse matrix [len(site_ids) x num_regionclass] of site weights
+        scale_factor: If True, divide profiles by the 'scale_factor' attribute of profile_dset
+
+    Returns:
+        tuple: (np.array [hours x num_regionclass], time index)
+    """
+    with h5py.File(h5path, 'r') as h5:
+        dset = h5[profile_dset]
+        meta_ids = pd.Index(h5['meta'][profile_id_col])
+        df_index = pd.Series(h5[time_dset][:])
+        ## Check that meta and profile are the same dimensions
+        assert dset.shape[1] == len(meta_ids), (
+            f"Dimensions of profile ({dset.shape[1]}) do not match meta file dimensions "
+            f"({len(meta_ids)}) in {os.path.basename(h5path)}"
+        )
+        ## Get the profile columns for sites in the supply curve, in column order.
+        ## h5py can't select the same column twice, so sites that appear more than once
+        ## are read once and their weights are summed.
+        positions = meta_ids.get_indexer(site_ids)
+        keep = np.flatnonzero(positions >= 0)
+        positions, inverse = np.unique(positions[keep], return_inverse=True)
+        combine = scipy.sparse.csr_matrix(
+            (np.ones(len(keep)), (inverse, np.arange(len(keep)))),
+            shape=(len(positions), len(keep)),
+        )
+        weights = combine @ weights.tocsr()[keep]
+        if scale_factor:
+            weights = weights / dset.attrs['scale_factor']
+        ## Read the sites in chunks
+        numhours = dset.shape[0]
+        chunk_sites = max(int(chunk_mb * 1e6 / (numhours * 8)), 1)
+        dfout = np.zeros((numhours, num_regionclass))
+        for start in range(0, len(positions), chunk_sites):
+            cols = positions[start:start+chunk_sites]
+            ## Read a contiguous block if the sites are dense; otherwise select columns
+            if (cols[-1] - cols[0] + 1) <= 2 * len(cols):
+                data = dset[:, cols[0]:cols[-1]+1][:, cols - cols[0]]
+            else:
+                data = dset[:, cols]
+            data = data.astype(np.float64)
+            ## Drop sites with missing data
+            valid = ~np.isnan(data).any(axis=0)
+            w = weights[start:start+chunk_sites]
+            if not valid.all():
+                data = data[:, valid]
+                w = w[valid]
+            dfout += np.asarray(w.T.dot(data.T).T)
+    return dfout, pd.to_datetime(df_index.str.decode("utf-8"))
+
+
 # get resource profiles for aggregated supply curve, using a weighted average based on a user specified column
 def get_profiles_allyears_weightedave(
         df_sc, rev_path, rev_case, hourly_out_years, profile_dset,
-        profile_dir, profile_id_col, profile_weight_col, tech, upv_type_out, profile_file_format, single_profile):
+        profile_dir, profile_id_col, profile_weight_col, tech, upv_type_out, profile_file_format,
+        single_profile, workers=1, chunk_mb=1000):
     """
-    Get the weighted average profiles for all years rather than representative profiles
+    Get the weighted average profiles for all years rather than representative profiles.
+    Years are processed by {workers} processes, each of which reads at most {chunk_mb}
+    of profiles at a time (so peak memory is roughly workers * chunk_mb).
     """
     print('Getting multiyear profiles...')
     startTime = datetime.datetime.now()
@@ -623,62 +750,47 @@ def get_profiles_allyears_weightedave(
     dfweight_id['weight'] = (
         dfweight_id[profile_weight_col+'_index']
         / dfweight_id[profile_weight_col+'_regionclass'])
-    colweight = dfweight_id.set_index(profile_id_col).weight.copy()
-    ## get mappping of sites to region,class
-    id_to_regionclass = pd.Series(
-        index=dfweight_id[profile_id_col],
-        data=zip(dfweight_id.region, dfweight_id['class']),
+    ## reV only produces AC profiles so we always read in those. If we're running hourlize to produce
+    ## DC UPV outputs then we convert to 'DC' profiles here. Note that these do not actually represent
+    ## pre-inverter profiles, but rather are just AC output / DC capacity.
+    if tech == "upv" and upv_type_out.lower() == "dc":
+        ilr_by_site = df_sc.set_index(profile_id_col).ilr
+        dfweight_id['weight'] /= dfweight_id[profile_id_col].map(ilr_by_site).values
+    dfweight_id = dfweight_id.dropna(subset=['weight'])
+    ## Sparse matrix mapping sites to (region,class) in the order of df_rep
+    regionclass = pd.MultiIndex.from_arrays([df_rep.region, df_rep['class']], names=[None, None])
+    weights = scipy.sparse.csr_matrix(
+        (
+            dfweight_id.weight.values,
+            (
+                np.arange(len(dfweight_id)),
+                regionclass.get_indexer(pd.MultiIndex.from_frame(dfweight_id[['region','class']])),
+            ),
+        ),
+        shape=(len(dfweight_id), len(regionclass)),
     )
     ## Load hourly profile for each year
-    dfyears = []
-    for year in hourly_out_years:
+    def get_args(year):
         if single_profile: #only one profile file
-            h5path = os.path.join(
-                rev_path, profile_dir,
-                f'{rev_case}_bespoke.h5')
-            with h5py.File(h5path, 'r') as h5:
-                dfall = pd.DataFrame(h5[f'cf_profile-{year}'][:])
-                # adjust profiles by scaling factor
-                scale_factor = h5[f'cf_profile-{year}'].attrs['scale_factor']
-                dfall = dfall/scale_factor
-                # read meta and time index
-                df_meta = pd.DataFrame(h5['meta'][:])
-                df_index = pd.Series(h5[f'time_index-{year}'][:])
+            h5path = os.path.join(rev_path, profile_dir, f'{rev_case}_bespoke.h5')
+            return (
+                h5path, f'cf_profile-{year}', f'time_index-{year}', profile_id_col,
+                dfweight_id[profile_id_col].values, weights, len(regionclass), True, chunk_mb,
+            )
         else:
-            h5path = os.path.join(
-                rev_path, profile_dir, f'{profile_file_format}_{year}.h5')
-            with h5py.File(h5path, 'r') as h5:
-                dfall = pd.DataFrame(h5[profile_dset][:])
-                # read meta and time index
-                df_meta = pd.DataFrame(h5['meta'][:])
-                df_index = pd.Series(h5['time_index'][:])
+            h5path = os.path.join(rev_path, profile_dir, f'{profile_file_format}_{year}.h5')
+            return (
+                h5path, profile_dset, 'time_index', profile_id_col,
+                dfweight_id[profile_id_col].values, weights, len(regionclass), False, chunk_mb,
+            )
 
-        ## Check that meta and profile are the same dimensions
-        assert dfall.shape[1] == df_meta.shape[0], f"Dimensions of profile ({dfall.shape[1]}) do not match meta file dimensions ({df_meta.shape[0]}) in {profile_file_format}_{year}.h5"
-        ## Change hourly profile column names from simple index to associated id specified by profile_id_col (usually sc_point_gid)
-        dfall.columns = dfall.columns.map(df_meta[profile_id_col])
-        ## Add time index
-        df_index = pd.to_datetime(df_index.str.decode("utf-8"))
-        dfall = dfall.set_index(df_index)
-
-        ## reV only produces AC profiles so we always read in those. If we're running hourlize to produce
-        ## DC UPV outputs then we convert to 'DC' profiles here. Note that these do not actually represent
-        ## pre-inverter profiles, but rather are just AC output / DC capacity.
-        if tech == "upv" and upv_type_out.lower() == "dc":
-            ilr_by_site = df_sc.set_index(profile_id_col).ilr.copy()
-            dfall /= ilr_by_site
-
-        ### Multiply each column by its weight, then drop the unweighted columns
-        dfall *= colweight
-        dfall.dropna(axis=1, inplace=True)
-        ### Switch to (region,class) index
-        dfall.columns = dfall.columns.map(id_to_regionclass)
-        ### Sum by (region,class) to finish weighted average of site profiles
-        dfall = dfall.T.groupby(level=[0,1]).sum().T
-        ### Keep columns in the (region,class) order from df_rep
-        dfall = dfall[list(zip(df_rep.region, df_rep['class']))].copy()
-        dfyears.append(dfall)
-        print('Done with ' + str(year))
+    dfyears = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(read_profiles_weighted, *get_args(year)) for year in hourly_out_years]
+        for year, future in zip(hourly_out_years, futures):
+            data, index = future.result()
+            dfyears.append(pd.DataFrame(data, index=index, columns=regionclass))
+            print('Done with ' + str(year))
 
     ### Concatenate individual years, drop indices
     df_prof_out = pd.concat(dfyears, axis=0)
@@ -1070,7 +1182,8 @@ if __name__== '__main__':
         df_sc, cf.rev_path, cf.rev_case,
             cf.hourly_out_years, cf.profile_dset,
             cf.profile_dir, cf.profile_id_col,
-            cf.profile_weight_col, cf.tech, upv_type_out, cf.profile_file_format, cf.single_profile)
+            cf.profile_weight_col, cf.tech, upv_type_out, cf.profile_file_format, cf.single_profile,
+            workers=cf.profile_workers, chunk_mb=cf.profile_chunk_mb)
 
         ### Shift timezones
         df_prof_out = shift_timezones(
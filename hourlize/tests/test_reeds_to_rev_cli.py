@@ -237,7 +237,7 @@ def test_get_priority_from_config_cost_col():
 
 
 def from_config_integration_helper(
-    test_cli_runner, config_data, data_path, expected_outputs_data_path
+    test_cli_runner, config_data, data_path, expected_outputs_data_path, options=()
 ):
     """
     Helper function for subsequent integration tests of from-config command.
@@ -254,6 +254,8 @@ def from_config_integration_helper(
         Path to the folder containing the input data used for integration testing.
     expected_outputs_data_path : pathlib.Path
         Path to the folder containing the expected output data.
+    options : tuple, optional
+        Additional command line options for from-config.
     """
 
     with tempfile.TemporaryDirectory() as out_dir:
@@ -266,7 +268,7 @@ def from_config_integration_helper(
             f.write(config_contents)
 
         result = test_cli_runner.invoke(
-            main, ["from-config", temp_config.as_posix(), out_dir]
+            main, ["from-config", temp_config.as_posix(), out_dir, *options]
         )
         assert result.exit_code == 0, "Command encountered an error"
 
@@ -331,6 +333,27 @@ def test_from_config_standard_inputs(test_cli_runner, test_data_path, techs):
     )
 
 
+def test_from_config_workers(test_cli_runner, test_data_path):
+    """
+    Integration test for from_config() CLI command with multiple workers. Ensure that
+    disaggregating technologies in parallel produces the same outputs.
+    """
+    integration_data_path = test_data_path.joinpath("r2r_integration")
+    json_path = test_data_path.joinpath(
+        "r2r_from_config", "standard_inputs_wind_and_pv.json"
+    )
+    with open(json_path, "r") as f:
+        config_json_data = json.load(f)
+
+    from_config_integration_helper(
+        test_cli_runner,
+        config_json_data,
+        integration_data_path,
+        integration_data_path.joinpath("expected_results"),
+        options=("--workers", "2"),
+    )
+
+
 def test_from_config_no_bin_constraint_inputs(
     test_cli_runner,
     no_bin_config_json_data,
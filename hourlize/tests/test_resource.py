@@ -0,0 +1,298 @@
+"""
+Tests for resource
+"""
+import importlib.util
+import sys
+
+import h5py
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from pandas.testing import assert_frame_equal
+import pytest
+
+import path_fix as _  # noqa: F401
+
+## hourlize/resource.py shadows the standard-library resource module, so load it by path
+spec = importlib.util.spec_from_file_location(
+    "hourlize_resource", _.HOURLIZE_PATH.joinpath("resource.py")
+)
+resource = importlib.util.module_from_spec(spec)
+## Register it so functions sent to worker processes can be pickled
+sys.modules[spec.name] = resource
+spec.loader.exec_module(resource)
+
+
+def assign_existing_sites_loop(df_cp, df_exist, profile_id_col):
+    """
+    Original row-by-row assignment of existing plants to supply curve sites, kept as a
+    reference for resource.assign_existing_sites()
+    """
+    df_cp = df_cp.copy()
+    df_cp["existing_capacity"] = 0.0
+    df_cp["existing_uid"] = 0
+    df_cp["online_year"] = 0
+    df_cp["retire_year"] = 0
+    df_cp_out = pd.DataFrame()
+    for state in df_exist["STATE"].unique():
+        df_exist_st = df_exist[df_exist["STATE"] == state].copy()
+        df_cp_st = df_cp[df_cp["STATE"] == state].copy()
+        for _, r_exist in df_exist_st.iterrows():
+            if r_exist["LONG"] == 0:
+                continue
+            df_cp_st["mi_sq"] = ((df_cp_st["latitude"] - r_exist["LAT"]) * 69) ** 2 + (
+                (df_cp_st["longitude"] - r_exist["LONG"]) * 53
+            ) ** 2
+            df_cp_st.sort_values(["mi_sq"], inplace=True)
+            exist_cap_remain = r_exist["cap"]
+            for i_avail in df_cp_st.index:
+                avail_cap = df_cp_st.at[i_avail, "capacity"]
+                df_cp_st.at[i_avail, "existing_uid"] = r_exist["UID"]
+                df_cp_st.at[i_avail, "online_year"] = r_exist["Commercial.Online.Year"]
+                df_cp_st.at[i_avail, "retire_year"] = r_exist["RetireYear"]
+                if exist_cap_remain <= avail_cap:
+                    df_cp_st.at[i_avail, "existing_capacity"] = exist_cap_remain
+                    exist_cap_remain = 0
+                    break
+                else:
+                    df_cp_st.at[i_avail, "existing_capacity"] = avail_cap
+                    exist_cap_remain = exist_cap_remain - avail_cap
+            df_cp_out_add = df_cp_st[df_cp_st["existing_capacity"] > 0].copy()
+            df_cp_out = pd.concat([df_cp_out, df_cp_out_add], sort=False).reset_index(
+                drop=True
+            )
+            df_cp_st = df_cp_st[df_cp_st["existing_capacity"] == 0].copy()
+    df_cp_out["exist_mi_diff"] = df_cp_out["mi_sq"] ** 0.5
+    return df_cp_out[
+        [
+            profile_id_col,
+            "existing_capacity",
+            "existing_uid",
+            "online_year",
+            "retire_year",
+            "exist_mi_diff",
+        ]
+    ]
+
+
+def make_sites(seed, num_sites=600, num_plants=150):
+    """Random supply curve sites and existing plants spread over a few states"""
+    rng = np.random.default_rng(seed)
+    states = ["Colorado", "Kansas", "Wyoming"]
+    df_cp = pd.DataFrame(
+        {
+            "sc_point_gid": np.arange(num_sites) * 3 + 7,
+            "STATE": rng.choice(states, num_sites),
+            "latitude": rng.uniform(37, 41, num_sites),
+            "longitude": rng.uniform(-109, -102, num_sites),
+            "capacity": rng.uniform(0, 200, num_sites).round(3),
+        }
+    )
+    ## Some sites have no capacity
+    df_cp.loc[rng.choice(num_sites, 20, replace=False), "capacity"] = 0.0
+    df_exist = pd.DataFrame(
+        {
+            "STATE": rng.choice(states + ["Nebraska"], num_plants),
+            "LAT": rng.uniform(37, 41, num_plants),
+            "LONG": rng.uniform(-109, -102, num_plants),
+            ## A few large plants fill many sites
+            "cap": np.where(
+                rng.uniform(size=num_plants) < 0.05,
+                rng.uniform(500, 3000, num_plants),
+                rng.uniform(1, 300, num_plants),
+            ).round(2),
+            "UID": rng.choice(100000, num_plants, replace=False),
+            "Commercial.Online.Year": rng.integers(1990, 2024, num_plants),
+            "RetireYear": rng.integers(2030, 2070, num_plants),
+        }
+    )
+    ## Plants without coordinates are skipped
+    df_exist.loc[:2, "LONG"] = 0
+    df_exist.sort_values("cap", ascending=False, inplace=True)
+    return df_cp, df_exist
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_assign_existing_sites(seed):
+    """
+    KD-tree assignment of existing plants gives the same result as the original loop,
+    including plants that exhaust the available sites in their state
+    """
+    df_cp, df_exist = make_sites(seed)
+    expected = assign_existing_sites_loop(df_cp, df_exist, "sc_point_gid")
+    result = resource.assign_existing_sites(df_cp, df_exist, "sc_point_gid", k_start=4)
+
+    assert result.sc_point_gid.is_unique
+    assert_frame_equal(
+        result.set_index("sc_point_gid").sort_index(),
+        expected.set_index("sc_point_gid").sort_index(),
+        check_dtype=False,
+    )
+
+
+def weighted_profiles_dense(h5path, profile_dset, time_dset, df_weights, scale_factor):
+    """
+    Original dense weighted average of site profiles, kept as a reference for
+    resource.read_profiles_weighted(): read all profiles, multiply each site by its
+    weight, drop sites with missing data or weights, and sum by (region, class)
+    """
+    with h5py.File(h5path, "r") as h5file:
+        dfall = pd.DataFrame(h5file[profile_dset][:])
+        if scale_factor:
+            dfall = dfall / h5file[profile_dset].attrs["scale_factor"]
+        df_meta = pd.DataFrame(h5file["meta"][:])
+        df_index = pd.Series(h5file[time_dset][:])
+    dfall.columns = dfall.columns.map(df_meta["sc_point_gid"])
+    dfall = dfall.set_index(pd.to_datetime(df_index.str.decode("utf-8")))
+    dfall *= df_weights.set_index("sc_point_gid").weight
+    dfall.dropna(axis=1, inplace=True)
+    dfall.columns = dfall.columns.map(df_weights.set_index("sc_point_gid").regionclass)
+    return dfall.T.groupby(level=0).sum().T
+
+
+def make_rev_h5(h5path, profile_dset, time_dset, num_sites=40, hours=48, seed=0):
+    """Small reV-style .h5 file with scaled integer profiles and a few missing values"""
+    rng = np.random.default_rng(seed)
+    meta = np.zeros(num_sites, dtype=[("sc_point_gid", "i8"), ("latitude", "f8")])
+    ## Sites are not stored in sc_point_gid order
+    meta["sc_point_gid"] = rng.permutation(num_sites) * 2 + 5
+    time_index = pd.date_range("2012-01-01", periods=hours, freq="H", tz="UTC")
+    profiles = rng.integers(0, 1000, (hours, num_sites)).astype(np.float32)
+    profiles[3, ::9] = np.nan
+    with h5py.File(h5path, "w") as h5file:
+        h5file.create_dataset("meta", data=meta)
+        h5file.create_dataset(time_dset, data=time_index.astype(str).values.astype("S"))
+        h5file.create_dataset(profile_dset, data=profiles)
+        h5file[profile_dset].attrs["scale_factor"] = 1000
+    return meta["sc_point_gid"]
+
+
+@pytest.mark.parametrize("scale_factor", [True, False])
+def test_read_profiles_weighted(tmp_path, scale_factor):
+    """
+    Chunked sparse weighted average of site profiles gives the same result as the
+    original dense calculation, including sites that are listed more than once
+    """
+    h5path = tmp_path / "upv_2012.h5"
+    site_ids = make_rev_h5(h5path, "cf_profile", "time_index")
+    rng = np.random.default_rng(1)
+    ## Some sites aren't in the supply curve and one isn't in the profile file
+    df_weights = pd.DataFrame(
+        {
+            "sc_point_gid": np.append(rng.choice(site_ids, 30, replace=False), 999),
+            "regionclass": rng.integers(0, 4, 31),
+            "weight": rng.uniform(0, 1, 31),
+        }
+    )
+    weights = scipy.sparse.csr_matrix(
+        (df_weights.weight, (np.arange(31), df_weights.regionclass)), shape=(31, 4)
+    )
+    expected = weighted_profiles_dense(
+        h5path, "cf_profile", "time_index", df_weights, scale_factor
+    )
+    ## 48 hours * 8 bytes * 3 sites per chunk
+    data, index = resource.read_profiles_weighted(
+        h5path,
+        "cf_profile",
+        "time_index",
+        "sc_point_gid",
+        df_weights.sc_point_gid.values,
+        weights,
+        4,
+        scale_factor=scale_factor,
+        chunk_mb=48 * 8 * 3 / 1e6,
+    )
+    assert (index == expected.index).all()
+    np.testing.assert_allclose(data, expected[range(4)].values, rtol=1e-6)
+
+
+def test_read_profiles_weighted_duplicates(tmp_path):
+    """
+    Splitting each site's weight over two rows gives the same result, including when
+    the duplicated sites are read by selecting columns from the .h5 file
+    """
+    h5path = tmp_path / "upv_2012.h5"
+    ## Every 8th column, so the chunks are too sparse to read as a contiguous block
+    site_ids = make_rev_h5(h5path, "cf_profile", "time_index")[::8]
+    df_weights = pd.DataFrame(
+        {
+            "sc_point_gid": site_ids,
+            "regionclass": [0, 1, 0, 1, 1],
+            "weight": [0.2, 0.5, 0.8, 0.25, 0.25],
+        }
+    )
+    expected = weighted_profiles_dense(
+        h5path, "cf_profile", "time_index", df_weights, True
+    )
+    weights = scipy.sparse.csr_matrix(
+        (df_weights.weight / 2, (np.arange(5), df_weights.regionclass)), shape=(5, 2)
+    )
+    data, _ = resource.read_profiles_weighted(
+        h5path,
+        "cf_profile",
+        "time_index",
+        "sc_point_gid",
+        np.concatenate([site_ids, site_ids]),
+        scipy.sparse.vstack([weights, weights]),
+        2,
+        scale_factor=True,
+        chunk_mb=48 * 8 * 3 / 1e6,
+    )
+    np.testing.assert_allclose(data, expected[range(2)].values, rtol=1e-6)
+
+
+def test_get_profiles_allyears_weightedave(tmp_path):
+    """
+    Sites with missing weights are dropped from the weighted average, and bespoke
+    profiles are divided by their scale factor
+    """
+    site_ids = make_rev_h5(
+        tmp_path / "wind_bespoke.h5", "cf_profile-2012", "time_index-2012"
+    )
+    rng = np.random.default_rng(2)
+    num_sites = 30
+    df_sc = pd.DataFrame(
+        {
+            "sc_point_gid": rng.choice(site_ids, num_sites, replace=False),
+            "region": rng.choice(["p1", "p2"], num_sites),
+            "class": rng.integers(1, 3, num_sites),
+            "capacity": rng.uniform(1, 100, num_sites),
+            "timezone": -6,
+        }
+    )
+    df_sc["capacity_ac"] = df_sc.capacity
+    df_sc.loc[[0, 5], "capacity_ac"] = np.nan
+    df_rep, df_prof = resource.get_profiles_allyears_weightedave(
+        df_sc,
+        str(tmp_path),
+        "wind",
+        [2012],
+        None,
+        ".",
+        "sc_point_gid",
+        "capacity_ac",
+        "wind-ons",
+        "ac",
+        None,
+        True,
+        chunk_mb=48 * 8 * 4 / 1e6,
+    )
+    ## Same as the dense calculation with the weights from the old implementation
+    dfweight = df_sc.assign(
+        weight=df_sc.capacity_ac
+        / df_sc.groupby(["region", "class"]).capacity_ac.transform("sum"),
+        ## Column of each site's (region, class) in df_rep
+        regionclass=pd.MultiIndex.from_frame(df_rep[["region", "class"]]).get_indexer(
+            pd.MultiIndex.from_frame(df_sc[["region", "class"]])
+        ),
+    )
+    expected = weighted_profiles_dense(
+        tmp_path / "wind_bespoke.h5",
+        "cf_profile-2012",
+        "time_index-2012",
+        dfweight,
+        True,
+    )
+    expected = expected[range(len(df_rep))]
+    np.testing.assert_allclose(df_prof.values, expected.values, rtol=1e-6)
+    assert (df_prof.index == expected.index).all()
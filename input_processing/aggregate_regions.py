@@ -25,6 +25,8 @@ import pandas as pd
 import gdxpds
 import shutil
 import sys
+import time
+import concurrent.futures
 import datetime
 from glob import glob
 from warnings import warn
@@ -244,11 +246,7 @@ def aggreg_methods(
             fracdata = disagg_data[aggfunc]
             fracdata = fracdata.loc[fracdata['PCA_REG'].isin(df1.columns)]
             fracdata.set_index('FIPS',inplace=True)
-            df1 = pd.concat(
-                {fips: row.fracdata * df1[row.PCA_REG]
-                    for fips, row in fracdata.iterrows()},
-                axis=1
-            ).astype(np.float32)
+            df1 = disaggregate_load_hourly(df1, fracdata)
 
         elif row.name =='dr_shed_hourly.h5' :
             # separate tech | region
@@ -441,34 +439,85 @@ def separate_wide_mixed_data(dfin,columns,fix_cols,agglevel_list):
         #Find columns with regions that are being solved at BA or aggreg resolution
         # Some inputs files have tech and regions combined as column header and
         # need to be filtered differently
+        agglevel_set = set(agglevel_list)
         keep_col = []
         for col in dfin.columns:
             new_col = col.split('|')
             for part in new_col:
-                if part in agglevel_list :
+                if part in agglevel_set:
                     keep_col.append(col)
 
         df_sep_in = dfin[fix_cols + keep_col]
 
     else:
-        col_list = fix_cols + agglevel_list
-        #Check if data exists for all BAs in agglevel list
-        #Loop through each ba in ba region list and add to region_list if it doesn't appear in input data
-        regions_list = []
-        for ba in  agglevel_list :
-            if ba not in dfin.columns :
-                regions_list.append(ba)
-        #If there is a ba for which there is no data, exclude this ba from the column list
-        if len(regions_list) >0 :
-            reduced_ba_regions = [x for x in agglevel_list if x not in regions_list]
-            df_sep_in = dfin[fix_cols +  reduced_ba_regions]
-        #If not, rewrite col_list to exclude BAs for which there is no data
-        else:
-            df_sep_in = dfin[col_list]
+        #Exclude regions for which there is no data
+        df_sep_in = dfin[fix_cols + get_present_regions(dfin, agglevel_list)]
 
     return df_sep_in
 
 
+def disaggregate_load_hourly(dfin, fracdata):
+    """
+    Disaggregate wide-format hourly load from BAs to counties
+
+    Args:
+        dfin (pd.DataFrame): Hourly load with one column per BA
+        fracdata (pd.DataFrame): Indexed by county with 'PCA_REG' (the county's BA)
+            and 'fracdata' (the county's fraction of its BA's load) columns
+
+    Returns:
+        pd.DataFrame: float32 hourly load with one column per county
+    """
+    return pd.DataFrame(
+        (
+            dfin.values[:, dfin.columns.get_indexer(fracdata.PCA_REG)]
+            * fracdata.fracdata.values
+        ).astype(np.float32),
+        index=dfin.index, columns=fracdata.index.values,
+    )
+
+
+def get_present_regions(dfin, regions):
+    """
+    Get the regions (in their original order) that appear as columns in dfin
+    """
+    return [r for r in regions if r in dfin.columns]
+
+
+def get_region_membership(agglevel_variables):
+    """
+    Get a table indexed by region (and transmission group) with boolean 'ba' and
+    'county' columns indicating the resolution at which each is solved in a
+    mixed-resolution run. Transmission groups can be in both.
+    """
+    ba = agglevel_variables['ba_regions'] + agglevel_variables['ba_transgrp']
+    county = agglevel_variables['county_regions'] + agglevel_variables['county_transgrp']
+    index = pd.Index(ba + county).unique()
+    return pd.DataFrame({'ba': index.isin(ba), 'county': index.isin(county)}, index=index)
+
+
+def filter_county_transmission(dfin, region_cols, region_membership):
+    """
+    Keep the county-county and county-BA interfaces in a mixed-resolution
+    transmission file (BA-BA interfaces are handled by the BA procedure)
+
+    Args:
+        dfin (pd.DataFrame): Transmission data with one row per interface
+        region_cols (list): Names of the two endpoint columns
+        region_membership (pd.DataFrame): Output of get_region_membership()
+    """
+    ends = [
+        region_membership.reindex(dfin[col].values, fill_value=False)
+        for col in region_cols
+    ]
+    keep = (
+        (ends[0].ba.values & ends[1].county.values)
+        | (ends[1].ba.values & ends[0].county.values)
+        | (ends[0].county.values & ends[1].county.values)
+    )
+    return dfin.loc[keep].drop_duplicates()
+
+
 def agg_disagg(filepath, r2aggreg_glob, r_ba_glob, runfiles_row):
     """
     filepath: input file to be aggregated/disaggregated/ignored
@@ -636,20 +685,9 @@ def agg_disagg(filepath, r2aggreg_glob, r_ba_glob, runfiles_row):
                     else:
                         df_agg_in = dfin[dfin[region_col].isin(agglevel_variables['ba_regions'])]
                 else:
-                    col_list = row.fix_cols + agglevel_variables['ba_regions']
-                    # Check if data exists for all BAs in agglevel_variables['ba_regions'] list
-                    # Loop through each ba in ba region list and add to region_list if it doesn't appear in input data
-                    regions_list = []
-                    for ba in  agglevel_variables['ba_regions'] :
-                        if ba not in dfin.columns :
-                            regions_list.append(ba)
-                    # If there is a ba for which there is no data, exclude this ba from the column list
-                    if len(regions_list) >1 :
-                        reduced_ba_regions = [x for x in agglevel_variables['ba_regions'] if x not in regions_list]
-                        df_agg_in = dfin[row.fix_cols +  reduced_ba_regions]
-                    #If not, rewrite col_list to exclude BAs for which there is no data
-                    else:
-                        df_agg_in = dfin[col_list]
+                    # Exclude BAs for which there is no data
+                    df_agg_in = dfin[
+                        row.fix_cols + get_present_regions(dfin, agglevel_variables['ba_regions'])]
 
                 df_agg = df_agg_in
 
@@ -696,19 +734,8 @@ def agg_disagg(filepath, r2aggreg_glob, r_ba_glob, runfiles_row):
                     # County transmission data will have county-ba interfaces created in copy_files
                     # To maintain these interfaces the filtering of the data needs to ensure that BA-BA interfaces
                     # are dropped but county-county and county-BA interfaces are kept
-                    df_disagg_list = []
-                    for idx, tx_row in dfin.iterrows():
-                        cond1 = ((tx_row[region_col[0]] in agglevel_variables['ba_regions']+agglevel_variables['ba_transgrp'])
-                                    and (tx_row[region_col[1]] in agglevel_variables['county_regions']+agglevel_variables['county_transgrp']))
-                        cond2 = ((tx_row[region_col[1]] in agglevel_variables['ba_regions']+ agglevel_variables['ba_transgrp'])
-                                    and (tx_row[region_col[0]] in agglevel_variables['county_regions']+agglevel_variables['county_transgrp']))
-                        cond3 = ((tx_row[region_col[0]] in agglevel_variables['county_regions']+agglevel_variables['county_transgrp'])
-                                    and (tx_row[region_col[1]] in agglevel_variables['county_regions']+agglevel_variables['county_transgrp']))
-
-                        if cond1 or cond2 or cond3:
-                            df_disagg_list.append(tx_row)
-
-                    df_disagg_in = pd.DataFrame(df_disagg_list).drop_duplicates()
+                    df_disagg_in = filter_county_transmission(
+                        dfin, region_col, region_membership)
 
                 elif filename == 'county2zone.csv':
                     df_disagg_in = dfin[dfin[region_col].isin(agglevel_variables['county_regions2ba'])]
@@ -742,18 +769,11 @@ def agg_disagg(filepath, r2aggreg_glob, r_ba_glob, runfiles_row):
                 else:
                     df_disagg_in = dfin[dfin[region_col].isin(agglevel_variables['county_regions2ba'])]
             else:
-                col_list = row.fix_cols + agglevel_variables['county_regions2ba']
-                # Check if data exists for all BAs in county_regions2ba list
-                regions_list = []
-                for ba in agglevel_variables['county_regions2ba']:
-                    if ba not in dfin.columns :
-                        regions_list.append(ba)
-                # If there is a ba for which there is no data, exclude this ba from the column list
-                if len(regions_list) >1 :
-                    reduced_ba_regions = [x for x in agglevel_variables['county_regions2ba'] if x not in regions_list]
-                    df_disagg_in = dfin[row.fix_cols + reduced_ba_regions]
-                else:
-                    df_disagg_in = dfin[col_list]
+                # Exclude BAs for which there is no data
+                df_disagg_in = dfin[
+                    row.fix_cols
+                    + get_present_regions(dfin, agglevel_variables['county_regions2ba'])
+                ]
 
             #Set aggfunc to disaggregation function
             aggfunc = aggfunc_disagg
@@ -892,23 +912,9 @@ def agg_disagg(filepath, r2aggreg_glob, r_ba_glob, runfiles_row):
 
 
 #%% ===========================================================================
-### --- PROCEDURE ---
+### --- SETTINGS ---
 ### ===========================================================================
 
-#%% Parse arguments
-parser = argparse.ArgumentParser(description='Extend inputs to arbitrary future year')
-parser.add_argument('reeds_path', help='path to ReEDS directory')
-parser.add_argument('inputs_case', help='path to inputs_case directory')
-
-args = parser.parse_args()
-reeds_path = args.reeds_path
-inputs_case = os.path.join(args.inputs_case)
-
-# #%%## Settings for testing
-# reeds_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-# inputs_case = os.path.join(
-#     reeds_path,'runs','v20250301_hydroM0_Pacific','inputs_case')
-
 #%% Settings for debugging
 ### Set debug == True to copy the original files to a new folder (inputs_case_original).
 ### If debug == False, the original files are overwritten.
@@ -927,316 +933,468 @@ anchortype = 'size'
 ### Types of cost data in files that use sc_cat
 sc_cost_types = ['cost', 'cost_cap', 'cost_trans']
 
-######################
-### DERIVED INPUTS ###
-### Get the case name (ReEDS-2.0/runs/{casename}/inputscase/)
-casename = inputs_case.split(os.sep)[-3]
-
-#%% Set up logger
-log = reeds.log.makelog(
-    scriptname=__file__,
-    logpath=os.path.join(inputs_case, '..', 'gamslog.txt'),
-)
-
-#%% Inputs from switches
-sw = pd.read_csv(
-    os.path.join(inputs_case, 'switches.csv'), header=None, index_col=0).squeeze(1)
-endyear = int(sw.endyear)
-GSw_CSP_Types = [int(i) for i in sw.GSw_CSP_Types.split('_')]
-
-scalars = pd.read_csv(
-        os.path.join(inputs_case, 'scalars.csv'),
-        header=None, usecols=[0,1], index_col=0).squeeze(1)
-
-# Use agglevel_variables function to obtain spatial resolution variables
-agglevel_variables = reeds.spatial.get_agglevel_variables(reeds_path, inputs_case)
-agglevel = agglevel_variables['agglevel']
-# Regions present in the current run
-val_r_all = sorted(
-    pd.read_csv(
-         os.path.join(inputs_case, 'val_r_all.csv'), header=None,
-    ).squeeze(1).tolist()
-)
-#%%
-#DEBUG: Copy the original inputs_case files
-if debug and (agglevel != 'ba'):
-    print('Copying original inputs_case file...')
-    import distutils.dir_util
-    os.makedirs(inputs_case+'_original', exist_ok=True)
-    distutils.dir_util.copy_tree(inputs_case, inputs_case+'_original', verbose=0)
-#%%
-### Mixed Resolution Procedure ###
-if agglevel_variables['lvl'] == 'mult' :
-    # Get the various region maps created in copy_files.py
-    #Need to store separate r_ba values for county and BA data
-    r_county = pd.read_csv(os.path.join(inputs_case,'r_county.csv'), index_col='county').squeeze()
-    r_ba = pd.read_csv(os.path.join(inputs_case,'r_ba.csv'))
-    r_ba_for_county = pd.read_csv(os.path.join(inputs_case,'r_ba.csv')).rename(columns={'r':'FIPS'})
-    r_ba_for_ba = pd.read_csv(os.path.join(inputs_case,'r_ba.csv')).set_index('ba').squeeze()
-
-    for val in agglevel_variables['agglevel'] :
-        if val == 'aggreg':
-            ### Get map from BA to aggreg
-            r_aggreg = pd.read_csv(os.path.join(inputs_case,'rb_aggreg.csv')).set_index('ba')['aggreg'].to_dict()
-
-
-### Single Resolution Procedure ###
-else:
-    # Get the various region maps created in copy_files.py
-    r_county = pd.read_csv(os.path.join(inputs_case,'r_county.csv'), index_col='county').squeeze()
-    r_ba = pd.read_csv(os.path.join(inputs_case,'r_ba.csv'))
-    # r_ba needs to be in different formats depending on whether you are aggregating
-    # or disaggregating
-    if agglevel in ['county']:
-        r_ba.rename(columns={'r':'FIPS'}, inplace=True)
-    elif agglevel in ['ba','aggreg']:
-        r_ba = r_ba.set_index('ba').squeeze()
-        ### Make all-regions-to-aggreg map
-        r2aggreg = pd.concat([r_county, r_ba])
-
-#####################################################
-### If using default 134 regions, exit the script ###
-
-if agglevel == 'ba':
-    print('all valid regions are BA, so skip aggregate_regions.py')
-    quit()
-else:
-    print('Starting aggregate_regions.py', flush=True)
-    ## Read in disaggregation data
-    disagg_data = {
-        'population': pd.read_csv(
-            os.path.join(inputs_case,'disagg_population.csv'),
-            header=0,
-            dtype={'fracdata':np.float32},
-        ),
-        'geosize': pd.read_csv(
-            os.path.join(inputs_case,'disagg_geosize.csv'),
-            header=0,
-        ),
-        'hydroexist': pd.read_csv(
-            os.path.join(inputs_case,'disagg_hydroexist.csv'),
-            header=0,
-        )
-    }
-
-#%%######################################################
-### Get the "anchor" zone for each aggregation region ###
+#%%################
+### CASE INPUTS ###
+### Read by agg_disagg() and aggreg_methods(); set from main() by init_worker()
+inputs_case = None
+sw = None
+agglevel = None
+agglevel_variables = None
+val_r_all = None
+inputfiles = None
+disagg_data = None
+r_county = None
+r_aggreg = None
+r_ba_for_county = None
+aggreg2anchorreg = None
+anchorreg2aggreg = None
+rscweight_nobin = None
+new_classes = None
+region_membership = None
+
+
+def init_worker(context):
+    """
+    Set the module-level case inputs used by agg_disagg() and aggreg_methods().
+    Called in the main process and as the initializer for each worker process.
+    """
+    global inputs_case, sw, agglevel, agglevel_variables, val_r_all, inputfiles
+    global disagg_data, r_county, r_aggreg, r_ba_for_county, aggreg2anchorreg
+    global anchorreg2aggreg, rscweight_nobin, new_classes, region_membership
+    inputs_case = context['inputs_case']
+    sw = context['sw']
+    agglevel = context['agglevel']
+    agglevel_variables = context['agglevel_variables']
+    val_r_all = context['val_r_all']
+    inputfiles = context['inputfiles']
+    disagg_data = context['disagg_data']
+    r_county = context['r_county']
+    r_aggreg = context['r_aggreg']
+    r_ba_for_county = context['r_ba_for_county']
+    aggreg2anchorreg = context['aggreg2anchorreg']
+    anchorreg2aggreg = context['anchorreg2aggreg']
+    rscweight_nobin = context['rscweight_nobin']
+    new_classes = context['new_classes']
+    region_membership = context['region_membership']
+
+
+def timed_agg_disagg(filepath, r2aggreg_glob, r_ba_glob, row):
+    """Run agg_disagg() for one file and return the elapsed time in seconds"""
+    filetic = time.perf_counter()
+    try:
+        agg_disagg(filepath, r2aggreg_glob, r_ba_glob, row)
+    except Exception as err:
+        print(f"Error processing {filepath}")
+        raise Exception(err)
+    return time.perf_counter() - filetic
 
-# For transmission we want to use the old endpoints to avoid requiring a new run of the
-# reV least-cost-paths procedure.
 
-if 'aggreg' in agglevel:
-    if agglevel_variables['lvl'] == 'mult':
-        r_ba = r_aggreg
-    if anchortype in ['load','demand','MW','MWh']:
-        ### Take the "anchor" zone as the zone with the largest annual demand in 2010.
-        ## Get annual average load
-        load = pd.read_csv(
-            os.path.join(reeds_path, 'inputs', 'variability', 'multi_year', 'load.csv.gz'),
-            index_col=0,
-        ).mean().rename_axis('r').rename('MW').to_frame()
-        ## Add column for new regions
-        load['aggreg'] = load.index.map(r_ba)
-        ## Take the original zone with largest demand
-        aggreg2anchorreg = load.groupby('aggreg').idxmax()['MW'].rename('rb')
-    elif anchortype in ['size','km2','area']:
-        ### Take the "anchor" zone as the zone with the largest area [km2]
-        dfba = reeds.io.get_zonemap(os.path.dirname(inputs_case))
-        dfba['km2'] = dfba.area / 1e6
-        ## Add column for new regions
-        dfba['aggreg'] = dfba.index.map(r_ba)
-        ## Take the original zone with largest area
-        aggreg2anchorreg = dfba.groupby('aggreg').km2.idxmax().rename('rb')
+def run_file_jobs(filepaths, runfiles, r2aggreg_glob, r_ba_glob, context, workers=1):
+    """
+    Aggregate or disaggregate each file in filepaths according to its row in runfiles.
+    The files are independent so they can be processed in separate processes; the
+    largest files are submitted first so a long job doesn't start last and hold up
+    the rest.
+
+    Args:
+        filepaths (list): Filenames relative to inputs_case
+        runfiles (pd.DataFrame): Processing directions from runfiles.csv
+        r2aggreg_glob, r_ba_glob: Region maps passed to agg_disagg()
+        context (dict): Module-level inputs passed to init_worker()
+        workers (int): Number of processes; 1 runs in this process, 0 uses all cores
+
+    Returns:
+        pd.Series: Seconds spent on each file, sorted from longest to shortest
+    """
+    init_worker(context)
+    inputs_case = context['inputs_case']
+    ## Largest files first
+    filepaths = sorted(
+        filepaths, key=lambda f: os.path.getsize(os.path.join(inputs_case, f)), reverse=True)
+    workers = min(os.cpu_count() if workers <= 0 else workers, len(filepaths))
+
+    durations = {}
+    if workers <= 1:
+        for filepath in filepaths:
+            durations[filepath] = timed_agg_disagg(
+                filepath, r2aggreg_glob, r_ba_glob, runfiles.loc[os.path.basename(filepath)])
     else:
-        raise ValueError(f'Invalid choice of anchortype: {anchortype}')
-    anchorreg2aggreg = pd.Series(index=aggreg2anchorreg.values, data=aggreg2anchorreg.index)
-    ## Save it for plotting
-    aggreg2anchorreg.to_csv(os.path.join(inputs_case, 'aggreg2anchorreg.csv'))
-
-    ### Get RSC VRE available capacity to use in capacity-weighted averages
-    ### We need the original un-aggregated supply curves, so run writesupplycurves again
-    # rscweight = pd.read_csv(os.path.join(inputs_case, 'rsc_combined.csv'))
-
-    # Read generator database and create rsc_wsc (for use in writesupplycurves function call below)
-    gendb = pd.read_csv(os.path.join(inputs_case,'unitdata.csv'))
-    import writecapdat
-    from writecapdat import create_rsc_wsc
-    # Set the 'r' column for the generator database
-    # Create the 'r_col' column
-    gendb = gendb.assign(r=gendb.reeds_ba.map(r_ba))
-    startyear = int(sw.startyear)
-    rsc_wsc = create_rsc_wsc(gendb, TECH=writecapdat.TECH, scalars=scalars,startyear=startyear)
-
-    import writesupplycurves
-    rscweight = writesupplycurves.main(
-        reeds_path, inputs_case, AggregateRegions=0, rsc_wsc_dat=rsc_wsc, write=False)
-    rscweight = (
-        rscweight.loc[(rscweight.sc_cat=='cap')]
-        .rename(columns={'*i':'i'})
-        .drop_duplicates(subset=['i','r','rscbin'])
-        [['i','r','rscbin','value']].rename(columns={'value':'MW'})
-    ).copy()
-
-    ### Get distpv capacity to use in capacity-weighted averages
-    distpvcap = pd.read_csv(
-        os.path.join(inputs_case, 'distpvcap.csv'), index_col=0
+        print(f'Processing {len(filepaths)} files with {workers} processes', flush=True)
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=(context,),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    timed_agg_disagg,
+                    filepath, r2aggreg_glob, r_ba_glob,
+                    runfiles.loc[os.path.basename(filepath)],
+                ): filepath
+                for filepath in filepaths
+            }
+            for future in concurrent.futures.as_completed(futures):
+                durations[futures[future]] = future.result()
+
+    return (
+        pd.Series(durations, name='seconds').rename_axis('filepath')
+        .sort_values(ascending=False)
     )
-    ## Keep a single year
-    distpvcap = distpvcap[
-        sw.GSw_HourlyClusterYear if sw.GSw_HourlyClusterYear in distpvcap
-        else str(int(sw.GSw_HourlyClusterYear) + 1)
-    ].rename_axis('r').rename('MW').copy()
-    ## Add it to rscweight_nobin
-    rscweight_nobin = rscweight.groupby(['i','r'], as_index=False).sum(numeric_only=True)
-    rscweight_nobin = pd.concat([rscweight_nobin, distpvcap.reset_index().assign(i='distpv')], axis=0)
-    ## Add PVB values in case we need them
-    pvbtechs = [f'pvb{i}' for i in sw.GSw_PVB_Types.split('_')]
-    tocopy = rscweight_nobin.loc[rscweight_nobin.i.str.startswith('upv')].copy()
-    rscweight_nobin = pd.concat(
-        [rscweight_nobin]
-        + [tocopy.assign(i=tocopy.i.str.replace('upv',pvbtech)) for pvbtech in pvbtechs]
-    )
-    ## Remove duplicate CSP values for different solar multiples
-    rscweight_nobin.i.replace(
-        {f'csp{i+1}_{c+1}': f'csp_{c+1}'
-         for i in GSw_CSP_Types
-         for c in range(int(sw.GSw_NumCSPclasses))},
-        inplace=True
-    )
-    rscweight_nobin.drop_duplicates(['i','r'], inplace=True)
-
-# rscweight_nobin required to be defined for aggreg_methods function call to work
-else:
-    rscweight_nobin=None
-
-#%% Get the mapping to reduced-resolution technology classes
-original_num_classes = {**{f'csp{i}':12 for i in range(1,5)}}
-new_classes = {}
-for tech in [f'csp{i}' for i in range(1,5)]:
-    GSw_NumClasses = int(sw['GSw_Num{}classes'.format(tech.upper().strip('1234'))])
-    ## Spread the new classes roughly evenly out over the old classes
-    num_in_step = original_num_classes[tech] // GSw_NumClasses
-    remainder = original_num_classes[tech] % GSw_NumClasses
-    new_classes[tech] = sorted(
-        list(np.ravel([[i]*num_in_step for i in range(1,GSw_NumClasses+1)]))
-        + list(range(1,remainder+1))
-    )
-    new_classes[tech] = dict(zip(
-        [f'{tech}_{i}' for i in range(1,original_num_classes[tech]+1)],
-        [f'{tech}_{i}' for i in new_classes[tech]]
-    ))
-### Combine all the new classes into one dictionary
-new_classes = {k:v for d in new_classes for k,v in new_classes[d].items()}
-
-#%% Get the settings file
-runfiles = (
-    pd.read_csv(
-        os.path.join(reeds_path, 'runfiles.csv'),
-        dtype={'fix_cols':str}, index_col='filename',
-        comment='#',
-    ).fillna({'fix_cols':''})
-    .rename(columns={'wide (1 if any parameters are in wide format)':'wide',
-                     'header (0 if file has column labels)':'header'})
+
+
+#%% ===========================================================================
+### --- MAIN FUNCTION ---
+### ===========================================================================
+def main(reeds_path, inputs_case, workers=None):
+    """
+    Aggregate or disaggregate the files in inputs_case to the spatial resolution of the
+    run. workers overrides the aggregate_regions_workers switch if provided.
+    """
+    ######################
+    ### DERIVED INPUTS ###
+    ## Only defined for some spatial resolutions
+    r_aggreg = r_ba_for_county = aggreg2anchorreg = anchorreg2aggreg = None
+
+    #%% Inputs from switches
+    sw = pd.read_csv(
+        os.path.join(inputs_case, 'switches.csv'), header=None, index_col=0).squeeze(1)
+    GSw_CSP_Types = [int(i) for i in sw.GSw_CSP_Types.split('_')]
+
+    scalars = pd.read_csv(
+            os.path.join(inputs_case, 'scalars.csv'),
+            header=None, usecols=[0,1], index_col=0).squeeze(1)
+
+    # Use agglevel_variables function to obtain spatial resolution variables
+    agglevel_variables = reeds.spatial.get_agglevel_variables(reeds_path, inputs_case)
+    agglevel = agglevel_variables['agglevel']
+    # Regions present in the current run
+    val_r_all = sorted(
+        pd.read_csv(
+             os.path.join(inputs_case, 'val_r_all.csv'), header=None,
+        ).squeeze(1).tolist()
     )
-#%% If any files are missing, stop and alert the user
-inputfiles = sorted([
-    f.split('inputs_case'+os.sep)[1]
-    for f in glob(os.path.join(inputs_case,'**'), recursive=True)
-    if 'metadata' not in f
-])
-## Drop the directories and backup h17 files
-inputfiles = [f for f in inputfiles if (('.' in f) and not f.endswith('_h17.csv'))]
-missingfiles = [f for f in inputfiles if (os.path.basename(f) not in runfiles.index.values)
-]
-if any(missingfiles):
-    if missing == 'raise':
-        raise Exception(
-            'Missing aggregation method for:\n{}\n'
-            '>>> Need to add entries for these files to runfiles.csv'
-            .format('\n'.join(missingfiles))
+    #%%
+    #DEBUG: Copy the original inputs_case files
+    if debug and (agglevel != 'ba'):
+        print('Copying original inputs_case file...')
+        import distutils.dir_util
+        os.makedirs(inputs_case+'_original', exist_ok=True)
+        distutils.dir_util.copy_tree(inputs_case, inputs_case+'_original', verbose=0)
+    #%%
+    ### Mixed Resolution Procedure ###
+    if agglevel_variables['lvl'] == 'mult' :
+        # Get the various region maps created in copy_files.py
+        #Need to store separate r_ba values for county and BA data
+        r_county = pd.read_csv(os.path.join(inputs_case,'r_county.csv'), index_col='county').squeeze()
+        r_ba = pd.read_csv(os.path.join(inputs_case,'r_ba.csv'))
+        r_ba_for_county = pd.read_csv(os.path.join(inputs_case,'r_ba.csv')).rename(columns={'r':'FIPS'})
+
+        for val in agglevel_variables['agglevel'] :
+            if val == 'aggreg':
+                ### Get map from BA to aggreg
+                r_aggreg = pd.read_csv(os.path.join(inputs_case,'rb_aggreg.csv')).set_index('ba')['aggreg'].to_dict()
+
+
+    ### Single Resolution Procedure ###
+    else:
+        # Get the various region maps created in copy_files.py
+        r_county = pd.read_csv(os.path.join(inputs_case,'r_county.csv'), index_col='county').squeeze()
+        r_ba = pd.read_csv(os.path.join(inputs_case,'r_ba.csv'))
+        # r_ba needs to be in different formats depending on whether you are aggregating
+        # or disaggregating
+        if agglevel in ['county']:
+            r_ba.rename(columns={'r':'FIPS'}, inplace=True)
+        elif agglevel in ['ba','aggreg']:
+            r_ba = r_ba.set_index('ba').squeeze()
+            ### Make all-regions-to-aggreg map
+            r2aggreg = pd.concat([r_county, r_ba])
+
+    #####################################################
+    ### If using default 134 regions, exit the script ###
+
+    if agglevel == 'ba':
+        print('all valid regions are BA, so skip aggregate_regions.py')
+        return
+    else:
+        print('Starting aggregate_regions.py', flush=True)
+        ## Read in disaggregation data
+        disagg_data = {
+            'population': pd.read_csv(
+                os.path.join(inputs_case,'disagg_population.csv'),
+                header=0,
+                dtype={'fracdata':np.float32},
+            ),
+            'geosize': pd.read_csv(
+                os.path.join(inputs_case,'disagg_geosize.csv'),
+                header=0,
+            ),
+            'hydroexist': pd.read_csv(
+                os.path.join(inputs_case,'disagg_hydroexist.csv'),
+                header=0,
+            )
+        }
+
+    #%%######################################################
+    ### Get the "anchor" zone for each aggregation region ###
+
+    # For transmission we want to use the old endpoints to avoid requiring a new run of the
+    # reV least-cost-paths procedure.
+
+    if 'aggreg' in agglevel:
+        if agglevel_variables['lvl'] == 'mult':
+            r_ba = r_aggreg
+        if anchortype in ['load','demand','MW','MWh']:
+            ### Take the "anchor" zone as the zone with the largest annual demand in 2010.
+            ## Get annual average load
+            load = pd.read_csv(
+                os.path.join(reeds_path, 'inputs', 'variability', 'multi_year', 'load.csv.gz'),
+                index_col=0,
+            ).mean().rename_axis('r').rename('MW').to_frame()
+            ## Add column for new regions
+            load['aggreg'] = load.index.map(r_ba)
+            ## Take the original zone with largest demand
+            aggreg2anchorreg = load.groupby('aggreg').idxmax()['MW'].rename('rb')
+        elif anchortype in ['size','km2','area']:
+            ### Take the "anchor" zone as the zone with the largest area [km2]
+            dfba = reeds.io.get_zonemap(os.path.dirname(inputs_case))
+            dfba['km2'] = dfba.area / 1e6
+            ## Add column for new regions
+            dfba['aggreg'] = dfba.index.map(r_ba)
+            ## Take the original zone with largest area
+            aggreg2anchorreg = dfba.groupby('aggreg').km2.idxmax().rename('rb')
+        else:
+            raise ValueError(f'Invalid choice of anchortype: {anchortype}')
+        anchorreg2aggreg = pd.Series(index=aggreg2anchorreg.values, data=aggreg2anchorreg.index)
+        ## Save it for plotting
+        aggreg2anchorreg.to_csv(os.path.join(inputs_case, 'aggreg2anchorreg.csv'))
+
+        ### Get RSC VRE available capacity to use in capacity-weighted averages
+        ### We need the original un-aggregated supply curves, so run writesupplycurves again
+        # rscweight = pd.read_csv(os.path.join(inputs_case, 'rsc_combined.csv'))
+
+        # Read generator database and create rsc_wsc (for use in writesupplycurves function call below)
+        gendb = pd.read_csv(os.path.join(inputs_case,'unitdata.csv'))
+        import writecapdat
+        from writecapdat import create_rsc_wsc
+        # Set the 'r' column for the generator database
+        # Create the 'r_col' column
+        gendb = gendb.assign(r=gendb.reeds_ba.map(r_ba))
+        startyear = int(sw.startyear)
+        rsc_wsc = create_rsc_wsc(gendb, TECH=writecapdat.TECH, scalars=scalars,startyear=startyear)
+
+        import writesupplycurves
+        rscweight = writesupplycurves.main(
+            reeds_path, inputs_case, AggregateRegions=0, rsc_wsc_dat=rsc_wsc, write=False)
+        rscweight = (
+            rscweight.loc[(rscweight.sc_cat=='cap')]
+            .rename(columns={'*i':'i'})
+            .drop_duplicates(subset=['i','r','rscbin'])
+            [['i','r','rscbin','value']].rename(columns={'value':'MW'})
+        ).copy()
+
+        ### Get distpv capacity to use in capacity-weighted averages
+        distpvcap = pd.read_csv(
+            os.path.join(inputs_case, 'distpvcap.csv'), index_col=0
+        )
+        ## Keep a single year
+        distpvcap = distpvcap[
+            sw.GSw_HourlyClusterYear if sw.GSw_HourlyClusterYear in distpvcap
+            else str(int(sw.GSw_HourlyClusterYear) + 1)
+        ].rename_axis('r').rename('MW').copy()
+        ## Add it to rscweight_nobin
+        rscweight_nobin = rscweight.groupby(['i','r'], as_index=False).sum(numeric_only=True)
+        rscweight_nobin = pd.concat([rscweight_nobin, distpvcap.reset_index().assign(i='distpv')], axis=0)
+        ## Add PVB values in case we need them
+        pvbtechs = [f'pvb{i}' for i in sw.GSw_PVB_Types.split('_')]
+        tocopy = rscweight_nobin.loc[rscweight_nobin.i.str.startswith('upv')].copy()
+        rscweight_nobin = pd.concat(
+            [rscweight_nobin]
+            + [tocopy.assign(i=tocopy.i.str.replace('upv',pvbtech)) for pvbtech in pvbtechs]
         )
+        ## Remove duplicate CSP values for different solar multiples
+        rscweight_nobin.i.replace(
+            {f'csp{i+1}_{c+1}': f'csp_{c+1}'
+             for i in GSw_CSP_Types
+             for c in range(int(sw.GSw_NumCSPclasses))},
+            inplace=True
+        )
+        rscweight_nobin.drop_duplicates(['i','r'], inplace=True)
+
+    # rscweight_nobin required to be defined for aggreg_methods function call to work
     else:
-        from warnings import warn
-        warn(
-            'Missing aggregation directions for:\n{}\n'
-            '>>> For this run, these files are copied without modification'
-            .format('\n'.join(missingfiles))
+        rscweight_nobin=None
+
+    #%% Get the mapping to reduced-resolution technology classes
+    original_num_classes = {**{f'csp{i}':12 for i in range(1,5)}}
+    new_classes = {}
+    for tech in [f'csp{i}' for i in range(1,5)]:
+        GSw_NumClasses = int(sw['GSw_Num{}classes'.format(tech.upper().strip('1234'))])
+        ## Spread the new classes roughly evenly out over the old classes
+        num_in_step = original_num_classes[tech] // GSw_NumClasses
+        remainder = original_num_classes[tech] % GSw_NumClasses
+        new_classes[tech] = sorted(
+            list(np.ravel([[i]*num_in_step for i in range(1,GSw_NumClasses+1)]))
+            + list(range(1,remainder+1))
+        )
+        new_classes[tech] = dict(zip(
+            [f'{tech}_{i}' for i in range(1,original_num_classes[tech]+1)],
+            [f'{tech}_{i}' for i in new_classes[tech]]
+        ))
+    ### Combine all the new classes into one dictionary
+    new_classes = {k:v for d in new_classes for k,v in new_classes[d].items()}
+
+    #%% Get the settings file
+    runfiles = (
+        pd.read_csv(
+            os.path.join(reeds_path, 'runfiles.csv'),
+            dtype={'fix_cols':str}, index_col='filename',
+            comment='#',
+        ).fillna({'fix_cols':''})
+        .rename(columns={'wide (1 if any parameters are in wide format)':'wide',
+                         'header (0 if file has column labels)':'header'})
         )
-        for f in missingfiles:
-            shutil.copy(os.path.join(inputs_case, f), os.path.join(inputs_case, f))
-            print(f'copied {f}, which is missing from runfiles.csv')
-
-#%% Maps (special case)
-mapsfile = os.path.join(inputs_case, 'maps.gpkg')
-if os.path.exists(mapsfile):
-    os.remove(mapsfile)
-dfmap = reeds.io.get_dfmap(os.path.dirname(inputs_case))
-for level in dfmap:
-    dfmap[level].rename_axis(level).to_file(mapsfile, layer=level)
-
-dfmap = reeds.io.get_dfmap(os.path.dirname(inputs_case))
-
-### Aggregate or disaggregate the 'r' map; none of the rest should change
-# Mixed resolution maps are patched together in the get_zonemap() function
-if agglevel_variables['lvl'] == 'mult' :
-    pass
-
-#Single resolution procedure
-else:
-    match agglevel:
-        case 'aggreg':
-            r2aggreg = pd.read_csv(
-                os.path.join(inputs_case, 'hierarchy_original.csv')
-            ).rename(columns={'ba':'r'}).set_index('r').aggreg
-        case 'county':
-            aggreg2anchorreg = r2aggreg = r_county.copy()
-
-
-    dfmap_r_agg = dfmap['r'].reset_index().rename(columns={'rb':'r', 'ba':'r'})
-    dfmap_r_agg.r = dfmap_r_agg.r.map(r2aggreg)
-    dfmap_r_agg = dfmap_r_agg.dissolve('r').loc[aggreg2anchorreg.index].copy()
-
-    ## Map endpoints to anchor regions
-    for j in ['x','y']:
-        dfmap_r_agg[j] = dfmap['r'][j].loc[dfmap_r_agg[j].index.map(aggreg2anchorreg)].values
-        dfmap_r_agg[f'centroid_{j}'] = dfmap_r_agg.centroid.x if j == 'x' else dfmap_r_agg.centroid.y
-
-    ## Overwrite the non-aggregated zone map
-    dfmap['r'] = dfmap_r_agg.drop(columns='county', errors='ignore')
-
-    ## Write the aggregated maps
+    #%% If any files are missing, stop and alert the user
+    inputfiles = sorted([
+        f.split('inputs_case'+os.sep)[1]
+        for f in glob(os.path.join(inputs_case,'**'), recursive=True)
+        if 'metadata' not in f
+    ])
+    ## Drop the directories and backup h17 files
+    inputfiles = [f for f in inputfiles if (('.' in f) and not f.endswith('_h17.csv'))]
+    missingfiles = [f for f in inputfiles if (os.path.basename(f) not in runfiles.index.values)
+    ]
+    if any(missingfiles):
+        if missing == 'raise':
+            raise Exception(
+                'Missing aggregation method for:\n{}\n'
+                '>>> Need to add entries for these files to runfiles.csv'
+                .format('\n'.join(missingfiles))
+            )
+        else:
+            from warnings import warn
+            warn(
+                'Missing aggregation directions for:\n{}\n'
+                '>>> For this run, these files are copied without modification'
+                .format('\n'.join(missingfiles))
+            )
+            for f in missingfiles:
+                shutil.copy(os.path.join(inputs_case, f), os.path.join(inputs_case, f))
+                print(f'copied {f}, which is missing from runfiles.csv')
+
+    #%% Maps (special case)
     mapsfile = os.path.join(inputs_case, 'maps.gpkg')
     if os.path.exists(mapsfile):
         os.remove(mapsfile)
+    dfmap = reeds.io.get_dfmap(os.path.dirname(inputs_case))
     for level in dfmap:
-        (
-            dfmap[level]
-            .drop(columns='aggreg', errors='ignore')
-            .rename_axis(level)
-            .to_file(mapsfile, layer=level)
-        )
+        dfmap[level].rename_axis(level).to_file(mapsfile, layer=level)
 
-#%%
-if agglevel_variables['lvl'] == 'mult' or agglevel == 'county':
-    r2aggreg_glob = None
-else:
-    r2aggreg_glob = r2aggreg
-r_ba_glob = r_ba
-
-# loop over inputfiles from runfiles and call aggregation/disaggregation function
-for filepath in inputfiles:
-    ### For debugging: Specify a file
-    # filepath = 'load_hourly.h5'
-    ### Get the appropriate row from runfiles
-    row = runfiles.loc[os.path.basename(filepath)]
-    try:
-        agg_disagg(filepath, r2aggreg_glob, r_ba_glob, row)
-    except Exception as err:
-        print(f"Error processing {filepath}")
-        raise Exception(err)
+    dfmap = reeds.io.get_dfmap(os.path.dirname(inputs_case))
+
+    ### Aggregate or disaggregate the 'r' map; none of the rest should change
+    # Mixed resolution maps are patched together in the get_zonemap() function
+    if agglevel_variables['lvl'] == 'mult' :
+        pass
+
+    #Single resolution procedure
+    else:
+        match agglevel:
+            case 'aggreg':
+                r2aggreg = pd.read_csv(
+                    os.path.join(inputs_case, 'hierarchy_original.csv')
+                ).rename(columns={'ba':'r'}).set_index('r').aggreg
+            case 'county':
+                aggreg2anchorreg = r2aggreg = r_county.copy()
+
+
+        dfmap_r_agg = dfmap['r'].reset_index().rename(columns={'rb':'r', 'ba':'r'})
+        dfmap_r_agg.r = dfmap_r_agg.r.map(r2aggreg)
+        dfmap_r_agg = dfmap_r_agg.dissolve('r').loc[aggreg2anchorreg.index].copy()
+
+        ## Map endpoints to anchor regions
+        for j in ['x','y']:
+            dfmap_r_agg[j] = dfmap['r'][j].loc[dfmap_r_agg[j].index.map(aggreg2anchorreg)].values
+            dfmap_r_agg[f'centroid_{j}'] = dfmap_r_agg.centroid.x if j == 'x' else dfmap_r_agg.centroid.y
+
+        ## Overwrite the non-aggregated zone map
+        dfmap['r'] = dfmap_r_agg.drop(columns='county', errors='ignore')
+
+        ## Write the aggregated maps
+        mapsfile = os.path.join(inputs_case, 'maps.gpkg')
+        if os.path.exists(mapsfile):
+            os.remove(mapsfile)
+        for level in dfmap:
+            (
+                dfmap[level]
+                .drop(columns='aggreg', errors='ignore')
+                .rename_axis(level)
+                .to_file(mapsfile, layer=level)
+            )
+
+    #%%
+    if agglevel_variables['lvl'] == 'mult' or agglevel == 'county':
+        r2aggreg_glob = None
+    else:
+        r2aggreg_glob = r2aggreg
+    r_ba_glob = r_ba
+
+    #%% Aggregate/disaggregate each file from runfiles
+    context = {
+        'inputs_case': inputs_case,
+        'sw': sw,
+        'agglevel': agglevel,
+        'agglevel_variables': agglevel_variables,
+        'val_r_all': val_r_all,
+        'inputfiles': inputfiles,
+        'disagg_data': disagg_data,
+        'r_county': r_county,
+        'r_aggreg': r_aggreg,
+        'r_ba_for_county': r_ba_for_county,
+        'aggreg2anchorreg': aggreg2anchorreg,
+        'anchorreg2aggreg': anchorreg2aggreg,
+        'rscweight_nobin': rscweight_nobin,
+        'new_classes': new_classes,
+        'region_membership': (
+            get_region_membership(agglevel_variables)
+            if agglevel_variables['lvl'] == 'mult' else None
+        ),
+    }
+    if workers is None:
+        workers = int(sw.get('aggregate_regions_workers', 1))
+    durations = run_file_jobs(
+        inputfiles, runfiles, r2aggreg_glob, r_ba_glob, context, workers=workers)
+    print('Slowest files [seconds]:')
+    print(durations.head(10).round(1).to_string())
+
+
+#%% ===========================================================================
+### --- PROCEDURE ---
+### ===========================================================================
+if __name__ == '__main__':
+
+    #%% Parse arguments
+    parser = argparse.ArgumentParser(description='Extend inputs to arbitrary future year')
+    parser.add_argument('reeds_path', help='path to ReEDS directory')
+    parser.add_argument('inputs_case', help='path to inputs_case directory')
+
+    args = parser.parse_args()
+    reeds_path = args.reeds_path
+    inputs_case = os.path.join(args.inputs_case)
+
+    # #%%## Settings for testing
+    # reeds_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # inputs_case = os.path.join(
+    #     reeds_path,'runs','v20250301_hydroM0_Pacific','inputs_case')
+
+    #%% Set up logger
+    log = reeds.log.makelog(
+        scriptname=__file__,
+        logpath=os.path.join(inputs_case, '..', 'gamslog.txt'),
+    )
+
+    #%% Run it
+    main(reeds_path, inputs_case)
 
-#%% Finish
-reeds.log.toc(tic=tic, year=0, process='input_processing/aggregate_regions.py',
-    path=os.path.join(inputs_case,'..'))
+    #%% Finish
+    reeds.log.toc(tic=tic, year=0, process='input_processing/aggregate_regions.py',
+        path=os.path.join(inputs_case,'..'))
 
-print('Finished aggregate_regions.py')
+    print('Finished aggregate_regions.py')
@@ -7,7 +7,9 @@ import datetime
 import numpy as np
 import pandas as pd
 import argparse
+import hashlib
 import shutil
+import tempfile
 import subprocess
 import yaml
 import json
@@ -1401,18 +1403,234 @@ def write_region_indexed_file(
         df.to_csv(os.path.join(dir_dst,filename), index=False)
 
 
+#%% ===========================================================================
+### --- Input cache ---
+### ===========================================================================
+## Region-indexed files that are never cached because they depend on other files in
+## inputs_case or write other files as a side effect
+uncached_files = ['techs_banned.csv', 'unitdata.csv']
+uncached_prefixes = ['supplycurve', 'exog_cap']
+## Switches used in the processing of particular region-indexed files
+## (switches used in the source filepath are covered by the resolved filepath)
+cache_switches = {
+    'hydcf.csv': ['endyear'],
+    'co2_site_char.csv': ['GSw_CO2_BEC'],
+}
+
+
+def hash_object(obj, key=None):
+    """
+    Add a (possibly nested) dict/list/dataframe/series/scalar to a sha256 hash
+    """
+    key = hashlib.sha256() if key is None else key
+    key.update(type(obj).__name__.encode())
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        key.update(repr(obj.columns.tolist() if isinstance(obj, pd.DataFrame) else obj.name).encode())
+        try:
+            key.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+        except TypeError:
+            key.update(obj.to_csv().encode())
+    elif isinstance(obj, dict):
+        for k in sorted(obj, key=str):
+            key.update(repr(k).encode())
+            hash_object(obj[k], key)
+    elif isinstance(obj, (list, tuple, np.ndarray, pd.Index)):
+        for i in obj:
+            hash_object(i, key)
+    elif isinstance(obj, set):
+        for i in sorted(obj, key=str):
+            hash_object(i, key)
+    else:
+        key.update(repr(obj).encode())
+    return key
+
+
+def hash_file(filepath, cachepath):
+    """
+    Get the sha256 hash of a file's contents. Each source file's hash is stored in its own
+    file in {cachepath}/filehashes (along with the file's size and modification time) so
+    the source is only read once, cases running in parallel don't overwrite each other's
+    hashes, and the stored hash is replaced when the source file changes.
+    """
+    stat = os.stat(filepath)
+    abspath = os.path.abspath(filepath)
+    hashpath = os.path.join(
+        cachepath, 'filehashes', hashlib.sha256(abspath.encode()).hexdigest() + '.json')
+    try:
+        with open(hashpath, 'r') as f:
+            filehash = json.load(f)
+        if (
+            (filehash['path'] == abspath)
+            and (filehash['size'] == stat.st_size)
+            and (filehash['mtime_ns'] == stat.st_mtime_ns)
+        ):
+            return filehash['hash']
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+    key = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(2**24), b''):
+            key.update(chunk)
+    filehash = {
+        'path': abspath,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': key.hexdigest(),
+    }
+    ## Write to a temporary file first since other cases may be reading it
+    os.makedirs(os.path.dirname(hashpath), exist_ok=True)
+    _hashpath = f'{hashpath}.{os.getpid()}'
+    with open(_hashpath, 'w') as f:
+        json.dump(filehash, f)
+    os.replace(_hashpath, hashpath)
+    return filehash['hash']
+
+
+def get_input_cache_key(
+    sw,
+    region_file_entry,
+    regions_and_agglevel,
+    agglevel_variables,
+    source_deflator_map,
+    inputs_case,
+    cachepath,
+):
+    """
+    Get the cache key for a region-indexed file, or None if the file shouldn't be cached.
+    The key includes the hash of the source file(s), the runfiles.csv entry, the valid
+    regions, the spatial resolution, the relevant switches and deflator, this script, and
+    the reeds modules it uses to read, filter, and write the file.
+    """
+    filename = region_file_entry['filename']
+    if (filename in uncached_files) or any([filename.startswith(i) for i in uncached_prefixes]):
+        return None
+    full_path = region_file_entry['full_filepath']
+    if (agglevel_variables['lvl'] == 'mult') and ('lvl' in region_file_entry['filepath']):
+        source_files = [full_path.replace('{lvl}', lvl) for lvl in ['ba', 'county']]
+        ## Mixed-resolution filtering also uses hierarchy_with_res.csv
+        source_files.append(os.path.join(inputs_case, 'hierarchy_with_res.csv'))
+    else:
+        source_files = [full_path.format(**{**sw, **{'lvl':agglevel_variables['lvl']}})]
+    key = hashlib.sha256()
+    for source_file in source_files:
+        key.update(source_file.encode())
+        key.update(hash_file(source_file, cachepath).encode())
+    hash_object(
+        {
+            'region_file_entry': region_file_entry.drop('full_filepath').to_dict(),
+            'regions_and_agglevel': regions_and_agglevel,
+            'agglevel_variables': agglevel_variables,
+            'switches': {i: sw[i] for i in cache_switches.get(filename, [])},
+            'deflator': source_deflator_map.get(region_file_entry['filepath']),
+        },
+        key,
+    )
+    for script in [__file__, reeds.io.__file__, reeds.spatial.__file__]:
+        key.update(hash_file(script, cachepath).encode())
+    return key.hexdigest()
+
+
+def evict_from_input_cache(cachepath, max_gb):
+    """
+    Remove least-recently-used entries from the input cache until it is smaller than max_gb.
+    The stored source file hashes in {cachepath}/filehashes are kept.
+    """
+    entries = []
+    for entry in os.scandir(cachepath):
+        if not entry.is_dir() or entry.name.startswith('tmp') or (entry.name == 'filehashes'):
+            continue
+        size = sum(
+            os.path.getsize(os.path.join(root, f))
+            for root, _, files in os.walk(entry.path) for f in files
+        )
+        entries.append((entry.stat().st_mtime, size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_gb * 1e9:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def write_region_indexed_file_cached(
+    inputs_case,
+    sw,
+    region_file_entry,
+    regions_and_agglevel,
+    agglevel_variables,
+    source_deflator_map,
+    cachepath,
+    max_gb,
+):
+    """
+    Copy a region-indexed file from the input cache if it's there; otherwise filter it,
+    write it to inputs_case, and add it to the cache.
+    Files are copied rather than hard-linked because later input-processing scripts
+    overwrite some files in inputs_case in place.
+    """
+    filename = region_file_entry['filename']
+    os.makedirs(cachepath, exist_ok=True)
+    key = get_input_cache_key(
+        sw, region_file_entry, regions_and_agglevel, agglevel_variables,
+        source_deflator_map, inputs_case, cachepath,
+    )
+    entry = None if key is None else os.path.join(cachepath, key)
+    if (entry is not None) and os.path.isfile(os.path.join(entry, filename)):
+        try:
+            shutil.copy(os.path.join(entry, filename), os.path.join(inputs_case, filename))
+            ## Mark as recently used
+            os.utime(entry)
+            print(f'...copied {filename} from input cache')
+            return
+        except FileNotFoundError:
+            ## Another case evicted the entry after we found it, so recompute the file
+            pass
+
+    df = subset_to_valid_regions(
+        sw,
+        region_file_entry,
+        agglevel_variables,
+        regions_and_agglevel,
+        inputs_case
+    )
+    write_region_indexed_file(
+        df,
+        inputs_case,
+        source_deflator_map,
+        sw,
+        region_file_entry,
+        regions_and_agglevel,
+        agglevel_variables
+    )
+    if entry is None:
+        return
+    ## Write to a temporary directory first so other cases never see a partial entry
+    tempdir = tempfile.mkdtemp(prefix='tmp', dir=cachepath)
+    shutil.copy(os.path.join(inputs_case, filename), os.path.join(tempdir, filename))
+    try:
+        os.rename(tempdir, entry)
+    except OSError:
+        ## Another case added the same entry first
+        shutil.rmtree(tempdir, ignore_errors=True)
+    evict_from_input_cache(cachepath, max_gb)
+
+
 def write_region_indexed_files(
     inputs_case,
     sw,
     region_files,
     regions_and_agglevel,
     agglevel_variables,
-    source_deflator_map
+    source_deflator_map,
+    cachepath=None,
 ):
     """
-    Filter and copy data for files with regions
+    Filter and copy data for files with regions.
+    If cachepath is provided and GSw_InputCacheGB > 0, reuse filtered files from
+    previous cases with the same inputs (see write_region_indexed_file_cached()).
     """
     print('Copying region-indexed files: filtering for valid regions')
+    max_gb = float(sw.get('GSw_InputCacheGB', 0))
     for _, region_file_entry in region_files.iterrows():
         # If the file is missing and not required,
         # an empty file is written with the given filename.
@@ -1422,6 +1640,18 @@ def write_region_indexed_files(
         ):
             print(f'...writing empty file {region_file_entry.filename}')
             write_empty_file(os.path.join(inputs_case,region_file_entry['filename']))
+        elif (cachepath is not None) and (max_gb > 0):
+            print(f'...copying {region_file_entry.filename}')
+            write_region_indexed_file_cached(
+                inputs_case,
+                sw,
+                region_file_entry,
+                regions_and_agglevel,
+                agglevel_variables,
+                source_deflator_map,
+                cachepath,
+                max_gb,
+            )
         else:
             print(f'...copying {region_file_entry.filename}')
             # Read file and return dataframe filtered for valid regions
@@ -1822,7 +2052,8 @@ def main(reeds_path, inputs_case, NARIS=False):
         region_files,
         regions_and_agglevel,
         agglevel_variables,
-        source_deflator_map
+        source_deflator_map,
+        cachepath=os.path.join(reeds_path, 'cache', 'copy_files'),
     )
 
     # Create a maps.gpkg for this run
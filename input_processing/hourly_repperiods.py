@@ -22,15 +22,21 @@ This script is currently not compatible with:
 ### --- IMPORTS ---
 ### ===========================================================================
 import argparse
+import hashlib
 import json
 import numpy as np
 import os
 import sys
+import time
 import datetime
 import pandas as pd
 import scipy
+import scipy.optimize
+import scipy.sparse
+import sklearn
 import sklearn.cluster
 import sklearn.neighbors
+import threadpoolctl
 import hourly_writetimeseries
 import hourly_plots
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -49,6 +55,11 @@ interactive = False
 all_weatheryears = list(range(2007,2014)) + list(range(2016,2024))
 ### VRE techs considered for GSw_PRM_StressSeedMinRElevel and GSw_HourlyMinRElevel
 techs_min_vre = ['upv', 'wind-ons']
+### Switches (in addition to the profiles) that determine the clustering results
+cluster_cache_switches = [
+    'GSw_HourlyClusterAlgorithm', 'GSw_HourlyClusterSolver', 'GSw_HourlyNumClusters', 'GSw_HourlyType']
+### Seconds to wait for another case that is clustering the same profiles
+cluster_cache_timeout = 3600
 
 #%% ===========================================================================
 ### --- FUNCTIONS ---
@@ -95,7 +106,98 @@ def get_load(inputs_case, keep_modelyear=None, keep_weatheryears=[2012]):
     return load
 
 
-def optimize_period_weights(profiles_fitperiods, numclusters=100):
+def write_mps(filepath, c, A_eq, b_eq, lb, ub, integrality=None, name='model'):
+    """
+    Write the problem min(c @ x) s.t. A_eq @ x == b_eq, lb <= x <= ub to a free-format
+    .mps file. Variables are named x{index} and constraints are named c{index}.
+    """
+    A = scipy.sparse.csc_matrix(A_eq)
+    numvars = A.shape[1]
+    integrality = np.zeros(numvars, dtype=int) if integrality is None else np.asarray(integrality)
+    lines = [f'NAME {name}', 'ROWS', ' N obj']
+    lines += [f' E c{i}' for i in range(A.shape[0])]
+    lines.append('COLUMNS')
+    marker = False
+    for j in range(numvars):
+        if integrality[j] and not marker:
+            lines.append(" MARKER 'MARKER' 'INTORG'")
+            marker = True
+        elif marker and not integrality[j]:
+            lines.append(" MARKER 'MARKER' 'INTEND'")
+            marker = False
+        if c[j] != 0:
+            lines.append(f' x{j} obj {c[j]!r}')
+        rows = A.indices[A.indptr[j]:A.indptr[j+1]]
+        vals = A.data[A.indptr[j]:A.indptr[j+1]]
+        lines += [f' x{j} c{i} {v!r}' for i, v in zip(rows, vals)]
+    if marker:
+        lines.append(" MARKER 'MARKER' 'INTEND'")
+    lines.append('RHS')
+    lines += [f' rhs c{i} {v!r}' for i, v in enumerate(b_eq) if v != 0]
+    lines.append('BOUNDS')
+    for j in range(numvars):
+        if lb[j] != 0:
+            lines.append(f' LO bnd x{j} {lb[j]!r}')
+        if np.isfinite(ub[j]):
+            lines.append(f' UP bnd x{j} {ub[j]!r}')
+        elif integrality[j]:
+            lines.append(f' PL bnd x{j}')
+    lines.append('ENDATA')
+    with open(filepath, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def solve_sparse_model(c, A_eq, b_eq, lb, ub, integrality=None, solver='cbc', name='model'):
+    """
+    Solve min(c @ x) s.t. A_eq @ x == b_eq, lb <= x <= ub, with x[integrality == 1] integer.
+
+    Args:
+        solver: 'highs' to use scipy's interface to HiGHS, or 'cbc' to write the problem to
+            an .mps file and solve it with the CBC executable distributed with pulp
+
+    Returns:
+        np.array: optimal values of x
+    """
+    tic = time.perf_counter()
+    if solver.lower() == 'highs':
+        result = scipy.optimize.milp(
+            c,
+            constraints=scipy.optimize.LinearConstraint(A_eq, b_eq, b_eq),
+            integrality=integrality,
+            bounds=scipy.optimize.Bounds(lb, ub),
+        )
+        if not result.success:
+            raise ValueError(f'{name} failed: {result.message}')
+        x = result.x
+    elif solver.lower() == 'cbc':
+        import pulp
+        import subprocess
+        import tempfile
+        with tempfile.TemporaryDirectory() as tempdir:
+            mpspath = os.path.join(tempdir, f'{name}.mps')
+            solpath = os.path.join(tempdir, f'{name}.sol')
+            write_mps(mpspath, c, A_eq, b_eq, lb, ub, integrality=integrality, name=name)
+            subprocess.run(
+                [pulp.PULP_CBC_CMD().path, mpspath, 'solve', 'solu', solpath],
+                check=True,
+            )
+            with open(solpath, 'r') as f:
+                status = f.readline()
+                if not status.startswith('Optimal'):
+                    raise ValueError(f'{name} failed: {status}')
+                x = np.zeros(len(c))
+                for line in f:
+                    ## Lines are formatted as [**] index name value reducedcost
+                    _, varname, value, _ = line.replace('**', '').split()
+                    x[int(varname[1:])] = float(value)
+    else:
+        raise ValueError(f"solver must be 'highs' or 'cbc' but is {solver}")
+    print(f'{name}: solved with {solver} in {time.perf_counter() - tic:.2f} seconds')
+
+    return x
+
+
+def optimize_period_weights(profiles_fitperiods, numclusters=100, solver='cbc'):
     """
     The optimization approach (minimizing sum of absolute errors) is described at
     https://optimization.mccormick.northwestern.edu/index.php/Optimization_with_absolute_values
@@ -103,9 +205,6 @@ def optimize_period_weights(profiles_fitperiods, numclusters=100):
     to the method used in the EPRI US-REGEN model, described at
     https://www.epri.com/research/products/000000003002016601
     """
-    ### Imports
-    import pulp
-
     ### Input processing
     profiles_day = (
         profiles_fitperiods.groupby(['property','region'], axis=1).mean())
@@ -114,38 +213,42 @@ def optimize_period_weights(profiles_fitperiods, numclusters=100):
     days = profiles_day.index.values
 
     ### Optimization: minimize sum of absolute errors
-    m = pulp.LpProblem('LinearDaySelection', pulp.LpMinimize)
-    ###### Variables
-    ### day weights
-    WEIGHT = pulp.LpVariable.dicts('WEIGHT', (d for d in days), lowBound=0, cat='Continuous')
-    ### errors
-    ERROR_POS = pulp.LpVariable.dicts(
-        'ERROR_POS', (c for c in profiles_day.columns), lowBound=0, cat='Continuous')
-    ERROR_NEG = pulp.LpVariable.dicts(
-        'ERROR_NEG', (c for c in profiles_day.columns), lowBound=0, cat='Continuous')
+    tic = time.perf_counter()
+    numcols = profiles_day.shape[1]
+    ###### Variables: [day weights (numdays), positive errors (numcols), negative errors (numcols)]
     ###### Constraints
-    ### weights must sum to 1
-    m += pulp.lpSum([WEIGHT[d] for d in days]) == 1
-    ### definition of errors
-    for c in profiles_day.columns:
-        m += (
-            ### Full error for column (given by positive component minus negative component)...
-            ERROR_POS[c] - ERROR_NEG[c]
-            ### ...plus sum of values for weighted representative days...
-            + pulp.lpSum([WEIGHT[d] * profiles_day[c][d] for d in days])
-            ### ...equals the mean for that column
-            == profiles_mean[c])
+    A_eq = scipy.sparse.vstack([
+        ### weights must sum to 1
+        scipy.sparse.hstack([
+            np.ones((1, numdays)),
+            scipy.sparse.csr_matrix((1, 2 * numcols)),
+        ]),
+        ### definition of errors: full error for column (given by positive component minus
+        ### negative component) plus sum of values for weighted representative days
+        ### equals the mean for that column
+        scipy.sparse.hstack([
+            scipy.sparse.csr_matrix(profiles_day.values.T),
+            scipy.sparse.identity(numcols),
+            -scipy.sparse.identity(numcols),
+        ]),
+    ], format='csr')
+    b_eq = np.concatenate([[1], profiles_mean.values])
     ###### Objective: minimize the sum of absolute values of errors across all columns
-    m += pulp.lpSum([
-        ERROR_POS[c] + ERROR_NEG[c]
-        for c in profiles_day.columns
-    ])
+    c = np.concatenate([np.zeros(numdays), np.ones(2 * numcols)])
+    print(
+        f'LinearDaySelection: built model with {A_eq.shape[1]} variables and '
+        f'{A_eq.shape[0]} constraints in {time.perf_counter() - tic:.2f} seconds'
+    )
 
     ### Solve it
-    m.solve(solver=pulp.PULP_CBC_CMD(msg=True))
+    x = solve_sparse_model(
+        c, A_eq, b_eq,
+        lb=np.zeros(len(c)), ub=np.full(len(c), np.inf),
+        solver=solver, name='LinearDaySelection',
+    )
 
     ### Collect weights, scaled by total number of days
-    weights = pd.Series({d:WEIGHT[d].varValue for d in days}) * numdays
+    weights = pd.Series(x[:numdays], index=days) * numdays
 
     ### Truncate based on numclusters, scale appropriately, and convert to integers
     ### Keep the the 'numclusters' highest-weighted days
@@ -171,63 +274,75 @@ def optimize_period_weights(profiles_fitperiods, numclusters=100):
     return profiles_day, iweights, weights
 
 
-def assign_representative_days(profiles_day, rweights):
+def assign_representative_days(profiles_day, rweights, solver='cbc'):
     """
+    Assign each actual day to one representative day, using each representative day
+    a number of times equal to its weight, to minimize the sum of absolute errors
     """
-    ### Imports
-    import pulp
-
     ### Input processing
     actualdays = profiles_day.index.values
     repdays = list(rweights.index)
+    numact = len(actualdays)
+    numrep = len(repdays)
+    numcols = profiles_day.shape[1]
+    profiles_rep = profiles_day.values[profiles_day.index.get_indexer(repdays)]
 
     ### Optimization: minimize sum of absolute errors
-    m = pulp.LpProblem('RepDayAssignment', pulp.LpMinimize)
-    ###### Variables
+    tic = time.perf_counter()
+    ###### Variables, flattened in (actual day, rep day) and (actual day, column) order:
     ### Weighting of rep days (r) for each actual day (a).
     ### Can only use whole days, so it's a binary variable.
-    WEIGHT = pulp.LpVariable.dicts(
-        'WEIGHT', ((a,r) for a in actualdays for r in repdays),
-        lowBound=0, upBound=1, cat=pulp.LpInteger)
     ### Errors. These are defined for features (c) and for actual days (a).
-    ERROR_POS = pulp.LpVariable.dicts(
-        'ERROR_POS', ((a,c) for a in actualdays for c in profiles_day.columns),
-        lowBound=0, cat='Continuous')
-    ERROR_NEG = pulp.LpVariable.dicts(
-        'ERROR_NEG', ((a,c) for a in actualdays for c in profiles_day.columns),
-        lowBound=0, cat='Continuous')
+    numweights = numact * numrep
+    numerrors = numact * numcols
     ###### Constraints
-    ### Each actual day can only be assigned to one representative day
-    for a in actualdays:
-        m += pulp.lpSum([WEIGHT[a,r] for r in repdays]) == 1
-    ### Each representative day must be used a number of times equal to its weight
-    for r in repdays:
-        m += pulp.lpSum([WEIGHT[a,r] for a in actualdays]) == rweights[r]
-    ### Define the error variables
-    for a in actualdays:
-        for c in profiles_day.columns:
-            m += (
-                ### Full error for column on actual day (given by positive
-                ### component minus negative component)...
-                ERROR_POS[a,c] - ERROR_NEG[a,c]
-                ### ...plus value for its representative day (since WEIGHT is binary)...
-                + pulp.lpSum([WEIGHT[a,r] * profiles_day[c][r] for r in repdays])
-                ### ...equals the actual value for that column and day
-                == profiles_day[c][a])
-    ###### Objective: minimize the sum of absolute values of errors
-    m += pulp.lpSum([
-        ERROR_POS[a,c] + ERROR_NEG[a,c]
-        for a in actualdays for c in profiles_day.columns
+    A_eq = scipy.sparse.vstack([
+        ### Each actual day can only be assigned to one representative day
+        scipy.sparse.hstack([
+            scipy.sparse.kron(scipy.sparse.identity(numact), np.ones((1, numrep))),
+            scipy.sparse.csr_matrix((numact, 2 * numerrors)),
+        ]),
+        ### Each representative day must be used a number of times equal to its weight
+        scipy.sparse.hstack([
+            scipy.sparse.kron(np.ones((1, numact)), scipy.sparse.identity(numrep)),
+            scipy.sparse.csr_matrix((numrep, 2 * numerrors)),
+        ]),
+        ### Define the error variables: full error for column on actual day (given by
+        ### positive component minus negative component) plus value for its
+        ### representative day (since WEIGHT is binary) equals the actual value
+        scipy.sparse.hstack([
+            scipy.sparse.kron(scipy.sparse.identity(numact), profiles_rep.T),
+            scipy.sparse.identity(numerrors),
+            -scipy.sparse.identity(numerrors),
+        ]),
+    ], format='csr')
+    b_eq = np.concatenate([
+        np.ones(numact),
+        rweights.values,
+        profiles_day.values.ravel(),
     ])
+    ###### Objective: minimize the sum of absolute values of errors
+    c = np.concatenate([np.zeros(numweights), np.ones(2 * numerrors)])
+    integrality = np.concatenate([np.ones(numweights), np.zeros(2 * numerrors)])
+    ub = np.concatenate([np.ones(numweights), np.full(2 * numerrors, np.inf)])
+    print(
+        f'RepDayAssignment: built model with {A_eq.shape[1]} variables and '
+        f'{A_eq.shape[0]} constraints in {time.perf_counter() - tic:.2f} seconds'
+    )
 
     ### Solve it
-    m.solve(solver=pulp.PULP_CBC_CMD(msg=True))
+    x = solve_sparse_model(
+        c, A_eq, b_eq, lb=np.zeros(len(c)), ub=ub, integrality=integrality,
+        solver=solver, name='RepDayAssignment',
+    )
 
     ### Collect assignments
-    assignments = pd.Series(
-        {(a,r):WEIGHT[a,r].varValue for a in actualdays for r in repdays}).astype(int)
-    assignments.index = assignments.index.rename(['act','rep'])
-    a2r = assignments.replace(0,np.nan).dropna().reset_index(level='rep').rep
+    assignments = x[:numweights].round().astype(int).reshape(numact, numrep)
+    a2r = pd.Series(
+        index=pd.Index(actualdays, name='act', tupleize_cols=False),
+        data=[repdays[i] for i in assignments.argmax(axis=1)],
+        name='rep',
+    )
 
     return a2r
 
@@ -313,6 +428,11 @@ def cluster_profiles(profiles_fitperiods, sw, forceperiods_yearperiod):
                 n_clusters=int(sw['GSw_HourlyNumClusters']),
                 metric=metric, linkage=linkage,
             )
+        elif sw['GSw_HourlyClusterAlgorithm'].lower().startswith('kmeans_minibatch'):
+            clusters = sklearn.cluster.MiniBatchKMeans(
+                n_clusters=int(sw['GSw_HourlyNumClusters']),
+                random_state=0, n_init='auto', max_iter=1000,
+            )
         elif sw['GSw_HourlyClusterAlgorithm'].lower().startswith('kmeans'):
             clusters = sklearn.cluster.KMeans(
                 n_clusters=int(sw['GSw_HourlyNumClusters']),
@@ -332,8 +452,10 @@ def cluster_profiles(profiles_fitperiods, sw, forceperiods_yearperiod):
                 metric=metric, init=init, method='pam',
                 max_iter=1000, random_state=0,
             )
-        ### Generate the fits
-        idx = clusters.fit_predict(profiles_fitperiods)
+        ### Generate the fits, using all available threads if threads <= 0
+        threads = int(sw.get('threads', 0))
+        with threadpoolctl.threadpool_limits(limits=(threads if threads > 0 else None)):
+            idx = clusters.fit_predict(profiles_fitperiods)
         ### Get nearest period to each centroid
         centroids = pd.DataFrame(
             sklearn.neighbors.NearestCentroid().fit(profiles_fitperiods, idx).centroids_,
@@ -366,9 +488,14 @@ def cluster_profiles(profiles_fitperiods, sw, forceperiods_yearperiod):
     elif sw['GSw_HourlyClusterAlgorithm'] in ['opt','optimized','optimize']:
         ### Optimize the weights of representative days
         profiles_day, rweights, weights = optimize_period_weights(
-            profiles_fitperiods=profiles_fitperiods, numclusters=int(sw['GSw_HourlyNumClusters']))
+            profiles_fitperiods=profiles_fitperiods, numclusters=int(sw['GSw_HourlyNumClusters']),
+            solver=sw.get('GSw_HourlyClusterSolver', 'cbc'),
+        )
         ### Optimize the assignment of actual days to representative days
-        a2r = assign_representative_days(profiles_day=profiles_day.round(4), rweights=rweights)
+        a2r = assign_representative_days(
+            profiles_day=profiles_day.round(4), rweights=rweights,
+            solver=sw.get('GSw_HourlyClusterSolver', 'cbc'),
+        )
 
         if len(rweights) < int(sw['GSw_HourlyNumClusters']):
             print(
@@ -457,6 +584,81 @@ def make_timestamps(sw):
 
 
 #%% ===========================================================================
+def get_cluster_cache_key(profiles_fitperiods, sw, forceperiods_yearperiod):
+    """
+    Hash the profiles and switches that determine the output of cluster_profiles(),
+    along with this script so changes to the clustering code invalidate old results
+    """
+    key = hashlib.sha256()
+    key.update(np.ascontiguousarray(profiles_fitperiods.values, dtype=float).tobytes())
+    key.update(repr(profiles_fitperiods.index.tolist()).encode())
+    key.update(repr(profiles_fitperiods.columns.tolist()).encode())
+    key.update(repr(sorted(forceperiods_yearperiod)).encode())
+    key.update(json.dumps({i: str(sw.get(i)) for i in cluster_cache_switches}, sort_keys=True).encode())
+    key.update(sklearn.__version__.encode())
+    with open(__file__, 'rb') as f:
+        key.update(f.read())
+    return key.hexdigest()
+
+
+def cluster_profiles_cached(profiles_fitperiods, sw, forceperiods_yearperiod, cachepath):
+    """
+    Wrapper for cluster_profiles() that reuses the results from previous cases with the same
+    profiles and clustering switches. Results are stored in {cachepath}/{hash}.csv.
+    If another case is clustering the same profiles (indicated by {hash}.csv.lock),
+    wait for it to finish and use its results.
+    """
+    if 'user' in sw['GSw_HourlyClusterAlgorithm'].lower():
+        return cluster_profiles(profiles_fitperiods, sw, forceperiods_yearperiod)
+
+    key = get_cluster_cache_key(profiles_fitperiods, sw, forceperiods_yearperiod)
+    os.makedirs(cachepath, exist_ok=True)
+    fpath = os.path.join(cachepath, f'{key}.csv')
+    lockpath = fpath + '.lock'
+    while not os.path.exists(fpath):
+        try:
+            os.close(os.open(lockpath, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            try:
+                stale = (time.time() - os.path.getmtime(lockpath)) > cluster_cache_timeout
+            except FileNotFoundError:
+                continue
+            if stale:
+                print(f'Removing stale lock {lockpath}')
+                try:
+                    os.remove(lockpath)
+                except FileNotFoundError:
+                    pass
+            else:
+                time.sleep(5)
+            continue
+        ### We have the lock, so do the clustering and cache the results
+        try:
+            rep_periods, period_szn = cluster_profiles(
+                profiles_fitperiods, sw, forceperiods_yearperiod)
+            dfwrite = pd.DataFrame(
+                period_szn.index.tolist(), columns=['year', 'yperiod'],
+            ).assign(szn=period_szn.values)
+            ## Write to a temporary file first so other cases never read a partial file
+            dfwrite.to_csv(f'{fpath}.{os.getpid()}', index=False)
+            os.replace(f'{fpath}.{os.getpid()}', fpath)
+        finally:
+            os.remove(lockpath)
+        print(f'Cached clustering results to {fpath}')
+        return rep_periods, period_szn
+
+    print(f'Using cached clustering results from {fpath}')
+    dfread = pd.read_csv(fpath)
+    period_szn = pd.Series(
+        index=pd.Index(list(zip(dfread.year, dfread.yperiod)), name='period', tupleize_cols=False),
+        data=dfread.szn.values,
+        name='szn',
+    )
+    rep_periods = sorted(period_szn.map(szn2yearperiod).unique())
+
+    return rep_periods, period_szn
+
+
 ### --- MAIN FUNCTION ---
 ### ===========================================================================
 
@@ -707,11 +909,19 @@ def main(
 
     ## Representative days or weeks
     if sw['GSw_HourlyType'] in ['day','wek']:
-        rep_periods, period_szn = cluster_profiles(
-            profiles_fitperiods=profiles_fitperiods_weighted,
-            sw=sw,
-            forceperiods_yearperiod=forceperiods_yearperiod,
-        )
+        if int(sw.get('GSw_HourlyClusterCache', 0)):
+            rep_periods, period_szn = cluster_profiles_cached(
+                profiles_fitperiods=profiles_fitperiods_weighted,
+                sw=sw,
+                forceperiods_yearperiod=forceperiods_yearperiod,
+                cachepath=os.path.join(reeds_path, 'cache', 'hourly_repperiods'),
+            )
+        else:
+            rep_periods, period_szn = cluster_profiles(
+                profiles_fitperiods=profiles_fitperiods_weighted,
+                sw=sw,
+                forceperiods_yearperiod=forceperiods_yearperiod,
+            )
         print("Clustering complete")
 
     ## 8760
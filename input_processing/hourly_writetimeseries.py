@@ -31,62 +31,14 @@ debug = True
 ### ===========================================================================
 def make_8760_map(period_szn, sw):
     """
+    Map all hours of the resource adequacy weather years to actual and representative
+    periods (see reeds.timeseries.get_hmap())
     """
-    hoursperperiod = {'day':24, 'wek':120, 'year':24}[sw['GSw_HourlyType']]
-    periodsperyear = {'day':365, 'wek':73, 'year':365}[sw['GSw_HourlyType']]
-    fulltimeindex = reeds.timeseries.get_timeindex(sw.resource_adequacy_years_list)
-    ### Start with all weather years
-    hmap_allyrs = pd.DataFrame({
-        'timestamp': fulltimeindex,
-        'year': np.ravel([[y]*8760 for y in sw.resource_adequacy_years_list]),
-        'yearperiod': np.ravel([
-            [h+1 for d in range(365) for h in (d,)*24] if sw['GSw_HourlyType'] == 'year'
-            else [h+1 for d in range(periodsperyear)
-                  for h in (d,)*hoursperperiod]
-            for y in sw.resource_adequacy_years_list]),
-        'hour': range(1, 8760*len(sw.resource_adequacy_years_list) + 1),
-        'hour0': range(8760*len(sw.resource_adequacy_years_list)),
-        'yearhour': np.ravel(list(range(1,8761))*len(sw.resource_adequacy_years_list)),
-        'periodhour': (
-            list(range(1,25))*365*len(sw.resource_adequacy_years_list)
-            if sw['GSw_HourlyType'] == 'year'
-            else (
-                list(range(1, hoursperperiod+1))
-                * periodsperyear
-                * len(sw.resource_adequacy_years_list))
-        ),
-    })
-    hmap_allyrs['actual_period'] = (
-        'y' + hmap_allyrs.year.astype(str)
-        + ('w' if sw.GSw_HourlyType == 'wek' else 'd')
-        + hmap_allyrs.yearperiod.astype(str).map('{:>03}'.format)
-    )
-    hmap_allyrs['actual_h'] = (
-        hmap_allyrs.actual_period
-        + 'h' + hmap_allyrs.periodhour.astype(str).map('{:>03}'.format)
+    return reeds.timeseries.get_hmap(
+        years=sw.resource_adequacy_years_list,
+        GSw_HourlyType=sw['GSw_HourlyType'],
+        period_szn=period_szn,
     )
-    hmap_allyrs['season'] = hmap_allyrs.actual_period.map(
-        period_szn.set_index('actual_period').season)
-    hmap_allyrs['month'] = hmap_allyrs.timestamp.dt.strftime('%b').str.upper()
-    ### create the timestamp index: y{20xx}d{xxx}h{xx} (left-padded with 0)
-    if sw["GSw_HourlyType"] == "year":
-        ### If using a chronological year (i.e. 8760) the day index uses actual days
-        hmap_allyrs['h'] = (
-            'y' + hmap_allyrs.year.astype(str)
-            + 'd' + hmap_allyrs.yearperiod.astype(str).map('{:>03}'.format)
-            + 'h' + hmap_allyrs.periodhour.astype(str).map('{:>03}'.format)
-        )
-    else:
-        ### If using representative periods (days/weks) the period index uses
-        ### representative periods, which are in the 'season' column
-        hmap_allyrs['h'] = (
-            hmap_allyrs.season
-            + 'h' + hmap_allyrs.periodhour.astype(str).map('{:>03}'.format)
-        )
-    ### hmap_myr (for "model years") only contains the actually-modeled periods
-    hmap_myr = hmap_allyrs.dropna(subset=['season']).copy()
-
-    return hmap_allyrs, hmap_myr
 
 
 def get_ccseason_peaks_hourly(load, sw, inputs_case, hierarchy, h2ccseason, val_r_all):
@@ -193,14 +145,30 @@ def get_minloading_windows(sw, h_szn, chunkmap):
     return hour_szn_group
 
 
-def get_yearly_demand(sw, hmap_myr, hmap_allyrs, inputs_case, periodtype='rep'):
+def read_hourly(filename, cachepath=None, period_index=None):
+    """
+    Read an hourly profile file, through a memory-mapped copy in cachepath if provided
+    """
+    if cachepath is None:
+        return reeds.io.read_file(filename, parse_timestamps=True, period_index=period_index)
+    return reeds.io.read_file_mmap(
+        filename, cachepath, parse_timestamps=True, period_index=period_index)
+
+
+def get_yearly_demand(
+    sw, hmap_myr, hmap_allyrs, inputs_case, periodtype='rep', cachepath=None, full=True,
+):
     """
     After clustering based on GSw_HourlyClusterYear and identifying the modeled days,
     reload the raw demand and extract the demand on the modeled days for each year.
+    If full=False, only the hours in hmap_myr are processed and load_in is returned as None.
     """
     ### Get original demand data, subset to cluster year
-    load_in = reeds.io.read_file(
-        os.path.join(inputs_case,'load.h5'), parse_timestamps=True).unstack(level=0)
+    load_in = read_hourly(os.path.join(inputs_case,'load.h5'), cachepath)
+    if not full:
+        load_in = load_in.loc[
+            load_in.index.get_level_values('datetime').isin(hmap_myr.timestamp)]
+    load_in = load_in.unstack(level=0)
     load_in.columns = load_in.columns.rename(['r','t'])
     ### load.h5 is busbar load, but b_inputs.gms ingests end-use load, so scale down by distloss
     scalars = reeds.io.get_scalars(inputs_case)
@@ -223,7 +191,34 @@ def get_yearly_demand(sw, hmap_myr, hmap_allyrs, inputs_case, periodtype='rep'):
     ### Reshape for ReEDS
     load_out = load_out.stack("r").reorder_levels(["r", "h"], axis=0).sort_index()
 
-    return load_in, load_out
+    return (load_in if full else None), load_out
+
+
+def get_previous_outputs(inputs_case, previous_periodtype, period_szn, tprefix='s'):
+    """
+    Load the outputs of a previous stress period iteration that are extended with the
+    newly added periods in incremental mode (see main()).
+    Returns None if any of the outputs are missing or if the previous iteration includes
+    periods that are not in period_szn, in which case all periods are processed.
+    """
+    prevpath = os.path.join(inputs_case, previous_periodtype)
+    try:
+        previous_periods = pd.read_csv(os.path.join(prevpath, 'period_szn.csv')).actual_period
+        previous_outputs = {
+            f: pd.read_csv(os.path.join(prevpath, f+'.csv'))
+            for f in ['cf_vre', 'outage_forced_h', 'outage_scheduled_h', 'peak_ccseason']
+        }
+    except FileNotFoundError:
+        return None
+    previous_periods = tprefix + previous_periods.str.strip(tprefix)
+    if not previous_periods.isin(period_szn.actual_period).all():
+        return None
+    ### Remove the '*' that marks the first column as a comment for GAMS
+    previous_outputs = {
+        f: df.rename(columns={df.columns[0]: df.columns[0].lstrip('*')})
+        for f, df in previous_outputs.items()
+    }
+    return previous_periods.tolist(), previous_outputs
 
 
 def get_yearly_flexibility(
@@ -363,8 +358,24 @@ def get_yearly_flexibility(
 # %% ===========================================================================
 ### --- MAIN FUNCTION ---
 ### ===========================================================================
-def main(sw, reeds_path, inputs_case, periodtype='rep', make_plots=1):
-    """ """
+def main(
+    sw, reeds_path, inputs_case, periodtype='rep', make_plots=1, previous_periodtype=None,
+):
+    """
+    Write the temporal inputs for the periods in {inputs_case}/{periodtype}/period_szn.csv
+
+    Notes
+    -----
+    * For stress periods with GSw_PRM_StressIncremental=1, recf.h5, csp.h5, and load.h5
+      are read through memory-mapped copies in {inputs_case}/hourly_cache that are
+      shared by all stress period iterations of the run.
+    * If previous_periodtype is provided (e.g. 'stress2030i0' when writing 'stress2030i1'),
+      the hourly profiles (cf_vre, outage_forced_h, outage_scheduled_h) are only
+      calculated for the periods that are not in the previous iteration and appended to
+      the previous iteration's outputs, and peak_ccseason (which doesn't depend on the
+      periods) is reused. The other outputs depend on the full set of periods and are
+      recalculated.
+    """
     # #%% Settings for testing
     # reeds_path = os.path.realpath(os.path.join(os.path.dirname(__file__),'..'))
     # inputs_case = os.path.join(reeds_path, 'runs', 'v20250313_chunkM0_Pacific_r4mean_s4max', 'inputs_case')
@@ -499,24 +510,62 @@ def main(sw, reeds_path, inputs_case, periodtype='rep', make_plots=1):
     ).squeeze(1)
     hmap_allyrs['ccseason'] = hmap_allyrs.timestamp.map(lambda x: ccseason_dates[x.month, x.day])
 
-    #%%### Load full hourly RE CF, for downselection below
+    #%%### Incremental mode: only calculate hourly profiles for the new periods
+    previous = (
+        get_previous_outputs(inputs_case, previous_periodtype, period_szn, tprefix)
+        if (previous_periodtype and periodtype.startswith('stress'))
+        else None
+    )
+    if previous is None:
+        calc_periods = period_szn.actual_period.unique()
+    else:
+        previous_periods, previous_outputs = previous
+        calc_periods = period_szn.loc[
+            ~period_szn.actual_period.isin(previous_periods)
+        ].actual_period.unique()
+        print(
+            f'{periodtype}: calculating profiles for {len(calc_periods)} new periods '
+            f'and appending to {previous_periodtype}'
+        )
+    hmap_calc = hmap_myr.loc[hmap_myr.actual_period.isin(calc_periods)]
+    cachepath = (
+        os.path.join(inputs_case, 'hourly_cache')
+        if (periodtype.startswith('stress') and int(sw.get('GSw_PRM_StressIncremental', 0)))
+        else None
+    )
+
+    #%%### Load hourly RE CF for the representative periods
+    rep_periods = sorted(period_szn.rep_period.unique())
+    calc_rep_periods = (
+        rep_periods if previous is None
+        else sorted(period_szn.loc[period_szn.actual_period.isin(calc_periods)].rep_period.unique())
+    )
+    calc_rep_codes = reeds.timeseries.period_to_code(calc_rep_periods)
     #%% VRE
-    recf = reeds.io.read_file(os.path.join(inputs_case, 'recf.h5'), parse_timestamps=True)
+    recf = read_hourly(
+        os.path.join(inputs_case, 'recf.h5'), cachepath, period_index=sw.GSw_HourlyType)
     ### Overwrite CSP CF (which in recf.h5 is post-storage) with solar field CF
-    cspcf = reeds.io.read_file(os.path.join(inputs_case, 'csp.h5'), parse_timestamps=True)
-    recf = (
-        recf.drop([c for c in recf if c.startswith('csp')], axis=1)
-        .merge(cspcf, left_index=True, right_index=True)
-    ).loc[hmap_allyrs.timestamp]
-    recf.index = hmap_allyrs.actual_h
-
-    # %% Get data for representative periods
-    rep_periods = sorted(period_szn.rep_period.unique())
+    cspcf = read_hourly(
+        os.path.join(inputs_case, 'csp.h5'), cachepath, period_index=sw.GSw_HourlyType)
+    cf_rep = (
+        recf.loc[
+            recf.index.get_level_values('period').isin(calc_rep_codes),
+            [c for c in recf if not c.startswith('csp')]
+        ]
+        .merge(
+            cspcf.loc[cspcf.index.get_level_values('period').isin(calc_rep_codes)],
+            left_index=True, right_index=True,
+        )
+    )
+    ### Label the rows by timeslice
+    hmap_rep = hmap_allyrs.loc[hmap_allyrs.actual_period.isin(calc_rep_periods)]
+    cf_rep.index = pd.Index(
+        hmap_rep.set_index('timestamp').actual_h
+        .reindex(cf_rep.index.get_level_values('datetime')).values,
+        name='actual_h',
+    )
 
     ### Broadcast CSP values for all techs
-    cf_rep = recf.loc[
-        recf.index.map(lambda x: any([x.startswith(i) for i in rep_periods]))
-    ]
 
     if int(sw["GSw_CSP"]) != 0:
         cf_rep = append_csp_profiles(cf_rep=cf_rep, sw=sw)
@@ -973,32 +1022,37 @@ def main(sw, reeds_path, inputs_case, periodtype='rep', make_plots=1):
 
     load_in, load_h = get_yearly_demand(
         sw=sw, hmap_myr=hmap_myr, hmap_allyrs=hmap_allyrs, inputs_case=inputs_case,
-        periodtype=periodtype,
+        periodtype=periodtype, cachepath=cachepath, full=(previous is None),
     )
 
+    years = pd.read_csv(os.path.join(inputs_case,'modeledyears.csv')).columns.astype(int).values
+
     ###### Get the peak demand in each (r,szn,modelyear) for GSw_HourlyWeatherYears
-    load_full_yearly = load_in.loc[
-        load_in.index.map(hmap_allyrs.set_index('actual_h').year.isin(sw['GSw_HourlyWeatherYears']))
-    ].stack('r').reset_index()
+    ### (which doesn't depend on the modeled periods, so reuse it in incremental mode)
+    if previous is not None:
+        peak_all = previous_outputs['peak_ccseason']
+    else:
+        load_full_yearly = load_in.loc[
+            load_in.index.map(hmap_allyrs.set_index('actual_h').year.isin(sw['GSw_HourlyWeatherYears']))
+        ].stack('r').reset_index()
 
-    h2ccseason = hmap_allyrs.set_index('actual_h').ccseason
-    years = pd.read_csv(os.path.join(inputs_case,'modeledyears.csv')).columns.astype(int).values
+        h2ccseason = hmap_allyrs.set_index('actual_h').ccseason
 
-    peak_all = {}
-    for year in years:
-        peak_all[year] = get_ccseason_peaks_hourly(
-            load=load_full_yearly[["r", "h", year]].rename(columns={year: "MW"}),
-            sw=sw,
-            inputs_case=inputs_case,
-            hierarchy=hierarchy,
-            h2ccseason=h2ccseason,
-            val_r_all=val_r_all,
-        )
-    peak_all = (
-        pd.concat(peak_all, names=["t", "drop"])
-        .reset_index()
-        .drop("drop", axis=1)[["r", "ccseason", "t", "MW"]]
-    ).copy()
+        peak_all = {}
+        for year in years:
+            peak_all[year] = get_ccseason_peaks_hourly(
+                load=load_full_yearly[["r", "h", year]].rename(columns={year: "MW"}),
+                sw=sw,
+                inputs_case=inputs_case,
+                hierarchy=hierarchy,
+                h2ccseason=h2ccseason,
+                val_r_all=val_r_all,
+            )
+        peak_all = (
+            pd.concat(peak_all, names=["t", "drop"])
+            .reset_index()
+            .drop("drop", axis=1)[["r", "ccseason", "t", "MW"]]
+        ).copy()
 
     ##############################################
     # %%  -- Hydro Month-to-Szn Adjustments --    #
@@ -1091,8 +1145,8 @@ def main(sw, reeds_path, inputs_case, periodtype='rep', make_plots=1):
         outage_hourly = reeds.io.get_outage_hourly(inputs_case, outage_type)
         column_levels = list(outage_hourly.columns.names)
         ## Aggregate to model resolution
-        outage_h[outage_type] = outage_hourly.loc[hmap_myr.timestamp].copy()
-        outage_h[outage_type].index = hmap_myr.h.map(chunkmap)
+        outage_h[outage_type] = outage_hourly.loc[hmap_calc.timestamp].copy()
+        outage_h[outage_type].index = hmap_calc.h.map(chunkmap)
         outage_h[outage_type] = (
             outage_h[outage_type]
             .groupby(outage_h[outage_type].index)
@@ -1102,6 +1156,16 @@ def main(sw, reeds_path, inputs_case, periodtype='rep', make_plots=1):
             .rename('outage_rate')
             .reset_index()
         )
+        if previous is not None:
+            outage_h[outage_type] = (
+                ## Round before combining so float32 values are rounded as in the full calculation
+                pd.concat([
+                    previous_outputs[f'outage_{outage_type}_h'],
+                    outage_h[outage_type].round(3),
+                ])
+                .sort_values('h', kind='stable')
+                .reset_index(drop=True)
+            )
 
 
     #%%
@@ -1138,7 +1202,7 @@ def main(sw, reeds_path, inputs_case, periodtype='rep', make_plots=1):
         dr_shed_avail_all_weatheryears.index = hmap_allyrs.loc[hmap_allyrs.timestamp.isin(dr_shed_avail_all_weatheryears.index)].actual_h
         # Map actual periods to rep periods
         dr_shed_avail_all_weatheryears = dr_shed_avail_all_weatheryears.loc[
-                                            dr_shed_avail_all_weatheryears.index.map(lambda x: any([x.startswith(i) for i in rep_periods]))]
+            dr_shed_avail_all_weatheryears.index.str.rsplit('h', n=1).str[0].isin(rep_periods)]
         #Need to convert avail to a fraction - use max in each column as base
         # Normalize dr_shed_avail by values specified in inputs/demand_response/dr_shed_avail_scalar.csv
         dr_shed_avail_scalar = pd.read_csv(os.path.join(inputs_case,'dr_shed_avail_scalar.csv'))
@@ -1254,6 +1318,13 @@ def main(sw, reeds_path, inputs_case, periodtype='rep', make_plots=1):
         .groupby(['i','r','h'], as_index=False)
         .agg(aggmethod, *args)
     )
+    if previous is not None:
+        cf_vre = (
+            ## Round before combining so float32 values are rounded as in the full calculation
+            pd.concat([previous_outputs['cf_vre'], cf_vre.round(5)])
+            .sort_values(['i','r','h'])
+            .reset_index(drop=True)
+        )
 
     load_long = (
         load_h
@@ -501,8 +501,11 @@ def main(reeds_path, inputs_case):
     #    -- Data Write-Out --    #
     ##############################
 
-    reeds.io.write_profile_to_h5(load_profiles, 'load.h5', inputs_case)
-    reeds.io.write_profile_to_h5(recf.astype(np.float16), 'recf.h5', inputs_case)
+    ## Uncompressed profiles are memory-mapped by reeds.io.read_file() in later stages
+    contiguous = bool(int(sw.get('GSw_HourlyUncompressed', 0)))
+    reeds.io.write_profile_to_h5(load_profiles, 'load.h5', inputs_case, contiguous=contiguous)
+    reeds.io.write_profile_to_h5(
+        recf.astype(np.float16), 'recf.h5', inputs_case, contiguous=contiguous)
     resources.to_csv(os.path.join(inputs_case,'resources.csv'), index=False)
     peakload.to_csv(os.path.join(inputs_case,'peakload.csv'))
     ### Write peak demand by NERC region to use in firm net import constraint
@@ -510,7 +513,8 @@ def main(reeds_path, inputs_case):
         os.path.join(inputs_case,'peakload_nercr.csv'))
     ### Write the CSP solar field CF (no SM or storage) for hourly_writetimeseries.py
     cspcf = cspcf.rename(columns=dict(zip(cspcf.columns, [f'csp_{i}' for i in cspcf.columns])))
-    reeds.io.write_profile_to_h5(cspcf.astype(np.float32), 'csp.h5', inputs_case)
+    reeds.io.write_profile_to_h5(
+        cspcf.astype(np.float32), 'csp.h5', inputs_case, contiguous=contiguous)
     ### Overwrite the original hierarchy.csv based on capcredit_hierarchy_level
     hierarchy.rename_axis('*r').to_csv(
         os.path.join(inputs_case, 'hierarchy.csv'), index=True, header=True)
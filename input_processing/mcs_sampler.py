@@ -10,7 +10,8 @@ import os
 import sys
 import numpy as np
 import pandas as pd
-import copy
+import scipy.sparse
+import concurrent.futures
 import argparse
 import yaml
 import datetime
@@ -501,6 +502,20 @@ def get_dist_instructions(reeds_path: str, inputs_case: str, run_ReEDS: bool = T
     return df_input_dist_ex, aux_files
 
 
+def stack_ref_files(dist_files: list, columns: list) -> np.ndarray:
+    """
+    Stack the columns of the aligned reference files into a single array.
+
+    Args:
+        dist_files (list of pd.DataFrame): List of reference dataframes with the same index.
+        columns (list of str): Columns to stack.
+
+    Returns:
+        np.ndarray: Values of the reference files ([n_ref_files, n_rows, n_columns]).
+    """
+    return np.stack([df[columns].to_numpy() for df in dist_files])
+
+
 #%% ===========================================================================
 ### --- WEIGHT CALCULATION ---
 ### ===========================================================================
@@ -543,6 +558,7 @@ def get_all_region_weights(
     dist_params: list,
     hierarchy_file: pd.DataFrame,
     sample_hierarchy_lvl: str = 'country',
+    n_samples: int = 1,
 ) -> dict:
     """
     Get the weights for all unique regions in sample_hierarchy_lvl and map them to the
@@ -554,9 +570,10 @@ def get_all_region_weights(
         dist_params (list): The parameters for the distribution.
         hierarchy_file (pd.DataFrame): DataFrame with the hierarchy information from get_hierarchy_file (.)
         sample_hierarchy_lvl (str): The hierarchy level which will be assigned unique weights.
+        n_samples (int): The number of samples to generate for each region.
 
     Returns:
-        dict: Dictionary with the weights for each region.
+        dict: Dictionary with the weights for each region ([n_samples, n_ref_files|values]).
     """
 
     # Only needs to map weights to 'ba', and 'cendiv'
@@ -566,7 +583,7 @@ def get_all_region_weights(
 
     for region in unique_sample_levels:
         # Generate region weights based on the specified distribution
-        r_weights = get_region_weights(distribution, dist_params)
+        r_weights = get_region_weights(distribution, dist_params, n_samples)
 
         # Retrieve all BAs linked to the current region
         bas = hierarchy_file.loc[hierarchy_file[sample_hierarchy_lvl] == region, "ba"].values
@@ -611,7 +628,9 @@ class WeightCalculator:
 
         # Get all general region weights
         self.r_weights = get_all_region_weights(
-            self.distribution, self.dist_params, self.hierarchy_file, self.sample_hierarchy_lvl)
+            self.distribution, self.dist_params, self.hierarchy_file, self.sample_hierarchy_lvl,
+            n_samples,
+        )
         ## Include aggregated region weights
         if aux_files['sw']['GSw_RegionResolution'] == 'aggreg':
             self.r_weights = {
@@ -703,7 +722,10 @@ class WeightCalculator:
             file_name (str): Name of the file we are getting the weights for.
 
         Returns:
-            dict: Dictionary with the weights for each reference file and sample.
+            np.ndarray or dict: Weights for each sample and reference file. For switches.csv
+                this is [n_samples, n_ref_files]; for recf files it is a dictionary of
+                (sample, file) -> pd.DataFrame; for all other files it is
+                [n_samples, n_ref_files, n_rows (or 1 if the same for all rows), n_modifiable_columns].
         """
 
         self._validate_inputs(dist_files, sw_name, file_name)
@@ -736,12 +758,9 @@ class WeightCalculator:
             file_name (str): Name of the file we are getting the weights for.
 
         Returns:
-            dict: Dictionary with the weights for each reference file and sample.
+            np.ndarray: Weights for each sample and reference file, [n_samples, n_ref_files]
+                for switches.csv and [n_samples, n_ref_files, 1, n_modifiable_columns] otherwise.
         """
-        # Number of reference files/values. Sicne all sw_assignments
-        # have the same number of files, we can use the first one.
-        n_files = len(self.sample_group["sw_assignments"][0]) 
-
         # Identify relevant columns that exist in the hierarchy
         #Examples: p1, p2, New_England, ...(covers NG and LOAD)
         columns_in_hierarchy = [col for col in dist_files[0].keys() if col in set(self.r_weights.keys())]
@@ -750,44 +769,31 @@ class WeightCalculator:
         unique_sample_levels = self.hierarchy_file[self.sample_hierarchy_lvl].unique()
         single_r_weight = len(unique_sample_levels) == 1
 
-        # Dictionary to store computed weights for the modifiable columns
-        # (sample, file) -> pd.DataFrame
-        dict_df_weights = {}
-
-        # Handle the simple case where there is only one weight for all regions 
-        # (or no regions). 
+        # Handle the simple case where there is only one weight for all regions
+        # (or no regions).
         if single_r_weight:
             # Get the first region key
-            first_region = next(iter(self.r_weights)) 
+            first_region = next(iter(self.r_weights))
             weight_matrix = self.r_weights[first_region]
 
             if file_name == "switches.csv":
-                for s in range(self.n_samples):
-                    for f in range(n_files):
-                        dict_df_weights[(s, f)] = weight_matrix[s, f]
-            else:
-                for s in range(self.n_samples):
-                    for f in range(n_files):
-                        dict_df_weights[(s, f)] = pd.DataFrame(
-                                data=weight_matrix[s, f],
-                                columns=modifiable_columns,
-                                index=dist_files[0].index,
-                        )
+                return weight_matrix
+            # The same weight applies to every row and column
+            return np.repeat(
+                weight_matrix[:, :, np.newaxis, np.newaxis], len(modifiable_columns), axis=3)
 
         # Cases that have regional columns from columns_in_hierarchy
         # and the weights are not the same for all regions
-        elif not single_r_weight and len(columns_in_hierarchy) and file_name != "switches.csv" :
-            for s in range(self.n_samples):
-                for f in range(n_files):
-
-                    w_df_tmp = pd.DataFrame(
-                        {col: self.r_weights[col][s, f] for col in columns_in_hierarchy},  
-                        index=dist_files[0].index 
-                    )
-
-                    dict_df_weights[(s, f)] = w_df_tmp
-
-        return dict_df_weights
+        elif len(columns_in_hierarchy) and file_name != "switches.csv":
+            # Each modifiable column is a region with its own weight
+            return np.stack(
+                [self.r_weights[col] for col in modifiable_columns], axis=-1
+            )[:, :, np.newaxis, :]
+
+        raise ValueError(
+            f"Cannot apply region-based weights to {file_name} for switch {sw_name} "
+            "because it has no columns for the regions in the hierarchy"
+        )
 
     def _get_weights_supply_curve(
         self,
@@ -805,66 +811,47 @@ class WeightCalculator:
             sw_name (str): Name of the switch we are getting the weights for.
 
         Returns:
-            dict: Dictionary with the weights for each reference file and sample.
+            np.ndarray: Weights for each sample and reference file
+                ([n_samples, n_ref_files, n_rows, n_modifiable_columns]).
         """
-        # Dictionary to store computed weights for the modifiable columns
-        # (sample, file) -> pd.DataFrame
-        dict_df_weights = {}
-
-        # Store weights to use later in the recf files (CF files)
-        self.recf_weights_map [sw_name] = {}
-
-        # Create a new column with the class|region combination (like in the CF file)
-        dist_files_copy = [copy.deepcopy(df) for df in dist_files] 
-
-        for df in dist_files_copy:
-            df["old c|r"] = (
-                df["class"].astype(int).astype(str) + "|" + df["region"].astype(str)
+        # Region weight for each sample, file, and row
+        region_weights = self._get_row_region_weights(dist_files)
+
+        # For "capacity", we assign the raw region weight; for others, multiply by capacity.
+        capacity = np.stack([df["capacity"].values for df in dist_files])
+        capacity_weights = region_weights * capacity[np.newaxis]
+        weights = np.stack(
+            [
+                region_weights if col == "capacity" else capacity_weights
+                for col in modifiable_columns
+            ],
+            axis=-1,
+        ).astype(float)
+
+        # Save the intermediate weights for the recf files (These are weights multiplied by capacity).
+        # They are not normalized here because they will be normalized later, after
+        # values are aggregated according to the new c|r column from supply curves.
+        old_c_r = [
+            df["class"].astype(int).astype(str) + "|" + df["region"].astype(str)
+            for df in dist_files
+        ]
+        self.recf_weights_map[sw_name] = {
+            (s, f): pd.DataFrame(
+                {"old c|r": old_c_r[f], "weight": capacity_weights[s, f]},
+                index=dist_files[f].index,
             )
+            for s in range(self.n_samples)
+            for f in range(len(dist_files))
+        }
 
-        for s in range(self.n_samples):
-            for f, df in enumerate(dist_files_copy):
-                # Initial skeleton of the weights DataFrame
-                w_df_tmp = df[["region", "sc_point_gid", "old c|r"]]
-
-                # Create a mapping from each unique region to its corresponding weight
-                region_to_weight = {
-                    r: self.r_weights[r][s, f]
-                    for r in w_df_tmp["region"].unique()
-                }
-
-                # Compute the region weights for each row
-                region_weights = w_df_tmp["region"].map(region_to_weight).values
-
-                # Build a new DataFrame for the modifiable columns using a dict comprehension.
-                # For "capacity", we assign the raw region weight; for others, multiply by capacity.
-                modifiable_df = pd.DataFrame({
-                    col: (region_weights if col == "capacity" else region_weights * df["capacity"])
-                    for col in modifiable_columns
-                }, index=w_df_tmp.index)
-
-                # Join the modifiable columns back into the original DataFrame
-                w_df_tmp = w_df_tmp.join(modifiable_df)
-
-                # Save the intermediate weights for the recf files (These are weights multiplied by capacity)
-                self.recf_weights_map [sw_name][(s, f)] = w_df_tmp[["old c|r","class"]].rename(columns={"class": "weight"})
-
-                # Store in dictionary
-                dict_df_weights[(s, f)] = w_df_tmp.drop(columns=["old c|r"])
-
-            # Normalize the weights to sum to 1
-            # Divide the weights by the sum of the weights across all files
-            sum_weights = sum(dict_df_weights[(s, f)][modifiable_columns] for f in range(len(dist_files)))
-            sum_weights[sum_weights == 0] = 1
-
-            for f in range(len(dist_files)):
-                dict_df_weights[(s, f)][modifiable_columns] /= sum_weights
-                # recf_weights_map is not normalized here because it will be normalized later
-                # values need to be aggregated according to the new c|r column from supply curves
+        # Normalize the weights to sum to 1
+        # Divide the weights by the sum of the weights across all files
+        sum_weights = weights.sum(axis=1, keepdims=True)
+        sum_weights[sum_weights == 0] = 1
 
-        return dict_df_weights
+        return weights / sum_weights
 
-    def _get_weights_exog_prescribed(self, dist_files: list) -> dict:
+    def _get_weights_exog_prescribed(self, dist_files: list) -> np.ndarray:
         """
         Get the weights for exogenous capacity and prescribed builds files.
 
@@ -872,24 +859,29 @@ class WeightCalculator:
             dist_files (list of pd.DataFrame): List of reference dataframes (ajusted to have the same # of rows)
 
         Returns:
-            dict: Dictionary with the weights for each reference file and sample.
+            np.ndarray: Weights for the capacity column for each sample and reference file
+                ([n_samples, n_ref_files, n_rows, 1]).
         """
-        dict_df_weights = {}
-        for s in range(self.n_samples):
-            for f, df in enumerate(dist_files):
+        return self._get_row_region_weights(dist_files)[..., np.newaxis]
 
-                region_to_weight = {
-                    r: self.r_weights[r][s, f]
-                    for r in df["region"].unique()
-                }
+    def _get_row_region_weights(self, dist_files: list) -> np.ndarray:
+        """
+        Map the region weights to the rows of each reference file using its "region" column.
 
-                dict_df_weights[(s, f)] = pd.DataFrame(
-                    data=df["region"].map(region_to_weight).values,
-                    columns=["capacity"],
-                    index=df.index,
-                )
+        Args:
+            dist_files (list of pd.DataFrame): List of reference dataframes (ajusted to have the same # of rows)
 
-        return dict_df_weights
+        Returns:
+            np.ndarray: Weights for each sample, reference file, and row ([n_samples, n_ref_files, n_rows]).
+        """
+        region_weights = []
+        for f, df in enumerate(dist_files):
+            codes, regions = pd.factorize(df["region"])
+            # [n_samples, n_regions] -> [n_samples, n_rows]
+            region_weights.append(
+                np.stack([self.r_weights[r][:, f] for r in regions], axis=-1)[:, codes]
+            )
+        return np.stack(region_weights, axis=1)
 
     def _get_weights_recf(self, sw_name: str) -> dict:
         """
@@ -1231,18 +1223,20 @@ class MCS_Sampler:
         dist_files: list,
         modifiable_columns: list,
         n_decimals: dict|int,
-        dict_df_weights: dict,
+        weights: np.ndarray,
         sample_idx: int
     ):
         """
         Apply the distribution weights to the reference files. 
         Applicable to all cases but recf files and switches.csv.
+        All samples are computed at once from the stacked reference files.
 
         Args:
             dist_files (List[pd.DataFrame]): List of input DataFrames for sampling.
             modifiable_columns (List[str]): List of columns that can be directly multiplied by the weights.
             n_decimals (Dict[str, int]): Dictionary with the number of decimal places for each column.
-            dict_df_weights (Dict[Tuple[int, int], pd.DataFrame]): Dictionary with the weights for each reference file and sample.
+            weights (np.ndarray): Weights for each sample and reference file from
+                WeightCalculator.get_df_weights() ([n_samples, n_ref_files, n_rows or 1, n_modifiable_columns]).
             sample_idx (int): Index of the Sample_ID in sample_group.
 
         Update:
@@ -1253,18 +1247,31 @@ class MCS_Sampler:
         sw_name = self.sample_group['switch_names'][sample_idx]
         file_name = self.sample_group["runfiles_csv"][sample_idx]["filename"]
 
-        # Initialize samples with zero values
-        samples_sw = [dist_files[0].copy() for n in range(self.n_samples)]   
+        # [n_ref_files, n_rows, n_modifiable_columns]
+        ref_values = stack_ref_files(dist_files, modifiable_columns)
 
+        # Weighted sum over the reference files for all samples: [n_samples, n_rows, n_modifiable_columns]
+        values = np.zeros(
+            (self.n_samples,) + ref_values.shape[1:],
+            dtype=np.result_type(ref_values, weights),
+        )
+        for f in range(len(dist_files)):
+            values += ref_values[np.newaxis, f] * weights[:, f]
+
+        # Integer columns stay integers if the weights are also integers (discrete distributions)
+        dtypes = [
+            np.result_type(weights, *[df[col].dtype for df in dist_files])
+            for col in modifiable_columns
+        ]
+        for c, col in enumerate(modifiable_columns):
+            values[..., c] = values[..., c].round(n_decimals[col]+1)
+
+        samples_sw = []
         for s in range(self.n_samples):
-            # Initialize with zeros
-            samples_sw[s][modifiable_columns] = 0  
-
-            for f, df in enumerate(dist_files):
-                samples_sw[s][modifiable_columns] += df[modifiable_columns] * dict_df_weights[s, f][modifiable_columns] 
-
-            for col in modifiable_columns:
-                samples_sw[s][col] = samples_sw[s][col].round(n_decimals[col]+1)
+            sample = dist_files[0].copy()
+            for c, col in enumerate(modifiable_columns):
+                sample[col] = values[s, :, c].astype(dtypes[c], copy=False)
+            samples_sw.append(sample)
 
         if file_name in MCSConstants.SUPPLY_CURVE_FILES:
             adjusted_samples = self._adjust_supply_curve_sample(samples_sw, sw_name, sample_idx)
@@ -1311,18 +1318,33 @@ class MCS_Sampler:
         samples_sw = []  
 
         for s in range(self.n_samples):
-            sample_sw = defaultdict(int)
+            # New class|region columns in the order they first appear
+            new_c_r = pd.unique(np.concatenate([
+                weights[(s, f)].index.get_level_values("new c|r").values
+                for f in range(len(dist_files))
+            ]))
+            sample_sw = np.zeros((len(indexes), len(new_c_r)))
 
             for f, df in enumerate(dist_files):
-                # Get the old and new class|region combinations from weights[(s, f)]
-                for (new_c_r, old_c_r) in weights[(s, f)].index:
-                    sample_sw[new_c_r] += df[old_c_r] * weights[(s, f)].loc[(new_c_r,old_c_r)].values[0]
-
-            # Round numbers to 9 decimal places and allow a maxium values of 1
-            for new_c_r in sample_sw.keys():
-                sample_sw[new_c_r] = sample_sw[new_c_r].round(9).clip(0,1)
-            
-            samples_sw.append(pd.DataFrame(sample_sw, index=indexes))
+                # Sparse [old c|r, new c|r] matrix of weights from weights[(s, f)]
+                new_idx = pd.Index(new_c_r).get_indexer(
+                    weights[(s, f)].index.get_level_values("new c|r"))
+                old_idx, old_c_r = pd.factorize(
+                    weights[(s, f)].index.get_level_values("old c|r"))
+                weight_matrix = scipy.sparse.csr_matrix(
+                    (weights[(s, f)]["weight"].values, (old_idx, new_idx)),
+                    shape=(len(old_c_r), len(new_c_r)),
+                )
+                sample_sw += (weight_matrix.T @ df[old_c_r].values.T).T
+
+            # Keep the precision of the reference files, round numbers to 9 decimal
+            # places, and allow a maxium values of 1
+            samples_sw.append(
+                pd.DataFrame(
+                    sample_sw.astype(np.result_type(*dist_files[0].dtypes), copy=False),
+                    index=indexes, columns=new_c_r,
+                ).round(9).clip(0,1)
+            )
 
         self.samples[Sample_ID] = samples_sw
 
@@ -1330,7 +1352,7 @@ class MCS_Sampler:
         self,
         dist_files: list,
         n_decimals: dict,
-        dict_df_weights: dict,
+        dict_df_weights: np.ndarray,
         sample_idx: int,
     ):
         """
@@ -1339,7 +1361,7 @@ class MCS_Sampler:
         Args:
             dist_files (List[pd.DataFrame]): List of input DataFrames for sampling.
             n_decimals (Dict[str, int]): Dictionary with the number of decimal places for each column.
-            dict_df_weights (Dict[Tuple[int, int], pd.DataFrame]): Dictionary with the weights for each reference file and sample.
+            dict_df_weights (np.ndarray): Weights for each sample and assignment ([n_samples, n_assignments]).
             sample_idx (int): Index of the Sample_ID in sample_group.
 
         Update:
@@ -1458,7 +1480,7 @@ class MCS_Sampler:
 
             #In some small cases all dist_files are empty
             if not all([len(df) for df in dist_files]):
-                self.samples[sample_ID] = [dist_files[0] for s in range(self.n_samples)]
+                self.samples[sample_ID] = [dist_files[0].copy() for s in range(self.n_samples)]
                 continue
 
             # Extend/modify dist_files if necessary (e.g supply curve related data)
@@ -1467,15 +1489,15 @@ class MCS_Sampler:
             )
 
             # Get weights we will apply to the reference files
-            dict_df_weights = self.weight_calc.get_df_weights(dist_files, modifiable_columns, sw_name, file_name)
+            weights = self.weight_calc.get_df_weights(dist_files, modifiable_columns, sw_name, file_name)
 
             # Dispatch weight application based on file type.
             if file_name == "switches.csv":
-                self._apply_weights_switches_csv(dist_files, n_decimals, dict_df_weights, sample_idx)
+                self._apply_weights_switches_csv(dist_files, n_decimals, weights, sample_idx)
             elif file_name in MCSConstants.RECF_FILES:
                 self._apply_weights_recf(dist_files, sample_idx)
             else:
-                self._apply_weights_general(dist_files, modifiable_columns, n_decimals, dict_df_weights, sample_idx)
+                self._apply_weights_general(dist_files, modifiable_columns, n_decimals, weights, sample_idx)
 
         return self.samples
 
@@ -1483,14 +1505,72 @@ class MCS_Sampler:
 #%% ===========================================================================
 ### --- OUTPUT FUNCTIONS ---
 ### ===========================================================================
+def write_sample(
+    sample,
+    save_path: str,
+    sw_name: str,
+    file_name: str,
+    inputs_case: str,
+    aux_files: dict,
+    run_ReEDS: bool = True,
+):
+    """
+    Write a single sample to save_path
+
+    Args:
+        sample (pd.DataFrame or str): The sample (a str for switches.csv).
+        save_path (str): Path the sample is written to.
+        sw_name (str): Name of the sampled switch.
+        file_name (str): Name given by ReEDS to the sampled file.
+        inputs_case (str): Path to the inputs_case directory.
+        aux_files (dict): Dictionary with the auxiliary files needed for sampling.
+        run_ReEDS (bool): If True, the script is being used to run ReEDS. 
+            If False, the script is being used to test the samples before running ReEDS.
+    """
+    folder_path = os.path.dirname(save_path)  # Folder path without the file name
+    file_termination = os.path.splitext(save_path)[-1]  # File termination (.csv, .h5, etc.)
+
+    # For run_ReEDS==False, create folder if it does not exist
+    if (not run_ReEDS):
+        os.makedirs(folder_path, exist_ok=True)
+
+    # If we have a region-indexed file
+    if file_name in aux_files['region_files']['filename'].values:
+        # Get destination directory instead of save_path
+        dir_dst = os.path.dirname(save_path)
+        # Get the row of the region-indexed file
+        region_files_row = aux_files['region_files'].query('filename == @file_name').iloc[0]
+        copy_files.write_region_indexed_file(sample, dir_dst, aux_files['source_deflator_map'],
+                                                aux_files['sw'], region_files_row,
+                                                aux_files['regions_and_agglevel'],
+                                                aux_files['agglevel_variables'])
+
+    elif file_termination == '.csv':
+        # Not a region-indexed file but it is a CSV file
+        if file_name != 'switches.csv':
+            sample.to_csv(save_path, index=False)
+        else:
+            # Read the original switches.csv file
+            original_switches = pd.read_csv(save_path, header=None, index_col=0)
+            # Update the original switches.csv file with the new samples
+            original_switches.loc[sw_name] = sample
+            original_switches.to_csv(save_path, header=False)
+            if run_ReEDS:
+                # Create gswitches.csv and .txt files 
+                gswitches_path = reeds.io.write_gswitches(original_switches, inputs_case)
+                copy_files.scalar_csv_to_txt(gswitches_path)
+
+
 def write_samples(
     sample_group: pd.Series,
     samples_dict: dict,
     aux_files: dict,
     run_ReEDS: bool = True,
+    max_workers: int = None,
 ):
     """
-    Write the samples to the appropriate locations
+    Write the samples to the appropriate locations. Samples that are written to
+    separate files (one per {sample_n}) are written in parallel threads.
 
     Args:
         sample_group (pd.Series): Row of the input file with the sampling instructions.
@@ -1498,6 +1578,7 @@ def write_samples(
         aux_files (dict): Dictionary with the auxiliary files needed for sampling.
         run_ReEDS (bool): If True, the script is being used to run ReEDS. 
             If False, the script is being used to test the samples before running ReEDS.
+        max_workers (int, optional): Number of threads (defaults to ThreadPoolExecutor's default)
     """
 
     inputs_case = sample_group['inputs_case']
@@ -1507,44 +1588,32 @@ def write_samples(
         sw_name = sample_group['switch_names'][sample_idx]
         save_path_structure = sample_group['save_paths'][sample_idx]  # Where the samples will be copied to
         file_name = sample_group["file_names"][sample_idx]
+        save_paths = [save_path_structure.replace('{sample_n}', str(n)) for n in range(len(samples))]
 
-        for n, sample in enumerate(samples):
-            save_path = save_path_structure.replace('{sample_n}', str(n))
-            folder_path = os.path.dirname(save_path)  # Folder path without the file name
-            file_termination = os.path.splitext(save_path)[-1]  # File termination (.csv, .h5, etc.)
-
-            # For run_ReEDS==False, create folder if it does not exist
-            if (not run_ReEDS):
-                os.makedirs(folder_path, exist_ok=True)
-
-            # If we have a region-indexed file
-            if file_name in aux_files['region_files']['filename'].values:
-                # Get destination directory instead of save_path
-                dir_dst = os.path.dirname(save_path)
-                # Get the row of the region-indexed file
-                region_files_row = aux_files['region_files'].query('filename == @file_name').iloc[0]
-                copy_files.write_region_indexed_file(sample, dir_dst, aux_files['source_deflator_map'],
-                                                        aux_files['sw'], region_files_row,
-                                                        aux_files['regions_and_agglevel'],
-                                                        aux_files['agglevel_variables'])
-
-            elif file_termination == '.csv':
-                # Not a region-indexed file but it is a CSV file
-                if file_name != 'switches.csv':
-                    sample.to_csv(save_path, index=False)
-                else:
-                    # Read the original switches.csv file
-                    original_switches = pd.read_csv(save_path, header=None, index_col=0)
-                    # Update the original switches.csv file with the new samples
-                    original_switches.loc[sw_name] = sample
-                    original_switches.to_csv(save_path, header=False)
-                    if run_ReEDS:
-                        # Create gswitches.csv and .txt files 
-                        gswitches_path = reeds.io.write_gswitches(original_switches, inputs_case)
-                        copy_files.scalar_csv_to_txt(gswitches_path)
-                        
-                  
-            if run_ReEDS:  # Only print if running ReEDS optimization
+        # switches.csv is updated in place (along with gswitches in inputs_case), and samples
+        # without {sample_n} overwrite each other, so those are written in order
+        parallel = (
+            (file_name != 'switches.csv')
+            and (len(set(save_paths)) == len(save_paths) > 1)
+        )
+        if parallel:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(
+                        write_sample, sample, save_path, sw_name, file_name,
+                        inputs_case, aux_files, run_ReEDS,
+                    )
+                    for sample, save_path in zip(samples, save_paths)
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            for sample, save_path in zip(samples, save_paths):
+                write_sample(
+                    sample, save_path, sw_name, file_name, inputs_case, aux_files, run_ReEDS)
+
+        if run_ReEDS:  # Only print if running ReEDS optimization
+            for save_path in save_paths:
                 reduced_path = os.sep.join(save_path.strip(os.sep).split(os.sep)[-3:])
                 print(f"...Sample related to switch {sw_name} was copied to {reduced_path}")
 
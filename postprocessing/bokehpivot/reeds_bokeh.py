@@ -6,6 +6,8 @@ from __future__ import division
 import os
 import re
 import copy
+import json
+import hashlib
 import platform
 import pandas as pd
 import collections
@@ -25,6 +27,11 @@ sys.path.append(os.path.abspath(os.path.join(this_dir_path,'..','..')))
 from reeds.io import read_output
 
 logger = logging.getLogger('')
+#Folder for cached sources (see get_src). Caching is off (None) unless a report turns it on,
+#e.g. by setting SRC_CACHE_PATH = DEFAULT_SRC_CACHE_PATH. Cached files are not removed
+#automatically, so delete the folder to clear the cache.
+DEFAULT_SRC_CACHE_PATH = os.path.abspath(os.path.join(this_dir_path,'..','..','cache','bokehpivot'))
+SRC_CACHE_PATH = None
 #ReEDS globals
 #scenarios: each element is a dict with name of scenario and path to scenario
 #result_dfs: keys are ReEDS result names. Values are dataframes for that result (with 'scenario' as one of the columns)
@@ -290,6 +297,7 @@ def get_reeds_data(topwdg, scenarios, result_dfs):
     #For each selected scenario, retrieve the data from gdx if we don't already have it,
     #and update result_dfs with the new data.
     result_meta = reeds.results_meta[result]
+    new_dfs = []
     for i in topwdg['scenario_filter'].active:
         scenario_name = scenarios[i]['name']
         if scenario_name not in cur_scenarios:
@@ -313,11 +321,16 @@ def get_reeds_data(topwdg, scenarios, result_dfs):
                     for preprocess in reeds.columns_meta[col]['preprocess']:
                         df_scen_result[col] = preprocess(df_scen_result[col])
             df_scen_result['scenario'] = scenario_name
-            if result_dfs[result] is None:
-                result_dfs[result] = df_scen_result
-            else:
-                result_dfs[result] = pd.concat([result_dfs[result], df_scen_result]).reset_index(drop=True)
+            new_dfs.append(df_scen_result)
         logger.info('***Done fetching ' + str(result) + ' for ' + str(scenario_name) + '.')
+    #Combine the new scenarios with the ones we already had in a single concat
+    if new_dfs:
+        if result_dfs[result] is not None:
+            new_dfs.insert(0, result_dfs[result])
+        if len(new_dfs) == 1:
+            result_dfs[result] = new_dfs[0]
+        else:
+            result_dfs[result] = pd.concat(new_dfs).reset_index(drop=True)
 
     #fill missing values with 0:
     df = result_dfs[result]
@@ -331,7 +344,9 @@ def get_reeds_data(topwdg, scenarios, result_dfs):
 def get_src(scen, src):
     '''
     For a given scenario and data source, fetch gdx or csv data and do common
-    pre-processing (remove Eps, coerce numeric columns to numeric, and lowercase everything)
+    pre-processing (remove Eps, coerce numeric columns to numeric, and lowercase everything).
+    If SRC_CACHE_PATH is set, pre-processed sources are cached there and reused until the
+    source file changes.
 
     Args:
         scen (dict): Scenario dictionary. Keys are 'name' and 'path'.
@@ -341,6 +356,15 @@ def get_src(scen, src):
         df_src (pandas dataframe): A dataframe of the source
     '''
     filepath = scen['path'] + GLRD['output_subdir'] + src['file']
+    cachefile, stamp = get_src_cache_key(scen, src, filepath)
+    if cachefile is not None:
+        try:
+            cached_stamp, df_src = pd.read_pickle(cachefile)
+            if cached_stamp == stamp:
+                return df_src
+        except Exception:
+            #Missing or unreadable cache file, so read the source
+            pass
     if src['file'].endswith('.gdx'):
         data = gdx2py.par2list(filepath, src['param'])
         df_src = pd.DataFrame(data)
@@ -356,12 +380,44 @@ def get_src(scen, src):
         df_src = df_src.T
     if 'columns' in src:
         df_src.columns = src['columns']
-    df_src.replace('Eps',0, inplace=True)
-    df_src.replace('Undf',0, inplace=True)
-    df_src = df_src.apply(pd.to_numeric, errors='ignore')
+    #Only text columns can hold Eps/Undf or numbers stored as strings
+    obj_cols = [col for col, dtype in df_src.dtypes.items() if dtype == object]
+    if obj_cols:
+        df_src[obj_cols] = df_src[obj_cols].replace(['Eps','Undf'], 0).apply(pd.to_numeric, errors='ignore')
     df_src = df_to_lowercase(df_src)
+    if cachefile is not None:
+        #Write to a temporary file first in case another report is reading it
+        try:
+            os.makedirs(SRC_CACHE_PATH, exist_ok=True)
+            pd.to_pickle((stamp, df_src), cachefile + '.' + str(os.getpid()))
+            os.replace(cachefile + '.' + str(os.getpid()), cachefile)
+        except OSError as err:
+            logger.info('***Could not cache ' + filepath + ': ' + str(err))
     return df_src
 
+def get_src_cache_key(scen, src, filepath):
+    '''
+    Get the cache file for a scenario source and a stamp (size and modification time)
+    of the file the source is read from. Returns (None, None) if caching is disabled or
+    the source file doesn't exist.
+    '''
+    if SRC_CACHE_PATH is None:
+        return None, None
+    if src['file'].endswith('.gdx') or src['file'].endswith('.csv'):
+        candidates = [filepath]
+    else:
+        #read_output() reads from outputs.h5, falling back to the .csv file
+        candidates = [scen['path'] + GLRD['output_subdir'] + 'outputs.h5', filepath + '.csv']
+    for sourcefile in candidates:
+        if os.path.isfile(sourcefile):
+            stat = os.stat(sourcefile)
+            stamp = '{}|{}|{}'.format(os.path.abspath(sourcefile), stat.st_size, stat.st_mtime_ns)
+            key = hashlib.sha256(
+                (os.path.abspath(filepath) + json.dumps(src, sort_keys=True, default=str)).encode()
+            ).hexdigest()
+            return os.path.join(SRC_CACHE_PATH, key + '.pkl'), stamp
+    return None, None
+
 
 def process_reeds_data(topwdg, custom_sorts, custom_colors, result_dfs):
     '''
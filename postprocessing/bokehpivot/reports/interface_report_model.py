@@ -3,9 +3,12 @@ import sys
 import importlib
 import site
 
-def run_report(data_type, data_source, scenario_filter, diff, base, report_path, report_format, html_num, output_dir, auto_open):
+def run_report(data_type, data_source, scenario_filter, diff, base, report_path, report_format, html_num, output_dir, auto_open, use_cache='No'):
     # import reeds_bokeh here to since path may differ for different entry points
     import reeds_bokeh as rb
+    # 'Yes' to cache the processed outputs in ReEDS/cache/bokehpivot (delete it to clear the cache)
+    if use_cache == 'Yes':
+        rb.SRC_CACHE_PATH = rb.DEFAULT_SRC_CACHE_PATH
     report_dir = os.path.dirname(report_path)
     sys.path.insert(1, report_dir)
     report_name = os.path.basename(report_path)[:-3]
@@ -15,5 +18,7 @@ def run_report(data_type, data_source, scenario_filter, diff, base, report_path,
 if __name__ == '__main__':
     bokeh_path =  os.path.join(sys.path[0], '..')
     site.addsitedir(os.path.join(bokeh_path))
-    data_type, data_source, scenario_filter, diff, base, report_path, report_format, html_num, output_dir, auto_open = sys.argv[1:]
-    run_report(data_type, data_source, scenario_filter, diff, base, report_path, report_format, html_num, output_dir, auto_open)
\ No newline at end of file
+    data_type, data_source, scenario_filter, diff, base, report_path, report_format, html_num, output_dir, auto_open = sys.argv[1:11]
+    # Optional 11th argument: 'Yes' to cache the processed outputs
+    use_cache = sys.argv[11] if len(sys.argv) > 11 else 'No'
+    run_report(data_type, data_source, scenario_filter, diff, base, report_path, report_format, html_num, output_dir, auto_open, use_cache)
\ No newline at end of file
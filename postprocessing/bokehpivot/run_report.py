@@ -31,8 +31,11 @@ scenario_filter = 'all' #'all' or string of comma-separated names.
 html_num = 'one' #'one' or 'multiple'. 'one' will create one html file with all sections, and 'multiple' will create a separate html file for each section
 report_format = 'html,excel' #'html', 'excel', or 'csv', or any combination separated by commas
 auto_open = 'Yes' #'Yes' or 'No'. Automatically open the resulting report excel and html files when they are created.
+use_cache = 'No' #'Yes' or 'No'. Cache the processed outputs in ReEDS/cache/bokehpivot so later reports on the same runs are faster. Delete that folder to clear the cache.
 
 #DON'T EDIT THIS SECTION
+if use_cache == 'Yes':
+    rb.SRC_CACHE_PATH = rb.DEFAULT_SRC_CACHE_PATH
 report_dir = os.path.dirname(report_path)
 sys.path.insert(1, report_dir)
 report_name = os.path.basename(report_path)[:-3]
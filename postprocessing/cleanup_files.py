@@ -11,6 +11,8 @@ file_levels = {
     ## Just duplicates and uncommonly used files
     0: [
         'inputs_case_original',
+        ## Uncompressed copies of hourly profiles used for stress period iterations
+        os.path.join('inputs_case', 'hourly_cache'),
         os.path.join('inputs_case', 'load_hourly.h5'),
         os.path.join('inputs_case', 'recf_csp.h5'),
         os.path.join('inputs_case', 'recf_distpv.h5'),
@@ -70,6 +70,11 @@ parser.add_argument(
 parser.add_argument(
     '--nowrap', '-w', action='store_true',
     help="Don't wrap subplot titles")
+parser.add_argument(
+    '--cache', '-c', action='store_true',
+    help=('Cache the outputs read from each case in ReEDS/cache/compare_cases (and the '
+          'bokehpivot sources in ReEDS/cache/bokehpivot) to speed up later comparisons; '
+          'delete those folders to clear the cache'))
 
 args = parser.parse_args()
 caselist = args.caselist
@@ -88,6 +93,7 @@ detailed = args.detailed
 forcemulti = args.forcemulti
 lesslabels = args.lesslabels
 nowrap = args.nowrap
+cache = args.cache
 interactive = False
 
 #%% Inputs for testing
@@ -269,7 +275,8 @@ if not skipbp:
     df_scenarios.to_csv(scenarios_path, index=False)
     call_str = (
         f'{start_str}python "{bp_py_file}" "ReEDS 2.0" "{scenarios_path}" all ' +
-        f'{add_diff} "{basecase}" "{report_path}" "html,excel" one "{bp_outpath}" {auto_open}'
+        f'{add_diff} "{basecase}" "{report_path}" "html,excel" one "{bp_outpath}" {auto_open} '
+        + ('Yes' if cache else 'No')
     )
     sp.Popen(call_str, shell=True)
 
@@ -381,9 +388,33 @@ dictin_sw = {case: reeds.io.get_switches(cases[case]) for case in cases}
 
 hierarchy = {case: reeds.io.get_hierarchy(cases[case]) for case in cases}
 
+### Read outputs from outputs.h5 for all cases at once
+valnames = {
+    'emit_nat': 'ton',
+    'tran_out': 'MW',
+    'cap': 'MW',
+    'cap_firm': 'MW',
+    'gen_h': 'GW',
+    'gen_h_stress': 'GW',
+    'tran_flow_stress': 'GW',
+    'load_stress': 'GW',
+    'captrade': 'GW',
+}
+print('Reading outputs')
+dictin_outputs = reeds.io.read_outputs(
+    cases,
+    (
+        ['error_check', 'emit_nat', 'tran_out', 'cap', 'cap_firm']
+        + (['gen_h', 'gen_h_stress', 'tran_flow_stress', 'load_stress', 'captrade']
+           if detailed else [])
+    ),
+    valnames=valnames,
+    cachepath=(os.path.join(reeds_path, 'cache', 'compare_cases') if cache else None),
+)
+
 dictin_error = {}
 for case in tqdm(cases, desc='system cost error'):
-    dictin_error[case] = reeds.io.read_output(cases[case], 'error_check').set_index('*').squeeze(1)
+    dictin_error[case] = dictin_outputs['error_check'][case].set_index('*').squeeze(1)
 
 dictin_cap = {}
 for case in tqdm(cases, desc='national capacity'):
@@ -450,9 +481,7 @@ for case in tqdm(cases, desc='annual system cost'):
 
 dictin_emissions = {}
 for case in tqdm(cases, desc='national emissions'):
-    dictin_emissions[case] = (
-        reeds.io.read_output(cases[case], 'emit_nat', valname='ton')
-    )
+    dictin_emissions[case] = dictin_outputs['emit_nat'][case]
     if int(dictin_sw[case].get('GSw_Upstream', 0)):
         dictin_emissions[case] = dictin_emissions[case].groupby(['e','t']).ton.sum().unstack('e')
     else:
@@ -470,7 +499,7 @@ for case in tqdm(cases, desc='national transmission'):
 
 dictin_trans_r = {}
 for case in tqdm(cases, desc='regional transmission'):
-    dictin_trans_r[case] = reeds.io.read_output(cases[case], 'tran_out', valname='MW')
+    dictin_trans_r[case] = dictin_outputs['tran_out'][case]
     for _level in ['interconnect','transreg','transgrp','st']:
         dictin_trans_r[case][f'inter_{_level}'] = (
             dictin_trans_r[case].r.map(hierarchy[case][_level])
@@ -479,7 +508,7 @@ for case in tqdm(cases, desc='regional transmission'):
 
 dictin_cap_r = {}
 for case in tqdm(cases, desc='regional capacity'):
-    dictin_cap_r[case] = reeds.io.read_output(cases[case], 'cap', valname='MW')
+    dictin_cap_r[case] = dictin_outputs['cap'][case]
     ### Simplify techs
     dictin_cap_r[case].i = dictin_cap_r[case].i.map(lambda x: renametechs.get(x,x))
     dictin_cap_r[case].i = dictin_cap_r[case].i.str.lower().map(lambda x: techmap.get(x,x))
@@ -487,7 +516,7 @@ for case in tqdm(cases, desc='regional capacity'):
 
 dictin_cap_firm = {}
 for case in tqdm(cases, desc='firm capacity'):
-    dictin_cap_firm[case] = reeds.io.read_output(cases[case], 'cap_firm', valname='MW')
+    dictin_cap_firm[case] = dictin_outputs['cap_firm'][case]
     ### Simplify techs
     dictin_cap_firm[case].i = reedsplots.simplify_techs(dictin_cap_firm[case].i)
     dictin_cap_firm[case] = dictin_cap_firm[case].groupby(['i','r','ccseason','t'], as_index=False).MW.sum()
@@ -585,7 +614,7 @@ if detailed:
     ### Timeslice generation by region
     dictin_gen_h = {}
     for case in tqdm(cases, desc='gen_h'):
-        dictin_gen_h[case] = reeds.io.read_output(cases[case], 'gen_h', valname='GW')
+        dictin_gen_h[case] = dictin_outputs['gen_h'][case]
         dictin_gen_h[case].GW /= 1e3
         dictin_gen_h[case].i = reedsplots.simplify_techs(dictin_gen_h[case].i)
         dictin_gen_h[case] = dictin_gen_h[case].groupby(['i','r','h','t'], as_index=False).GW.sum()
@@ -621,7 +650,7 @@ if detailed:
     ### Stress period dispatch
     dictin_gen_h_stress = {}
     for case in tqdm(cases, desc='gen_h_stress'):
-        dictin_gen_h_stress[case] = reeds.io.read_output(cases[case], 'gen_h_stress', valname='GW')
+        dictin_gen_h_stress[case] = dictin_outputs['gen_h_stress'][case]
         dictin_gen_h_stress[case].GW /= 1e3
         dictin_gen_h_stress[case].i = reedsplots.simplify_techs(dictin_gen_h_stress[case].i)
         ## Separate charge and discharge
@@ -632,14 +661,13 @@ if detailed:
     ### Stress period flows
     dictin_tran_flow_stress = {}
     for case in tqdm(cases, desc='tran_flow_stress'):
-        dictin_tran_flow_stress[case] = reeds.io.read_output(
-            cases[case], 'tran_flow_stress', valname='GW')
+        dictin_tran_flow_stress[case] = dictin_outputs['tran_flow_stress'][case]
         dictin_tran_flow_stress[case].GW /= 1e3
 
     ### Stress period load
     dictin_load_stress = {}
     for case in tqdm(cases, desc='load_stress'):
-        dictin_load_stress[case] = reeds.io.read_output(cases[case], 'load_stress', valname='GW')
+        dictin_load_stress[case] = dictin_outputs['load_stress'][case]
         dictin_load_stress[case].GW /= 1e3
 
     ### Peak load (for capacity credit)
@@ -654,7 +682,7 @@ if detailed:
     ### Capacity credit PRMTRADE
     dictin_prmtrade = {}
     for case in tqdm(cases, desc='prmtrade'):
-        dictin_prmtrade[case] = reeds.io.read_output(cases[case], 'captrade', valname='GW')
+        dictin_prmtrade[case] = dictin_outputs['captrade'][case]
         dictin_prmtrade[case].GW /= 1e3
 
 
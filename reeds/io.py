@@ -3,6 +3,9 @@ import os
 import sys
 import re
 import datetime
+import hashlib
+import contextlib
+import concurrent.futures
 import h5py
 import ctypes
 import numpy as np
@@ -291,12 +294,116 @@ def get_dfmap(case=None, levels=None, exclude_water_areas=False):
 
 
 ### Read files from a ReEDS case
+## Columns that are renamed in read_output()
+OUTPUT_COLUMN_RENAMES = {'allh':'h', 'allt':'t', 'eall':'e'}
+
+
+def _decode_h5_strings(values, vocab=None, categorical=False):
+    """
+    Decode a byte-string column read from an .h5 file.
+    If vocab is provided, values are integer codes into vocab (dictionary encoding);
+    otherwise values are fixed-width byte strings, which are factorized first.
+    Either way, each unique value is only decoded once.
+    """
+    if vocab is None:
+        vocab, values = np.unique(values, return_inverse=True)
+    uniques = pd.Index(vocab).str.decode('utf-8')
+    if categorical:
+        return pd.Categorical.from_codes(values, categories=uniques)
+    return uniques.values.take(values)
+
+
+def _get_h5_row_mask(values, allowed, vocab=None):
+    """
+    Get a boolean mask of rows where values (as stored in an .h5 file) are in allowed.
+    Strings are compared in their stored (encoded) form so rows are never decoded.
+    """
+    if vocab is not None:
+        allowed_codes = np.flatnonzero(
+            pd.Index(vocab).str.decode('utf-8').isin([str(i) for i in allowed]))
+        return np.isin(values, allowed_codes)
+    elif values.dtype.kind == 'S':
+        return np.isin(values, [str(i).encode('utf-8') for i in allowed])
+    else:
+        return np.isin(values, allowed)
+
+
+def read_h5_output_group(
+    group,
+    columns: list = None,
+    filters: dict = None,
+    any_filters: dict = None,
+    categorical: bool = False,
+) -> pd.DataFrame:
+    """
+    Read a group written by reeds.io.write_output_to_h5() from an open h5py.File.
+
+    Args:
+        group: h5py.Group for one output
+        columns (optional): Subset of columns to read (as stored in the .h5 file)
+        filters (optional): {column: list of allowed values}; rows are kept if they
+            match all filters. Filter columns are read first and only the matching
+            rows of the other columns are read.
+        any_filters (optional): Same as filters, but rows are kept if they match any
+            of the filters (used for r/rr region filters)
+        categorical (optional): If True, return string columns as categoricals
+
+    Returns:
+        pd.DataFrame
+    """
+    allcolumns = [i.decode() for i in list(group['columns'])]
+    columns = allcolumns if columns is None else [c for c in allcolumns if c in columns]
+    vocabs = group['_vocab'] if '_vocab' in group else {}
+
+    def get_vocab(col):
+        return vocabs[col][...] if col in vocabs else None
+
+    ### Get the rows to read
+    mask = None
+    raw = {}
+    for _filters, combine in [(filters, np.logical_and), (any_filters, np.logical_or)]:
+        if not _filters:
+            continue
+        _mask = None
+        for col, allowed in _filters.items():
+            if col not in allcolumns:
+                raise ValueError(f"Can't filter on {col}: not in {allcolumns}")
+            raw[col] = group[col][...]
+            colmask = _get_h5_row_mask(raw[col], allowed, get_vocab(col))
+            _mask = colmask if _mask is None else combine(_mask, colmask)
+        mask = _mask if mask is None else (mask & _mask)
+    if mask is not None:
+        rows = np.flatnonzero(mask)
+        ## Only read the span of rows that contains matches
+        span = slice(rows[0], rows[-1] + 1) if len(rows) else slice(0, 0)
+        submask = mask[span]
+
+    ### Read the data
+    dictout = {}
+    for col in columns:
+        if mask is None:
+            values = group[col][...]
+        elif col in raw:
+            values = raw[col][mask]
+        else:
+            values = group[col][span][submask]
+        vocab = get_vocab(col)
+        if (vocab is not None) or (values.dtype.kind == 'S'):
+            values = _decode_h5_strings(values, vocab=vocab, categorical=categorical)
+        dictout[col] = values
+
+    return pd.DataFrame(dictout, columns=columns)
+
+
 def read_output(
     case: str,
     filename: str,
     valname: str = None,
     low_memory: bool = False,
     r_filter: list = None,
+    columns: list = None,
+    filters: dict = None,
+    h5file: h5py.File = None,
 ) -> pd.DataFrame:
     """
     Read a ReEDS output csv file or a key from outputs.h5.
@@ -311,10 +418,19 @@ def read_output(
         valname (optional): If provided, rename 'Value' column to {valname}
         low_memory (optional): If True, reduce memory usage by changing datatypes
         r_filter (optional): List of regions to filter on
+        columns (optional): List of columns to read (after renaming allh/allt/eall
+            to h/t/e but before renaming Value to {valname}).
+            Only these columns are read from outputs.h5.
+        filters (optional): Dictionary of {column: list of values to keep}.
+            For outputs.h5 the filters are applied before the other columns are read.
+        h5file (optional): outputs.h5 already opened with h5py, to avoid reopening it
+            when reading several outputs from the same case
         
     Returns:
         pd.DataFrame
     """
+    ## Map column names back to their names in the output files
+    original_names = {v: k for k, v in OUTPUT_COLUMN_RENAMES.items()}
     if case.endswith('.h5'):
         h5path = case
     else:
@@ -322,13 +438,34 @@ def read_output(
     if os.path.exists(h5path) and not filename.endswith('.csv'):
         key = os.path.basename(filename)
         try:
-            with h5py.File(h5path, 'r') as f:
-                columns = [i.decode() for i in list(f[key]['columns'])]
-                df = pd.DataFrame({col: f[key][col] for col in columns})
-            for col in df:
-                if df[col].dtype == 'O':
-                    df[col] = df[col].str.decode('utf-8')
-        except KeyError:
+            with (
+                contextlib.nullcontext(h5file) if h5file is not None
+                else h5py.File(h5path, 'r')
+            ) as f:
+                group = f[key]
+                allcolumns = [i.decode() for i in list(group['columns'])]
+                def stored(col):
+                    return original_names[col] if original_names.get(col) in allcolumns else col
+                ## Push the region filter down to the h5 read
+                any_filters = None
+                if r_filter is not None:
+                    any_filters = {c: r_filter for c in ['r', 'rr'] if c in allcolumns}
+                    if not len(any_filters):
+                        raise ValueError(
+                            f"The region column was not found for {filename} file, "
+                            "but a region filter was requested."
+                        )
+                df = read_h5_output_group(
+                    group,
+                    columns=(None if columns is None else [stored(c) for c in columns]),
+                    filters=(None if filters is None
+                             else {stored(c): v for c, v in filters.items()}),
+                    any_filters=any_filters,
+                    categorical=low_memory,
+                )
+            r_filter = None
+            filters = None
+        except KeyError as err:
             ## Empty dataframes aren't written to h5 file, so make one ourselves
             e_report_params = pd.read_csv(
                 os.path.join(case, 'e_report_params.csv'),
@@ -338,14 +475,23 @@ def read_output(
                 e_report_params.param.map(lambda x: x.split('(')[0]) == key, 'param'
             ].squeeze()
             if not len(_index):
-                raise KeyError(f"{filename} is not in {h5path}")
+                raise KeyError(f"{filename} is not in {h5path}") from err
             index = _index.split('(')[-1].strip(')').split(',')
             df = pd.DataFrame(columns=index + ['Value'])
     else:
         _filename = filename if filename.endswith('.csv') else filename + '.csv'
         df = pd.read_csv(os.path.join(case, 'outputs', _filename))
 
-    df = df.rename(columns={'allh':'h', 'allt':'t', 'eall':'e'})
+    df = df.rename(columns=OUTPUT_COLUMN_RENAMES)
+
+    ## Filters that weren't applied during the h5 read
+    if filters is not None:
+        for col, allowed in filters.items():
+            df = df.loc[df[col].isin(allowed)]
+        df = df.reset_index(drop=True)
+
+    if columns is not None:
+        df = df[[c for c in columns if c in df]]
 
     ## If desired, change datatypes to reduce memory use
     if low_memory:
@@ -376,6 +522,96 @@ def read_output(
     return df
 
 
+def read_case_outputs(case, filenames, valnames=None, cachepath=None):
+    """
+    Read several outputs for one ReEDS case, opening outputs.h5 once.
+    Arguments are as for read_outputs(); returns {filename: pd.DataFrame}.
+    """
+    valnames = {} if valnames is None else valnames
+    h5path = os.path.join(case, 'outputs', 'outputs.h5')
+    dfs = {}
+    ## Cache outputs read from outputs.h5 in a folder for this case, and clear it if
+    ## outputs.h5 has changed since the cache was written
+    casecache = None
+    if (cachepath is not None) and os.path.exists(h5path):
+        stat = os.stat(h5path)
+        casecache = os.path.join(
+            cachepath, hashlib.sha256(os.path.abspath(h5path).encode()).hexdigest()[:16])
+        stamp = f'{os.path.abspath(h5path)}|{stat.st_size}|{stat.st_mtime_ns}'
+        stampfile = os.path.join(casecache, 'stamp.txt')
+        try:
+            with open(stampfile, 'r') as f:
+                current = (f.read() == stamp)
+        except FileNotFoundError:
+            current = False
+        if not current:
+            os.makedirs(casecache, exist_ok=True)
+            for oldfile in glob(os.path.join(casecache, '*.pkl')):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(oldfile)
+            with open(stampfile, 'w') as f:
+                f.write(stamp)
+        for filename in filenames:
+            try:
+                dfs[filename] = pd.read_pickle(
+                    os.path.join(casecache, f'{filename}_{valnames.get(filename)}.pkl'))
+            except FileNotFoundError:
+                pass
+
+    toread = [filename for filename in filenames if filename not in dfs]
+    if not toread:
+        return dfs
+    with (
+        h5py.File(h5path, 'r') if os.path.exists(h5path)
+        else contextlib.nullcontext()
+    ) as h5file:
+        for filename in toread:
+            dfs[filename] = read_output(
+                case, filename, valname=valnames.get(filename), h5file=h5file)
+            if (casecache is not None) and not filename.endswith('.csv'):
+                ## Write to a temporary file first in case another process is reading it
+                cachefile = os.path.join(casecache, f'{filename}_{valnames.get(filename)}.pkl')
+                dfs[filename].to_pickle(f'{cachefile}.{os.getpid()}')
+                os.replace(f'{cachefile}.{os.getpid()}', cachefile)
+    return dfs
+
+
+def read_outputs(cases, filenames, valnames=None, cachepath=None, max_workers=None):
+    """
+    Read several outputs for several ReEDS cases.
+    Each case's outputs.h5 is only opened once, and cases are read in parallel threads.
+
+    Args:
+        cases: Dictionary of {casename: path to ReEDS run folder}
+        filenames: List of output names to read (as for read_output())
+        valnames (optional): Dictionary of {filename: valname} to rename 'Value' columns
+        cachepath (optional): Folder in which to cache outputs read from outputs.h5.
+            Cached outputs are reused until outputs.h5 is modified.
+        max_workers (optional): Number of threads (defaults to ThreadPoolExecutor's default)
+
+    Returns:
+        dict: {filename: {casename: pd.DataFrame}}
+    """
+    ## Read each run folder once even if it's listed under several names
+    casepaths = list(dict.fromkeys(cases.values()))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            casepath: executor.submit(
+                read_case_outputs, casepath, filenames, valnames, cachepath)
+            for casepath in casepaths
+        }
+        dfs = {casepath: futures[casepath].result() for casepath in casepaths}
+    ## Copy outputs for repeated run folders since callers may modify them in place
+    outputs = {filename: {} for filename in filenames}
+    seen = set()
+    for case, casepath in cases.items():
+        for filename in filenames:
+            df = dfs[casepath][filename]
+            outputs[filename][case] = df.copy() if casepath in seen else df
+        seen.add(casepath)
+    return outputs
+
+
 def get_report_sheetmap(case):
     """
     Create a dictionary of report.xlsx fields to excel sheet names
@@ -548,11 +784,50 @@ def get_scalars(case=None, full=False):
     return scalars
 
 
+def read_h5_dataset(dataset, filename):
+    """Return the values of an h5py dataset.
+
+    Datasets that are stored contiguously without compression or filters (as written by
+    write_profile_to_h5(..., contiguous=True)) are returned as a copy-on-write memory map of
+    {filename}, so only the pages that are used are read from disk (and modifying the
+    values doesn't change the file). Other datasets are read into memory.
+    """
+    if not isinstance(dataset, h5py.Dataset):
+        ## Groups (e.g. from pandas HDFStore files) raise a TypeError, as handled by read_file()
+        return dataset[:]
+    offset = dataset.id.get_offset()
+    if (
+        (dataset.chunks is None)
+        and (dataset.compression is None)
+        and (offset is not None)
+        and (dataset.dtype.kind in 'fiu')
+        and dataset.size
+    ):
+        return np.memmap(
+            filename, mode='c', dtype=dataset.dtype, shape=dataset.shape, offset=offset)
+    return dataset[:]
+
+
+def is_contiguous_h5(filename, datakey='data'):
+    """Return True if the {datakey} dataset of {filename} can be memory-mapped"""
+    try:
+        with h5py.File(filename, 'r') as f:
+            dataset = f[datakey]
+            return (
+                (dataset.chunks is None)
+                and (dataset.compression is None)
+                and (dataset.id.get_offset() is not None)
+            )
+    except (OSError, KeyError, AttributeError):
+        return False
+
+
 def read_h5py_file(filename, decode_strings=False):
     """Return dataframe object for a h5py file.
 
     This function returns a pandas dataframe of a h5py file. If the file has multiple dataset on it
     means it has yearly index.
+    Uncompressed contiguous data are memory-mapped instead of read (see read_h5_dataset()).
 
     Parameters
     ----------
@@ -578,7 +853,7 @@ def read_h5py_file(filename, decode_strings=False):
 
         if datakey in keys:
             # load data
-            df = pd.DataFrame(f[datakey][:])
+            df = pd.DataFrame(read_h5_dataset(f[datakey], filename), copy=False)
         else:
             df = pd.DataFrame()
 
@@ -590,15 +865,20 @@ def read_h5py_file(filename, decode_strings=False):
                 .values
             )
 
-        # add any index values
+        # add any index values (building the index separately so the data aren't copied)
         idx_cols = [c for c in keys if re.match('index_[0-9]', c)]
         if len(idx_cols) > 0:
             idx_cols.sort()
+            dfindex = pd.DataFrame(index=df.index if len(df.columns) else None)
             for idx_col in idx_cols:
-                df[idx_col] = pd.Series(f[idx_col]).values
-                if str(df[idx_col].dtype).startswith('|S') and decode_strings:
-                    df[idx_col] = df[idx_col].str.decode('utf-8')
-            df = df.set_index(idx_cols)
+                dfindex[idx_col] = pd.Series(f[idx_col]).values
+                if str(dfindex[idx_col].dtype).startswith('|S') and decode_strings:
+                    dfindex[idx_col] = dfindex[idx_col].str.decode('utf-8')
+            index = dfindex.set_index(idx_cols).index
+            if len(df.columns):
+                df.index = index
+            else:
+                df = pd.DataFrame(index=index)
 
         # add index and column names if supplied
         if 'index_names' in keys:
@@ -617,7 +897,7 @@ def read_h5py_file(filename, decode_strings=False):
     return df
 
 
-def read_file(filename, parse_timestamps=False, decode_strings=False):
+def read_file(filename, parse_timestamps=False, decode_strings=False, period_index=None):
     """Return dataframe object of input file for multiple file formats.
 
     This function read multiple file formats for h5 file sand returns a dataframe from the file.
@@ -626,6 +906,10 @@ def read_file(filename, parse_timestamps=False, decode_strings=False):
     ----------
     filename
         File path to read
+    period_index
+        GSw_HourlyType ('day', 'wek', or 'year'). If provided, integer 'period' and
+        'periodhour' index levels are appended to the 'datetime' index level
+        (see reeds.timeseries.add_period_index()). Implies parse_timestamps=True.
 
     Returns
     -------
@@ -652,34 +936,108 @@ def read_file(filename, parse_timestamps=False, decode_strings=False):
         df = pd.read_hdf(filename)
 
     # parse timestamps if specified and if there is a datetime index
-    if parse_timestamps and ('datetime' in df.index.names):
+    if (parse_timestamps or period_index) and ('datetime' in df.index.names):
         if isinstance(df.index.get_level_values('datetime')[0], bytes):
             unique_indices = df.index.get_level_values('datetime').unique()
             index2datetime = dict(zip(
                 unique_indices,
                 pd.to_datetime(unique_indices.str.decode('utf-8'), format='ISO8601')
             ))
-            df['datetime'] = df.index.get_level_values('datetime').map(index2datetime)
+            ## Replace the index directly (instead of through a column) so the data aren't copied
+            datetimes = df.index.get_level_values('datetime').map(index2datetime)
             if isinstance(df.index, pd.MultiIndex):
-                df = df.droplevel('datetime').set_index('datetime', append=True)
+                levels = [i for i in df.index.names if i != 'datetime']
+                df.index = pd.MultiIndex.from_arrays(
+                    [df.index.get_level_values(i) for i in levels] + [datetimes],
+                    names=levels + ['datetime'],
+                )
             else:
-                df = df.set_index('datetime')
+                df.index = datetimes.rename('datetime')
+
+    if period_index and ('datetime' in df.index.names):
+        df = reeds.timeseries.add_period_index(df, GSw_HourlyType=period_index)
 
     # All values being NaN indicates that the region filtering in copy_files.py removed all
     # data, leaving an empty dataframe.
     # Return an empty dataframe with the original file's index if all values are NaN
-    if all(df.isnull().all()):
+    # (checking the first row first to avoid scanning the full data in the usual case)
+    if ((not len(df)) or df.iloc[0].isnull().all()) and all(df.isnull().all()):
         df = df.drop(columns=df.columns)
         return df
 
     # NOTE: Some files are saved as float16, so we cast to float32 to prevent issues with
-    # large/small numbers
-    numeric_cols = [c for c in df if is_float_dtype(df[c].dtype)]
-    df = df.astype({column: np.float32 for column in numeric_cols})
+    # large/small numbers. Columns that are already float32 are left as-is so memory-mapped
+    # data aren't copied.
+    numeric_cols = [
+        c for c in df if is_float_dtype(df[c].dtype) and (df[c].dtype != np.float32)
+    ]
+    if len(numeric_cols):
+        df = df.astype({column: np.float32 for column in numeric_cols})
 
     return df
 
 
+def read_file_mmap(filename, cachepath, parse_timestamps=False, period_index=None):
+    """Read a single-dtype profile file through an uncompressed, memory-mapped copy.
+
+    The first call reads {filename} with read_file() and saves the values to
+    {cachepath}/{name}.npy and the index and columns to {cachepath}/{name}.pkl.
+    Later calls (from this or any other process) map the .npy file into memory as long as
+    the cache is newer than {filename}, so selecting a few hours doesn't require
+    decompressing the whole file. Files written with write_profile_to_h5(..., contiguous=True)
+    are memory-mapped directly and not copied.
+
+    Parameters
+    ----------
+    filename
+        File path to read
+    cachepath
+        Folder in which to keep the uncompressed copy
+    parse_timestamps, period_index
+        Passed to read_file()
+
+    Returns
+    -------
+    pd.DataFrame
+        Dataframe backed by a copy-on-write memory map (selections from it are copies).
+        Files that are empty or have mixed dtypes are returned without caching.
+    """
+    _parse_timestamps = parse_timestamps or bool(period_index)
+    name = os.path.splitext(os.path.basename(filename))[0] + (
+        '_timestamps' if _parse_timestamps else ''
+    )
+    valuesfile = os.path.join(cachepath, f'{name}.npy')
+    labelsfile = os.path.join(cachepath, f'{name}.pkl')
+    if is_contiguous_h5(filename):
+        ## read_file() already memory-maps uncompressed files, so there's no need for a copy
+        df = read_file(filename, parse_timestamps=_parse_timestamps)
+    elif (
+        os.path.isfile(labelsfile)
+        and (os.path.getmtime(labelsfile) >= os.path.getmtime(filename))
+    ):
+        index, columns = pd.read_pickle(labelsfile)
+        values = np.load(valuesfile, mmap_mode='c')
+        df = pd.DataFrame(values, index=index, columns=columns, copy=False)
+    else:
+        df = read_file(filename, parse_timestamps=_parse_timestamps)
+        if (not df.empty) and (len(df.dtypes.unique()) == 1):
+            ## Write to temporary files first so other processes never see a partial cache.
+            ## The labels are written last since they indicate that the cache is complete.
+            os.makedirs(cachepath, exist_ok=True)
+            for outfile, write in [
+                (valuesfile, lambda f: np.save(f, np.ascontiguousarray(df.values))),
+                (labelsfile, lambda f: pd.to_pickle((df.index, df.columns), f)),
+            ]:
+                tempfile = f'{outfile}.{os.getpid()}'
+                with open(tempfile, 'wb') as f:
+                    write(f)
+                os.replace(tempfile, outfile)
+
+    if period_index and ('datetime' in df.index.names):
+        df = reeds.timeseries.add_period_index(df, GSw_HourlyType=period_index)
+    return df
+
+
 def read_h5_groups(filepath):
     """
     Read a .h5 file with the following format,
@@ -709,10 +1067,13 @@ def read_h5_groups(filepath):
             indexname = f[group].attrs['index']
             index = pd.Index(f[group][indexname], name=indexname)
             columns = [i for i in _columns if i != f[group].attrs['index']]
+            vocabs = f[group]['_vocab'] if '_vocab' in f[group] else {}
             _dfout = {}
             for c in columns:
                 _dfout[c] = pd.Series(f[group][c])
-                if str(_dfout[c].dtype).startswith('|S'):
+                if c in vocabs:
+                    _dfout[c] = pd.Series(_decode_h5_strings(_dfout[c].values, vocabs[c][...]))
+                elif str(_dfout[c].dtype).startswith('|S'):
                     _dfout[c] = _dfout[c].str.decode('utf-8')
             dfout = pd.concat(_dfout, axis=1)
             dfout.index = index
@@ -1164,24 +1525,148 @@ def get_dtype(col, df=None):
         return f"S{maxlength}"
 
 
+def get_unique_columns(columns):
+    """
+    Get column names without duplicates.
+    Example: [*,*,r,*,t,Value] becomes [*,*.1,r,*.2,t,Value].
+    """
+    duplicated = pd.Index(columns).duplicated()
+    if not any(duplicated):
+        return list(columns)
+    columns_new = []
+    times_used = {}
+    for i, column in enumerate(columns):
+        if not duplicated[i]:
+            columns_new.append(column)
+        else:
+            times_used[column] = times_used.get(column, 1)
+            columns_new.append(f'{column}.{times_used[column]}')
+            times_used[column] += 1
+    return columns_new
+
+
 def make_columns_unique(df):
     """
     Rename columns in place to avoid duplicates.
     Example: [*,*,r,*,t,Value] becomes [*,*.1,r,*.2,t,Value].
     """
-    duplicated = df.columns.duplicated()
-    if any(duplicated):
-        columns_old = df.columns
-        columns_new = []
-        times_used = {}
-        for i, column in enumerate(columns_old):
-            if not duplicated[i]:
-                columns_new.append(column)
-            else:
-                times_used[column] = times_used.get(column, 1)
-                columns_new.append(f'{column}.{times_used[column]}')
-                times_used[column] += 1
-        df.columns = columns_new
+    if any(df.columns.duplicated()):
+        df.columns = get_unique_columns(df.columns)
+
+
+def encode_h5_column(data, string_encoding='fixed', dtype=None):
+    """
+    Convert one column to the arrays written by write_to_h5().
+
+    Returns:
+        tuple: (data array, vocab array or None)
+    """
+    is_string = (
+        (data.dtype == 'O')
+        or (data.dtype.kind == 'S')
+        or isinstance(data.dtype, pd.CategoricalDtype)
+    )
+    if is_string and (string_encoding == 'dictionary'):
+        codes, uniques = pd.factorize(data, use_na_sentinel=False)
+        uniques = pd.Index(uniques).map(
+            lambda x: x if isinstance(x, bytes) else str(x).encode('utf-8'))
+        vocab = uniques.values.astype(bytes)
+        return codes.astype(np.min_scalar_type(max(len(uniques) - 1, 0))), vocab
+    elif dtype is not None:
+        return np.asarray(data).astype(dtype, copy=False), None
+    elif data.dtype == 'O':
+        return np.asarray(data).astype(f"S{data.str.len().max()}"), None
+    else:
+        return np.asarray(data), None
+
+
+def encode_output_for_h5(df, drop_ctypes=False, string_encoding='fixed'):
+    """
+    Convert a dataframe of GAMS outputs to the arrays written by write_output_to_h5()
+    without copying or modifying df.
+
+    Returns:
+        dict: {'columns': list, 'data': {column: array}, 'vocab': {column: array}}
+            or None if df is empty
+    """
+    if not len(df):
+        return None
+    columns = list(df.columns)
+    ## Sets have `c_bool(True)` as the value for every entry, so just
+    ## drop the Value column if it's a set
+    keep = [
+        i for i, col in enumerate(columns)
+        if not (drop_ctypes and (col == 'Value') and isinstance(df.iloc[0, i], ctypes.c_bool))
+    ]
+    ## Make column names unique (necessary if '*' is overused)
+    names = get_unique_columns([columns[i] for i in keep])
+    encoded = {'columns': names, 'data': {}, 'vocab': {}}
+    for i, col in zip(keep, names):
+        data = df.iloc[:, i]
+        ## Normalize column data types; dictionary-encoded string columns are factorized
+        ## directly so don't need to be converted to fixed-width byte strings first
+        if col.lower() in ['value', 't', 'allt'] or string_encoding != 'dictionary':
+            dtype = get_dtype(col, {col: data})
+        else:
+            dtype = None
+        encoded['data'][col], vocab = encode_h5_column(data, string_encoding, dtype)
+        if vocab is not None:
+            encoded['vocab'][col] = vocab
+    return encoded
+
+
+def write_encoded_to_h5(
+    encoded,
+    key,
+    filepath,
+    attrs={},
+    overwrite=False,
+    compression='gzip',
+    compression_opts=4,
+    h5file=None,
+    **kwargs,
+):
+    """
+    Write the output of encode_output_for_h5() to the {key} group of {filepath}.
+    If an open h5py.File is passed as h5file, it is written to instead of filepath.
+    """
+    if h5file is None:
+        with h5py.File(filepath, 'a') as f:
+            return write_encoded_to_h5(
+                encoded, key, filepath, attrs=attrs, overwrite=overwrite,
+                compression=compression, compression_opts=compression_opts,
+                h5file=f, **kwargs,
+            )
+    f = h5file
+    if key in list(f):
+        if overwrite:
+            del f[key]
+        else:
+            raise ValueError(f'{key} is already used in {filepath}')
+
+    group = f.create_group(key)
+    ## Write columns to maintain order
+    columns = pd.Index(encoded['columns'])
+    group.create_dataset(
+        'columns',
+        data=columns,
+        dtype=f"S{columns.str.len().max()}",
+    )
+    if len(attrs):
+        for attr, val in attrs.items():
+            group.attrs[attr] = val
+    ## Write data
+    for col, vocab in encoded['vocab'].items():
+        group.require_group('_vocab').create_dataset(col, data=vocab)
+    for col, data in encoded['data'].items():
+        group.create_dataset(
+            col,
+            data=data,
+            dtype=data.dtype,
+            compression=compression,
+            compression_opts=compression_opts,
+            **kwargs,
+        )
 
 
 def write_to_h5(
@@ -1192,42 +1677,30 @@ def write_to_h5(
     overwrite=False,
     compression='gzip',
     compression_opts=4,
+    string_encoding='fixed',
     **kwargs,
 ):
-    """ """
-    with h5py.File(filepath, 'a') as f:
-        if key in list(f):
-            if overwrite:
-                del f[key]
-            else:
-                raise ValueError(f'{key} is already used in {filepath}')
+    """
+    Write each column of dfwrite to its own dataset in the {key} group of {filepath}.
 
-        group = f.create_group(key)
-        ## Write columns to maintain order
-        group.create_dataset(
-            'columns',
-            data=dfwrite.columns,
-            dtype=f"S{dfwrite.columns.str.len().max()}",
-        )
-        if len(attrs):
-            for key, val in attrs.items():
-                group.attrs[key] = val
-        ## Write data
-        if len(dfwrite):
-            for col in dfwrite:
-                dtype = (
-                    f"S{dfwrite[col].str.len().max()}"
-                    if dfwrite.dtypes[col] == 'O'
-                    else dfwrite.dtypes[col]
-                )
-                group.create_dataset(
-                    col,
-                    data=dfwrite[col],
-                    dtype=dtype,
-                    compression=compression,
-                    compression_opts=compression_opts,
-                    **kwargs,
-                )
+    string_encoding:
+        'fixed': String columns are written as fixed-width byte strings (one per row)
+        'dictionary': String columns are written as unsigned integer codes, with the
+            unique values written to {key}/_vocab/{column} as fixed-width byte strings.
+            Read with reeds.io.read_h5_output_group().
+    """
+    if string_encoding not in ['fixed', 'dictionary']:
+        raise ValueError(f"string_encoding must be 'fixed' or 'dictionary' but is {string_encoding}")
+    encoded = {'columns': list(dfwrite.columns), 'data': {}, 'vocab': {}}
+    if len(dfwrite):
+        for col in dfwrite:
+            encoded['data'][col], vocab = encode_h5_column(dfwrite[col], string_encoding)
+            if vocab is not None:
+                encoded['vocab'][col] = vocab
+    write_encoded_to_h5(
+        encoded, key, filepath, attrs=attrs, overwrite=overwrite,
+        compression=compression, compression_opts=compression_opts, **kwargs,
+    )
 
 
 def write_output_to_h5(
@@ -1236,6 +1709,7 @@ def write_output_to_h5(
     filepath,
     drop_ctypes=False,
     verbose=0,
+    string_encoding='fixed',
     **kwargs,
 ):
     """
@@ -1244,28 +1718,26 @@ def write_output_to_h5(
     of numeric data is named "Value".
     A group of name {key} is created in the .h5 file at {filepath} and each column
     in {df} is written to its own dataset.
-    String columns need to be decoded when read.
+    String columns need to be decoded when read; with string_encoding='dictionary'
+    they are written as integer codes plus a vocabulary (see write_to_h5()).
+    Both formats are read by reeds.io.read_output().
+    df is not modified or copied; returns the dictionary of encoded columns
+    (see encode_output_for_h5()).
     """
-    dfwrite = df.copy()
-    if not len(dfwrite):
+    if string_encoding not in ['fixed', 'dictionary']:
+        raise ValueError(f"string_encoding must be 'fixed' or 'dictionary' but is {string_encoding}")
+    encoded = encode_output_for_h5(df, drop_ctypes=drop_ctypes, string_encoding=string_encoding)
+    if encoded is None:
         if verbose:
             print(f'{key} dataframe is empty, so it was not written to {filepath}')
-        return dfwrite
-    ## Sets have `c_bool(True)` as the value for every entry, so just
-    ## drop the Value column if it's a set
-    if drop_ctypes and ("Value" in dfwrite) and isinstance(dfwrite.Value.values[0], ctypes.c_bool):
-        dfwrite.drop("Value", axis=1, inplace=True)
-    ## Make column names unique (necessary if '*' is overused)
-    make_columns_unique(dfwrite)
-    ## Normalize column data types
-    dfwrite = dfwrite.astype({col: get_dtype(col, dfwrite) for col in dfwrite})
+        return encoded
     ### Write to .h5 file
-    write_to_h5(dfwrite, key, filepath, **kwargs)
+    write_encoded_to_h5(encoded, key, filepath, **kwargs)
 
-    return dfwrite
+    return encoded
 
 
-def write_profile_to_h5(df, filename, outfolder, compression_opts=4):
+def write_profile_to_h5(df, filename, outfolder, compression_opts=4, contiguous=False):
     """Writes dataframe to h5py file format used by ReEDS. Used in ReEDS and hourlize
 
     This function takes a pandas dataframe and saves to a h5py file. Data is saved to h5 file as follows:
@@ -1283,6 +1755,9 @@ def write_profile_to_h5(df, filename, outfolder, compression_opts=4):
         Name of h5 file
     outfolder
         Path to folder to save the file (in ReEDS this is usually the inputs_case folder)
+    contiguous
+        If True, save the data uncompressed and contiguous (with floats as float32) so that
+        read_file() can memory-map it instead of decompressing the whole file
 
     Returns
     -------
@@ -1334,13 +1809,20 @@ def write_profile_to_h5(df, filename, outfolder, compression_opts=4):
             pass
         elif len(df.dtypes.unique()) == 1:
             dtype = df.dtypes.unique()[0]
-            f.create_dataset(
-                'data',
-                data=df.values,
-                dtype=dtype,
-                compression='gzip',
-                compression_opts=compression_opts,
-            )
+            if contiguous:
+                f.create_dataset(
+                    'data',
+                    data=df.values,
+                    dtype=(np.float32 if is_float_dtype(dtype) else dtype),
+                )
+            else:
+                f.create_dataset(
+                    'data',
+                    data=df.values,
+                    dtype=dtype,
+                    compression='gzip',
+                    compression_opts=compression_opts,
+                )
         else:
             types = df.dtypes.unique()
             print(df)
@@ -115,15 +115,17 @@ def get_solve_times(path=''):
 
 
 def write_last_pras_runtime(year, path=''):
-    """Write latest ReEDS2PRAS and PRAS runtimes from gamslog.txt to meta.csv"""
+    """Write latest ReEDS2PRAS, PRAS, and Julia compilation times from gamslog.txt to meta.csv"""
     times = {
         'start_ReEDS2PRAS': [],
         'stop_ReEDS2PRAS': [],
         'start_PRAS': [],
         'stop_PRAS': [],
     }
+    compile_seconds = []
     prefix = '[ Info: '
     postfix = ' | '
+    compile_label = ' | Julia compilation time: '
     with open(os.path.join(path, 'gamslog.txt'), 'r') as f:
         for _line in f:
             line = _line.strip()
@@ -135,6 +137,8 @@ def write_last_pras_runtime(year, path=''):
                 times['start_PRAS'].append(line[len(prefix) : line.index(postfix)])
             elif line.endswith('| Finished PRAS'):
                 times['stop_PRAS'].append(line[len(prefix) : line.index(postfix)])
+            elif compile_label in line:
+                compile_seconds.append(float(line.split(compile_label)[1].split()[0]))
     for key, val in times.items():
         times[key] = [pd.Timestamp(t) for t in val][-1]
     durations = {
@@ -152,6 +156,18 @@ def write_last_pras_runtime(year, path=''):
                     durations[process],
                 )
             )
+        ## Part of the ReEDS2PRAS and PRAS time that was spent compiling rather than
+        ## running (large for a new Julia process, small for a warm PRAS worker)
+        if compile_seconds:
+            METAFILE.writelines(
+                '{},{},{},{},{}\n'.format(
+                    year,
+                    'julia_compile',
+                    times['start_ReEDS2PRAS'].isoformat(),
+                    times['stop_PRAS'].isoformat(),
+                    compile_seconds[-1],
+                )
+            )
 
 
 def write_last_solve_time(path=''):
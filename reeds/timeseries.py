@@ -1,3 +1,4 @@
+import functools
 import os
 import sys
 import numpy as np
@@ -31,6 +32,154 @@ def get_timeindex(
     return timeindex
 
 
+@functools.lru_cache(maxsize=8)
+def _get_hmap_base(years, GSw_HourlyType='day', tz='Etc/GMT+6'):
+    """
+    Period-independent columns of the hourly map for a tuple of weather years.
+    Returns the dataframe along with the integer period code for each hour
+    (index into the returned array of period labels) and the zero-padded periodhour labels.
+    """
+    hoursperperiod = {'day':24, 'wek':120, 'year':24}[GSw_HourlyType]
+    periodsperyear = {'day':365, 'wek':73, 'year':365}[GSw_HourlyType]
+    p = 'w' if GSw_HourlyType == 'wek' else 'd'
+    numyears = len(years)
+    timestamps = [
+        pd.date_range(
+            f'{y}-01-01', f'{y + 1}-01-01', freq='H', inclusive='left', tz=tz,
+        )[:8760]
+        for y in years
+    ]
+    yearhour0 = np.tile(np.arange(8760, dtype=np.int64), numyears)
+    period0 = yearhour0 // hoursperperiod
+    periodhour = yearhour0 % hoursperperiod + 1
+    codes = np.repeat(np.arange(numyears, dtype=np.int64), 8760) * periodsperyear + period0
+    ### Each label is only formatted once and then broadcast to all hours using the codes
+    period_labels = np.array(
+        [f'y{y}{p}{d:>03}' for y in years for d in range(1, periodsperyear + 1)],
+        dtype=object,
+    )
+    hour_labels = np.array(
+        ['h' + f'{h:>03}' for h in range(hoursperperiod + 1)], dtype=object,
+    )[periodhour]
+    months = np.array(
+        ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'],
+        dtype=object,
+    )
+    hmap = pd.DataFrame({
+        'timestamp': timestamps[0].append(timestamps[1:]),
+        'year': np.repeat(np.array(years, dtype=np.int64), 8760),
+        'yearperiod': period0 + 1,
+        'hour': np.arange(1, 8760 * numyears + 1, dtype=np.int64),
+        'hour0': np.arange(8760 * numyears, dtype=np.int64),
+        'yearhour': yearhour0 + 1,
+        'periodhour': periodhour,
+        'actual_period': period_labels[codes],
+    })
+    hmap['actual_h'] = hmap.actual_period.values + hour_labels
+    hmap['month'] = months[hmap.timestamp.dt.month.values - 1]
+    return hmap, codes, period_labels, hour_labels
+
+
+@functools.lru_cache(maxsize=8)
+def _get_hmap(years, GSw_HourlyType, periods):
+    hmap_base, codes, period_labels, hour_labels = _get_hmap_base(years, GSw_HourlyType)
+    hmap_allyrs = hmap_base.copy()
+    period2season = pd.Series(
+        [season for _, season in periods], index=[period for period, _ in periods],
+        dtype=object,
+    )
+    season = pd.Series(period_labels).map(period2season).values[codes]
+    hmap_allyrs.insert(hmap_allyrs.columns.get_loc('month'), 'season', season)
+    if GSw_HourlyType == 'year':
+        ### If using a chronological year (i.e. 8760) the day index uses actual days
+        hmap_allyrs['h'] = hmap_allyrs.actual_h
+    else:
+        ### If using representative periods (days/weks) the period index uses
+        ### representative periods, which are in the 'season' column
+        hmap_allyrs['h'] = hmap_allyrs.season + hour_labels
+    ### hmap_myr (for "model years") only contains the actually-modeled periods
+    hmap_myr = hmap_allyrs.dropna(subset=['season'])
+    return hmap_allyrs, hmap_myr
+
+
+def get_hmap(years, GSw_HourlyType='day', period_szn=None):
+    """
+    Map each hour of the weather years to its actual period and modeled timeslice.
+    Columns are built with integer arithmetic and each label is formatted once per period,
+    then broadcast to the hours.
+
+    Inputs
+    ------
+    years: list of weather years or '_'-delimited string
+    GSw_HourlyType: 'day', 'wek', or 'year'
+    period_szn: dataframe with 'actual_period' and 'season' columns
+
+    Returns
+    -------
+    hmap_allyrs: all hours of all weather years
+    hmap_myr: only the hours in modeled periods (with a non-null 'season')
+
+    Notes
+    -----
+    * Results are memoized on (years, GSw_HourlyType, period_szn) so repeated calls within
+      a process (e.g. for stress-period iterations) reuse the hourly map, and a new
+      period_szn only reassigns the 'season' and 'h' columns.
+      Copies are returned so callers can modify them.
+    """
+    _years = tuple(
+        int(y) for y in (years.split('_') if isinstance(years, str) else years)
+    )
+    periods = (
+        tuple() if period_szn is None
+        else tuple(period_szn[['actual_period', 'season']].itertuples(index=False, name=None))
+    )
+    hmap_allyrs, hmap_myr = _get_hmap(_years, GSw_HourlyType, periods)
+    return hmap_allyrs.copy(), hmap_myr.copy()
+
+
+def get_period_index(timestamps, GSw_HourlyType='day', tz='Etc/GMT+6'):
+    """
+    Integer period code and periodhour for each timestamp, following the hour numbering
+    in get_hmap() (8760 hours per year; leap years drop Dec 31).
+    Period codes are {year}{yearperiod:03}; e.g. y2012d045 -> 2012045 (see period_to_code()).
+    """
+    _timestamps = pd.DatetimeIndex(timestamps)
+    if _timestamps.tz is not None:
+        _timestamps = _timestamps.tz_convert(tz)
+    hoursperperiod = {'day':24, 'wek':120, 'year':24}[GSw_HourlyType]
+    yearhour0 = (_timestamps.dayofyear.values.astype(np.int64) - 1) * 24 + _timestamps.hour.values
+    period = _timestamps.year.values.astype(np.int64) * 1000 + yearhour0 // hoursperperiod + 1
+    periodhour = yearhour0 % hoursperperiod + 1
+    return period, periodhour
+
+
+def period_to_code(periods):
+    """
+    Map period labels (e.g. 'y2012d045', 'sy2012w009', or timeslices like
+    'y2012d045h001') to the integer period codes used by get_period_index()
+    """
+    labels = pd.Series(periods, dtype=object).str.extract(r'y(\d{4})[dw](\d{3})')
+    return (labels[0].astype(np.int64) * 1000 + labels[1].astype(np.int64)).values
+
+
+def add_period_index(df, GSw_HourlyType='day', tz='Etc/GMT+6'):
+    """
+    Append integer 'period' and 'periodhour' index levels (see get_period_index())
+    to a dataframe with a 'datetime' index level, so it can be sliced by period with
+    df.loc[df.index.get_level_values('period').isin(period_to_code(periods))].
+    The data are not copied.
+    """
+    period, periodhour = get_period_index(
+        df.index.get_level_values('datetime'), GSw_HourlyType=GSw_HourlyType, tz=tz,
+    )
+    dfout = df.copy(deep=False)
+    dfout.index = pd.MultiIndex.from_arrays(
+        [df.index.get_level_values(i) for i in range(df.index.nlevels)] + [period, periodhour],
+        names=list(df.index.names) + ['period', 'periodhour'],
+    )
+    return dfout
+
+
 def h2timestamp(h, tz='Etc/GMT+6'):
     """
     Map ReEDS timeslice to actual timestamp
@@ -0,0 +1,88 @@
+"""
+Check the county disaggregation helpers in input_processing/aggregate_regions.py
+on small mixed-resolution cases
+"""
+
+#%% Imports
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+reeds_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if reeds_path not in sys.path:
+    sys.path.append(reeds_path)
+sys.path.append(os.path.join(reeds_path, 'input_processing'))
+import aggregate_regions
+
+
+#%% Inputs
+@pytest.fixture
+def agglevel_variables():
+    """p1 and p2 are solved at BA resolution and p3 and p4 at county resolution"""
+    return {
+        'lvl': 'mult',
+        'ba_regions': ['p1', 'p2'],
+        'county_regions': ['p03001', 'p03002', 'p04001'],
+        'county_regions2ba': ['p3', 'p4'],
+        ## tg1 includes both BA- and county-resolution regions
+        'ba_transgrp': ['tg1'],
+        'county_transgrp': ['tg1', 'tg2'],
+    }
+
+
+#%% Tests
+def test_get_region_membership(agglevel_variables):
+    region_membership = aggregate_regions.get_region_membership(agglevel_variables)
+    expected = pd.DataFrame(
+        {
+            'ba': [True, True, True, False, False, False, False],
+            'county': [False, False, True, True, True, True, True],
+        },
+        index=['p1', 'p2', 'tg1', 'p03001', 'p03002', 'p04001', 'tg2'],
+    )
+    pd.testing.assert_frame_equal(region_membership, expected)
+
+
+def test_filter_county_transmission(agglevel_variables):
+    dftrans = pd.DataFrame(
+        [
+            ('p1', 'p2', 'AC', 100.),
+            ('p1', 'p03001', 'AC', 200.),
+            ('p03001', 'p2', 'B2B', 300.),
+            ('p03001', 'p04001', 'AC', 400.),
+            ('p1', 'missing', 'AC', 500.),
+            ('tg1', 'p1', 'LCC', 600.),
+            ('missing', 'p03002', 'AC', 700.),
+            ('p1', 'p03001', 'AC', 200.),
+        ],
+        columns=['r', 'rr', 'trtype', 'MW'],
+    )
+    region_membership = aggregate_regions.get_region_membership(agglevel_variables)
+    result = aggregate_regions.filter_county_transmission(
+        dftrans, ['r', 'rr'], region_membership)
+    ## BA-BA and unknown-region interfaces are dropped, as is the duplicate
+    pd.testing.assert_frame_equal(result, dftrans.loc[[1, 2, 3, 5]])
+
+
+def test_get_present_regions():
+    dfin = pd.DataFrame(columns=['p1', 'p3', 'p134'])
+    assert (
+        aggregate_regions.get_present_regions(dfin, ['p200', 'p3', 'p1', 'p500', 'p134'])
+        == ['p3', 'p1', 'p134']
+    )
+
+
+def test_disaggregate_load_hourly():
+    index = pd.MultiIndex.from_product([[2030], [0, 1]], names=['year', 'datetime'])
+    load = pd.DataFrame(
+        {'p1': [10., 20.], 'p2': [1., 2.], 'p5': [3., 4.]}, index=index, dtype=np.float32)
+    fracdata = pd.DataFrame(
+        {'PCA_REG': ['p2', 'p1', 'p1'], 'fracdata': [1., 0.25, 0.75]},
+        index=pd.Index(['c1', 'c2', 'c3'], name='FIPS'),
+    )
+    result = aggregate_regions.disaggregate_load_hourly(load, fracdata)
+    expected = pd.DataFrame(
+        {'c1': [1., 2.], 'c2': [2.5, 5.], 'c3': [7.5, 15.]}, index=index, dtype=np.float32)
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,122 @@
+"""
+Check the capacity credit functions in ReEDS_Augur/capacity_credit.py on small
+profiles with hand-computed results
+"""
+
+#%% Imports
+import os
+import sys
+import numpy as np
+import pytest
+
+reeds_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if reeds_path not in sys.path:
+    sys.path.append(reeds_path)
+from ReEDS_Augur import capacity_credit
+
+
+#%% Tests
+@pytest.mark.parametrize(
+    'eff_charge,stor_buffer_minutes,expected',
+    [
+        (1.0, 0, [0, 2, 8]),
+        (0.5, 0, [0, 3, 8]),
+        ## The buffer adds stor_buffer_minutes of energy at each power level
+        (1.0, 60, [0, 4, 12]),
+        (1.0, 30, [0, 3, 10]),
+    ],
+)
+def test_calc_required_mwh(eff_charge, stor_buffer_minutes, expected):
+    load_profile = np.array([5., 10., 6., 10., 4.])
+    peak_reductions = np.array([0., 2., 4.])
+    required_MWhs, batt_powers = capacity_credit.calc_required_mwh(
+        load_profile, peak_reductions, eff_charge, stor_buffer_minutes)
+    np.testing.assert_allclose(required_MWhs, expected)
+    assert batt_powers.shape == (len(peak_reductions), len(load_profile))
+    np.testing.assert_array_equal(batt_powers[:, 0], peak_reductions)
+
+
+def test_calc_required_mwh_batch():
+    ### Profiles of different lengths, peak reductions, and efficiencies,
+    ### as for ccregs and ccseasons
+    load_profiles = [np.array([5., 10., 6., 10., 4.]), np.array([3., 1., 3.])]
+    peak_reductions = [np.array([0., 2., 4.]), np.array([0., 1., 2.])]
+    ## max_elements=5 processes one peak reduction at a time to exercise the chunking
+    required_MWhs = capacity_credit.calc_required_mwh_batch(
+        load_profiles, peak_reductions, [0.5, 1.0], 0, max_elements=5)
+    np.testing.assert_allclose(required_MWhs[0], [0, 3, 8])
+    np.testing.assert_allclose(required_MWhs[1], [0, 1, 4])
+    ## A single set of peak reductions is used for all profiles
+    required_MWhs = capacity_credit.calc_required_mwh_batch(
+        load_profiles, np.array([0., 2.]), 1.0, 60)
+    np.testing.assert_allclose(required_MWhs[0], [0, 4])
+    np.testing.assert_allclose(required_MWhs[1], [0, 6])
+
+
+def test_find_crossover():
+    ## The energy line e_base + 3 * (p - p_base) crosses re = 6p - 500 at p = 166.67
+    pr = np.array([0., 100., 200.])
+    re = np.array([0., 100., 700.])
+    p, iterations, converged = capacity_credit.find_crossover(
+        pr, re, p_base=0., e_base=0., d=3, p_step_small=1.)
+    assert (p, converged) == (166, True)
+    assert iterations > 0
+    ## Starting from an existing bin: 6p - 500 >= 50 + 3 * (p - 50) at p = 133.33
+    p, _, converged = capacity_credit.find_crossover(
+        pr, re, p_base=50., e_base=50., d=3, p_step_small=1.)
+    assert (p, converged) == (133, True)
+    ## Stop after max_iter steps if the crossover hasn't been reached
+    p, _, converged = capacity_credit.find_crossover(
+        pr, re, p_base=50., e_base=50., d=3, p_step_small=1., max_iter=10)
+    assert (p, converged) == (61, False)
+    ## A curve with lower duration than the energy line never crosses it
+    _, _, converged = capacity_credit.find_crossover(
+        pr, np.array([0., 100., 200.]), p_base=0., e_base=0., d=3, p_step_small=1.)
+    assert not converged
+
+
+def test_cc_storage():
+    pr = np.array([0., 100., 200., 300.])
+    re = np.array([0., 150., 500., 1100.])
+    result = capacity_credit.cc_storage(pr, re, [2, 4, 8])
+    assert result.duration.tolist() == [2, 4, 8]
+    ## 2h: limited by the 3.5h marginal duration between 100 and 200 MW.
+    ## 4h: crossover of the curve (6p - 700 above 200 MW) and 250 + 4 * (p - 125) at 225 MW.
+    ## 8h: the rest of the curve.
+    np.testing.assert_allclose(result.MW.values, [125, 99, 76])
+    assert result.MW.sum() == pr[-1]
+    ## Only the 4h bin needs a crossover search
+    assert result.iterations.tolist()[0] == result.iterations.tolist()[2] == 0
+    assert result.iterations.tolist()[1] > 0
+
+
+def test_cc_storage_constant_duration():
+    ## With a 3h MW–MWh curve, 2h storage gets nothing and 4h storage gets everything
+    pr = np.linspace(0, 1000, 11)
+    result = capacity_credit.cc_storage(pr, pr * 3, [2, 4, 6, 8])
+    assert result.duration.tolist() == [2, 4, 6, 8]
+    np.testing.assert_allclose(result.MW.values, [0, 1000, 0, 0])
+    assert (result.iterations == 0).all()
+
+
+@pytest.mark.parametrize('chunk_mb', [None, 1e-6])
+def test_calc_peak_marg_net_load(chunk_mb):
+    load_net = np.array([5., 9., 7., 1., 8.])
+    marg_cf = np.array([
+        [0., 0., 0.],
+        [2., 0., 0.],
+        [0., 1.5, 0.],
+        [0., 0., 0.],
+        [0., 0., 4.],
+    ])
+    peak_net_load, peak_bytes = capacity_credit.calc_peak_marg_net_load(
+        load_net, marg_cf, 2, marg_scale=2., chunk_mb=chunk_mb)
+    ## Top 2 hours of load_net - 2 * marg_cf for each resource, from highest to lowest
+    expected = np.array([
+        [8., 9., 9.],
+        [7., 8., 7.],
+    ])
+    np.testing.assert_array_equal(peak_net_load, expected)
+    if chunk_mb is not None:
+        ## One resource at a time
+        assert peak_bytes <= len(load_net) * 8
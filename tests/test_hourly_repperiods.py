@@ -0,0 +1,101 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'input_processing'))
+import hourly_repperiods
+
+
+#%% Helper functions
+def make_profiles(daymeans, hours=2):
+    """
+    Make hourly profiles with one row per day and (property, region, h_of_period) columns
+    from the daily means of each (property, region) column
+    """
+    daymeans = np.asarray(daymeans, dtype=float)
+    numdays, numcols = daymeans.shape
+    index = pd.MultiIndex.from_tuples(
+        [(2012, d) for d in range(1, numdays + 1)], names=['year', 'yperiod'])
+    columns = pd.MultiIndex.from_product(
+        [['load', 'upv'], [f'p{i}' for i in range(numcols // 2)], range(1, hours + 1)],
+        names=['property', 'region', 'h_of_period'])
+    ## Alternate above and below the daily mean so the hourly values average to it
+    offsets = np.tile([0.1, -0.1], hours // 2)
+    values = (daymeans[:, :, None] + offsets[None, None, :]).reshape(numdays, -1)
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+#%% Tests
+@pytest.mark.parametrize('solver', ['highs', 'cbc'])
+def test_solve_sparse_model(solver):
+    ## min x0 + 2 x1 + 3 x2 s.t. x0 + x1 + x2 == 2, x0 <= 1.5, x integer
+    x = hourly_repperiods.solve_sparse_model(
+        c=np.array([1., 2., 3.]),
+        A_eq=scipy.sparse.csr_matrix(np.ones((1, 3))),
+        b_eq=np.array([2.]),
+        lb=np.zeros(3),
+        ub=np.array([1.5, np.inf, np.inf]),
+        integrality=np.ones(3),
+        solver=solver,
+    )
+    np.testing.assert_allclose(x, [1, 1, 0], atol=1e-9)
+
+
+def test_solve_sparse_model_solver():
+    with pytest.raises(ValueError):
+        hourly_repperiods.solve_sparse_model(
+            np.ones(1), scipy.sparse.csr_matrix(np.ones((1, 1))), np.ones(1),
+            np.zeros(1), np.ones(1), solver='gurobi')
+
+
+@pytest.mark.parametrize('solver', ['highs', 'cbc'])
+def test_optimize_period_weights(solver):
+    ## The only weighting of these days that reproduces the mean is equal weights
+    profiles = make_profiles([
+        [1, 0, 0, 1],
+        [0, 1, 0, 1],
+        [0, 0, 1, 1],
+        [1, 1, 1, 0],
+    ])
+    profiles_day, iweights, weights = hourly_repperiods.optimize_period_weights(
+        profiles, numclusters=4, solver=solver)
+    assert list(profiles_day.columns) == [
+        ('load', 'p0'), ('load', 'p1'), ('upv', 'p0'), ('upv', 'p1')]
+    np.testing.assert_allclose(profiles_day.values[0], [1, 0, 0, 1])
+    np.testing.assert_allclose(weights.values, 1, atol=1e-6)
+    assert iweights.tolist() == [1, 1, 1, 1]
+
+
+@pytest.mark.parametrize('solver', ['highs', 'cbc'])
+def test_optimize_period_weights_truncated(solver):
+    profiles = make_profiles(np.random.default_rng(0).random((30, 4)))
+    profiles_day, iweights, weights = hourly_repperiods.optimize_period_weights(
+        profiles, numclusters=5, solver=solver)
+    ## The weighted days reproduce the mean of all days
+    np.testing.assert_allclose(
+        (profiles_day.multiply(weights, axis=0)).sum() / len(profiles_day),
+        profiles_day.mean(), atol=1e-6)
+    assert weights.sum() == pytest.approx(len(profiles_day))
+    ## Only the highest-weighted days are kept, and their weights sum to the number of days
+    assert len(iweights) <= 5
+    assert iweights.sum() == len(profiles_day)
+    assert set(iweights.index) <= set(weights.sort_values(ascending=False).index[:5])
+
+
+@pytest.mark.parametrize('solver', ['highs', 'cbc'])
+def test_assign_representative_days(solver):
+    profiles_day = pd.DataFrame(
+        {('load', 'p0'): [0., 1., 10., 11., 20.], ('upv', 'p0'): [0., 0., 5., 5., 0.]},
+        index=pd.MultiIndex.from_tuples(
+            [(2012, d) for d in range(1, 6)], names=['year', 'yperiod']),
+    )
+    rweights = pd.Series({(2012, 1): 2, (2012, 3): 2, (2012, 5): 1})
+    a2r = hourly_repperiods.assign_representative_days(profiles_day, rweights, solver=solver)
+    assert a2r.index.name == 'act'
+    assert a2r.name == 'rep'
+    ## Each day goes to the closest representative day that still has weight left
+    assert a2r.tolist() == [(2012, 1), (2012, 1), (2012, 3), (2012, 3), (2012, 5)]
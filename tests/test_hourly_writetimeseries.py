@@ -0,0 +1,82 @@
+"""
+Check that writing the stress period inputs in input_processing/hourly_writetimeseries.py
+incrementally (appending the new periods to the previous iteration) gives the same
+outputs as processing all periods from scratch.
+
+Requires a completed ReEDS case with stress periods:
+    python -m pytest tests/test_hourly_writetimeseries.py --casepath /path/to/case
+"""
+
+#%% Imports
+import os
+import shutil
+import sys
+import pandas as pd
+import pytest
+
+reeds_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if reeds_path not in sys.path:
+    sys.path.append(reeds_path)
+sys.path.append(os.path.join(reeds_path, 'input_processing'))
+import reeds
+import hourly_writetimeseries
+
+
+#%% Fixtures
+@pytest.fixture
+def inputs_case(pytestconfig, tmp_path):
+    """Link the case's input files into tmp_path so the outputs are written there"""
+    casepath = pytestconfig.getoption('casepath')
+    if casepath is None:
+        pytest.skip('requires --casepath')
+    shutil.copytree(
+        os.path.join(casepath, 'inputs_case'),
+        tmp_path / 'inputs_case',
+        copy_function=os.symlink,
+    )
+    return str(tmp_path / 'inputs_case')
+
+
+#%% Helper functions
+def get_stress_periods(inputs_case):
+    """Get the stress periods from the first stress period iteration of the case"""
+    for stresspath in sorted(os.listdir(inputs_case)):
+        fpath = os.path.join(inputs_case, stresspath, 'period_szn.csv')
+        if stresspath.startswith('stress') and os.path.isfile(fpath):
+            period_szn = pd.read_csv(fpath)
+            if len(period_szn) >= 2:
+                return period_szn
+    pytest.skip('case has no stress period iteration with at least 2 periods')
+
+
+def write_periods(inputs_case, periodtype, period_szn, previous_periodtype=None):
+    os.makedirs(os.path.join(inputs_case, periodtype), exist_ok=True)
+    period_szn.to_csv(os.path.join(inputs_case, periodtype, 'period_szn.csv'), index=False)
+    sw = reeds.io.get_switches(inputs_case)
+    return hourly_writetimeseries.main(
+        sw=sw, reeds_path=reeds_path, inputs_case=inputs_case, periodtype=periodtype,
+        make_plots=0, previous_periodtype=previous_periodtype,
+    )
+
+
+def read_output(inputs_case, periodtype, f):
+    df = pd.read_csv(os.path.join(inputs_case, periodtype, f+'.csv'))
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+#%% Tests
+def test_incremental_stress_periods(inputs_case):
+    period_szn = get_stress_periods(inputs_case)
+    ## The previous iteration has the first half of the periods
+    write_periods(inputs_case, 'stress9999i0', period_szn.iloc[:len(period_szn) // 2])
+    write = write_periods(inputs_case, 'stress9999i1', period_szn)
+    write_periods(
+        inputs_case, 'stress9999i2', period_szn, previous_periodtype='stress9999i0')
+
+    for f in write:
+        pd.testing.assert_frame_equal(
+            read_output(inputs_case, 'stress9999i2', f),
+            read_output(inputs_case, 'stress9999i1', f),
+            check_dtype=False,
+            obj=f,
+        )
@@ -0,0 +1,203 @@
+"""
+Check the batched weight calculation and application in input_processing/mcs_sampler.py
+on small reference files with fixed region weights
+"""
+
+#%% Imports
+import os
+import sys
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+import pytest
+
+reeds_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if reeds_path not in sys.path:
+    sys.path.append(reeds_path)
+from input_processing import mcs_sampler
+
+
+#%% Inputs
+## Weights for [sample, reference file]: sample 0 mixes the files and sample 1 picks one
+R_WEIGHTS = {
+    'p1': np.array([[0.25, 0.75], [1., 0.]]),
+    'p2': np.array([[0.5, 0.5], [0., 1.]]),
+}
+
+
+def get_weight_calculator(r_weights=R_WEIGHTS, sample_hierarchy_lvl='ba'):
+    """Make a WeightCalculator with fixed BA-level weights without reading a ReEDS case"""
+    wc = mcs_sampler.WeightCalculator.__new__(mcs_sampler.WeightCalculator)
+    wc.distribution = 'dirichlet'
+    wc.dist_params = [1, 1]
+    wc.sample_hierarchy_lvl = sample_hierarchy_lvl
+    wc.hierarchy_file = pd.DataFrame({
+        'ba': ['p1', 'p2'], 'cendiv': ['cendiv1', 'cendiv1'], 'country': 'USA'})
+    wc.n_samples = 2
+    wc.r_weights = r_weights
+    wc.recf_weights_map = {}
+    wc.flag_recf_normalization = defaultdict(lambda: False)
+    return wc
+
+
+def get_sampler(wc, file_name):
+    """Make an MCS_Sampler for a single file without reading a ReEDS case"""
+    sampler = mcs_sampler.MCS_Sampler.__new__(mcs_sampler.MCS_Sampler)
+    sampler.sample_group = {
+        'Sample_ID': ['sample'],
+        'switch_names': ['GSw_Test'],
+        'runfiles_csv': [{'filename': file_name}],
+    }
+    sampler.n_samples = wc.n_samples
+    sampler.weight_calc = wc
+    sampler.samples = {}
+    return sampler
+
+
+@pytest.fixture
+def supply_curves():
+    """Two aligned supply curves; class 2 in p1 has no capacity in the first"""
+    return [
+        pd.DataFrame({
+            'region': ['p1', 'p1', 'p2'], 'sc_point_gid': [0, 1, 2], 'class': [1, 2, 1],
+            'capacity': [10., 0., 20.], 'cost_cap': [100., 200., 300.],
+        }),
+        pd.DataFrame({
+            'region': ['p1', 'p1', 'p2'], 'sc_point_gid': [0, 1, 2], 'class': [1, 1, 2],
+            'capacity': [30., 40., 20.], 'cost_cap': [500., 600., 700.],
+        }),
+    ]
+
+
+#%% Tests
+def test_general():
+    dist_files = [
+        pd.DataFrame({'t': [2020, 2030], 'p1': [10, 20], 'p2': [100, 200]}),
+        pd.DataFrame({'t': [2020, 2030], 'p1': [30, 40], 'p2': [300, 400]}),
+    ]
+    wc = get_weight_calculator()
+    weights = wc._get_weights_general(dist_files, ['p1', 'p2'], 'GSw_Test', 'test.csv')
+    assert weights.shape == (2, 2, 1, 2)
+    np.testing.assert_array_equal(weights[:, :, 0, 0], R_WEIGHTS['p1'])
+    np.testing.assert_array_equal(weights[:, :, 0, 1], R_WEIGHTS['p2'])
+
+    sampler = get_sampler(wc, 'test.csv')
+    sampler._apply_weights_general(dist_files, ['p1', 'p2'], {'p1': 2, 'p2': 2}, weights, 0)
+    samples = sampler.samples['sample']
+    pd.testing.assert_frame_equal(
+        samples[0], pd.DataFrame({'t': [2020, 2030], 'p1': [25., 35.], 'p2': [200., 300.]}))
+    pd.testing.assert_frame_equal(
+        samples[1], pd.DataFrame({'t': [2020, 2030], 'p1': [10., 20.], 'p2': [300., 400.]}))
+    ## The reference files are not modified
+    assert dist_files[0].p1.tolist() == [10, 20]
+
+
+def test_general_discrete():
+    ## Integer columns stay integers with one-hot (discrete) weights
+    dist_files = [
+        pd.DataFrame({'p1': [1, 2], 'p2': [3, 4]}),
+        pd.DataFrame({'p1': [5, 6], 'p2': [7, 8]}),
+    ]
+    r_weights = {'p1': np.array([[1, 0], [0, 1]]), 'p2': np.array([[0, 1], [0, 1]])}
+    wc = get_weight_calculator(r_weights)
+    weights = wc._get_weights_general(dist_files, ['p1', 'p2'], 'GSw_Test', 'test.csv')
+    sampler = get_sampler(wc, 'test.csv')
+    sampler._apply_weights_general(dist_files, ['p1', 'p2'], {'p1': 0, 'p2': 0}, weights, 0)
+    samples = sampler.samples['sample']
+    pd.testing.assert_frame_equal(samples[0], pd.DataFrame({'p1': [1, 2], 'p2': [7, 8]}))
+    pd.testing.assert_frame_equal(samples[1], pd.DataFrame({'p1': [5, 6], 'p2': [7, 8]}))
+
+
+def test_single_weight():
+    dist_files = [pd.DataFrame({'value': [1.]}), pd.DataFrame({'value': [2.]})]
+    wc = get_weight_calculator(
+        {'p1': R_WEIGHTS['p1'], 'p2': R_WEIGHTS['p1']}, sample_hierarchy_lvl='country')
+    ## switches.csv gets one weight per sample and file
+    weights = wc._get_weights_general(dist_files, ['value'], 'GSw_Test', 'switches.csv')
+    np.testing.assert_array_equal(weights, R_WEIGHTS['p1'])
+    ## Other files get the same weight for every row and column
+    weights = wc._get_weights_general(dist_files, ['value', 'other'], 'GSw_Test', 'test.csv')
+    assert weights.shape == (2, 2, 1, 2)
+    np.testing.assert_array_equal(weights[..., 0, 1], R_WEIGHTS['p1'])
+
+
+def test_general_without_regions():
+    dist_files = [pd.DataFrame({'value': [1.]}), pd.DataFrame({'value': [2.]})]
+    wc = get_weight_calculator()
+    with pytest.raises(ValueError):
+        wc._get_weights_general(dist_files, ['value'], 'GSw_Test', 'test.csv')
+
+
+def test_exog_prescribed():
+    dist_files = [
+        pd.DataFrame({'region': ['p2', 'p1', 'p2'], 'capacity': [1., 2., 3.]}),
+        pd.DataFrame({'region': ['p2', 'p1', 'p2'], 'capacity': [4., 5., 6.]}),
+    ]
+    weights = get_weight_calculator()._get_weights_exog_prescribed(dist_files)
+    assert weights.shape == (2, 2, 3, 1)
+    np.testing.assert_array_equal(weights[0, :, :, 0], [[0.5, 0.25, 0.5], [0.5, 0.75, 0.5]])
+    np.testing.assert_array_equal(weights[1, :, :, 0], [[0., 1., 0.], [1., 0., 1.]])
+
+
+def test_supply_curve(supply_curves):
+    modifiable_columns = ['class', 'capacity', 'cost_cap']
+    wc = get_weight_calculator()
+    weights = wc._get_weights_supply_curve(supply_curves, modifiable_columns, 'GSw_Test')
+    assert weights.shape == (2, 2, 3, 3)
+    ## Capacity uses the region weights; other columns are weighted by capacity
+    np.testing.assert_allclose(weights[0, :, :, 1], [[0.25, 0.25, 0.5], [0.75, 0.75, 0.5]])
+    np.testing.assert_allclose(weights[0, :, :, 2], [[0.1, 0., 0.5], [0.9, 1., 0.5]])
+    ## Points with no capacity in any selected file get zero weight
+    np.testing.assert_allclose(weights[1, :, :, 2], [[1., 0., 0.], [0., 0., 1.]])
+    np.testing.assert_array_equal(weights[..., 0], weights[..., 2])
+
+    sampler = get_sampler(wc, 'test.csv')
+    sampler._apply_weights_general(
+        supply_curves, modifiable_columns, {col: 3 for col in modifiable_columns}, weights, 0)
+    samples = sampler.samples['sample']
+    expected = [
+        supply_curves[0].assign(
+            **{'class': [1., 1., 1.5]}, capacity=[25., 30., 20.], cost_cap=[460., 600., 500.]),
+        supply_curves[0].assign(
+            **{'class': [1., 0., 2.]}, capacity=[10., 0., 20.], cost_cap=[100., 0., 700.]),
+    ]
+    for s in range(2):
+        pd.testing.assert_frame_equal(samples[s], expected[s])
+
+
+def test_recf(supply_curves):
+    wc = get_weight_calculator()
+    wc._get_weights_supply_curve(supply_curves, ['capacity'], 'GSw_Test')
+    ## New classes after the supply curve sample is adjusted
+    samples = [
+        supply_curves[0].assign(**{'class': [1, 1, 2]}),
+        supply_curves[0].assign(**{'class': [1, 0, 2]}),
+    ]
+    wc.normalize_recf_weights_map(samples, 'GSw_Test')
+    ## Sample 0: 1|p1 gets 2.5 MW from the first file and 52.5 MW from the second
+    pd.testing.assert_series_equal(
+        wc.recf_weights_map['GSw_Test'][0, 1]['weight'],
+        pd.Series(
+            [52.5 / 55, 0.5], name='weight',
+            index=pd.MultiIndex.from_tuples(
+                [('1|p1', '1|p1'), ('2|p2', '2|p2')], names=['new c|r', 'old c|r']),
+        ),
+    )
+
+    cf_files = [
+        pd.DataFrame({'1|p1': [0.2, 0.4], '2|p1': [0.9, 0.9], '1|p2': [0.6, 0.8]}),
+        pd.DataFrame({'1|p1': [0.42, 0.2], '2|p2': [0.2, 0.4]}),
+    ]
+    sampler = get_sampler(wc, 'test.csv')
+    sampler._apply_weights_recf(cf_files, 0)
+    samples = sampler.samples['sample']
+    pd.testing.assert_frame_equal(
+        samples[0],
+        pd.DataFrame({
+            '1|p1': [(0.2 * 2.5 + 0.42 * 52.5) / 55, (0.4 * 2.5 + 0.2 * 52.5) / 55],
+            '2|p2': [0.4, 0.6],
+        }).round(9),
+    )
+    ## Sample 1 takes p1 from the first file and p2 from the second
+    pd.testing.assert_frame_equal(
+        samples[1], pd.DataFrame({'1|p1': [0.2, 0.4], '2|p2': [0.2, 0.4]}))
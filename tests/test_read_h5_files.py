@@ -1,3 +1,5 @@
+import os
+from glob import glob
 import h5py
 import numpy as np
 import pandas as pd
@@ -59,3 +61,195 @@ def test_read_h5py_file(load_h5):
     assert isinstance(h5_df, pd.DataFrame)
     assert h5_df.size == 720  # 3 years * 24 rows * 10 colums
     assert h5_df.index.names == ["year", "hour"]
+
+
+@pytest.fixture
+def outputs_case(tmp_path, n_rows=1000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'i': rng.choice(['wind-ons_1', 'upv_1', 'battery_4', 'gas-cc'], n_rows),
+        'r': rng.choice([f'p{i}' for i in range(1, 11)], n_rows),
+        'rr': rng.choice([f'p{i}' for i in range(1, 11)], n_rows),
+        'allh': rng.choice([f'h{i}' for i in range(1, 25)], n_rows),
+        'allt': rng.choice([2030, 2040, 2050], n_rows),
+        'Value': rng.random(n_rows),
+    })
+    (tmp_path / 'outputs').mkdir()
+    h5path = tmp_path / 'outputs' / 'outputs.h5'
+    reeds.io.write_output_to_h5(df, 'fixed', h5path)
+    reeds.io.write_to_h5(df, 'dictionary', h5path, string_encoding='dictionary')
+    return str(tmp_path), df.rename(columns=reeds.io.OUTPUT_COLUMN_RENAMES)
+
+
+@pytest.mark.parametrize('key', ['fixed', 'dictionary'])
+def test_read_output_filters(outputs_case, key):
+    case, df = outputs_case
+    ## Full read matches what was written
+    dfread = reeds.io.read_output(case, key)
+    pd.testing.assert_frame_equal(dfread, df, check_dtype=False)
+    ## Column selection and filters are pushed down to the h5 read
+    dfread = reeds.io.read_output(
+        case, key, columns=['i', 'h', 't', 'Value'], filters={'t': [2040], 'i': ['upv_1']},
+    )
+    expected = df.loc[(df.t == 2040) & (df.i == 'upv_1'), ['i', 'h', 't', 'Value']]
+    pd.testing.assert_frame_equal(dfread, expected.reset_index(drop=True), check_dtype=False)
+    ## Region filter matches either r or rr
+    dfread = reeds.io.read_output(case, key, r_filter=['p1', 'p2'])
+    expected = df.loc[df.r.isin(['p1', 'p2']) | df.rr.isin(['p1', 'p2'])]
+    pd.testing.assert_frame_equal(dfread, expected.reset_index(drop=True), check_dtype=False)
+    ## Categorical decoding
+    dfread = reeds.io.read_output(case, key, low_memory=True, filters={'h': ['h1']})
+    assert isinstance(dfread.i.dtype, pd.CategoricalDtype)
+    assert (dfread.h == 'h1').all()
+    assert len(dfread) == (df.h == 'h1').sum()
+    ## No matches
+    assert not len(reeds.io.read_output(case, key, filters={'r': ['missing']}))
+
+
+def test_write_output_to_h5_dictionary(outputs_case, tmp_path):
+    _, df = outputs_case
+    df = df.rename(columns={v: k for k, v in reeds.io.OUTPUT_COLUMN_RENAMES.items()})
+    h5path = tmp_path / 'encoded.h5'
+    reeds.io.write_output_to_h5(df, 'gen_h', h5path, string_encoding='dictionary')
+    with h5py.File(h5path, 'r') as f:
+        assert f['gen_h']['r'].dtype.kind == 'u'
+        assert f['gen_h']['_vocab']['r'].dtype.kind == 'S'
+        assert f['gen_h']['allt'].dtype == np.uint16
+    dfread = reeds.io.read_output(str(h5path), 'gen_h')
+    pd.testing.assert_frame_equal(
+        dfread, df.rename(columns=reeds.io.OUTPUT_COLUMN_RENAMES), check_dtype=False)
+
+
+def test_read_outputs(outputs_case, tmp_path):
+    case, df = outputs_case
+    cases = {'a': case, 'b': case}
+    cachepath = str(tmp_path / 'cache')
+    valnames = {'fixed': 'MW'}
+    ## Matches read_output for each case and output
+    dfs = reeds.io.read_outputs(
+        cases, ['fixed', 'dictionary'], valnames=valnames, cachepath=cachepath)
+    for name in cases:
+        pd.testing.assert_frame_equal(
+            dfs['fixed'][name], reeds.io.read_output(case, 'fixed', valname='MW'))
+        pd.testing.assert_frame_equal(
+            dfs['dictionary'][name], reeds.io.read_output(case, 'dictionary'))
+    ## Second read comes from the cache
+    cachefiles = glob(os.path.join(cachepath, '*', '*.pkl'))
+    assert len(cachefiles) == 2
+    dfcached = reeds.io.read_outputs(cases, ['fixed'], valnames=valnames, cachepath=cachepath)
+    pd.testing.assert_frame_equal(dfcached['fixed']['a'], dfs['fixed']['a'])
+    assert dfcached['fixed']['a'] is not dfcached['fixed']['b']
+    ## Rewriting outputs.h5 invalidates the cache
+    h5path = os.path.join(case, 'outputs', 'outputs.h5')
+    df2 = df.rename(columns={v: k for k, v in reeds.io.OUTPUT_COLUMN_RENAMES.items()})
+    df2['Value'] *= 2
+    with h5py.File(h5path, 'a') as f:
+        del f['fixed']
+    reeds.io.write_output_to_h5(df2, 'fixed', h5path)
+    os.utime(h5path, ns=(0, os.stat(h5path).st_mtime_ns + 1))
+    dfnew = reeds.io.read_outputs(cases, ['fixed'], cachepath=cachepath)
+    np.testing.assert_allclose(dfnew['fixed']['a'].Value, df.Value * 2)
+
+
+def test_write_dfdict_workers(tmp_path):
+    import ctypes
+    import e_report_dump
+    rng = np.random.default_rng(0)
+    dfdict = {
+        f'out{i}': pd.DataFrame({
+            'i': rng.choice(['upv_1', 'wind-ons_1'], 100), 'r': rng.choice(['p1', 'p2'], 100),
+            'allt': rng.choice([2030, 2040], 100), 'Value': rng.random(100),
+        })
+        for i in range(10)
+    }
+    dfdict['set'] = pd.DataFrame({'*': ['a', 'b'], '*_': ['c', 'd'], 'Value': ctypes.c_bool(True)})
+    dfdict['set'].columns = ['*', '*', 'Value']
+    dfdict['empty'] = pd.DataFrame(columns=['r', 'Value'])
+    before = {key: df.copy() for key, df in dfdict.items()}
+    dfout = {}
+    for workers in [None, 4]:
+        outputs_path = tmp_path / str(workers)
+        outputs_path.mkdir()
+        e_report_dump.write_dfdict(
+            dfdict, str(outputs_path), write_csv=True, rename={'out0': 'renamed'},
+            workers=workers, errors='raise',
+        )
+        h5path = str(outputs_path / 'outputs.h5')
+        with h5py.File(h5path, 'r') as f:
+            assert 'empty' not in f
+            dfout[workers] = {key: reeds.io.read_output(h5path, key) for key in f}
+        assert (outputs_path / 'renamed.csv').exists()
+    ## Inputs are not modified
+    for key, df in before.items():
+        pd.testing.assert_frame_equal(dfdict[key], df)
+    assert list(dfout[None]) == list(dfout[4])
+    for key, df in dfout[None].items():
+        pd.testing.assert_frame_equal(df, dfout[4][key])
+    assert list(dfout[4]['set'].columns) == ['*', '*.1']
+    pd.testing.assert_frame_equal(
+        dfout[4]['renamed'],
+        dfdict['out0'].rename(columns=reeds.io.OUTPUT_COLUMN_RENAMES),
+        check_dtype=False, atol=1e-6,
+    )
+
+
+def test_read_file_mmap(tmp_path):
+    """Memory-mapped copy of a profile file matches read_file() and is reused"""
+    timeindex = pd.date_range(
+        "2012-01-01", periods=48, freq="H", tz="Etc/GMT+6", name="datetime"
+    )
+    profiles = pd.concat(
+        {
+            year: pd.DataFrame(
+                np.random.rand(len(timeindex), 3).astype(np.float32),
+                index=timeindex,
+                columns=["p1", "p2", "p3"],
+            )
+            for year in [2030, 2035]
+        },
+        names=["year"],
+    )
+    reeds.io.write_profile_to_h5(profiles, "load.h5", tmp_path)
+    filename = os.path.join(tmp_path, "load.h5")
+    cachepath = os.path.join(tmp_path, "cache")
+
+    expected = reeds.io.read_file(filename, parse_timestamps=True)
+    first = reeds.io.read_file_mmap(filename, cachepath, parse_timestamps=True)
+    cached = reeds.io.read_file_mmap(filename, cachepath, parse_timestamps=True)
+
+    assert sorted(os.listdir(cachepath)) == ["load_timestamps.npy", "load_timestamps.pkl"]
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(cached, expected)
+    pd.testing.assert_frame_equal(
+        cached.loc[cached.index.get_level_values("year") == 2035] * 2,
+        expected.loc[expected.index.get_level_values("year") == 2035] * 2,
+    )
+
+
+def test_write_profile_contiguous(tmp_path):
+    """Uncompressed profiles are memory-mapped and read the same as compressed profiles"""
+    timeindex = pd.date_range(
+        "2012-01-01", periods=48, freq="H", tz="Etc/GMT+6", name="datetime"
+    )
+    profiles = pd.DataFrame(
+        np.random.rand(len(timeindex), 4).astype(np.float16),
+        index=timeindex,
+        columns=[f"upv_1|p{i}" for i in range(4)],
+    )
+    reeds.io.write_profile_to_h5(profiles, "compressed.h5", tmp_path)
+    reeds.io.write_profile_to_h5(profiles, "contiguous.h5", tmp_path, contiguous=True)
+    assert not reeds.io.is_contiguous_h5(tmp_path / "compressed.h5")
+    assert reeds.io.is_contiguous_h5(tmp_path / "contiguous.h5")
+
+    expected = reeds.io.read_file(tmp_path / "compressed.h5", parse_timestamps=True)
+    mapped = reeds.io.read_file(tmp_path / "contiguous.h5", parse_timestamps=True)
+    pd.testing.assert_frame_equal(mapped, expected)
+    values = mapped._mgr.arrays[0]
+    while not isinstance(values, np.memmap):
+        values = values.base
+
+    ## Modifying the dataframe doesn't change the file
+    mapped.iloc[0] = -1
+    pd.testing.assert_frame_equal(
+        reeds.io.read_file(tmp_path / "contiguous.h5", parse_timestamps=True), expected
+    )
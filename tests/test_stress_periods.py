@@ -0,0 +1,74 @@
+"""
+Check the sparse-matrix region aggregation in ReEDS_Augur/stress_periods.py
+on a small three-region hierarchy
+"""
+
+#%% Imports
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+reeds_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if reeds_path not in sys.path:
+    sys.path.append(reeds_path)
+from ReEDS_Augur import stress_periods
+
+
+#%% Fixtures
+@pytest.fixture
+def sw(tmp_path):
+    """p1 and p2 are in state A and p3 is in state B"""
+    os.makedirs(tmp_path / 'inputs_case')
+    pd.DataFrame({
+        'ba': ['p1', 'p2', 'p3'],
+        'nercr': ['N1', 'N2', 'N2'],
+        'transreg': ['T1', 'T2', 'T2'],
+        'transgrp': ['G1', 'G2', 'G2'],
+        'st': ['A', 'A', 'B'],
+        'interconnect': ['western'] * 3,
+        'country': ['USA'] * 3,
+    }).to_csv(tmp_path / 'inputs_case' / 'hierarchy.csv', index=False)
+    return pd.Series({'casedir': str(tmp_path)})
+
+
+#%% Tests
+@pytest.mark.parametrize(
+    'hierarchy_level,expected',
+    [
+        ('country', {'USA': [3., 3.], 'p9': [5., 0.]}),
+        ('st', {'A': [1., 3.], 'B': [2., 0.], 'p9': [5., 0.]}),
+        ('r', {'p1': [1., 3.], 'p2': [0., 0.], 'p3': [2., 0.], 'p9': [5., 0.]}),
+    ],
+)
+def test_aggregate_regions(sw, hierarchy_level, expected):
+    ## p9 isn't in the hierarchy so it keeps its own name; NaN is treated as 0
+    dfeue = pd.DataFrame(
+        {'p3': [2., 0.], 'p1': [1., 3.], 'p9': [5., 0.], 'p2': [0., np.nan]})
+    result = stress_periods.aggregate_regions(
+        dfeue, stress_periods.get_region_aggregator(sw, dfeue.columns, hierarchy_level))
+    pd.testing.assert_frame_equal(result, pd.DataFrame(expected))
+
+
+def test_get_annual_neue(sw, monkeypatch):
+    dfeue = pd.DataFrame({'p1': [1., 3.], 'p2': [0., 0.], 'p3': [2., 0.]})
+    ## Load columns are in a different order
+    dfload = pd.DataFrame({'p3': [500., 500.], 'p2': [3000., 3000.], 'p1': [1000., 1000.]})
+    monkeypatch.setattr(stress_periods, 'get_pras_eue', lambda **kwargs: dfeue)
+    monkeypatch.setattr(stress_periods.reeds.io, 'read_h5py_file', lambda f: dfload.copy())
+    neue = stress_periods.get_annual_neue(sw, t=2030)
+    assert neue.name == 'NEUE_ppm'
+    assert neue.index.names == ['level', 'metric', 'region']
+    assert neue.index.get_level_values('level').unique().tolist() == [
+        'country', 'interconnect', 'nercr', 'transreg', 'transgrp', 'st', 'r']
+    ## Annual EUE / annual load
+    assert neue['country', 'sum', 'USA'] == pytest.approx(6 / 9000 * 1e6)
+    assert neue['st', 'sum', 'A'] == pytest.approx(4 / 8000 * 1e6)
+    assert neue['st', 'sum', 'B'] == pytest.approx(2 / 1000 * 1e6)
+    assert neue['r', 'sum', 'p2'] == 0
+    ## Highest hourly EUE / load
+    assert neue['country', 'max', 'USA'] == pytest.approx(3 / 4500 * 1e6)
+    assert neue['st', 'max', 'A'] == pytest.approx(3 / 4000 * 1e6)
+    assert neue['nercr', 'max', 'N2'] == pytest.approx(2 / 3500 * 1e6)
+    assert neue['r', 'max', 'p3'] == pytest.approx(2 / 500 * 1e6)
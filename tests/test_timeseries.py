@@ -0,0 +1,85 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import reeds
+
+
+#%% Tests
+@pytest.mark.parametrize(
+    'GSw_HourlyType,period,hoursperperiod,periodsperyear',
+    [('day', 'd', 24, 365), ('wek', 'w', 120, 73), ('year', 'd', 24, 365)],
+)
+def test_get_hmap(GSw_HourlyType, period, hoursperperiod, periodsperyear):
+    """
+    Hourly map labels for the first hour, the 126th hour of the second year, and the
+    last hour, including when the map is reused from the cache with a new set of periods
+    """
+    years = [2011, 2012, 2013]
+    period_szn = pd.DataFrame({'actual_period': [f'y2012{period}001', f'y2012{period}006']})
+    period_szn['season'] = (
+        'winter' if GSw_HourlyType == 'year' else period_szn.actual_period
+    )
+    yearperiod = 2 if GSw_HourlyType == 'wek' else 6
+
+    for periods in [period_szn, period_szn.iloc[:1], period_szn]:
+        hmap_allyrs, hmap_myr = reeds.timeseries.get_hmap(
+            years=years, GSw_HourlyType=GSw_HourlyType, period_szn=periods,
+        )
+        assert len(hmap_allyrs) == 8760 * 3
+        row = hmap_allyrs.iloc[0]
+        assert (row.year, row.yearperiod, row.hour, row.hour0, row.yearhour, row.periodhour) == (
+            2011, 1, 1, 0, 1, 1)
+        assert (row.actual_period, row.actual_h, row.month) == (
+            f'y2011{period}001', f'y2011{period}001h001', 'JAN')
+        row = hmap_allyrs.iloc[8760 + 125]
+        assert row.timestamp == pd.Timestamp('2012-01-06 05:00', tz='Etc/GMT+6')
+        assert (row.year, row.yearperiod, row.hour, row.yearhour, row.periodhour) == (
+            2012, yearperiod, 8886, 126, 6)
+        assert row.actual_h == f'y2012{period}{yearperiod:>03}h006'
+        row = hmap_allyrs.iloc[-1]
+        assert (row.year, row.yearperiod, row.yearhour, row.periodhour, row.month) == (
+            2013, periodsperyear, 8760, hoursperperiod, 'DEC')
+        ## Only the hours in period_szn are kept in hmap_myr
+        assert len(hmap_myr) == len(periods) * hoursperperiod
+        assert (hmap_myr.actual_period.unique() == periods.actual_period.values).all()
+        if GSw_HourlyType == 'year':
+            assert (hmap_allyrs.h == hmap_allyrs.actual_h).all()
+            assert (hmap_myr.season == 'winter').all()
+        else:
+            assert (hmap_myr.h == hmap_myr.actual_h).all()
+            assert hmap_allyrs.h.isnull().sum() == len(hmap_allyrs) - len(hmap_myr)
+        ## Returned maps are copies, so modifying them doesn't change the cache
+        hmap_myr['h'] = 's' + hmap_myr['h']
+
+
+@pytest.mark.parametrize('GSw_HourlyType', ['day', 'wek', 'year'])
+def test_period_index(GSw_HourlyType):
+    """
+    Integer period codes from timestamps match the period labels in the hourly map,
+    including leap years
+    """
+    years = [2011, 2012]
+    hmap_allyrs, _ = reeds.timeseries.get_hmap(years=years, GSw_HourlyType=GSw_HourlyType)
+    period, periodhour = reeds.timeseries.get_period_index(
+        hmap_allyrs.timestamp.dt.tz_convert('UTC'), GSw_HourlyType=GSw_HourlyType,
+    )
+    assert (period == reeds.timeseries.period_to_code(hmap_allyrs.actual_period)).all()
+    assert (period == reeds.timeseries.period_to_code('s' + hmap_allyrs.actual_h)).all()
+    assert (periodhour == hmap_allyrs.periodhour.values).all()
+
+    profiles = pd.DataFrame(
+        {'cf': np.arange(len(hmap_allyrs))},
+        index=pd.Index(hmap_allyrs.timestamp, name='datetime'),
+    )
+    profiles = reeds.timeseries.add_period_index(profiles, GSw_HourlyType=GSw_HourlyType)
+    assert profiles.index.names == ['datetime', 'period', 'periodhour']
+    periods = hmap_allyrs.actual_period.drop_duplicates().iloc[[0, 5, -1]].tolist()
+    selected = profiles.loc[
+        profiles.index.get_level_values('period').isin(reeds.timeseries.period_to_code(periods))
+    ]
+    assert (selected.cf.values == np.flatnonzero(hmap_allyrs.actual_period.isin(periods))).all()